@@ -1,5 +1,10 @@
 import streamlit as st
 from utils.session import init_session_state
+from utils.data_manager import DataManager, request_scope
+from utils.perf import SHOW_TIMINGS, timing_summary, backend_call_summary
+from utils.price_crawler import PriceRefreshCrawler
+from utils.birthday_events import BirthdayEventJob
+from utils.chat_archive import ChatArchiveJob
 
 # Import pages
 from pages.login import show_login_page
@@ -10,6 +15,7 @@ from pages.add_wishlist_item import show_add_wishlist_item_page
 from pages.contribute import show_contribute_page
 from pages.wallet import show_wallet_page
 from pages.community import show_community_page
+from pages.search import show_search_page
 
 # Set page config
 st.set_page_config(
@@ -22,6 +28,33 @@ st.set_page_config(
 # Initialize session state
 init_session_state()
 
+@st.cache_resource
+def start_price_refresh():
+    """Start the background price refresh crawler once per server process"""
+    crawler = PriceRefreshCrawler()
+    crawler.start(interval_seconds=3600)
+    return crawler
+
+start_price_refresh()
+
+@st.cache_resource
+def start_birthday_events():
+    """Start the daily birthday event job once per server process"""
+    job = BirthdayEventJob()
+    job.start(interval_seconds=86400)
+    return job
+
+start_birthday_events()
+
+@st.cache_resource
+def start_chat_archive():
+    """Start the daily job archiving the chats of past events once per server process"""
+    job = ChatArchiveJob()
+    job.start(interval_seconds=86400)
+    return job
+
+start_chat_archive()
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -88,6 +121,8 @@ def route_to_page():
         show_wallet_page()
     elif page == "community":
         show_community_page()
+    elif page == "search":
+        show_search_page()
     else:
         st.error(f"Page '{page}' not found")
         st.session_state.page = "dashboard"
@@ -106,11 +141,21 @@ def show_footer():
 # Main app
 def main():
     """Main app function"""
-    # Route to the appropriate page
-    route_to_page()
+    # Route to the appropriate page, counting the data backend calls it makes
+    with request_scope(st.session_state.page):
+        route_to_page()
     
     # Show footer
     show_footer()
+    
+    # Per-section script timings, for comparing full reruns with fragment reruns
+    if SHOW_TIMINGS:
+        with st.expander("Script timings"):
+            st.dataframe([{"section": name, **stats} for name, stats in timing_summary().items()])
+            st.caption("Backend calls per render")
+            st.dataframe([{"section": name, **stats} for name, stats in backend_call_summary().items()])
+            st.caption("Read cache")
+            st.json(DataManager.get_cache_metrics())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
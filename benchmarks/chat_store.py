@@ -0,0 +1,67 @@
+# Memory, archival and read costs of utils.chat_store's segmented chat logs.
+# Run: python -m benchmarks.chat_store
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+
+from utils.chat_store import SegmentedChatLog, ChatStore
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    event_count, messages_per_event, active_events = 1000, 400, 100
+    phrases = ["Count me in for $20", "What about the blue one?", "I can pick it up on Friday",
+               "Has anyone asked about sizes?", "Great idea!", "Let's split it evenly"]
+
+    def messages(event):
+        return [{"user": f"user{rng.randrange(5000)}", "message": f"{rng.choice(phrases)} ({event}/{i})",
+                 "timestamp": f"2026-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} "
+                              f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:00"}
+                for i in range(messages_per_event)]
+
+    def measure(label, build):
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        kept = build()
+        elapsed = time.perf_counter() - started
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label}: {size / 2 ** 20:.1f} MiB ({elapsed:.1f} s)")
+        return kept, size
+
+    total = event_count * messages_per_event
+    rng.seed(7)
+    _, dict_bytes = measure(f"{total} messages as dicts", lambda: {f"event{e}": messages(e) for e in range(event_count)})
+
+    with tempfile.TemporaryDirectory() as directory:
+        rng.seed(7)
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        store = ChatStore({f"event{e}": SegmentedChatLog(messages(e)) for e in range(event_count)}, SegmentedChatLog)
+        segmented_bytes, _ = tracemalloc.get_traced_memory()
+        print(f"{total} messages in segmented logs: {segmented_bytes / 2 ** 20:.1f} MiB ({time.perf_counter() - started:.1f} s)")
+
+        started = time.perf_counter()
+        for e in range(active_events, event_count):
+            store.archive(f"event{e}", directory)
+        gc.collect()
+        resident_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"archive {event_count - active_events} past events: {time.perf_counter() - started:.1f} s; "
+              f"{resident_bytes / 2 ** 20:.1f} MiB resident for {active_events} active events, "
+              f"{dict_bytes / resident_bytes:.0f}x less than all chats as dicts")
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            store.read("event5", limit=50)
+        print(f"read the newest 50 messages of an active chat: {(time.perf_counter() - started) * 1e3:.0f} us")
+        started = time.perf_counter()
+        store.read("event500", cursor=100, limit=50)
+        print(f"open an archived chat and read 50 old messages: {(time.perf_counter() - started) * 1e3:.1f} ms")
+        started = time.perf_counter()
+        for _ in range(1000):
+            store.read("event500", cursor=100, limit=50)
+        print(f"read them again from the loaded chat: {(time.perf_counter() - started) * 1e3:.0f} us")
@@ -0,0 +1,65 @@
+# Append, load and group-by costs of utils.contribution_ledger at ten million contributions.
+# Run: python -m benchmarks.contribution_ledger
+import datetime
+import time
+
+import numpy as np
+
+from utils.contribution_ledger import BY_EVENT, BY_ITEM, BY_USER, BY_DAY, _COLUMNS, ContributionLedger
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    count = 10_000_000
+    event_count, user_count = 100000, 1000000
+
+    ledger = ContributionLedger()
+    started = time.perf_counter()
+    for i in range(100000):
+        ledger.append({"event_id": f"event{i % event_count}", "item_id": f"item{i % 10 + 1}",
+                       "user_id": f"user{i % user_count}", "amount": 25.0, "date": "2026-10-19"})
+    append_us = (time.perf_counter() - started) * 1e6 / 100000
+
+    # Fill the rest directly in the column format, as a snapshot load would
+    day = datetime.date(2026, 1, 1).toordinal()
+    events = rng.integers(0, event_count, count, dtype=np.int32)
+    items = rng.integers(0, 10, count, dtype=np.int32)
+    started = time.perf_counter()
+    ledger.load_columns({
+        "count": count,
+        "event_id": ("codes", events, [f"event{i}" for i in range(event_count)]),
+        "item_id": ("codes", events * 10 + items, [f"item{i + 1}" for _ in range(event_count) for i in range(10)]),
+        "item_events": np.repeat(np.arange(event_count, dtype=np.int32), 10),
+        "user_id": ("codes", rng.integers(0, user_count, count, dtype=np.int32), [f"user{i}" for i in range(user_count)]),
+        "amount": ("cents", rng.integers(500, 20000, count)),
+        "date": ("days", rng.integers(day, day + 365, count).astype(np.int32)),
+    })
+    print(f"append: {append_us:.2f} us/contribution; load {count} from columns: {time.perf_counter() - started:.1f} s, "
+          f"{sum(getattr(ledger, name)[:count].nbytes for name, _ in _COLUMNS) / 2 ** 20:.0f} MiB of columns")
+
+    def timed(label, fn, repeat=5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        print(f"{label}: {(time.perf_counter() - started) * 1e3 / repeat:.1f} ms ({len(result) if hasattr(result, '__len__') else result})")
+
+    timed("totals by event", lambda: ledger.totals(BY_EVENT))
+    timed("totals by user", lambda: ledger.totals(BY_USER), repeat=2)
+    timed("totals by day", lambda: ledger.totals(BY_DAY))
+    timed("totals by user for one event", lambda: ledger.totals(BY_USER, event_id="event42"))
+    timed("totals by item for one event", lambda: ledger.totals(BY_ITEM, event_id="event42"))
+    timed("total for one user", lambda: ledger.total(user_id="user42"))
+
+    sample = ledger[:1_000_000]
+    started = time.perf_counter()
+    by_event = {}
+    for contribution in sample:
+        by_event[contribution["event_id"]] = by_event.get(contribution["event_id"], 0) + contribution["amount"]
+    print(f"comprehension over 1M contributions for comparison: {(time.perf_counter() - started) * 1e3:.0f} ms")
+
+    ledger.frame()  # Imports pandas outside the timing
+
+    started = time.perf_counter()
+    frame = ledger.frame()
+    shared = np.shares_memory(frame["amount_cents"].to_numpy(), ledger._cents)
+    print(f"DataFrame view: {(time.perf_counter() - started) * 1e3:.2f} ms, shares memory: {shared}; "
+          f"groupby sum by day {frame.groupby('day')['amount_cents'].sum().size} days")
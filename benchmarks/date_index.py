@@ -0,0 +1,40 @@
+# Indexing and window query costs of utils.date_index over 1M birthdays and 200k events.
+# Run: python -m benchmarks.date_index
+import datetime
+import random
+import time
+
+from utils.date_index import next_occurrence, BirthdayIndex, EventDateIndex
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    user_count, event_count = 1_000_000, 200_000
+    today = datetime.date(2026, 10, 19)
+
+    started = time.perf_counter()
+    birthdays = BirthdayIndex(
+        {"id": f"user{i}", "birthday": (datetime.date(1970, 1, 1) + datetime.timedelta(days=rng.randrange(15000))).isoformat()}
+        for i in range(user_count)
+    )
+    print(f"index {user_count} birthdays: {time.perf_counter() - started:.2f} s")
+
+    started = time.perf_counter()
+    window = birthdays.upcoming(today, 7)
+    print(f"birthdays in the next 7 days: {(time.perf_counter() - started) * 1e3:.2f} ms, {len(window)} users")
+
+    started = time.perf_counter()
+    scanned = [user_id for user_id, birthday in birthdays._birthdays.items()
+               if (next_occurrence(birthday, today) - today).days < 7]
+    print(f"full scan for comparison: {(time.perf_counter() - started) * 1e3:.0f} ms, {len(scanned)} users")
+
+    started = time.perf_counter()
+    events = EventDateIndex(
+        {"id": f"event{i}", "date": (today + datetime.timedelta(days=rng.randrange(-365, 365))).isoformat()}
+        for i in range(event_count)
+    )
+    print(f"index {event_count} events: {time.perf_counter() - started:.2f} s")
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        upcoming = events.between(today, today + datetime.timedelta(days=30))
+    print(f"events in the next 30 days: {(time.perf_counter() - started) * 1e3 / 1000:.3f} ms, {len(upcoming)} events")
@@ -0,0 +1,44 @@
+# Query and update costs of utils.event_discovery as the number of public events grows.
+# Run: python -m benchmarks.event_discovery
+import datetime
+import random
+import time
+
+from utils.event_discovery import SORT_BY_FUNDING, EventDiscoveryIndex
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    event_types = ["birthday", "wedding", "baby_shower", "holiday", "graduation", "anniversary", "housewarming", "other"]
+    today = datetime.date(2026, 10, 19)
+    start, end = today.isoformat(), (today + datetime.timedelta(days=30)).isoformat()
+
+    index = EventDiscoveryIndex()
+    count = 0
+    for size in (10000, 50000, 200000):
+        started = time.perf_counter()
+        while count < size:
+            event = {"id": f"event{count}", "type": rng.choice(event_types), "privacy": "public",
+                     "date": (today + datetime.timedelta(days=rng.randrange(-365, 365))).isoformat()}
+            goal = rng.uniform(50, 2000)
+            index.add_event(event, goal, goal * rng.random())
+            count += 1
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(200):
+            page, cursor = index.query("housewarming", start, end, max_funding=0.5, limit=10)
+            index.query("housewarming", start, end, max_funding=0.5, cursor=cursor, limit=10)
+        query_ms = (time.perf_counter() - started) * 1e3 / 400
+
+        started = time.perf_counter()
+        for _ in range(200):
+            index.query(max_funding=0.05, sort=SORT_BY_FUNDING, limit=10)
+        funding_ms = (time.perf_counter() - started) * 1e3 / 200
+
+        started = time.perf_counter()
+        for i in range(1000):
+            index.add_funds(f"event{rng.randrange(count)}", 25.0)
+        update_us = (time.perf_counter() - started) * 1e6 / 1000
+
+        print(f"{count} events (+{build:.1f} s to index): housewarmings next 30 days <50% funded "
+              f"{query_ms:.3f} ms/page, least funded {funding_ms:.3f} ms/page, contribution update {update_us:.1f} us")
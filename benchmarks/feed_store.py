@@ -0,0 +1,21 @@
+# Publish fan-out and timeline page costs of utils.feed_store.
+# Run: python -m benchmarks.feed_store
+import time
+
+from utils.feed_store import FeedStore
+
+if __name__ == "__main__":
+    users = [f"user{i}" for i in range(2000)]
+    friends = {user_id: [users[(i + k) % len(users)] for k in range(1, 51)] for i, user_id in enumerate(users)}
+    store = FeedStore([], lambda user_id: friends.get(user_id, []))
+
+    started = time.perf_counter()
+    for i in range(200000):
+        store.publish({"user_id": users[i % len(users)], "type": "general_update", "content": f"post {i}"})
+    print(f"publish (fan-out to 51 timelines): {(time.perf_counter() - started) * 1e6 / 200000:.2f} us/post")
+
+    started = time.perf_counter()
+    cursor = None
+    for _ in range(100):
+        page, cursor = store.read_timeline(users[0], cursor, 10)
+    print(f"read_timeline: {(time.perf_counter() - started) * 1e6 / 100:.2f} us/page over 200000 posts")
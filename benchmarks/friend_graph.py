@@ -0,0 +1,52 @@
+# Build, query, traversal and suggestion costs of utils.friend_graph over 1M users and 10M edges.
+# Run: python -m benchmarks.friend_graph
+import time
+
+import numpy as np
+
+from utils.friend_graph import FriendGraph
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    user_count, edge_count = 1_000_000, 10_000_000
+    user_ids = [f"user{i}" for i in range(user_count)]
+
+    started = time.perf_counter()
+    graph = FriendGraph.from_edges(user_ids, rng.integers(0, user_count, edge_count, dtype=np.int32),
+                                   rng.integers(0, user_count, edge_count, dtype=np.int32))
+    print(f"build {user_count} users / {edge_count} edges: {time.perf_counter() - started:.2f} s, "
+          f"{(graph._indptr.nbytes + graph._indices.nbytes) / 2 ** 20:.0f} MiB of arrays")
+
+    sample = [user_ids[i] for i in rng.integers(0, user_count, 1000)]
+
+    started = time.perf_counter()
+    for user_id in sample:
+        graph.friends(user_id)
+    print(f"friends: {(time.perf_counter() - started) * 1e6 / len(sample):.2f} us/query")
+
+    started = time.perf_counter()
+    for a, b in zip(sample, reversed(sample)):
+        graph.are_friends(a, b)
+        graph.mutual_friend_count(a, b)
+    print(f"are_friends + mutual_friend_count: {(time.perf_counter() - started) * 1e6 / len(sample):.2f} us/pair")
+
+    started = time.perf_counter()
+    reached = [len(graph.within(user_id, 2)) for user_id in sample[:100]]
+    print(f"2-hop BFS: {(time.perf_counter() - started) * 1e3 / 100:.3f} ms/user, ~{np.mean(reached):.0f} users reached")
+
+    started = time.perf_counter()
+    graph.precompute_suggestions(sample[:100])
+    print(f"precompute suggestions: {(time.perf_counter() - started) * 1e3 / 100:.3f} ms/user")
+    started = time.perf_counter()
+    for user_id in sample[:100]:
+        graph.suggestions(user_id, 10)
+    print(f"cached suggestions: {(time.perf_counter() - started) * 1e6 / 100:.2f} us/user")
+
+    started = time.perf_counter()
+    for i in range(20000):
+        graph.add_friendship(sample[i % len(sample)], user_ids[int(rng.integers(user_count))])
+    print(f"add_friendship (with compactions): {(time.perf_counter() - started) * 1e6 / 20000:.2f} us/edge")
+
+    started = time.perf_counter()
+    stats = graph.degree_stats()
+    print(f"degree stats: {(time.perf_counter() - started) * 1e3:.1f} ms, {stats}")
@@ -0,0 +1,74 @@
+# Token and latency savings of utils.html_reducer over saved product pages.
+# Run: python -m benchmarks.html_reducer
+import os
+import time
+from typing import Dict, List, Any, Optional, Callable
+
+from utils.html_reducer import reduce_product_html
+
+def benchmark_corpus(directory: str,
+                     extract_fn: Optional[Callable[[str], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Measure token and latency savings of the reduction stage over a corpus of saved pages
+
+    Args:
+        directory: Directory of saved product pages (*.html)
+        extract_fn: Optional extraction function (e.g. an LLM call) taking page HTML;
+            when given, it is timed on both the full and the reduced page
+
+    Returns:
+        One result dictionary per page
+    """
+    results = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".html"):
+            continue
+
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            html = f.read()
+
+        reduction = reduce_product_html(html)
+        result = {
+            "page": name,
+            "tokens_before": reduction["tokens_before"],
+            "tokens_after": reduction["tokens_after"],
+            "reduction_ms": reduction["reduction_ms"]
+        }
+
+        if extract_fn:
+            started = time.perf_counter()
+            extract_fn(html)
+            result["extract_full_ms"] = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            extract_fn(reduction["html"])
+            result["extract_reduced_ms"] = (time.perf_counter() - started) * 1000
+            result["latency_saved_ms"] = (result["extract_full_ms"]
+                                          - result["extract_reduced_ms"]
+                                          - result["reduction_ms"])
+
+        results.append(result)
+    return results
+
+if __name__ == "__main__":
+    corpus = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixtures", "product_pages")
+
+    # Time real LLM extraction on both page versions when scrapegraphai is installed
+    from utils.scraper import SCRAPER_AVAILABLE, run_smart_scraper
+    extract_fn = run_smart_scraper if SCRAPER_AVAILABLE else None
+
+    total_before = total_after = 0
+    total_saved_ms = 0.0
+    for row in benchmark_corpus(corpus, extract_fn):
+        total_before += row["tokens_before"]
+        total_after += row["tokens_after"]
+        line = (f"{row['page']:<30} {row['tokens_before']:>7} -> {row['tokens_after']:>6} tokens "
+                f"({row['reduction_ms']:.1f} ms)")
+        if "latency_saved_ms" in row:
+            total_saved_ms += row["latency_saved_ms"]
+            line += f", extraction {row['extract_full_ms']:.0f} -> {row['extract_reduced_ms']:.0f} ms"
+        print(line)
+    if total_before:
+        print(f"Total: {total_before} -> {total_after} tokens ({100 * (1 - total_after / total_before):.1f}% smaller)")
+    if extract_fn:
+        print(f"Extraction latency saved: {total_saved_ms:.0f} ms")
@@ -0,0 +1,78 @@
+# Snapshot, journal append and warm start costs of utils.journal at ten million contributions.
+# Run: python -m benchmarks.journal
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from utils.journal import (FSYNC_POLICIES, Journal, snapshot_path, read_journal, write_snapshot, read_snapshot,
+                           decode_columns)
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    contribution_count = 10_000_000
+    decode_count = 1_000_000
+    directory = tempfile.mkdtemp(prefix="hubshub-journal-")
+
+    try:
+        # Columns as encode_columns produces them, generated directly: ten million
+        # contribution dicts would not fit in memory next to their snapshot
+        dates = [f"2026-{month:02d}-{day:02d}" for month in range(1, 13) for day in range(1, 29)]
+        state = {"contributions": {
+            "count": contribution_count,
+            "event_id": ("codes", rng.integers(0, 100000, contribution_count, dtype=np.int32),
+                         [f"event{i}" for i in range(100000)]),
+            "item_id": ("codes", rng.integers(0, 10, contribution_count, dtype=np.int32),
+                        [f"item{i}" for i in range(1, 11)]),
+            "user_id": ("codes", rng.integers(0, 1000000, contribution_count, dtype=np.int32),
+                        [f"user{i}" for i in range(1000000)]),
+            "amount": ("number", rng.integers(500, 20000, contribution_count) / 100),
+            "date": ("codes", rng.integers(0, len(dates), contribution_count, dtype=np.int32), dates),
+        }}
+
+        started = time.perf_counter()
+        write_snapshot(snapshot_path(directory, 0), state)
+        print(f"write snapshot of {contribution_count} contributions: {time.perf_counter() - started:.2f} s, "
+              f"{os.path.getsize(snapshot_path(directory, 0)) / 2 ** 20:.0f} MiB")
+        del state
+
+        record = {"event_id": "event1", "item_id": "item1", "user_id": "user1", "amount": 25.0, "date": "2026-10-19"}
+        for fsync in FSYNC_POLICIES:
+            for path in glob.glob(os.path.join(directory, "journal-*.log")):
+                os.remove(path)
+            journal = Journal(directory, fsync, next_seq=1)
+            started = time.perf_counter()
+            for i in range(100000):
+                journal.append("contribution", contribution_count + i, record)
+            append_us = (time.perf_counter() - started) * 1e6 / 100000
+            journal.wait_durable(journal.last_seq)
+            total = time.perf_counter() - started
+            journal.close()
+            print(f"journal 100000 records, fsync={fsync}: {append_us:.2f} us/record on the write path, "
+                  f"all written after {total:.2f} s ({journal.metrics['batches']} batches, "
+                  f"{journal.metrics['fsyncs']} fsyncs)")
+
+        # Warm start: map the snapshot, then replay the journal tail
+        started = time.perf_counter()
+        loaded = read_snapshot(snapshot_path(directory, 0))
+        columns = loaded["contributions"]
+        total_amount = columns["amount"][1].sum()
+        mapped = time.perf_counter() - started
+
+        started = time.perf_counter()
+        replayed = sum(1 for _ in read_journal(directory))
+        replay = time.perf_counter() - started
+        print(f"warm start: map snapshot and sum {columns['count']} amounts {mapped * 1e3:.0f} ms, "
+              f"replay {replayed} journal records {replay:.2f} s")
+
+        sample = {field: column if field == "count" else (column[0], column[1][:decode_count]) + tuple(column[2:])
+                  for field, column in columns.items()}
+        started = time.perf_counter()
+        decode_columns(sample)
+        print(f"rebuild {decode_count} contribution dicts: {time.perf_counter() - started:.2f} s")
+        del loaded, columns, sample
+    finally:
+        shutil.rmtree(directory)
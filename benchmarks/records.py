@@ -0,0 +1,54 @@
+# Memory and build time of the compact record types in data.records against plain dicts.
+# Run: python -m benchmarks.records
+import gc
+import random
+import time
+import tracemalloc
+
+from data.records import User, ChatLog
+from utils.contribution_ledger import ContributionLedger
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    count = 1_000_000
+
+    def contribution(i):
+        return {"event_id": f"event{rng.randrange(100000)}", "item_id": f"item{rng.randrange(1, 11)}",
+                "user_id": f"user{rng.randrange(200000)}", "amount": rng.randrange(500, 20000) / 100,
+                "date": f"2026-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"}
+
+    def message(i):
+        return {"user": f"user{rng.randrange(200000)}", "message": "See you there!",
+                "timestamp": f"2026-10-{rng.randrange(1, 29):02d} 12:{rng.randrange(60):02d}:00", "id": i}
+
+    def user(i):
+        return {"id": f"user{i}", "name": "Alex Johnson", "email": f"user{i}@example.com",
+                "profile_photo": "https://randomuser.me/api/portraits/men/1.jpg", "birthday": "1990-05-15",
+                "friends": [f"user{(i + k) % count}" for k in (1, 2, 3)], "wallet_balance": 500.0, "reward_points": 180}
+
+    def measure(label, build):
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        kept = build()
+        elapsed = time.perf_counter() - started
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label}: {size / 2 ** 20:.0f} MiB per million, built in {elapsed:.1f} s")
+        return kept
+
+    # The same records each time: the generators are reseeded
+    for name, make, compact in (
+            ("contributions", contribution, lambda records: ContributionLedger(records)),
+            ("chat messages", message, lambda records: ChatLog(records)),
+            ("users", user, lambda records: [User(record) for record in records])):
+        rng.seed(7)
+        measure(f"{name} as dicts", lambda: [make(i) for i in range(count)])
+        rng.seed(7)
+        kept = measure(f"{name} compact", lambda: compact(make(i) for i in range(count)))
+
+        started = time.perf_counter()
+        for record in kept[:100000]:
+            dict(record)
+        print(f"  read 100000 {name} through views: {(time.perf_counter() - started) * 1e3:.0f} ms")
+        del kept
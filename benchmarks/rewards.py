@@ -0,0 +1,36 @@
+# Award, leaderboard and friends leaderboard costs of utils.rewards over a million users.
+# Run: python -m benchmarks.rewards
+import random
+import time
+
+from utils.rewards import RewardPoints
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    user_count = 1_000_000
+    rewards = RewardPoints(leaderboard_size=100)
+
+    started = time.perf_counter()
+    for i in range(user_count):
+        rewards.award(f"user{i}", rng.randint(1, 500), "opening")
+    print(f"{user_count} opening awards: {(time.perf_counter() - started) * 1e6 / user_count:.2f} us/award")
+
+    started = time.perf_counter()
+    for _ in range(200000):
+        rewards.award(f"user{rng.randrange(user_count)}", rng.choice([2, 5, 10, 50]), "activity")
+    print(f"activity awards: {(time.perf_counter() - started) * 1e6 / 200000:.2f} us/award")
+
+    started = time.perf_counter()
+    top = rewards.leaderboard(10)
+    print(f"global top 10: {(time.perf_counter() - started) * 1e3:.3f} ms")
+
+    # Check against a full sort
+    started = time.perf_counter()
+    expected = sorted(rewards._lifetime.items(), key=lambda entry: entry[1], reverse=True)[:10]
+    print(f"full sort for comparison: {(time.perf_counter() - started) * 1e3:.1f} ms, "
+          f"same scores: {[score for _, score in top] == [score for _, score in expected]}")
+
+    friends = [f"user{rng.randrange(user_count)}" for _ in range(500)]
+    started = time.perf_counter()
+    rewards.friends_leaderboard("user0", friends, 10)
+    print(f"friends top 10 of 500: {(time.perf_counter() - started) * 1e3:.3f} ms")
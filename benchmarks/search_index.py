@@ -0,0 +1,61 @@
+# Indexing, search, update and snapshot costs of utils.search_index over a million documents.
+# Run: python -m benchmarks.search_index
+import os
+import random
+import tempfile
+import time
+
+from utils.search_index import CHAT, POST, DOC_KINDS, SearchIndex
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    vocabulary = [f"word{i}" for i in range(50000)]
+    products = ["dyson vacuum", "kitchenaid mixer", "sony headphones", "espresso machine", "echo dot speaker",
+                "nintendo switch game", "indoor plants", "bedding set", "air purifier", "throw blanket"]
+    # Zipf-like term frequencies, like natural text
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    doc_count = 1_000_000
+    event_count = 50000
+    index = SearchIndex()
+    for event in range(event_count):
+        index.set_event_privacy(f"event{event}", event % 2 == 0)
+
+    started = time.perf_counter()
+    for start in range(0, doc_count, 10000):
+        words = rng.choices(vocabulary, weights, k=10000 * 12)
+        for i in range(10000):
+            number = start + i
+            text = " ".join(words[i * 12:(i + 1) * 12])
+            if number % 50 == 0:
+                text += " " + rng.choice(products)
+            kind = DOC_KINDS[number % 3]
+            event_id = None if kind == POST else f"event{rng.randrange(event_count)}"
+            index.add(f"{kind}:{number}", kind, text, event_id)
+    build = time.perf_counter() - started
+    print(f"index {doc_count} documents: {build:.1f} s ({build * 1e6 / doc_count:.1f} us/doc), "
+          f"{len(index._postings)} terms, ~{index.size_bytes() / 2 ** 20:.0f} MiB of postings and doc arrays")
+
+    members = [f"event{rng.randrange(event_count)}" for _ in range(20)]
+    for query in ("dyson", "dyson vacuum", "word3 word17", "word1", "sony headphones word40"):
+        started = time.perf_counter()
+        for _ in range(20):
+            results = index.search(query, members, limit=10)
+        print(f"search {query!r}: {(time.perf_counter() - started) * 1e3 / 20:.2f} ms, top score "
+              f"{results[0][1]:.2f}" if results else f"search {query!r}: no results")
+
+    started = time.perf_counter()
+    for i in range(10000):
+        index.add(f"chat:{i * 3 + 1}", CHAT, "updated message about the dyson", f"event{i % event_count}")
+    print(f"update: {(time.perf_counter() - started) * 1e6 / 10000:.1f} us/doc")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search.idx")
+        started = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = SearchIndex.load(path)
+        print(f"snapshot: save {saved:.1f} s, load {time.perf_counter() - started:.1f} s, "
+              f"{os.path.getsize(path) / 2 ** 20:.0f} MiB on disk, same results: "
+              f"{loaded.search('dyson vacuum', members) == index.search('dyson vacuum', members)}")
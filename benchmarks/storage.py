@@ -0,0 +1,58 @@
+# Latency of the common operations of each utils.storage backend.
+# Run: python -m benchmarks.storage
+import copy
+import os
+import tempfile
+import time
+
+from data import mock_data
+from utils.chat_store import SegmentedChatLog
+from utils.contribution_ledger import ContributionLedger, BY_USER
+from utils.resp import RespClient, LocalRespServer
+from utils.storage import MemoryBackend, SQLiteBackend, RedisBackend
+
+def benchmark(name, backend, rounds=2000):
+    user_ids = [f"bench{i}" for i in range(1000)]
+    for user_id in user_ids:
+        backend.put_user({"id": user_id, "name": user_id, "wallet_balance": 1e9, "reward_points": 0})
+    for i in range(200):
+        backend.append_chat_message("event2", {"user": "user1", "message": f"message {i}",
+                                               "timestamp": "2026-10-01 10:00:00"})
+
+    def timed(label, operation, count=rounds):
+        started = time.perf_counter()
+        for i in range(count):
+            operation(i)
+        print(f"  {label}: {(time.perf_counter() - started) * 1e6 / count:.0f} us")
+
+    print(name)
+    timed("get_user", lambda i: backend.get_user(user_ids[i % 1000]))
+    timed("get_users (100 ids)", lambda i: backend.get_users(user_ids[i % 900:i % 900 + 100]), rounds // 20)
+    timed("get_user x100", lambda i: [backend.get_user(user_id) for user_id in user_ids[i % 900:i % 900 + 100]],
+          rounds // 20)
+    timed("adjust_user_number", lambda i: backend.adjust_user_number(user_ids[i % 1000], "wallet_balance",
+                                                                     -1.0, minimum=0))
+    timed("append_chat_message", lambda i: backend.append_chat_message(
+        "event2", {"user": "user1", "message": "hi", "timestamp": "2026-10-01 10:00:00"}))
+    timed("read_chat_messages (50)", lambda i: backend.read_chat_messages("event2", limit=50))
+    timed("add_contribution", lambda i: backend.add_contribution(
+        {"event_id": "event2", "item_id": "item5", "user_id": user_ids[i % 1000], "amount": 1.0,
+         "date": "2026-10-01"}))
+    timed("contribution_totals by user", lambda i: backend.contribution_totals(BY_USER), rounds // 20)
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        server = LocalRespServer()
+        host, port = server.address
+        backends = {
+            "memory": MemoryBackend({}, {}, {}, {}, ContributionLedger(), [], SegmentedChatLog),
+            "sqlite": SQLiteBackend(os.path.join(directory, "hubshub.db")),
+            "redis": RedisBackend(RespClient(host, port)),
+        }
+        for name, backend in backends.items():
+            backend.seed(*copy.deepcopy((mock_data.USERS, mock_data.EVENTS, mock_data.WISHLISTS,
+                                         mock_data.CHAT_MESSAGES, mock_data.CONTRIBUTIONS,
+                                         mock_data.COMMUNITY_POSTS)))
+            benchmark(name, backend)
+            backend.close()
+        server.shutdown()
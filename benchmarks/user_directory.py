@@ -0,0 +1,35 @@
+# Indexing, search and type-ahead costs of utils.user_directory over 200k users.
+# Run: python -m benchmarks.user_directory
+import random
+import time
+
+from utils.user_directory import UserDirectory, TypeAhead
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    first_names = ["alex", "jamie", "taylor", "morgan", "casey", "jordan", "riley", "avery", "quinn", "sam"]
+    last_names = ["johnson", "smith", "wilson", "lee", "brown", "garcia", "miller", "davis", "lopez", "clark"]
+
+    user_count = 200000
+    users = []
+    for i in range(user_count):
+        first, last = rng.choice(first_names), rng.choice(last_names)
+        users.append({"id": f"user{i}", "name": f"{first.title()} {last.title()}{i}",
+                      "email": f"{first}.{last}{i}@example.com"})
+    friends = {f"user{i}": [f"user{rng.randrange(user_count)}" for _ in range(100)] for i in range(100)}
+
+    started = time.perf_counter()
+    directory = UserDirectory(users, lambda user_id: friends.get(user_id, []))
+    print(f"index {user_count} users: {time.perf_counter() - started:.2f} s")
+
+    for query in ("a", "al", "alex", "alex john", "jordan.lopez12"):
+        started = time.perf_counter()
+        for _ in range(100):
+            matches = directory.search(query, 10, user_id="user1")
+        print(f"search {query!r}: {(time.perf_counter() - started) * 1e3 / 100:.3f} ms, {len(matches)} matches")
+
+    typeahead = TypeAhead(directory)
+    started = time.perf_counter()
+    for end in range(1, len("morgan wilson") + 1):
+        typeahead.search("morgan wilson"[:end], 10, user_id="user1")
+    print(f"type-ahead 'morgan wilson' keystroke by keystroke: {(time.perf_counter() - started) * 1e3:.3f} ms")
@@ -0,0 +1,39 @@
+# Append, point-in-time balance, history and reconciliation costs of utils.wallet_ledger.
+# Run: python -m benchmarks.wallet_ledger
+import time
+
+import numpy as np
+
+from utils.wallet_ledger import CREDIT, CONTRIBUTION, WalletLedger
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    ledger = WalletLedger()
+    users = [f"user{i}" for i in range(10000)]
+    start_ts = time.time() - 365 * 86400
+
+    started = time.perf_counter()
+    for i in range(500000):
+        user_id = users[int(rng.integers(len(users)))]
+        amount = float(rng.choice([25.0, 50.0, -10.0, -20.0]))
+        ledger.append(user_id, CREDIT if amount > 0 else CONTRIBUTION, amount, "benchmark",
+                      ts=start_ts + i * 60)
+    print(f"append: {(time.perf_counter() - started) * 1e6 / 500000:.2f} us/entry")
+
+    started = time.perf_counter()
+    for user_id in users[:1000]:
+        ledger.balance_at(user_id, start_ts + 180 * 86400)
+    print(f"balance_at: {(time.perf_counter() - started) * 1e3:.3f} ms/1000 lookups")
+
+    started = time.perf_counter()
+    cursor, pages = None, 0
+    while True:
+        page, cursor = ledger.history(users[0], cursor)
+        pages += 1
+        if cursor is None:
+            break
+    print(f"history: {pages} pages in {(time.perf_counter() - started) * 1e3:.3f} ms")
+
+    started = time.perf_counter()
+    mismatched = ledger.reconcile()
+    print(f"reconcile {len(users)} users: {(time.perf_counter() - started) * 1e3:.2f} ms, {len(mismatched)} mismatched")
@@ -9,7 +9,8 @@ USERS = {
         "profile_photo": "https://randomuser.me/api/portraits/men/1.jpg",
         "birthday": "1990-05-15",
         "friends": ["user2", "user3", "user4", "user5"],
-        "wallet_balance": 500.00
+        "wallet_balance": 500.00,
+        "reward_points": 180
     },
     "user2": {
         "id": "user2",
@@ -18,7 +19,8 @@ USERS = {
         "profile_photo": "https://randomuser.me/api/portraits/women/2.jpg",
         "birthday": "1992-08-22",
         "friends": ["user1", "user3", "user5"],
-        "wallet_balance": 350.00
+        "wallet_balance": 350.00,
+        "reward_points": 95
     },
     "user3": {
         "id": "user3",
@@ -27,7 +29,8 @@ USERS = {
         "profile_photo": "https://randomuser.me/api/portraits/men/3.jpg",
         "birthday": "1988-11-30",
         "friends": ["user1", "user2", "user4"],
-        "wallet_balance": 725.50
+        "wallet_balance": 725.50,
+        "reward_points": 320
     },
     "user4": {
         "id": "user4",
@@ -36,7 +39,8 @@ USERS = {
         "profile_photo": "https://randomuser.me/api/portraits/women/4.jpg",
         "birthday": "1995-02-14",
         "friends": ["user1", "user3", "user5"],
-        "wallet_balance": 180.25
+        "wallet_balance": 180.25,
+        "reward_points": 60
     },
     "user5": {
         "id": "user5",
@@ -45,7 +49,8 @@ USERS = {
         "profile_photo": "https://randomuser.me/api/portraits/men/5.jpg",
         "birthday": "1991-07-08",
         "friends": ["user1", "user2", "user4"],
-        "wallet_balance": 420.75
+        "wallet_balance": 420.75,
+        "reward_points": 140
     }
 }
 
@@ -229,4 +234,44 @@ CONTRIBUTIONS = [
     {"event_id": "event1", "item_id": "item3", "user_id": "user4", "amount": 24.99, "date": "2024-04-15"},
     {"event_id": "event2", "item_id": "item5", "user_id": "user1", "amount": 150.00, "date": "2024-08-15"},
     {"event_id": "event2", "item_id": "item5", "user_id": "user5", "amount": 100.00, "date": "2024-08-16"}
-] 
\ No newline at end of file
+]
+
+# Community feed posts, oldest first
+COMMUNITY_POSTS = [
+    {
+        "user_id": "user4",
+        "type": "gift_recommendation",
+        "content": "Looking for a housewarming gift? These smart light bulbs were a hit at my friend's party!",
+        "product_name": "SmartBright Color Bulbs",
+        "product_url": "https://example.com/smartbulbs",
+        "date": (datetime.datetime.now() - datetime.timedelta(days=8)).strftime("%Y-%m-%d"),
+        "likes": 5,
+        "comments": []
+    },
+    {
+        "user_id": "user2",
+        "type": "store_recommendation",
+        "content": "Found this great website for personalized gifts. They have amazing quality and quick delivery!",
+        "store_name": "PersonalizeIt",
+        "store_url": "https://example.com/personalize",
+        "date": (datetime.datetime.now() - datetime.timedelta(days=5)).strftime("%Y-%m-%d"),
+        "likes": 12,
+        "comments": [
+            {"user_id": "user5", "text": "I've used them before, they're great!"},
+            {"user_id": "user3", "text": "Thanks for sharing, will check them out for my next gift."}
+        ]
+    },
+    {
+        "user_id": "user3",
+        "type": "gift_received",
+        "content": "Just received this amazing coffee machine from my birthday wishlist! Thanks to everyone who contributed!",
+        "image_url": "https://images.unsplash.com/photo-1606937478082-9bfacb70a67e",
+        "date": (datetime.datetime.now() - datetime.timedelta(days=2)).strftime("%Y-%m-%d"),
+        "likes": 7,
+        "comments": [
+            {"user_id": "user1", "text": "Looks awesome! Enjoy your coffee!"},
+            {"user_id": "user4", "text": "Happy to contribute! ☕"}
+        ]
+    }
+]
+
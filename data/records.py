@@ -0,0 +1,310 @@
+import array
+import datetime
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+# Dates and timestamps are kept parsed; the mapping interface returns them in
+# the string forms the rest of the app uses
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def parse_date(value) -> Optional[datetime.date]:
+    """Date of an ISO date string, or None if the string wouldn't format back the same"""
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            date = datetime.date.fromisoformat(value)
+        except ValueError:
+            return None
+        return date if date.isoformat() == value else None
+    return None
+
+def parse_timestamp(value) -> Optional[datetime.datetime]:
+    """Datetime of a 'YYYY-MM-DD HH:MM:SS' string, or None if it isn't in that form"""
+    if isinstance(value, str) and len(value) == 19:
+        try:
+            timestamp = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        return timestamp if timestamp.isoformat(" ") == value else None
+    return None
+
+class Record(MutableMapping):
+    """
+    Record stored in slots, readable and writable like the dicts it replaces.
+    Each subclass lists its fields in __slots__; an unset slot is a missing
+    key, and keys outside the fields go to a small overflow dict. Fields in
+    _dates and _timestamps hold date/datetime objects (as attributes) and read
+    back as strings through the mapping interface. Ids are interned, so the
+    many copies of a user id across records share one string.
+    """
+
+    __slots__ = ("_extra",)
+    _fields: frozenset = frozenset()
+    _dates: frozenset = frozenset()
+    _timestamps: frozenset = frozenset()
+    _ids: frozenset = frozenset()
+    _id_lists: frozenset = frozenset()
+
+    def __init_subclass__(cls, dates: Iterable[str] = (), timestamps: Iterable[str] = (),
+                          ids: Iterable[str] = (), id_lists: Iterable[str] = (), **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.__slots__)
+        clashes = cls._fields & set(dir(MutableMapping))
+        if clashes:
+            raise TypeError(f"{cls.__name__} fields shadow mapping methods: {sorted(clashes)}")
+        cls._dates = frozenset(dates)
+        cls._timestamps = frozenset(timestamps)
+        cls._ids = frozenset(ids)
+        cls._id_lists = frozenset(id_lists)
+
+    def __init__(self, data: Any = (), **kwargs):
+        self._extra: Optional[Dict[str, Any]] = None
+        self.update(data, **kwargs)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "Record":
+        """Record holding a mapping's keys (records of this class are returned as is)"""
+        return data if type(data) is cls else cls(data)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            if key in self._dates and isinstance(value, datetime.date):
+                return value.isoformat()
+            if key in self._timestamps and isinstance(value, datetime.datetime):
+                return value.isoformat(" ")
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self._fields:
+            if key in self._ids and isinstance(value, str):
+                value = sys.intern(value)
+            elif key in self._id_lists and isinstance(value, list):
+                value[:] = [sys.intern(item) if isinstance(item, str) else item for item in value]
+            elif key in self._dates:
+                value = parse_date(value) or value
+            elif key in self._timestamps:
+                value = parse_timestamp(value) or value
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self._fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if key in self._fields:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.__slots__:
+            if hasattr(self, field):
+                yield field
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        return sum(1 for field in self.__slots__ if hasattr(self, field)) + len(self._extra or ())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+class User(Record, dates=("birthday",), ids=("id",), id_lists=("friends",)):
+    """A user account"""
+    __slots__ = ("id", "name", "email", "profile_photo", "birthday", "friends", "wallet_balance",
+                 "reward_points", "redemptions")
+
+class Event(Record, dates=("date",), timestamps=("created_at",), ids=("id", "creator"),
+            id_lists=("participants",)):
+    """An event with its participants and their RSVPs"""
+    __slots__ = ("id", "title", "date", "type", "description", "creator", "participants", "privacy",
+                 "rsvp", "created_at", "auto_created")
+
+class WishlistItem(Record, ids=("id",), id_lists=("contributors",)):
+    """An item on an event's wishlist"""
+    __slots__ = ("id", "title", "description", "price", "category", "url", "status", "priority",
+                 "contributors", "pooled_amount", "fraud_check", "price_checked_at")
+
+class _Interner:
+    """Table of distinct strings and their codes"""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            value = sys.intern(value)
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class ContributionView(Mapping):
+    """
+    Read-only mapping view of one contribution in a columnar store (see
+    utils.contribution_ledger.ContributionLedger)
+    """
+
+    __slots__ = ("_log", "_position")
+
+    def __init__(self, log: Any, position: int):
+        self._log = log
+        self._position = position
+
+    def __getitem__(self, key: str) -> Any:
+        return self._log.value(self._position, key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from CONTRIBUTION_FIELDS
+        # Overflow keys, less the fields kept there in their original form
+        yield from (key for key in self._log.extra(self._position) or () if key not in CONTRIBUTION_FIELDS)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"ContributionView({dict(self)!r})"
+
+CONTRIBUTION_FIELDS = ("event_id", "item_id", "user_id", "amount", "date")
+
+class ChatMessageView(Mapping):
+    """Read-only mapping view of one message in a ChatLog; its 'id' is its position"""
+
+    __slots__ = ("_log", "_position")
+
+    def __init__(self, log: "ChatLog", position: int):
+        self._log = log
+        self._position = position
+
+    def __getitem__(self, key: str) -> Any:
+        return self._log.value(self._position, key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from CHAT_FIELDS
+        # Overflow keys, less the fields kept there in their original form
+        yield from (key for key in self._log.extra(self._position) or () if key not in CHAT_FIELDS)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"ChatMessageView({dict(self)!r})"
+
+CHAT_FIELDS = ("id", "user", "message", "timestamp")
+
+class ChatLog:
+    """
+    One event's chat messages stored column by column: sender codes,
+    timestamps as int64 seconds and the message texts. Behaves as the list of
+    messages it replaces (indexing, slicing, append), returning ChatMessageView
+    objects. A log holding a later part of a chat (see utils.chat_store) starts
+    its message ids at `base`.
+    """
+
+    def __init__(self, messages: Iterable[Mapping] = (), base: int = 0):
+        self.base = base
+        self._user_ids = _Interner()
+        self._users = array.array("i")
+        self._times = array.array("q")
+        self._texts: List[str] = []
+        # Keys beyond CHAT_FIELDS, and timestamps not in TIMESTAMP_FORMAT, by position
+        self._extra: Dict[int, Dict[str, Any]] = {}
+        self.extend(messages)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __iter__(self) -> Iterator[ChatMessageView]:
+        return (ChatMessageView(self, position) for position in range(len(self)))
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [ChatMessageView(self, i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("chat message index out of range")
+        return ChatMessageView(self, position)
+
+    def _columns_of(self, message: Mapping) -> Tuple[int, int, str, Optional[Dict[str, Any]]]:
+        extra = {key: value for key, value in message.items() if key not in CHAT_FIELDS} or None
+        timestamp = parse_timestamp(message.get("timestamp"))
+        if timestamp is None:
+            extra = dict(extra or {}, timestamp=message.get("timestamp"))
+        seconds = (timestamp - _EPOCH) // datetime.timedelta(seconds=1) if timestamp else 0
+        return self._user_ids.code(message["user"]), seconds, message["message"], extra
+
+    def append(self, message: Mapping):
+        """Append a message ('user', 'message', 'timestamp'); its id is its position"""
+        user, seconds, text, extra = self._columns_of(message)
+        if extra:
+            self._extra[len(self._texts)] = extra
+        self._users.append(user)
+        self._times.append(seconds)
+        # Texts last: the length of the log is the length of this column
+        self._texts.append(text)
+
+    def extend(self, messages: Iterable[Mapping]):
+        for message in messages:
+            self.append(message)
+
+    def __setitem__(self, position: int, message: Mapping):
+        """Replace a message (journal replay)"""
+        user, seconds, text, extra = self._columns_of(message)
+        self._users[position] = user
+        self._times[position] = seconds
+        self._texts[position] = text
+        self._extra.pop(position, None)
+        if extra:
+            self._extra[position] = extra
+
+    def extra(self, position: int) -> Optional[Dict[str, Any]]:
+        """Overflow keys of a message"""
+        return self._extra.get(position)
+
+    def value(self, position: int, key: str) -> Any:
+        """One field of a message"""
+        extra = self._extra.get(position)
+        if extra and key in extra:
+            return extra[key]
+        if key == "id":
+            return self.base + position
+        if key == "user":
+            return self._user_ids.values[self._users[position]]
+        if key == "message":
+            return self._texts[position]
+        if key == "timestamp":
+            return (_EPOCH + datetime.timedelta(seconds=self._times[position])).isoformat(" ")
+        raise KeyError(key)
+
+    def __reduce__(self):
+        return (_chat_log_from_columns,
+                (self._user_ids.values, self._users, self._times, self._texts, self._extra, self.base))
+
+def _chat_log_from_columns(user_ids, users, times, texts, extra, base=0) -> ChatLog:
+    log = ChatLog(base=base)
+    for user_id in user_ids:
+        log._user_ids.code(user_id)
+    log._users, log._times, log._texts, log._extra = users, times, texts, extra
+    return log
@@ -55,6 +55,14 @@ def show_add_wishlist_item_page():
     with tab4:
         show_product_url_entry(event_id)
 
+def show_fraud_warning(event_id, item_id):
+    """Warn the creator if an added item's price is far off its price history"""
+    item = DataManager.get_wishlist_item(event_id, item_id)
+    fraud_check = item.get("fraud_check", {}) if item else {}
+    
+    if fraud_check.get("assessment") == "potential_fraud":
+        st.warning(f"{fraud_check['reason']} (typically ${fraud_check['median_market_price']:.2f})")
+
 def show_manual_entry(event_id):
     """Show manual entry form for adding a wishlist item"""
     st.subheader("Add Item Manually")
@@ -122,6 +130,7 @@ def show_manual_entry(event_id):
     # Show success message and view wishlist button OUTSIDE the form
     if item_added:
         st.success(f"Added '{item_title}' to your wishlist!")
+        show_fraud_warning(event_id, item_id)
         st.button("View Wishlist", on_click=navigate_to, 
                  kwargs={"page": "event_details", "selected_event": event_id})
 
@@ -349,9 +358,10 @@ def show_product_url_entry(event_id):
                 }
                 
                 # Add to the mock data
-                DataManager.add_wishlist_item(new_item)
+                item_id = DataManager.add_wishlist_item(event_id, new_item)
                 
                 st.success(f"Added '{title}' to the wishlist!")
+                show_fraud_warning(event_id, item_id)
                 
                 # Reset the extraction state
                 st.session_state.url_extraction_success = False
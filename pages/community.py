@@ -1,48 +1,12 @@
 import streamlit as st
-import random
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from utils.data_manager import DataManager
 from utils.session import navigate_to
+from utils.rewards import POINTS_FOR_POST, POINTS_FOR_COMMENT, POINTS_FOR_LIKE
 
-# Sample community posts
-SAMPLE_POSTS = [
-    {
-        "user_id": "user3",
-        "type": "gift_received",
-        "content": "Just received this amazing coffee machine from my birthday wishlist! Thanks to everyone who contributed!",
-        "image_url": "https://images.unsplash.com/photo-1606937478082-9bfacb70a67e",
-        "date": (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d"),
-        "likes": 7,
-        "comments": [
-            {"user_id": "user1", "text": "Looks awesome! Enjoy your coffee!"},
-            {"user_id": "user4", "text": "Happy to contribute! ☕"}
-        ]
-    },
-    {
-        "user_id": "user2",
-        "type": "store_recommendation",
-        "content": "Found this great website for personalized gifts. They have amazing quality and quick delivery!",
-        "store_name": "PersonalizeIt",
-        "store_url": "https://example.com/personalize",
-        "date": (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d"),
-        "likes": 12,
-        "comments": [
-            {"user_id": "user5", "text": "I've used them before, they're great!"},
-            {"user_id": "user3", "text": "Thanks for sharing, will check them out for my next gift."}
-        ]
-    },
-    {
-        "user_id": "user4",
-        "type": "gift_recommendation",
-        "content": "Looking for a housewarming gift? These smart light bulbs were a hit at my friend's party!",
-        "product_name": "SmartBright Color Bulbs",
-        "product_url": "https://example.com/smartbulbs",
-        "date": (datetime.now() - timedelta(days=8)).strftime("%Y-%m-%d"),
-        "likes": 5,
-        "comments": []
-    }
-]
+# Posts shown per feed page
+FEED_PAGE_SIZE = 10
 
 def show_community_page():
     """Display the community feed page"""
@@ -60,34 +24,19 @@ def show_community_page():
     # Back button
     st.button("Back to Dashboard", on_click=navigate_to, kwargs={"page": "dashboard"})
     
-    # Add reward points if not already present
-    if 'reward_points' not in user:
-        user['reward_points'] = random.randint(50, 200)  # Give initial points
-    
     # Show user's reward points
     st.markdown(f"## Your Rewards")
-    st.metric("Reward Points", f"{user['reward_points']} pts")
-    
-    # Show level based on points
-    levels = [
-        {"name": "Gift Novice", "min_points": 0, "color": "gray"},
-        {"name": "Gift Giver", "min_points": 100, "color": "blue"},
-        {"name": "Gift Expert", "min_points": 300, "color": "green"},
-        {"name": "Gift Master", "min_points": 700, "color": "purple"},
-        {"name": "Gift Legend", "min_points": 1500, "color": "gold"}
-    ]
+    st.metric("Reward Points", f"{DataManager.get_reward_points(user_id)} pts")
     
-    current_level = levels[0]
-    for level in levels:
-        if user['reward_points'] >= level['min_points']:
-            current_level = level
+    # Show level based on lifetime points
+    current_level = DataManager.get_reward_level(user_id)
     
     st.markdown(f"**Level:** <span style='color:{current_level['color']}'>{current_level['name']}</span>", unsafe_allow_html=True)
     
     st.markdown("---")
     
     # Tabs for different community sections
-    tab1, tab2, tab3 = st.tabs(["Community Feed", "Share Something", "Redeem Rewards"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Community Feed", "Share Something", "Redeem Rewards", "Leaderboard"])
     
     with tab1:
         show_community_feed(user_id)
@@ -97,28 +46,33 @@ def show_community_page():
     
     with tab3:
         show_rewards_redemption(user_id, user)
+    
+    with tab4:
+        show_leaderboard(user_id)
 
 def show_community_feed(user_id):
     """Show the community feed with posts"""
     st.subheader("Latest from the Community")
     
-    # In a real app, we would load posts from a database
-    # For this prototype, we'll use sample posts
+    scope = st.radio("Show posts from", ["Friends", "Everyone"], key="feed_scope", horizontal=True)
     
-    # Get community posts
-    posts = []
-    if 'community_posts' in st.session_state:
-        posts = st.session_state.community_posts + SAMPLE_POSTS
-    else:
-        posts = SAMPLE_POSTS
-        st.session_state.community_posts = []
+    # Cursors of the pages visited so far; the last one is the current page
+    cursors = st.session_state.setdefault(f"feed_cursors_{scope}", [None])
+    posts, next_cursor = DataManager.get_feed(user_id if scope == "Friends" else None, cursors[-1], FEED_PAGE_SIZE)
     
-    # Sort posts by date (newest first)
-    posts = sorted(posts, key=lambda p: p.get('date', ''), reverse=True)
+    if not posts:
+        st.info("No posts yet. Share something with the community!")
+        return
+    
+    # Look up the authors of all posts and comments at once
+    authors = DataManager.get_users(
+        {post['user_id'] for post in posts} |
+        {comment['user_id'] for post in posts for comment in post.get('comments', [])}
+    )
     
     # Display each post
     for post in posts:
-        post_user = DataManager.get_user(post['user_id'])
+        post_user = authors.get(post['user_id'])
         
         with st.container():
             # Post header with user info
@@ -148,48 +102,50 @@ def show_community_feed(user_id):
             # Like button and comment count
             col1, col2 = st.columns([1, 5])
             with col1:
-                if st.button(f"❤️ {post.get('likes', 0)}", key=f"like_{posts.index(post)}"):
+                if st.button(f"❤️ {post['likes']}", key=f"like_{post['id']}"):
                     # Increment likes
-                    post['likes'] = post.get('likes', 0) + 1
+                    DataManager.like_post(post['id'])
                     
-                    # Award points for engagement (first time only)
-                    user = DataManager.get_user(user_id)
-                    if user and post['user_id'] != user_id:
-                        user['reward_points'] = user.get('reward_points', 0) + 2
-                        st.success("+2 reward points for engagement!")
+                    # Award points for engagement
+                    if post['user_id'] != user_id:
+                        DataManager.award_points(user_id, POINTS_FOR_LIKE, "Liked a post")
+                        st.success(f"+{POINTS_FOR_LIKE} reward points for engagement!")
             
             with col2:
-                comment_count = len(post.get('comments', []))
+                comment_count = len(post['comments'])
                 st.markdown(f"💬 {comment_count} comments")
             
             # Show existing comments
             with st.expander(f"View comments ({comment_count})"):
-                for comment in post.get('comments', []):
-                    comment_user = DataManager.get_user(comment['user_id'])
+                for comment in post['comments']:
+                    comment_user = authors.get(comment['user_id'])
                     comment_user_name = comment_user['name'] if comment_user else "Unknown User"
                     st.markdown(f"**{comment_user_name}:** {comment['text']}")
                 
                 # Add comment form
-                new_comment = st.text_input("Add a comment:", key=f"comment_{posts.index(post)}")
-                if st.button("Post Comment", key=f"post_comment_{posts.index(post)}"):
+                new_comment = st.text_input("Add a comment:", key=f"comment_{post['id']}")
+                if st.button("Post Comment", key=f"post_comment_{post['id']}"):
                     if new_comment:
-                        if 'comments' not in post:
-                            post['comments'] = []
-                        
-                        post['comments'].append({
-                            'user_id': user_id,
-                            'text': new_comment
-                        })
+                        DataManager.add_post_comment(post['id'], user_id, new_comment)
                         
-                        # Award points for commenting (first time only)
-                        user = DataManager.get_user(user_id)
-                        if user and post['user_id'] != user_id:
-                            user['reward_points'] = user.get('reward_points', 0) + 5
-                            st.success("+5 reward points for commenting!")
+                        # Award points for commenting
+                        if post['user_id'] != user_id:
+                            DataManager.award_points(user_id, POINTS_FOR_COMMENT, "Commented on a post")
+                            st.success(f"+{POINTS_FOR_COMMENT} reward points for commenting!")
                         
                         st.rerun()
             
             st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("Newer posts", key="feed_newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor is not None and st.button("Older posts", key="feed_older"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 def show_post_form(user_id):
     """Show form for creating a new community post"""
@@ -228,9 +184,7 @@ def show_post_form(user_id):
                     "user_id": user_id,
                     "type": post_type.lower().replace(" ", "_"),
                     "content": content,
-                    "date": datetime.now().strftime("%Y-%m-%d"),
-                    "likes": 0,
-                    "comments": []
+                    "date": datetime.now().strftime("%Y-%m-%d")
                 }
                 
                 # Add type-specific fields
@@ -247,25 +201,21 @@ def show_post_form(user_id):
                     if 'product_url' in locals() and product_url:
                         new_post["product_url"] = product_url
                 
-                # Add post to session state
-                if 'community_posts' not in st.session_state:
-                    st.session_state.community_posts = []
-                    
-                st.session_state.community_posts.append(new_post)
+                # Publish to the shared feed
+                DataManager.add_post(new_post)
                 
                 # Award points for posting
-                user = DataManager.get_user(user_id)
-                if user:
-                    user['reward_points'] = user.get('reward_points', 0) + 10
+                DataManager.award_points(user_id, POINTS_FOR_POST, "Shared a post")
                 
-                st.success("Post shared successfully! (+10 reward points)")
+                st.success(f"Post shared successfully! (+{POINTS_FOR_POST} reward points)")
                 st.rerun()
 
 def show_rewards_redemption(user_id, user):
     """Show options for redeeming reward points"""
     st.subheader("Redeem Your Reward Points")
     
-    st.markdown(f"You have **{user.get('reward_points', 0)} points** to redeem")
+    points = DataManager.get_reward_points(user_id)
+    st.markdown(f"You have **{points} points** to redeem")
     
     # List of available rewards
     rewards = [
@@ -288,29 +238,34 @@ def show_rewards_redemption(user_id, user):
         
         with col3:
             # Disable button if user doesn't have enough points
-            disabled = user.get('reward_points', 0) < reward['cost']
+            disabled = points < reward['cost']
             if st.button("Redeem", key=f"redeem_{rewards.index(reward)}", disabled=disabled):
                 # Process redemption
                 with st.spinner("Processing your redemption..."):
                     time.sleep(1)  # Simulate processing
                     
-                    # Deduct points
-                    user['reward_points'] -= reward['cost']
-                    
-                    # Add redemption record
-                    if 'redemptions' not in user:
-                        user['redemptions'] = []
+                    # Deduct points and record the redemption
+                    if DataManager.redeem_reward(user_id, reward):
+                        st.success(f"Redeemed: {reward['name']}")
+                        st.code(reward['code'])
+                        st.markdown("*Use this code during checkout*")
                         
-                    user['redemptions'].append({
-                        'date': datetime.now().strftime("%Y-%m-%d"),
-                        'reward': reward['name'],
-                        'code': reward['code'],
-                        'cost': reward['cost']
-                    })
-                    
-                    st.success(f"Redeemed: {reward['name']}")
-                    st.code(reward['code'])
-                    st.markdown("*Use this code during checkout*")
-                    
-                    # Show updated points
-                    st.markdown(f"**Remaining points:** {user['reward_points']}") 
\ No newline at end of file
+                        # Show updated points
+                        st.markdown(f"**Remaining points:** {DataManager.get_reward_points(user_id)}")
+                    else:
+                        st.error("You don't have enough points for this reward")
+
+def show_leaderboard(user_id):
+    """Show the top gift givers by lifetime reward points"""
+    st.subheader("Top Gift Givers")
+    
+    scope = st.radio("Rank", ["Friends", "Everyone"], key="leaderboard_scope", horizontal=True)
+    board = DataManager.get_leaderboard(10, user_id if scope == "Friends" else None)
+    names = DataManager.get_user_names([member for member, _ in board])
+    
+    for rank, (member, points) in enumerate(board, start=1):
+        name = names[member]
+        if member == user_id:
+            name = f"**{name} (you)**"
+        st.markdown(f"{rank}. {name} — {points} pts")
+
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.data_manager import DataManager
+from utils.rewards import points_for_contribution
 from utils.session import navigate_to
 
 def show_contribute_page():
@@ -48,12 +49,13 @@ def show_contribute_page():
     if item.get("contributors"):
         st.markdown("### Current Contributors")
         
+        contributors = DataManager.get_users(item["contributors"])
+        totals_by_user = DataManager.get_contribution_totals("user", event_id=event_id, item_id=item_id)
+        
         for contributor_id in item["contributors"]:
-            contributor = DataManager.get_user(contributor_id)
+            contributor = contributors.get(contributor_id)
             if contributor:
-                contributions = [c for c in DataManager.get_item_contributions(event_id, item_id) 
-                                if c["user_id"] == contributor_id]
-                total = sum(c["amount"] for c in contributions)
+                total = totals_by_user.get(contributor_id, 0.0)
                 st.markdown(f"- {contributor['name']}: ${total:.2f}")
     
     # Contribution form
@@ -62,12 +64,11 @@ def show_contribute_page():
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        st.markdown(f"Your wallet balance: **${user['wallet_balance']:.2f}**")
+        st.markdown(f"Your wallet balance: **${DataManager.get_wallet_balance(user_id):.2f}**")
         
-        # Show reward points if available
-        if 'reward_points' in user:
-            st.markdown(f"Current reward points: **{user['reward_points']} pts**")
-            st.markdown("*You'll earn points for contributing!*")
+        # Show reward points
+        st.markdown(f"Current reward points: **{DataManager.get_reward_points(user_id)} pts**")
+        st.markdown("*You'll earn points for contributing!*")
     
     # Variables to store form results
     contribution_success = False
@@ -123,12 +124,8 @@ def show_contribute_page():
                 contribution_success = True
                 
                 # Award points for contribution
-                if 'reward_points' not in user:
-                    user['reward_points'] = 0
-                    
-                # Award 10 points per $10 contributed (rounded up)
-                points_earned = max(10, int((contribution_amount / 10) * 10))
-                user['reward_points'] += points_earned
+                points_earned = points_for_contribution(contribution_amount)
+                DataManager.award_points(user_id, points_earned, "Contribution")
                 
                 # Check if item is now fully funded
                 updated_item = DataManager.get_wishlist_item(event_id, item_id)
@@ -149,22 +146,24 @@ def show_contribute_page():
 
 def select_contribution_amount(user, remaining_amount):
     """Helper function to handle contribution amount selection"""
+    balance = DataManager.get_wallet_balance(user["id"])
+    
     # Suggest contribution amounts
     suggested_amounts = []
     
     # Full amount
-    if user["wallet_balance"] >= remaining_amount:
+    if balance >= remaining_amount:
         suggested_amounts.append(("Full amount", remaining_amount))
     
     # Half
     half_amount = remaining_amount / 2
-    if user["wallet_balance"] >= half_amount:
+    if balance >= half_amount:
         suggested_amounts.append(("Half", half_amount))
     
     # Custom smaller amounts
     for percent, label in [(0.25, "25%"), (0.1, "10%")]:
         partial_amount = remaining_amount * percent
-        if user["wallet_balance"] >= partial_amount:
+        if balance >= partial_amount:
             suggested_amounts.append((label, partial_amount))
     
     # Add custom option
@@ -186,7 +185,7 @@ def select_contribution_amount(user, remaining_amount):
     
     # If custom amount selected, show input field
     if selected_option == "Custom amount":
-        max_allowed = min(user["wallet_balance"], remaining_amount)
+        max_allowed = min(balance, remaining_amount)
         contribution_amount = st.number_input(
             "Enter contribution amount:",
             min_value=1.0,
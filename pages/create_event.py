@@ -5,6 +5,9 @@ import random
 from utils.data_manager import DataManager
 from utils.session import navigate_to
 
+# Number of matching users offered in the participant picker
+PARTICIPANT_MATCHES = 10
+
 def show_create_event_page():
     """Display the create event page"""
     st.title("Create New Event")
@@ -12,6 +15,9 @@ def show_create_event_page():
     # Back to dashboard button
     st.button("Back to Dashboard", on_click=navigate_to, kwargs={"page": "dashboard"})
     
+    # Participants are picked outside the form, so matches update as the user types
+    selected_participants = select_participants(st.session_state.user_id)
+    
     # Form for creating a new event
     with st.form(key="create_event_form"):
         event_title = st.text_input("Event Title")
@@ -41,18 +47,6 @@ def show_create_event_page():
             horizontal=True
         )
         
-        # Participant selection from existing users (in a real app, this would be a search)
-        all_users = DataManager.get_all_users()
-        current_user = DataManager.get_user(st.session_state.user_id)
-        other_users = [user for user in all_users if user["id"] != st.session_state.user_id]
-        
-        # Use multiselect for participants
-        selected_participants = st.multiselect(
-            "Invite Participants",
-            options=[user["id"] for user in other_users],
-            format_func=lambda user_id: next((user["name"] for user in other_users if user["id"] == user_id), "Unknown")
-        )
-        
         # Submit button
         submitted = st.form_submit_button("Create Event")
         
@@ -94,4 +88,38 @@ def show_create_event_page():
     # View event button outside the form
     if "selected_event" in st.session_state and st.session_state.selected_event:
         if st.button("View Event", key="view_created_event"):
-            navigate_to("event_details", selected_event=st.session_state.selected_event) 
\ No newline at end of file
+            navigate_to("event_details", selected_event=st.session_state.selected_event) 
+
+def select_participants(user_id):
+    """Type-ahead participant picker; returns the selected user IDs"""
+    st.subheader("Invite Participants")
+    query = st.text_input("Search friends and other users", key="participant_query")
+    
+    if "participant_typeahead" not in st.session_state:
+        st.session_state.participant_typeahead = DataManager.new_user_typeahead()
+    
+    # Offer the current matches plus everyone already selected, so the
+    # selection survives a change of query
+    selected = st.session_state.get("invite_participants", [])
+    matches = DataManager.search_users(query, PARTICIPANT_MATCHES, user_id=user_id, exclude=selected,
+                                       typeahead=st.session_state.participant_typeahead)
+    names = DataManager.get_user_names(selected, default="Unknown")
+    names.update((user["id"], user["name"]) for user in matches)
+    
+    selected = st.multiselect(
+        "Selected participants",
+        options=list(selected) + [user["id"] for user in matches],
+        format_func=lambda participant_id: names.get(participant_id, "Unknown"),
+        key="invite_participants"
+    )
+    
+    # Friends of friends who aren't invited yet
+    suggestions = DataManager.suggest_invitees(user_id, exclude=selected)
+    if suggestions:
+        suggested_names = DataManager.get_user_names([suggested_id for suggested_id, _ in suggestions])
+        st.caption("People you may know: " + ", ".join(
+            f"{suggested_names[suggested_id]} ({mutual} mutual friend{'s' if mutual != 1 else ''})"
+            for suggested_id, mutual in suggestions
+        ))
+    
+    return selected
@@ -1,7 +1,18 @@
 import streamlit as st
 import datetime
 from utils.data_manager import DataManager
-from utils.session import navigate_to, logout
+from utils.session import navigate_to, logout, section_navigation
+from utils.cache import user_scope, discovery_scope
+
+DASHBOARD_SECTIONS = ["My Events", "Events I'm Invited To", "Upcoming", "Discover", "My Contributions"]
+
+# Days ahead covered by the upcoming section
+UPCOMING_DAYS = 60
+
+# Filters of the discover section
+DISCOVER_EVENT_TYPES = ["birthday", "wedding", "housewarming", "baby_shower", "holiday", "graduation", "anniversary", "other"]
+DISCOVER_WINDOWS = {"Next 7 days": 7, "Next 30 days": 30, "Next 90 days": 90, "Any time": None}
+DISCOVER_PAGE_SIZE = 10
 
 def show_dashboard_page():
     """Display the user dashboard"""
@@ -13,8 +24,11 @@ def show_dashboard_page():
         logout()
         st.rerun()
     
+    # Everything the dashboard shows, maintained incrementally per user
+    summary = DataManager.get_dashboard_summary(user_id)
+    
     # Add sidebar navigation
-    show_sidebar_navigation(user)
+    show_sidebar_navigation(user, summary)
     
     # Header with user info and logout button
     col1, col2 = st.columns([3, 1])
@@ -26,28 +40,29 @@ def show_dashboard_page():
     # User stats
     col1, col2 = st.columns(2)
     with col1:
-        st.info(f"Wallet Balance: ${user['wallet_balance']:.2f}")
+        st.info(f"Wallet Balance: ${DataManager.get_wallet_balance(user_id):.2f}")
         st.button("Add Funds", on_click=navigate_to, kwargs={"page": "wallet"})
     
     with col2:
-        # Show reward points if available
-        if 'reward_points' in user:
-            st.success(f"Reward Points: {user['reward_points']} pts")
-            st.button("Community Hub", on_click=navigate_to, kwargs={"page": "community"})
+        # Show reward points
+        st.success(f"Reward Points: {DataManager.get_reward_points(user_id)} pts")
+        st.button("Community Hub", on_click=navigate_to, kwargs={"page": "community"})
     
-    # Tabs for different dashboard sections
-    tab1, tab2, tab3 = st.tabs(["My Events", "Events I'm Invited To", "My Contributions"])
+    # Section switcher for the dashboard; only the active section is computed
+    section = section_navigation("dashboard_section", DASHBOARD_SECTIONS)
     
-    with tab1:
-        show_my_events(user_id)
-        
-    with tab2:
-        show_invited_events(user_id)
-        
-    with tab3:
-        show_contributions(user_id)
+    if section == "My Events":
+        show_my_events(summary)
+    elif section == "Events I'm Invited To":
+        show_invited_events(summary)
+    elif section == "Upcoming":
+        show_upcoming(user_id)
+    elif section == "Discover":
+        show_discover()
+    else:
+        show_contributions(summary)
 
-def show_sidebar_navigation(user):
+def show_sidebar_navigation(user, summary):
     """Show sidebar with navigation links"""
     with st.sidebar:
         st.title("HubsHub")
@@ -72,8 +87,11 @@ def show_sidebar_navigation(user):
         if st.button("👥 Community", use_container_width=True):
             navigate_to("community")
             
+        if st.button("🔍 Search", use_container_width=True):
+            navigate_to("search")
+            
         # Event quick links if any
-        events = DataManager.get_user_events(user['id'])
+        events = summary.events
         if events:
             st.markdown("---")
             st.markdown("### My Events")
@@ -89,9 +107,9 @@ def show_sidebar_navigation(user):
         st.markdown("*HubsHub Gift Coordination Platform*")
         st.markdown("*v1.0 Prototype*")
 
-def show_my_events(user_id):
+def show_my_events(summary):
     """Show events created by the user"""
-    events = [e for e in DataManager.get_user_events(user_id) if e["creator"] == user_id]
+    events = summary.owned_events
     
     if not events:
         st.write("You haven't created any events yet.")
@@ -100,20 +118,16 @@ def show_my_events(user_id):
               on_click=navigate_to, kwargs={"page": "create_event"})
     
     # Display each event
-    for event in events:
+    for entry in events:
+        event = entry["event"]
+        rsvp_counts = entry["rsvp_counts"]
+        
         with st.expander(f"{event['title']} ({event['date']})"):
             col1, col2 = st.columns([3, 1])
             
             with col1:
                 st.write(f"**Type:** {event['type'].capitalize()}")
                 st.write(f"**Privacy:** {event['privacy'].capitalize()}")
-                
-                # Count RSVPs
-                rsvp_counts = {"yes": 0, "maybe": 0, "no": 0, "not responded": 0}
-                for status in event["rsvp"].values():
-                    if status in rsvp_counts:
-                        rsvp_counts[status] += 1
-                
                 st.write(f"**RSVPs:** {rsvp_counts['yes']} Yes, {rsvp_counts['maybe']} Maybe, {rsvp_counts['no']} No, {rsvp_counts['not responded']} Pending")
             
             with col2:
@@ -121,19 +135,20 @@ def show_my_events(user_id):
                          on_click=navigate_to, 
                          kwargs={"page": "event_details", "selected_event": event["id"]})
 
-def show_invited_events(user_id):
+def show_invited_events(summary):
     """Show events the user is invited to"""
-    events = [e for e in DataManager.get_user_events(user_id) 
-              if e["creator"] != user_id and user_id in e["participants"]]
+    user_id = summary.user_id
+    events = summary.invited_events
     
     if not events:
         st.write("You don't have any event invitations.")
         return
     
     # Display each invited event
-    for event in events:
-        creator = DataManager.get_user(event["creator"])
-        creator_name = creator["name"] if creator else "Unknown"
+    for entry in events:
+        event = entry["event"]
+        creator_name = entry["creator_name"]
+        user_status = entry["user_status"]
         
         with st.expander(f"{event['title']} by {creator_name} ({event['date']})"):
             col1, col2, col3 = st.columns([2, 1, 1])
@@ -142,7 +157,6 @@ def show_invited_events(user_id):
                 st.write(f"**Type:** {event['type'].capitalize()}")
                 
                 # Show user's RSVP status
-                user_status = event["rsvp"].get(user_id, "not responded")
                 status_display = {
                     "yes": "✅ You're attending",
                     "maybe": "❓ You might attend",
@@ -156,17 +170,17 @@ def show_invited_events(user_id):
                     rsvp_col1, rsvp_col2, rsvp_col3 = st.columns(3)
                     with rsvp_col1:
                         if st.button("Yes", key=f"yes_{event['id']}"):
-                            event["rsvp"][user_id] = "yes"
+                            DataManager.update_rsvp(event["id"], user_id, "yes")
                             st.success("RSVP updated to Yes!")
                             st.rerun()
                     with rsvp_col2:
                         if st.button("Maybe", key=f"maybe_{event['id']}"):
-                            event["rsvp"][user_id] = "maybe"
+                            DataManager.update_rsvp(event["id"], user_id, "maybe")
                             st.success("RSVP updated to Maybe!")
                             st.rerun()
                     with rsvp_col3:
                         if st.button("No", key=f"no_{event['id']}"):
-                            event["rsvp"][user_id] = "no"
+                            DataManager.update_rsvp(event["id"], user_id, "no")
                             st.success("RSVP updated to No!")
                             st.rerun()
             
@@ -182,39 +196,118 @@ def show_invited_events(user_id):
                              on_click=navigate_to, 
                              kwargs={"page": "event_details", "selected_event": event["id"]})
 
-def show_contributions(user_id):
-    """Show the user's contributions to events"""
-    contributions = DataManager.get_user_contributions(user_id)
+def build_upcoming_view(user_id, today):
+    """Upcoming events and friends' birthdays, with the friends' names"""
+    birthdays = DataManager.get_friend_birthdays(user_id, UPCOMING_DAYS, today)
+    names = DataManager.get_user_names([friend_id for friend_id, _ in birthdays])
+    return {
+        "upcoming": DataManager.get_upcoming_events(user_id, UPCOMING_DAYS, today),
+        "birthdays": [(names[friend_id], date) for friend_id, date in birthdays]
+    }
+
+def show_upcoming(user_id):
+    """Show upcoming events and birthdays for the user and their friends"""
+    # Friends' new events and birthdays bump the friends' scopes, and new friendships the user's
+    today = datetime.date.today()
+    scopes = [user_scope(user_id)] + [user_scope(friend["id"]) for friend in DataManager.get_user_friends(user_id)]
+    view = DataManager.get_view(("dashboard", "upcoming", user_id, today), scopes,
+                                lambda: build_upcoming_view(user_id, today))
+    upcoming, birthdays = view["upcoming"], view["birthdays"]
     
-    if not contributions:
-        st.write("You haven't made any contributions yet.")
+    if not upcoming and not birthdays:
+        st.write(f"Nothing coming up in the next {UPCOMING_DAYS} days.")
         return
     
-    total_contributed = sum(c["amount"] for c in contributions)
-    st.metric("Total Contributed", f"${total_contributed:.2f}")
+    if upcoming:
+        st.markdown("#### Events")
+        for entry in upcoming:
+            event = entry["event"]
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.write(f"**{event['title']}** - {event['date']} (in {entry['days_until']} days)")
+            with col2:
+                st.button("View Event", key=f"upcoming_{event['id']}",
+                         on_click=navigate_to,
+                         kwargs={"page": "event_details", "selected_event": event["id"]})
     
-    # Group by event
-    contributions_by_event = {}
-    for contrib in contributions:
-        event_id = contrib["event_id"]
-        if event_id not in contributions_by_event:
-            contributions_by_event[event_id] = []
-        contributions_by_event[event_id].append(contrib)
+    if birthdays:
+        st.markdown("#### Friends' Birthdays")
+        for name, date in birthdays:
+            st.write(f"🎂 **{name}** - {date.strftime('%B %d')}")
+
+def show_discover():
+    """Browse public events by type, date and how much of their wishlist is funded"""
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        event_type = st.selectbox("Type", ["any"] + DISCOVER_EVENT_TYPES, key="discover_type",
+                                  format_func=lambda value: value.replace("_", " ").capitalize())
+    with col2:
+        window = st.selectbox("When", list(DISCOVER_WINDOWS), index=1, key="discover_window")
+    with col3:
+        max_funding = st.slider("Funded at most (%)", 0, 100, 100, step=10, key="discover_funding")
+    with col4:
+        sort = st.radio("Sort by", ["date", "funding"], key="discover_sort",
+                        format_func=lambda value: "Soonest" if value == "date" else "Least funded")
+    
+    # Cursors of the pages visited so far, reset whenever the filters change
+    filters = (event_type, window, max_funding, sort)
+    if st.session_state.get("discover_filters") != filters:
+        st.session_state.discover_filters = filters
+        st.session_state.discover_cursors = [None]
+    cursors = st.session_state.discover_cursors
+    
+    today = datetime.date.today()
+    results, next_cursor = DataManager.get_view(
+        ("dashboard", "discover", filters, cursors[-1], today), [discovery_scope()],
+        lambda: DataManager.discover_events(
+            None if event_type == "any" else event_type, DISCOVER_WINDOWS[window], max_funding / 100,
+            sort=sort, cursor=cursors[-1], limit=DISCOVER_PAGE_SIZE, today=today
+        )
+    )
+    
+    if not results:
+        st.write("No public events match these filters.")
+    
+    for result in results:
+        event = result["event"]
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**{event['title']}** - {event['type'].replace('_', ' ').capitalize()}, {event['date']}")
+            st.progress(result["funding_ratio"], text=f"{result['funding_ratio'] * 100:.0f}% funded")
+        with col2:
+            st.button("View Event", key=f"discover_{event['id']}",
+                     on_click=navigate_to,
+                     kwargs={"page": "event_details", "selected_event": event["id"]})
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("Previous", key="discover_previous"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor is not None and st.button("Next", key="discover_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+def show_contributions(summary):
+    """Show the user's contributions to events"""
+    if not summary.contribution_count:
+        st.write("You haven't made any contributions yet.")
+        return
+    
+    st.metric("Total Contributed", f"${summary.total_contributed:.2f}")
     
     # Display contributions grouped by event
-    for event_id, event_contribs in contributions_by_event.items():
-        event = DataManager.get_event(event_id)
-        if not event:
-            continue
-            
-        with st.expander(f"{event['title']} - ${sum(c['amount'] for c in event_contribs):.2f}"):
-            for contrib in event_contribs:
-                item = DataManager.get_wishlist_item(event_id, contrib["item_id"])
-                if item:
-                    st.write(f"- ${contrib['amount']:.2f} for {item['title']} on {contrib['date']}")
+    for event_id, by_event in summary.contributions_by_event.items():
+        event = by_event["event"]
+        
+        with st.expander(f"{event['title']} - ${by_event['total']:.2f}"):
+            for entry in by_event["entries"]:
+                if entry["item_title"]:
+                    st.write(f"- ${entry['amount']:.2f} for {entry['item_title']} on {entry['date']}")
                 else:
-                    st.write(f"- ${contrib['amount']:.2f} on {contrib['date']}")
+                    st.write(f"- ${entry['amount']:.2f} on {entry['date']}")
             
             st.button("View Event", key=f"contrib_{event_id}",
                      on_click=navigate_to, 
-                     kwargs={"page": "event_details", "selected_event": event_id}) 
\ No newline at end of file
+                     kwargs={"page": "event_details", "selected_event": event_id})
\ No newline at end of file
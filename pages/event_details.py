@@ -1,11 +1,33 @@
 import streamlit as st
 import datetime
+import copy
 import pandas as pd
-from utils.data_manager import DataManager
-from utils.session import navigate_to
+from utils.data_manager import DataManager, request_scope
+from utils.session import navigate_to, section_navigation
+from utils.cache import user_scope, event_scope
 from utils.ai_helper import chat_with_assistant
 from utils.fund_allocator import FundAllocator
+from utils.perf import timed
 
+# Number of chat messages rendered per window
+CHAT_PAGE_SIZE = 30
+
+# The wishlist and fund views re-run on their own at this interval to pick up new contributions
+FUNDING_REFRESH_SECONDS = 30
+
+EVENT_SECTIONS = ["Wishlist", "Chat", "Participants", "Fund Allocation"]
+
+def navigate_from_fragment(page, **kwargs):
+    """Navigate away from inside a fragment (fragment reruns don't redraw the whole page)"""
+    navigate_to(page, **kwargs)
+    st.rerun(scope="app")
+
+def section_view(name, event_id, build_fn, scopes, *args):
+    """Get a section's view data, rebuilt only when the underlying data changes"""
+    key = ("event", name, event_id) + args
+    return DataManager.get_view(key, scopes, lambda: build_fn(event_id, *args))
+
+@timed("event_details.page")
 def show_event_details_page():
     """Display event details, wishlist, and chat"""
     event_id = st.session_state.selected_event
@@ -32,24 +54,53 @@ def show_event_details_page():
     with col2:
         st.button("Back to Dashboard", on_click=navigate_to, kwargs={"page": "dashboard"})
     
-    # Tabs for different event sections
-    tab1, tab2, tab3, tab4 = st.tabs(["Wishlist", "Chat", "Participants", "Fund Allocation"])
+    # Section switcher; only the active section is computed, and each one
+    # is a fragment that re-runs on its own
+    section = section_navigation(f"event_section_{event_id}", EVENT_SECTIONS)
     
-    with tab1:
+    if section == "Wishlist":
         show_wishlist(event_id, user_id, is_creator)
-        
-    with tab2:
+    elif section == "Chat":
         show_chat(event_id, user_id)
-        
-    with tab3:
+    elif section == "Participants":
         show_participants(event, user_id)
-        
-    with tab4:
+    else:
         show_fund_allocation(event_id, user_id, is_creator)
 
+def build_wishlist_view(event_id, user_id):
+    """Group the wishlist by category and resolve contributor names"""
+    wishlist = DataManager.get_wishlist(event_id)
+    
+    # Look up all contributors at once
+    users = DataManager.get_users({c_id for item in wishlist for c_id in item.get("contributors", [])})
+    
+    categories = {"small": [], "medium": [], "large": []}
+    contributor_names = {}
+    for item in wishlist:
+        category = item.get("category", "medium")
+        if category in categories:
+            categories[category].append(item)
+        
+        contributor_names[item["id"]] = [users[c_id]["name"] for c_id in item.get("contributors", []) if c_id in users]
+    
+    # Items the user has contributed to can be viewed once reserved
+    my_item_ids = {item_id for _, item_id in
+                   DataManager.get_contribution_totals("item", event_id=event_id, user_id=user_id)}
+    
+    return {
+        "categories": categories,
+        "contributor_names": contributor_names,
+        "my_item_ids": my_item_ids
+    }
+
+@st.fragment(run_every=FUNDING_REFRESH_SECONDS)
+@timed("event_details.wishlist")
+@request_scope("event_details.wishlist")
 def show_wishlist(event_id, user_id, is_creator):
     """Show the event's wishlist"""
-    wishlist = DataManager.get_wishlist(event_id)
+    view = section_view("wishlist", event_id, build_wishlist_view,
+                        [event_scope(event_id), user_scope(user_id)], user_id)
+    categories = view["categories"]
     
     col1, col2 = st.columns([3, 1])
     with col1:
@@ -57,21 +108,13 @@ def show_wishlist(event_id, user_id, is_creator):
     
     if is_creator:
         with col2:
-            st.button("Add Item", key="add_item_btn",
-                     on_click=navigate_to, 
-                     kwargs={"page": "add_wishlist_item", "selected_event": event_id})
+            if st.button("Add Item", key="add_item_btn"):
+                navigate_from_fragment("add_wishlist_item", selected_event=event_id)
     
-    if not wishlist:
+    if not view["contributor_names"]:
         st.write("No items in the wishlist yet.")
         return
     
-    # Group items by category
-    categories = {"small": [], "medium": [], "large": []}
-    for item in wishlist:
-        category = item.get("category", "medium")
-        if category in categories:
-            categories[category].append(item)
-    
     # Display items by category
     for category_name, category_title in [
         ("large", "Large Gifts ($200+)"), 
@@ -98,12 +141,7 @@ def show_wishlist(event_id, user_id, is_creator):
                     
                     # Show contributors if any
                     if item.get("contributors"):
-                        contributor_names = []
-                        for c_id in item["contributors"]:
-                            user = DataManager.get_user(c_id)
-                            if user:
-                                contributor_names.append(user["name"])
-                        
+                        contributor_names = view["contributor_names"][item["id"]]
                         st.markdown(f"*Contributors: {', '.join(contributor_names)}*")
                     
                     # Show pooled amount if any
@@ -114,7 +152,13 @@ def show_wishlist(event_id, user_id, is_creator):
                 
                 with col2:
                     st.markdown(f"**${item['price']:.2f}**")
-                    
+
+                    # Show price changes detected by the background price refresh
+                    recommendation = item.get("price_recommendation")
+                    if recommendation and recommendation.get("recommendation") != "no_change":
+                        st.caption(f"Now ${recommendation['current_price']:.2f} online "
+                                   f"({recommendation['recommendation'].replace('_', ' ')})")
+
                     # Show priority if this is the creator's wishlist
                     if is_creator and item.get("priority"):
                         priority_colors = {
@@ -127,14 +171,15 @@ def show_wishlist(event_id, user_id, is_creator):
                 
                 with col3:
                     if item["status"] == "available":
-                        st.button("Contribute", key=f"contribute_{item['id']}",
-                                 on_click=navigate_to,
-                                 kwargs={"page": "contribute", "selected_event": event_id, "selected_item": item["id"]})
-                    elif item["status"] == "reserved" and item["id"] in [c.get("item_id") for c in DataManager.get_user_contributions(user_id) if c.get("event_id") == event_id]:
-                        st.button("View", key=f"view_{item['id']}",
-                                 on_click=navigate_to,
-                                 kwargs={"page": "view_item", "selected_event": event_id, "selected_item": item["id"]})
+                        if st.button("Contribute", key=f"contribute_{item['id']}"):
+                            navigate_from_fragment("contribute", selected_event=event_id, selected_item=item["id"])
+                    elif item["status"] == "reserved" and item["id"] in view["my_item_ids"]:
+                        if st.button("View", key=f"view_{item['id']}"):
+                            navigate_from_fragment("view_item", selected_event=event_id, selected_item=item["id"])
 
+@st.fragment
+@timed("event_details.chat")
+@request_scope("event_details.chat")
 def show_chat(event_id, user_id):
     """Show the event chat"""
     st.subheader("Group Chat")
@@ -171,14 +216,37 @@ def show_chat(event_id, user_id):
                 # Normal message
                 DataManager.add_chat_message(event_id, user_id, message)
             
-            st.rerun()
+            # Only the chat needs to be redrawn
+            st.rerun(scope="fragment")
     
-    # Display existing messages
+    # Display the newest window of messages; older ones are only loaded on request
     with chat_container:
-        messages = DataManager.get_chat_messages(event_id)
+        # Messages loaded with "Load older", oldest first. The log is append-only,
+        # so they are kept across reruns and each click reads one page before them.
+        history_key = f"chat_history_{event_id}"
+        history = st.session_state.get(history_key, [])
+        messages = DataManager.get_chat_messages(event_id, limit=CHAT_PAGE_SIZE)
+        
+        if history and messages:
+            loaded_until = history[-1]["id"] + 1
+            if messages[0]["id"] > loaded_until:
+                # New messages pushed the window past the history; read the gap once
+                history = history + DataManager.get_chat_messages(
+                    event_id, cursor=messages[0]["id"], limit=messages[0]["id"] - loaded_until)
+                st.session_state[history_key] = history
+            messages = history + [msg for msg in messages if msg["id"] > history[-1]["id"]]
         
         if not messages:
             st.info("No messages yet. Start the conversation!")
+        elif messages[0]["id"] > 0:
+            older_count = messages[0]["id"]
+            if st.button(f"Load older messages ({older_count} more)", key=f"load_older_{event_id}"):
+                page = DataManager.get_chat_messages(event_id, cursor=messages[0]["id"], limit=CHAT_PAGE_SIZE)
+                st.session_state[history_key] = page + messages
+                st.rerun(scope="fragment")
+        
+        # Look up the senders of the whole window at once
+        senders = DataManager.get_users({msg["user"] for msg in messages})
         
         for msg in messages:
             col1, col2 = st.columns([1, 5])
@@ -188,8 +256,8 @@ def show_chat(event_id, user_id):
                 sender_name = "Gift Assistant 🤖"
                 sender_image = "https://api.dicebear.com/7.x/bottts/svg?seed=assistant"
             else:
-                sender = DataManager.get_user(msg["user"])
-                sender_name = sender["name"] if sender else "Unknown User"
+                sender = senders.get(msg["user"], {})
+                sender_name = sender.get("name", "Unknown User")
                 sender_image = sender.get("profile_photo", "https://api.dicebear.com/7.x/avataaars/svg?seed=" + msg["user"])
             
             with col1:
@@ -213,12 +281,37 @@ def show_chat(event_id, user_id):
                 
             st.divider()
 
+def build_participants_view(event_id):
+    """Group participant names by RSVP status"""
+    event = DataManager.get_event(event_id)
+    users = DataManager.get_users([event["creator"]] + event["participants"])
+    
+    # Group participants by status
+    statuses = {"yes": [], "maybe": [], "no": [], "not responded": []}
+    
+    for participant_id in event["participants"]:
+        status = event["rsvp"].get(participant_id, "not responded")
+        if status in statuses and participant_id in users:
+            statuses[status].append(users[participant_id]["name"])
+    
+    return {
+        "creator": users.get(event["creator"]),
+        "statuses": statuses
+    }
+
+@st.fragment
+@timed("event_details.participants")
+@request_scope("event_details.participants")
 def show_participants(event, user_id):
     """Show event participants and their RSVP status"""
     st.subheader("Participants")
     
+    view = section_view("participants", event["id"], build_participants_view,
+                        [event_scope(event["id"])])
+    statuses = view["statuses"]
+    
     # Show creator
-    creator = DataManager.get_user(event["creator"])
+    creator = view["creator"]
     if creator:
         st.markdown(f"**Creator:** {creator['name']} ({creator['email']})")
     
@@ -228,42 +321,26 @@ def show_participants(event, user_id):
     # Create status columns
     yes_col, maybe_col, no_col, pending_col = st.columns(4)
     
-    # Group participants by status
-    statuses = {"yes": [], "maybe": [], "no": [], "not responded": []}
-    
-    for participant_id in event["participants"]:
-        status = event["rsvp"].get(participant_id, "not responded")
-        if status in statuses:
-            statuses[status].append(participant_id)
-    
     # Display participants by status
     with yes_col:
         st.markdown("#### ✅ Attending")
-        for p_id in statuses["yes"]:
-            participant = DataManager.get_user(p_id)
-            if participant:
-                st.markdown(f"- {participant['name']}")
+        for name in statuses["yes"]:
+            st.markdown(f"- {name}")
     
     with maybe_col:
         st.markdown("#### ❓ Maybe")
-        for p_id in statuses["maybe"]:
-            participant = DataManager.get_user(p_id)
-            if participant:
-                st.markdown(f"- {participant['name']}")
+        for name in statuses["maybe"]:
+            st.markdown(f"- {name}")
     
     with no_col:
         st.markdown("#### ❌ Declined")
-        for p_id in statuses["no"]:
-            participant = DataManager.get_user(p_id)
-            if participant:
-                st.markdown(f"- {participant['name']}")
+        for name in statuses["no"]:
+            st.markdown(f"- {name}")
     
     with pending_col:
         st.markdown("#### ⏳ Pending")
-        for p_id in statuses["not responded"]:
-            participant = DataManager.get_user(p_id)
-            if participant:
-                st.markdown(f"- {participant['name']}")
+        for name in statuses["not responded"]:
+            st.markdown(f"- {name}")
     
     # RSVP controls if the user is a participant but not the creator
     if user_id in event["participants"] and user_id != event["creator"]:
@@ -274,22 +351,18 @@ def show_participants(event, user_id):
                             index=["yes", "maybe", "no"].index(current_status) if current_status in ["yes", "maybe", "no"] else 0)
         
         if st.button("Update RSVP"):
-            # In a real application, this would update the database
-            # For this prototype, we'll update the mock data directly
-            event["rsvp"][user_id] = new_status
+            DataManager.update_rsvp(event["id"], user_id, new_status)
             st.success("RSVP updated successfully!")
-            st.rerun()
+            # RSVPs feed the fund allocation analysis, so redraw the whole page
+            st.rerun(scope="app")
 
-def show_fund_allocation(event_id, user_id, is_creator):
-    """Show fund allocation and splitting analysis with the new sophisticated logic"""
-    st.subheader("Fund Allocation Analysis")
-    
+def build_fund_allocation_view(event_id):
+    """Compute the funding totals, contribution shares and purchase plan for an event"""
     wishlist = DataManager.get_wishlist(event_id)
     event = DataManager.get_event(event_id)
     
     if not wishlist:
-        st.info("No items in the wishlist yet.")
-        return
+        return None
     
     # Initialize the fund allocator
     fund_allocator = FundAllocator()
@@ -297,10 +370,95 @@ def show_fund_allocation(event_id, user_id, is_creator):
     # Analyze wishlist status
     total_wishlist_value = sum(item["price"] for item in wishlist)
     funded_amount = sum(item.get("pooled_amount", 0) for item in wishlist)
-    remaining_amount = total_wishlist_value - funded_amount
     
-    # Calculate required amounts including fees
-    fee_breakdown = fund_allocator.calculate_total_required(total_wishlist_value)
+    # Get available participants based on RSVPs
+    confirmed_participants = [p_id for p_id, status in event["rsvp"].items() if status in ["yes", "maybe"]]
+    
+    # Get contributors who already contributed, with their totals
+    totals_by_user = DataManager.get_contribution_totals("user", event_id=event_id)
+    contributor_ids = list(totals_by_user)
+    
+    # Format contributions for the allocator
+    contributions_for_allocator = [{"user_id": c_id, "amount": total_amount}
+                                   for c_id, total_amount in totals_by_user.items()]
+    
+    contributor_names = DataManager.get_user_names(contributor_ids, default="Unknown")
+    
+    # Calculate proportional contributions
+    contribution_data = []
+    if contributions_for_allocator:
+        proportional_contributions = fund_allocator.allocate_individual_contributions(
+            copy.deepcopy(contributions_for_allocator), 
+            total_wishlist_value
+        )
+        
+        for contrib in proportional_contributions:
+            contribution_data.append({
+                "Contributor": contributor_names[contrib["user_id"]],
+                "Amount": f"${contrib['amount']:.2f}",
+                "Percentage": f"{contrib['percentage']:.1f}%",
+                "Effective Share": f"${contrib['individual_share']:.2f}"
+            })
+    
+    # Calculate average contribution per person
+    avg_contribution = 25.0  # Default value
+    if contributions_for_allocator:
+        avg_contribution = funded_amount / len(contributions_for_allocator)
+    
+    # Calculate optimal purchase plan on copies, since the allocator annotates the items
+    prioritized_items = []
+    if funded_amount < total_wishlist_value:
+        priority_values = {"high": 3, "medium": 2, "low": 1}
+        items = [dict(item) for item in wishlist]
+        for item in items:
+            item["priority_value"] = priority_values.get(item.get("priority", "medium"), 2)
+        
+        prioritized_items = fund_allocator.prioritize_multi_item_purchase(
+            items,
+            funded_amount,
+            event["date"]
+        )
+    
+    return {
+        "wishlist": wishlist,
+        "total_wishlist_value": total_wishlist_value,
+        "funded_amount": funded_amount,
+        "fee_breakdown": fund_allocator.calculate_total_required(total_wishlist_value),
+        "confirmed_participants": confirmed_participants,
+        "contributor_ids": contributor_ids,
+        "contributor_names": contributor_names,
+        "contributions_for_allocator": contributions_for_allocator,
+        "contribution_data": contribution_data,
+        "avg_contribution": avg_contribution,
+        "prioritized_items": prioritized_items
+    }
+
+@st.fragment(run_every=FUNDING_REFRESH_SECONDS)
+@timed("event_details.fund_allocation")
+@request_scope("event_details.fund_allocation")
+def show_fund_allocation(event_id, user_id, is_creator):
+    """Show fund allocation and splitting analysis with the new sophisticated logic"""
+    st.subheader("Fund Allocation Analysis")
+    
+    view = section_view("fund_allocation", event_id, build_fund_allocation_view,
+                        [event_scope(event_id)])
+    
+    if not view:
+        st.info("No items in the wishlist yet.")
+        return
+    
+    fund_allocator = FundAllocator()
+    wishlist = view["wishlist"]
+    total_wishlist_value = view["total_wishlist_value"]
+    funded_amount = view["funded_amount"]
+    remaining_amount = total_wishlist_value - funded_amount
+    fee_breakdown = view["fee_breakdown"]
+    confirmed_participants = view["confirmed_participants"]
+    contributor_ids = view["contributor_ids"]
+    contributor_names = view["contributor_names"]
+    contributions_for_allocator = view["contributions_for_allocator"]
+    avg_contribution = view["avg_contribution"]
+    prioritized_items = view["prioritized_items"]
     
     col1, col2, col3 = st.columns(3)
     
@@ -335,46 +493,12 @@ def show_fund_allocation(event_id, user_id, is_creator):
     # Pool splitting analysis
     st.markdown("### Proportional Contribution Analysis")
     
-    # Get available participants based on RSVPs
-    confirmed_participants = [p_id for p_id, status in event["rsvp"].items() if status in ["yes", "maybe"]]
-    
-    # Get contributors who already contributed
-    all_contributions = [c for c in DataManager.get_user_contributions(None) if c["event_id"] == event_id]
-    contributor_ids = list(set([c["user_id"] for c in all_contributions]))
-    
-    # Format contributions for the allocator
-    contributions_for_allocator = []
-    for c_id in contributor_ids:
-        user_contributions = [c for c in all_contributions if c["user_id"] == c_id]
-        total_amount = sum(c["amount"] for c in user_contributions)
-        contributions_for_allocator.append({
-            "user_id": c_id,
-            "amount": total_amount
-        })
-    
-    # Calculate proportional contributions
-    if contributions_for_allocator:
-        proportional_contributions = fund_allocator.allocate_individual_contributions(
-            contributions_for_allocator, 
-            total_wishlist_value
-        )
-        
+    if view["contribution_data"]:
         # Show current contributions table
         st.write("#### Current Contributions")
         
-        contribution_data = []
-        for contrib in proportional_contributions:
-            user = DataManager.get_user(contrib["user_id"])
-            username = user["name"] if user else "Unknown"
-            contribution_data.append({
-                "Contributor": username,
-                "Amount": f"${contrib['amount']:.2f}",
-                "Percentage": f"{contrib['percentage']:.1f}%",
-                "Effective Share": f"${contrib['individual_share']:.2f}"
-            })
-        
         # Display as a DataFrame for better formatting
-        st.dataframe(pd.DataFrame(contribution_data))
+        st.dataframe(pd.DataFrame(view["contribution_data"]))
     
     # Analyze funding status
     if funded_amount >= total_wishlist_value:
@@ -400,7 +524,7 @@ def show_fund_allocation(event_id, user_id, is_creator):
             allocation = fund_allocator.handle_overfunding(
                 funded_amount,
                 total_wishlist_value,
-                contributions_for_allocator,
+                copy.deepcopy(contributions_for_allocator),
                 option_mapping[options]
             )
             
@@ -408,10 +532,8 @@ def show_fund_allocation(event_id, user_id, is_creator):
             if options == "Proportional Refund":
                 refund_data = []
                 for contrib in allocation["contributors"]:
-                    user = DataManager.get_user(contrib["user_id"])
-                    username = user["name"] if user else "Unknown"
                     refund_data.append({
-                        "Contributor": username,
+                        "Contributor": contributor_names.get(contrib["user_id"], "Unknown"),
                         "Total Contributed": f"${contrib['amount']:.2f}",
                         "Refund Amount": f"${contrib['refund']:.2f}",
                         "Final Amount": f"${contrib['final_contribution']:.2f}"
@@ -433,11 +555,6 @@ def show_fund_allocation(event_id, user_id, is_creator):
         shortfall = total_wishlist_value - funded_amount
         st.warning(f"The wishlist is currently underfunded by ${shortfall:.2f}")
         
-        # Calculate average contribution per person
-        avg_contribution = 25.0  # Default value
-        if contributions_for_allocator:
-            avg_contribution = funded_amount / len(contributions_for_allocator)
-        
         # Show analysis for remaining participants
         remaining_participants = [p for p in confirmed_participants if p not in contributor_ids]
         potential_funding = len(remaining_participants) * avg_contribution
@@ -449,18 +566,6 @@ def show_fund_allocation(event_id, user_id, is_creator):
         - Potential additional funding: **${potential_funding:.2f}** (if all confirmed participants contribute)
         """)
         
-        # Prioritize items
-        priority_values = {"high": 3, "medium": 2, "low": 1}
-        for item in wishlist:
-            item["priority_value"] = priority_values.get(item.get("priority", "medium"), 2)
-        
-        # Calculate optimal purchase plan
-        prioritized_items = fund_allocator.prioritize_multi_item_purchase(
-            wishlist,
-            funded_amount,
-            event["date"]
-        )
-        
         st.write("#### Recommended Purchase Plan")
         
         purchase_plan_data = []
@@ -503,7 +608,7 @@ def show_fund_allocation(event_id, user_id, is_creator):
             allocation = fund_allocator.handle_underfunding(
                 funded_amount,
                 total_wishlist_value,
-                contributions_for_allocator,
+                copy.deepcopy(contributions_for_allocator),
                 {"items": wishlist},
                 option_mapping[options]
             )
@@ -528,10 +633,8 @@ def show_fund_allocation(event_id, user_id, is_creator):
                 st.write("All contributions will be refunded to their original contributors")
                 refund_data = []
                 for contrib in allocation["contributors"]:
-                    user = DataManager.get_user(contrib["user_id"])
-                    username = user["name"] if user else "Unknown"
                     refund_data.append({
-                        "Contributor": username,
+                        "Contributor": contributor_names.get(contrib["user_id"], "Unknown"),
                         "Refund Amount": f"${contrib['amount']:.2f}"
                     })
                 
@@ -573,4 +676,4 @@ def show_fund_allocation(event_id, user_id, is_creator):
                         if st.button("Contribute Smart Amount", key=f"smart_contribute_{item['id']}"):
                             st.session_state.selected_item = item["id"]
                             st.session_state.suggested_amount = contribution_per_person
-                            navigate_to("contribute", selected_event=event_id, selected_item=item["id"]) 
\ No newline at end of file
+                            navigate_from_fragment("contribute", selected_event=event_id, selected_item=item["id"]) 
\ No newline at end of file
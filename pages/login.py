@@ -1,6 +1,9 @@
 import streamlit as st
 from utils.session import login
-from data.mock_data import USERS
+from utils.data_manager import DataManager
+
+# Number of matching users offered in the picker
+LOGIN_MATCHES = 10
 
 def show_login_page():
     """Display the login page"""
@@ -10,22 +13,29 @@ def show_login_page():
         st.title("HubsHub")
         st.markdown("### Gift coordination made simple")
         
+        # In a real app, this would be a proper login form
+        # For this prototype, users are picked from a type-ahead search
+        st.subheader("Login")
+        
+        # Outside the form, so matches update as the user types
+        query = st.text_input("Search users by name or email", key="login_query")
+        if "login_typeahead" not in st.session_state:
+            st.session_state.login_typeahead = DataManager.new_user_typeahead()
+        matches = DataManager.search_users(query, LOGIN_MATCHES, typeahead=st.session_state.login_typeahead)
+        
         with st.form("login_form"):
-            # In a real app, this would be a proper login form
-            # For this prototype, we'll use a simple dropdown
-            st.subheader("Login")
-            
-            users = list(USERS.values())
-            options = [f"{user['name']} ({user['email']})" for user in users]
-            selected_option = st.selectbox("Select a user:", options)
+            options = [user["id"] for user in matches]
+            labels = {user["id"]: f"{user['name']} ({user['email']})" for user in matches}
+            selected_user_id = st.selectbox("Select a user:", options, format_func=labels.get)
             
             submit = st.form_submit_button("Login")
             
             if submit:
-                selected_index = options.index(selected_option)
-                selected_user = users[selected_index]
-                login(selected_user["id"])
-                st.rerun()
+                if selected_user_id is None:
+                    st.error("No users match your search.")
+                else:
+                    login(selected_user_id)
+                    st.rerun()
 
         with st.expander("About HubsHub"):
             st.markdown("""
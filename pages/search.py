@@ -0,0 +1,44 @@
+import streamlit as st
+from utils.data_manager import DataManager
+from utils.session import navigate_to
+
+# Maximum number of results shown
+SEARCH_RESULTS = 20
+
+# Labels of the searchable content types
+SEARCH_KINDS = {"item": "🎁 Wishlist items", "chat": "💬 Chat messages", "post": "👥 Community posts"}
+
+def show_search_page():
+    """Display full-text search over wishlists, event chats and community posts"""
+    user_id = st.session_state.user_id
+    
+    st.title("Search")
+    st.button("Back to Dashboard", on_click=navigate_to, kwargs={"page": "dashboard"})
+    
+    query = st.text_input("Search wishlists, event chats and community posts", key="search_query")
+    kinds = st.multiselect("Include", list(SEARCH_KINDS), default=list(SEARCH_KINDS),
+                           format_func=SEARCH_KINDS.get, key="search_kinds")
+    
+    if not query.strip():
+        return
+    
+    # Only public events and the user's own events are searched
+    results = DataManager.search(user_id, query, kinds, SEARCH_RESULTS)
+    if not results:
+        st.write("No results found.")
+        return
+    
+    for i, result in enumerate(results):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown(f"{SEARCH_KINDS[result['kind']].split()[0]} **{result['title']}**")
+            if result["text"]:
+                st.caption(result["text"])
+        with col2:
+            if result["event_id"]:
+                st.button("View Event", key=f"search_result_{i}",
+                         on_click=navigate_to,
+                         kwargs={"page": "event_details", "selected_event": result["event_id"]})
+            else:
+                st.button("Community", key=f"search_result_{i}",
+                         on_click=navigate_to, kwargs={"page": "community"})
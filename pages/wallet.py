@@ -1,8 +1,14 @@
 import streamlit as st
-import random
-import time
+import uuid
 from utils.data_manager import DataManager
 from utils.session import navigate_to
+from utils.payments import get_payment_processor, SUCCEEDED
+
+# How often a pending top-up's status is polled
+TOP_UP_POLL_SECONDS = 1
+
+# Wallet history entries per page
+HISTORY_PAGE_SIZE = 5
 
 def show_wallet_page():
     """Display the wallet page with funding options"""
@@ -21,13 +27,19 @@ def show_wallet_page():
     st.button("Back to Dashboard", on_click=navigate_to, kwargs={"page": "dashboard"})
     
     # Current balance
-    st.markdown(f"## Current Balance: ${user['wallet_balance']:.2f}")
+    st.markdown(f"## Current Balance: ${DataManager.get_wallet_balance(user_id):.2f}")
+    
+    # Transaction history
+    show_wallet_history(user_id)
     
-    # Transaction history (if any)
-    if 'transactions' in user:
-        st.markdown("### Recent Transactions")
-        for tx in user.get('transactions', [])[-5:]:  # Show last 5 transactions
-            st.markdown(f"- {tx['date']}: {tx['description']} ${tx['amount']:.2f}")
+    # Status of the latest top-up
+    intent_id = st.session_state.get("wallet_intent")
+    if intent_id:
+        intent = get_payment_processor().get_intent(intent_id)
+        if intent and not intent.finished:
+            show_pending_top_up(intent_id)
+        elif intent:
+            show_top_up_result(intent)
     
     # Add funds section
     st.markdown("## Add Funds")
@@ -82,51 +94,68 @@ def show_wallet_page():
     elif add_200:
         add_funds(user_id, 200, "Quick Add")
 
-def add_funds(user_id, amount, payment_method):
-    """Add funds to user wallet with simulated payment processing"""
-    user = DataManager.get_user(user_id)
-    if not user:
-        st.error("User not found")
+def show_wallet_history(user_id):
+    """Show the wallet history one page at a time, newest first"""
+    # Cursors of the pages visited so far; the last one is the current page
+    cursors = st.session_state.setdefault("wallet_history_cursors", [None])
+    entries, next_cursor = DataManager.get_wallet_history(user_id, cursors[-1], HISTORY_PAGE_SIZE)
+    
+    if not entries:
         return
     
-    # Show payment processing animation
-    with st.spinner("Processing payment..."):
-        progress_bar = st.progress(0)
-        for i in range(100):
-            # Simulate payment processing
-            time.sleep(0.01)
-            progress_bar.progress(i + 1)
-        
-        # 95% chance of success, 5% chance of failure
-        success = random.random() < 0.95
+    st.markdown("### Recent Transactions")
+    for entry in entries:
+        st.markdown(f"- {entry['date']}: {entry['description']} ${entry['amount']:.2f}")
     
-    if success:
-        # Update user wallet balance
-        user['wallet_balance'] += amount
-        
-        # Add transaction record
-        if 'transactions' not in user:
-            user['transactions'] = []
-            
-        transaction = {
-            'date': time.strftime("%Y-%m-%d"),
-            'description': f"Added funds via {payment_method}",
-            'amount': amount,
-            'type': 'credit'
-        }
-        
-        user['transactions'].append(transaction)
-        
-        # Show success message
-        st.success(f"Successfully added ${amount:.2f} to your wallet!")
-        st.balloons()
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("Newer", key="wallet_history_newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor is not None and st.button("Older", key="wallet_history_older"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+def add_funds(user_id, amount, payment_method):
+    """Start a wallet top-up; the wallet is credited once the payment succeeds"""
+    # One idempotency key per top-up attempt, so a double submit doesn't charge twice
+    if "wallet_attempt" not in st.session_state:
+        st.session_state.wallet_attempt = uuid.uuid4().hex
+    idempotency_key = f"{user_id}:{st.session_state.wallet_attempt}:{amount:.2f}:{payment_method}"
+    
+    intent = get_payment_processor().create_top_up(user_id, amount, payment_method, idempotency_key)
+    st.session_state.wallet_intent = intent.id
+    st.rerun()
+
+@st.fragment(run_every=TOP_UP_POLL_SECONDS)
+def show_pending_top_up(intent_id):
+    """Poll a pending top-up without blocking the page"""
+    intent = get_payment_processor().get_intent(intent_id)
+    
+    if intent is None or intent.finished:
+        # Redraw the whole page to show the outcome and the new balance
+        st.rerun(scope="app")
+    
+    st.info(f"Processing payment of ${intent.amount:.2f}... ({intent.status})")
+
+def show_top_up_result(intent):
+    """Show the outcome of a finished top-up"""
+    # The next top-up is a new attempt
+    st.session_state.pop("wallet_attempt", None)
+    
+    if intent.status == SUCCEEDED:
+        st.success(f"Successfully added ${intent.amount:.2f} to your wallet!")
         
-        # Show updated balance
-        st.markdown(f"**New Balance:** ${user['wallet_balance']:.2f}")
+        # Celebrate once per top-up
+        if st.session_state.get("wallet_celebrated") != intent.id:
+            st.session_state.wallet_celebrated = intent.id
+            st.balloons()
     else:
         # Show error message for failed payment
-        st.error("Payment processing failed. Please try again or use a different payment method.")
+        reason = f" ({intent.failure_reason})" if intent.failure_reason else ""
+        st.error(f"Payment processing failed{reason}. Please try again or use a different payment method.")
     
     # Button to return to dashboard
     st.button("Return to Dashboard", key="return_after_funding", 
-             on_click=navigate_to, kwargs={"page": "dashboard"}) 
\ No newline at end of file
+             on_click=navigate_to, kwargs={"page": "dashboard"})
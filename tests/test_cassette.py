@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from utils.cassette import Cassette, CassetteMiss
+
+class Response:
+    def __init__(self, status_code, text, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+def test_recordings_replay_in_order(tmp_path):
+    path = os.path.join(str(tmp_path), "cassette.jsonl.gz")
+    recorder = Cassette("record", path, flush_every=2)
+    recorder.http_get(lambda: Response(200, "<p>v1</p>", {"ETag": "a"}), "https://shop.example/p")
+    # Recordings are written in batches
+    assert not os.path.exists(path)
+    recorder.http_get(lambda: Response(200, "<p>v2</p>"), "https://shop.example/p")
+    recorder.http_get(lambda: Response(429, "slow down"), "https://shop.example/q")
+    recorder.llm_generate(lambda: {"price": 12.5}, "llama3", "price of p?")
+    recorder.flush()
+    assert recorder.stats["recorded"] == 3
+
+    player = Cassette("replay", path)
+    first = player.http_get(None, "https://shop.example/p")
+    assert (first.status_code, first.text, first.headers["etag"]) == (200, "<p>v1</p>", "a")
+    assert player.http_get(None, "https://shop.example/p").text == "<p>v2</p>"
+    # The last recording repeats
+    assert player.http_get(None, "https://shop.example/p").text == "<p>v2</p>"
+    assert player.llm_generate(None, "llama3", "price of p?") == {"price": 12.5}
+    # Throttled responses aren't recorded
+    with pytest.raises(CassetteMiss):
+        player.http_get(None, "https://shop.example/q")
+
+def test_sessions_append_to_the_cassette(tmp_path):
+    path = os.path.join(str(tmp_path), "cassette.jsonl.gz")
+    for text in ("first", "second"):
+        recorder = Cassette("record", path)
+        recorder.llm_generate(lambda: text, "llama3", text)
+        recorder.flush()
+    player = Cassette("replay", path)
+    assert [player.llm_generate(None, "llama3", text) for text in ("first", "second")] == ["first", "second"]
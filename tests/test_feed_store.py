@@ -0,0 +1,38 @@
+from utils.feed_store import FeedStore
+
+def post_ids(store, user_id, limit=3):
+    ids, cursor = [], None
+    while True:
+        page, cursor = store.read_timeline(user_id, cursor, limit)
+        ids.extend(post["id"] for post in page)
+        if cursor is None:
+            return ids
+
+def test_new_friends_see_each_others_earlier_posts():
+    friends = {"ann": ["bob"], "bob": ["ann"], "cat": []}
+    store = FeedStore([], lambda user_id: friends[user_id])
+    for i in range(10):
+        store.publish({"user_id": ("ann", "bob", "cat")[i % 3], "type": "general_update", "content": f"post {i}"})
+    assert post_ids(store, "ann") == [9, 7, 6, 4, 3, 1, 0]
+    assert post_ids(store, "cat") == [8, 5, 2]
+
+    friends["ann"].append("cat")
+    friends["cat"].append("ann")
+    store.add_friendship("ann", "cat")
+    assert post_ids(store, "ann") == list(range(9, -1, -1))
+    assert post_ids(store, "cat") == [9, 8, 6, 5, 3, 2, 0]
+
+    store.publish({"user_id": "cat", "type": "general_update", "content": "post 10"})
+    assert post_ids(store, "ann")[:2] == [10, 9]
+    # Backfilling again doesn't duplicate posts
+    store.add_friendship("ann", "cat")
+    assert post_ids(store, "ann") == list(range(10, -1, -1))
+
+def test_posts_published_out_of_id_order_page_in_order():
+    store = FeedStore([], lambda user_id: ["bob"] if user_id == "ann" else ["ann"])
+    # Ids assigned by a backend, published by racing requests
+    for post_id in (0, 1, 3, 2, 5, 4, 6):
+        store.publish({"id": post_id, "user_id": ("ann", "bob")[post_id % 2], "type": "general_update",
+                       "content": f"post {post_id}"})
+    assert post_ids(store, "ann", limit=2) == list(range(6, -1, -1))
+    assert post_ids(store, "bob", limit=3) == list(range(6, -1, -1))
@@ -0,0 +1,111 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils.fetch_scheduler import FetchScheduler
+
+class ThrottlingServer:
+    """
+    Local HTTP server that answers 429 with a Retry-After header to the first
+    `throttle` requests (all of them if None), then 200
+    """
+
+    def __init__(self, throttle=None, retry_after="0.2"):
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.request_times = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.request_times.append(time.monotonic())
+                throttled = server.throttle is None or len(server.request_times) <= server.throttle
+                body = b"slow down" if throttled else b"<h1>Kettle</h1>"
+                self.send_response(429 if throttled else 200)
+                if throttled and server.retry_after is not None:
+                    self.send_header("Retry-After", server.retry_after)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/product"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def scheduler():
+    scheduler = FetchScheduler(max_concurrency=2, domain_rate=100, domain_burst=10,
+                               max_retries=3, backoff_base=0.01, backoff_max=5.0)
+    yield scheduler
+    scheduler.shutdown()
+
+def test_retries_after_throttling_honor_retry_after(scheduler):
+    server = ThrottlingServer(throttle=2, retry_after="0.2")
+    try:
+        response = scheduler.fetch(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 200 and response.text == "<h1>Kettle</h1>"
+    first, second, third = server.request_times
+    assert second - first >= 0.19 and third - second >= 0.19
+    metrics = scheduler.metrics()
+    assert metrics["throttled"] == 2 and metrics["retries"] == 2 and metrics["completed"] == 1
+
+def test_throttled_response_returned_when_retries_run_out(scheduler):
+    server = ThrottlingServer(retry_after=None)
+    try:
+        response = scheduler.fetch(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 429
+    assert len(server.request_times) == scheduler.max_retries + 1
+
+def test_backoff_capped_by_deadline(scheduler):
+    # Retry-After asks for 5 s, which the deadline doesn't leave room for
+    server = ThrottlingServer(retry_after="5")
+    started = time.monotonic()
+    try:
+        response = scheduler.fetch(server.url, deadline=1.0)
+    finally:
+        server.close()
+    assert response.status_code == 429
+    assert len(server.request_times) == 1
+    assert time.monotonic() - started < 1.0
+
+def test_queued_job_fails_at_deadline():
+    scheduler = FetchScheduler(max_concurrency=1, domain_rate=0.05, domain_burst=1)
+    server = ThrottlingServer(throttle=0)
+    try:
+        assert scheduler.fetch(server.url).status_code == 200
+        # The domain's only token is spent; the next one is 20 s away
+        started = time.monotonic()
+        with pytest.raises(requests.Timeout):
+            scheduler.fetch(server.url, deadline=0.3)
+        assert 0.25 <= time.monotonic() - started < 2.0
+        assert scheduler.metrics()["queued"]["interactive"] == 0
+    finally:
+        scheduler.shutdown()
+        server.close()
+    assert len(server.request_times) == 1
+
+def test_domain_rate_limit():
+    scheduler = FetchScheduler(max_concurrency=4, domain_rate=10, domain_burst=2)
+    server = ThrottlingServer(throttle=0)
+    try:
+        futures = [scheduler.submit(server.url) for _ in range(6)]
+        assert all(future.result(timeout=5).status_code == 200 for future in futures)
+    finally:
+        scheduler.shutdown()
+        server.close()
+    # Two back to back, then one every 0.1 s
+    assert server.request_times[-1] - server.request_times[0] >= 0.35
@@ -0,0 +1,84 @@
+import json
+import os
+import re
+
+import pytest
+
+from utils.html_reducer import reduce_product_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixtures", "product_pages")
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+def _text(html):
+    return re.sub(r"<[^>]+>", " ", html)
+
+# page: (title, price as shown, text that must be dropped)
+PAGES = {
+    "shopify_running_shoe.html": ("Cloudrunner 2 Men's Running Shoe", "$129.00", "Sign up for our newsletter"),
+    "marketplace_headphones.html": ("SoundCore Q45 Wireless Noise Cancelling Headphones", "$79.99",
+                                    "Clamps a bit tight"),
+    "woocommerce_stand_mixer.html": ("Artisan Series 5 Quart Tilt-Head Stand Mixer", "379.99", "Pasta Roller Attachment"),
+    "microdata_cordless_vacuum.html": ("V15 Detect Absolute Cordless Vacuum", "$749.99", "We use cookies"),
+}
+
+def test_unclosed_list_items_in_dropped_navigation():
+    html = "<nav><ul><li>Home<li>Shop</ul></nav><main><h1>Dyson V15</h1><p>Price: $749.99</p></main>"
+    assert reduce_product_html(html)["html"] == "<main><h1>Dyson V15</h1><p>Price: $749.99</p></main>"
+
+def test_dropped_list_item_closed_by_its_sibling():
+    html = '<body><ul><li class="share">Share<li>Ships in 2 days</ul><p>Price: $20</p></body>'
+    reduced = reduce_product_html(html)["html"]
+    assert "Share" not in reduced
+    assert "Ships in 2 days" in reduced and "Price: $20" in reduced
+
+def test_dropped_block_ended_by_its_parent():
+    # The promo paragraph is never closed; the end of its div ends it
+    html = '<main><div><p class="promo">10% off<span>today</span></div><h1>Kettle</h1></main>'
+    reduced = reduce_product_html(html)["html"]
+    assert "10% off" not in reduced and "<h1>Kettle</h1>" in reduced
+
+def test_stray_end_tag_inside_dropped_block():
+    html = '<main><div class="ads"><span>Buy now</span></b></div><h1>Kettle</h1></main>'
+    assert reduce_product_html(html)["html"] == "<main><h1>Kettle</h1></main>"
+
+def test_product_meta_and_json_ld_kept():
+    html = ('<head><meta property="og:price:amount" content="19.99"><meta property="og:image" content="x.jpg">'
+            '<script type="application/ld+json">{"@type": "BreadcrumbList", "itemListElement": []}</script>'
+            '<script type="application/ld+json">{"@type": "Product", "name": "Mug",'
+            ' "offers": {"@type": "Offer", "price": "19.99"}}</script>'
+            '<script>var tracking = 1;</script></head><body><p>Mug</p></body>')
+    reduced = reduce_product_html(html)["html"]
+    assert '<meta property="og:price:amount" content="19.99">' in reduced
+    assert "og:image" not in reduced and "BreadcrumbList" not in reduced and "tracking" not in reduced
+    data = json.loads(re.search(r'<script type="application/ld\+json">(.*?)</script>', reduced).group(1))
+    assert data["offers"]["price"] == "19.99"
+
+@pytest.mark.parametrize("page", sorted(PAGES))
+def test_fixture_pages(page):
+    title, price, dropped = PAGES[page]
+    html = _fixture(page)
+    reduction = reduce_product_html(html)
+    text = _text(reduction["html"])
+    assert title in text
+    assert price in reduction["html"]
+    assert dropped in html and dropped not in reduction["html"]
+    assert reduction["tokens_after"] < reduction["tokens_before"] / 3
+
+def test_price_only_in_structured_data():
+    # A client-rendered page: the body is an empty app shell
+    reduced = reduce_product_html(_fixture("spa_smart_speaker.html"))["html"]
+    assert '<meta property="product:price:amount" content="59.99">' in reduced
+    assert '"lowPrice":"49.99"' in reduced
+    assert "Organization\",\"name\":\"VoltMart\",\"url\"" not in reduced
+    assert "__INITIAL_STATE__" not in reduced
+
+def test_text_and_attribute_values_stay_escaped():
+    html = ('<main><h1>Salt &amp; Pepper &lt;Mill&gt;</h1>'
+            '<img alt="5&quot; tall &lt;b&gt;" src="x.jpg"><p>&lt;script&gt;alert(1)&lt;/script&gt;</p></main>')
+    reduced = reduce_product_html(html)["html"]
+    assert "<h1>Salt &amp; Pepper &lt;Mill&gt;</h1>" in reduced
+    assert 'alt="5&quot; tall &lt;b&gt;"' in reduced
+    assert "<script>" not in reduced and "&lt;script&gt;alert(1)&lt;/script&gt;" in reduced
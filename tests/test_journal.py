@@ -0,0 +1,141 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+from utils.journal import Persistence, FSYNC_NEVER
+from utils.rewards import RewardPoints
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def recover_points(directory):
+    """A points ledger recovered from a directory, journaling to it"""
+    persistence = Persistence(directory, FSYNC_NEVER, snapshot_every=10 ** 9)
+    points = RewardPoints(on_write=persistence.record)
+    persistence.recover(lambda state: points.load_entries(state["points"]),
+                        lambda op, args: points.put(*args),
+                        lambda: {"points": points.entries()})
+    return persistence, points
+
+def points_state(points, user_ids):
+    return {user_id: (points.history(user_id, limit=100), points.balance(user_id), points.lifetime(user_id))
+            for user_id in user_ids}, points.leaderboard(10)
+
+def test_points_survive_snapshot_and_replay(tmp_path):
+    persistence, points = recover_points(str(tmp_path))
+    for i in range(20):
+        points.award(f"user{i % 4}", 10 + i, "Post")
+    points.redeem("user1", 20, "Gift card")
+    persistence.snapshot()
+
+    # Journaled after the snapshot, so replayed on top of it
+    points.award("user3", 500, "Contribution")
+    points.redeem("user3", 100, "Gift card")
+    expected = points_state(points, [f"user{i}" for i in range(4)])
+    persistence.close()
+
+    persistence, points = recover_points(str(tmp_path))
+    assert persistence.last_recovery["snapshot_seq"] > 0
+    assert persistence.last_recovery["replayed"] == 2
+    assert points_state(points, [f"user{i}" for i in range(4)]) == expected
+    # Entries the snapshot holds are skipped when replayed again
+    points.put(0, 1_700_000_000, "user0", 10, "Post")
+    assert points_state(points, [f"user{i}" for i in range(4)]) == expected
+    persistence.close()
+
+def tear_last_record(directory):
+    """Simulate a crash in the middle of writing a record to the newest segment"""
+    newest = max(glob.glob(os.path.join(directory, "journal-*.log")))
+    with open(newest, "ab") as f:
+        f.write(b"\x40\x00\x00\x00torn")
+
+def test_records_after_a_torn_tail_survive_later_crashes(tmp_path):
+    directory = str(tmp_path)
+    persistence, points = recover_points(directory)
+    for i in range(3):
+        points.award("user1", 10 + i, "Post")
+    persistence.close()
+    tear_last_record(directory)
+
+    # First crash: the torn record is dropped, and new records follow the valid ones
+    persistence, points = recover_points(directory)
+    assert persistence.last_recovery["replayed"] == 3
+    assert persistence.last_recovery["truncated_bytes"] == 8
+    points.award("user1", 20, "Comment")
+    points.award("user2", 30, "Comment")
+    expected = points_state(points, ["user1", "user2"])
+    persistence.close()
+    tear_last_record(directory)
+
+    # Second crash: everything written since the first recovery is still there
+    persistence, points = recover_points(directory)
+    assert persistence.last_recovery["replayed"] == 5
+    assert points_state(points, ["user1", "user2"]) == expected
+    persistence.close()
+
+def test_failed_background_snapshot_is_logged_and_retried(tmp_path, caplog):
+    persistence = Persistence(str(tmp_path), FSYNC_NEVER, snapshot_every=2, retry_delay=0.01)
+    failures = []
+
+    def capture():
+        # Fails every attempt of the first snapshot() call
+        if len(failures) < 3:
+            failures.append(1)
+            raise RuntimeError("dictionary changed size during iteration")
+        return {"points": []}
+
+    persistence.recover(lambda state: None, lambda op, args: None, capture)
+    persistence.record("points", 0)
+    persistence.record("points", 1)
+
+    deadline = time.monotonic() + 5
+    while not glob.glob(os.path.join(str(tmp_path), "snapshot-*.bin")) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert glob.glob(os.path.join(str(tmp_path), "snapshot-*.bin"))
+    assert any("Snapshot failed" in record.message for record in caplog.records)
+    persistence.close()
+
+STATE_SCRIPT = """
+import json, sys
+from utils import data_manager
+from utils.data_manager import DataManager
+
+if sys.argv[1] == "write":
+    DataManager.credit_wallet("user1", 25.0, "Added funds via Card", "txn_1")
+    DataManager.add_contribution("event1", "item1", "user1", 15.0)
+    DataManager.award_points("user1", 10, "Contribution")
+    data_manager.persistence.snapshot()
+    DataManager.credit_wallet("user1", 5.0, "Added funds via Card", "txn_2")
+    DataManager.award_points("user1", 5, "Comment")
+
+history, _ = DataManager.get_wallet_history("user1", limit=100)
+json.dump({
+    "history": history,
+    "balance": DataManager.get_wallet_balance("user1"),
+    "balance_at": [DataManager.get_wallet_balance_at("user1", entry["ts"]) for entry in history],
+    "reconcile": DataManager.reconcile_wallets(),
+    "points": data_manager.reward_points.history("user1", limit=100),
+    "reward_points": DataManager.get_reward_points("user1"),
+    "leaderboard": DataManager.get_leaderboard(3),
+}, sys.stdout)
+data_manager.persistence.close()
+"""
+
+def run_app(directory, mode):
+    env = dict(os.environ, HUBSHUB_DATA_DIR=directory, HUBSHUB_FSYNC="never")
+    env.pop("HUBSHUB_BACKEND", None)
+    result = subprocess.run([sys.executable, "-c", STATE_SCRIPT, mode], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+def test_data_manager_restart_keeps_wallet_and_points_history(tmp_path):
+    written = run_app(str(tmp_path), "write")
+    assert [entry["kind"] for entry in written["history"]] == ["credit", "contribution", "credit", "opening"]
+    assert written["reconcile"] == {}
+
+    restarted = run_app(str(tmp_path), "read")
+    assert restarted == written
+    # The opening entries were restored, not added again
+    assert run_app(str(tmp_path), "read")["history"] == written["history"]
@@ -0,0 +1,104 @@
+import datetime
+import time
+
+import pytest
+
+from utils import payments
+from utils.payments import PaymentGateway, PaymentProcessor, LocalPaymentGateway, PROCESSING, SUCCEEDED, FAILED
+
+class ManualGateway(PaymentGateway):
+    """Gateway whose events are delivered by the test"""
+
+    def __init__(self, webhook):
+        super().__init__(webhook)
+        self.charges = []
+
+    def charge(self, intent_id, amount, payment_method, idempotency_key):
+        self.charges.append(intent_id)
+
+def succeeded(intent, event_id="evt_ok"):
+    return {"id": event_id, "type": "payment_intent.succeeded", "intent_id": intent.id, "transaction_id": "txn_1"}
+
+class FlakyWallet:
+    """Credit function failing the first `failures` calls"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.credited = []
+
+    def __call__(self, intent):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("wallet store unavailable")
+        self.credited.append(intent.id)
+
+def test_duplicate_events_credit_once():
+    wallet = FlakyWallet()
+    processor = PaymentProcessor(wallet, ManualGateway)
+    intent = processor.create_top_up("user1", 25.0, "Card", "key1")
+    assert processor.create_top_up("user1", 25.0, "Card", "key1") is intent
+    assert processor.gateway.charges == [intent.id]
+
+    assert processor.handle_webhook({"id": "evt_p", "type": "payment_intent.processing", "intent_id": intent.id})
+    assert intent.status == PROCESSING
+    assert processor.handle_webhook(succeeded(intent))
+    assert not processor.handle_webhook(succeeded(intent))
+    assert not processor.handle_webhook(succeeded(intent, "evt_other"))
+    assert intent.status == SUCCEEDED
+    assert wallet.credited == [intent.id]
+
+def test_failed_credit_is_retried_on_redelivery():
+    wallet = FlakyWallet(failures=1)
+    processor = PaymentProcessor(wallet, ManualGateway)
+    intent = processor.create_top_up("user1", 25.0, "Card", "key1")
+
+    with pytest.raises(ConnectionError):
+        processor.handle_webhook(succeeded(intent))
+    assert not intent.finished
+
+    assert processor.handle_webhook(succeeded(intent))
+    assert intent.status == SUCCEEDED
+    assert wallet.credited == [intent.id]
+
+def test_intent_fails_after_max_credit_attempts():
+    wallet = FlakyWallet(failures=10)
+    processor = PaymentProcessor(wallet, ManualGateway, max_credit_attempts=2)
+    intent = processor.create_top_up("user1", 25.0, "Card", "key1")
+
+    with pytest.raises(ConnectionError):
+        processor.handle_webhook(succeeded(intent))
+    assert processor.handle_webhook(succeeded(intent))
+    assert intent.status == FAILED
+    assert "wallet store unavailable" in intent.failure_reason
+    assert not processor.handle_webhook(succeeded(intent))
+    assert wallet.credited == []
+
+def test_webhook_state_is_bounded(monkeypatch):
+    processor = PaymentProcessor(FlakyWallet(), ManualGateway, max_seen_events=3)
+    old = processor.create_top_up("user1", 25.0, "Card", "old")
+    for i in range(5):
+        processor.handle_webhook({"id": f"evt_{i}", "type": "payment_intent.processing", "intent_id": old.id})
+    assert len(processor._seen_events) == 3
+
+    old.created_at -= payments.RETENTION + datetime.timedelta(minutes=1)
+    new = processor.create_top_up("user1", 25.0, "Card", "new")
+    assert processor.get_intent(old.id) is None
+    assert processor.get_intent(new.id) is new
+    # The expired key starts a new top-up
+    assert processor.create_top_up("user1", 25.0, "Card", "old") is not old
+
+def test_local_gateway_redelivers_until_credited():
+    wallet = FlakyWallet(failures=2)
+    processor = PaymentProcessor(
+        wallet,
+        lambda webhook: LocalPaymentGateway(webhook, latency=(0, 0), success_rate=1.0, redelivery_delay=0.01)
+    )
+    try:
+        intent = processor.create_top_up("user1", 25.0, "Card", "key1")
+        deadline = time.monotonic() + 5
+        while not intent.finished and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert intent.status == SUCCEEDED
+        assert wallet.credited == [intent.id]
+    finally:
+        processor.gateway.shutdown()
@@ -0,0 +1,24 @@
+from utils.price_history import PriceHistoryStore, canonical_product_key
+
+def test_tracking_parameters_dropped():
+    assert canonical_product_key("https://www.Example.com/dyson/?utm_source=mail&gclid=abc#reviews") == "example.com/dyson"
+    assert canonical_product_key("https://example.com/dyson?fbclid=x&ref=home&utm_campaign=spring") == "example.com/dyson"
+
+def test_only_the_host_is_case_insensitive():
+    assert canonical_product_key("HTTPS://Shop.Example/p/AbC12") == "shop.example/p/AbC12"
+    assert canonical_product_key("https://shop.example/p/AbC12") != canonical_product_key("https://shop.example/p/abc12")
+
+def test_product_parameters_kept_and_sorted():
+    assert canonical_product_key("https://shop.example/item?id=123") == "shop.example/item?id=123"
+    assert canonical_product_key("https://shop.example/item?id=123") != canonical_product_key("https://shop.example/item?id=456")
+    assert (canonical_product_key("https://shop.example/p?variant=7&color=red&utm_medium=cpc")
+            == canonical_product_key("https://shop.example/p?color=red&variant=7"))
+
+def test_products_with_different_ids_keep_separate_histories(tmp_path):
+    store = PriceHistoryStore(str(tmp_path))
+    for day in range(5):
+        store.record("https://shop.example/item?id=123", 20.0, observed_at=1_700_000_000 + day * 86400)
+        store.record("https://shop.example/item?id=456&utm_source=x", 400.0, observed_at=1_700_000_000 + day * 86400)
+    now = 1_700_000_000 + 5 * 86400
+    assert store.window_stats("https://shop.example/item?id=123", now=now)["max"] == 20.0
+    assert store.window_stats("https://shop.example/item?id=456", now=now)["min"] == 400.0
@@ -0,0 +1,81 @@
+import datetime
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# An app process: evaluates one DataManager expression per input line and prints its result as JSON
+APP_SCRIPT = """
+import datetime, json, sys
+from collections.abc import Mapping
+from utils.data_manager import DataManager
+
+def plain(value):
+    return dict(value) if isinstance(value, Mapping) else str(value)
+
+print(json.dumps("ready"), flush=True)
+for line in sys.stdin:
+    print(json.dumps(eval(line, {"DataManager": DataManager, "datetime": datetime}), default=plain), flush=True)
+"""
+
+class App:
+    def __init__(self, path):
+        env = dict(os.environ, HUBSHUB_BACKEND=f"sqlite:{path}")
+        env.pop("HUBSHUB_DATA_DIR", None)
+        self.process = subprocess.Popen([sys.executable, "-c", APP_SCRIPT], cwd=ROOT, env=env, text=True,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        assert self.read() == "ready"
+
+    def read(self):
+        return json.loads(self.process.stdout.readline())
+
+    def __call__(self, expression):
+        self.process.stdin.write(expression + "\n")
+        self.process.stdin.flush()
+        return self.read()
+
+    def close(self):
+        self.process.stdin.close()
+        assert self.process.wait(timeout=30) == 0
+
+@pytest.fixture
+def apps(tmp_path):
+    path = os.path.join(str(tmp_path), "hubshub.db")
+    # The first process seeds the database before the second opens it
+    started = [App(path)]
+    started.append(App(path))
+    yield started
+    for app in started:
+        app.close()
+
+def test_views_see_writes_of_another_process(apps):
+    writer, reader = apps
+    in_a_week = (datetime.date.today() + datetime.timedelta(days=7)).isoformat()
+    # The reader builds its views before the writes
+    assert reader('DataManager.search("user1", "quokka")') == []
+    assert "user4" not in [user["id"] for user in reader('DataManager.get_user_friends("user2")')]
+    discovered, _ = reader('DataManager.discover_events(days=30)')
+    assert discovered == []
+
+    writer('DataManager.add_post({"user_id": "user1", "type": "general_update", "content": "A quokka plush"})')
+    writer('DataManager.add_friendship("user2", "user4")')
+    writer('DataManager.set_birthday("user4", "1995%s")' % in_a_week[4:])
+    writer('DataManager.add_event({"id": "party", "title": "Garden party", "date": "%s", "type": "housewarming",'
+           ' "creator": "user2", "privacy": "public", "participants": ["user1"], "rsvp": {"user1": "yes"}})'
+           % in_a_week)
+    writer('DataManager.add_wishlist_item("party", {"title": "Quokka lamp", "price": 40.0})')
+
+    for app in (writer, reader):
+        assert sorted(hit["kind"] for hit in app('DataManager.search("user1", "quokka")')) == ["item", "post"]
+        assert "user4" in [user["id"] for user in app('DataManager.get_user_friends("user2")')]
+        assert "user4" in [friend_id for friend_id, _ in app('DataManager.get_friend_birthdays("user2", days=8)')]
+        feed, _ = app('DataManager.get_feed("user2", limit=100)')
+        assert "user4" in {post["user_id"] for post in feed}
+        discovered, _ = app('DataManager.discover_events(days=30)')
+        assert [entry["event"]["id"] for entry in discovered] == ["party"]
+        assert [entry["event"]["id"] for entry in app('DataManager.get_upcoming_events("user1")')] == ["party"]
+        assert "party" in [event["id"] for event in app('DataManager.get_dashboard_summary("user1").events')]
@@ -0,0 +1,290 @@
+import copy
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Mapping
+
+import pytest
+
+from data import mock_data
+from utils.chat_store import SegmentedChatLog
+from utils.contribution_ledger import ContributionLedger, BY_EVENT, BY_ITEM, BY_USER, BY_DAY
+from utils.resp import RespClient, LocalRespServer
+from utils.storage import (MemoryBackend, SQLiteBackend, RedisBackend, USERS, EVENTS, WISHLISTS, CHATS, CONTRIBUTIONS,
+                           POSTS)
+from utils.wallet_ledger import CREDIT, CONTRIBUTION, REWARD_REDEMPTION
+
+# Entry times after the seeded opening entries (which are stamped with the current time)
+LATER = 4_000_000_000
+
+BACKENDS = ("memory", "sqlite", "redis")
+
+def plain(value):
+    """Records, tuple keys and NumPy scalars as plain values, to compare backends"""
+    if isinstance(value, Mapping):
+        return {str(key): plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+def collections():
+    return copy.deepcopy((mock_data.USERS, mock_data.EVENTS, mock_data.WISHLISTS, mock_data.CHAT_MESSAGES,
+                          mock_data.CONTRIBUTIONS, mock_data.COMMUNITY_POSTS))
+
+@pytest.fixture(scope="module")
+def redis_server():
+    server = LocalRespServer()
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def connect_backend(tmp_path, redis_server):
+    """connect_backend(name) returns a function opening new clients of one fresh store"""
+    def connect_for(name):
+        if name == "memory":
+            memory = MemoryBackend({}, {}, {}, {}, ContributionLedger(), [], SegmentedChatLog)
+            return lambda: memory
+        if name == "sqlite":
+            path = os.path.join(str(tmp_path), f"{uuid.uuid4().hex}.db")
+            return lambda: SQLiteBackend(path)
+        host, port = redis_server.address
+        prefix = f"test{uuid.uuid4().hex}"
+        return lambda: RedisBackend(RespClient(host, port), prefix)
+    return connect_for
+
+def exercise(backend):
+    """Every operation, with its results"""
+    results = {}
+
+    def record(name, value):
+        # Snapshot each result as it's returned: the memory backend hands out its live records
+        results[name] = plain(value)
+
+    chat_message = {"user": "user1", "message": "hi", "timestamp": "2026-10-01 10:00:00"}
+    record("all_users", backend.all_users())
+    record("get_users", backend.get_users(["user1", "user3", "nobody"]))
+    record("update_user", backend.update_user("user2", {"bio": "hi"}))
+    record("update_missing_user", backend.update_user("nobody", {"bio": "x"}))
+    record("get_user", backend.get_user("user2"))
+    record("debit", backend.adjust_user_number("user1", "wallet_balance", -25.5, minimum=0))
+    record("overdraw", backend.adjust_user_number("user1", "wallet_balance", -1e6, minimum=0))
+    record("award", backend.adjust_user_number("user1", "reward_points", 20))
+    record("adjust_missing_user", backend.adjust_user_number("nobody", "reward_points", 1))
+    record("put_event", backend.put_event({"id": "event9", "title": "Picnic", "date": "2026-11-01",
+                                           "type": "other", "creator": "user3", "privacy": "public",
+                                           "participants": ["user2"], "rsvp": {}}))
+    record("put_existing_event_if_absent", backend.put_event_if_absent({"id": "event9", "title": "Other",
+                                                                         "date": "2026-11-02", "type": "other",
+                                                                         "creator": "user4"}))
+    record("put_event_if_absent", backend.put_event_if_absent({"id": "event10", "title": "Brunch",
+                                                               "date": "2026-11-03", "type": "other",
+                                                               "creator": "user4", "participants": ["user2"]}))
+    record("user_events", [event["id"] for event in backend.get_user_events("user2")])
+    record("set_rsvp", backend.set_rsvp("event1", "user4", "yes"))
+    record("set_rsvp_missing_event", backend.set_rsvp("nope", "user1", "yes"))
+    record("get_events", backend.get_events(["event1", "event9", "nope"]))
+    record("all_events", backend.all_events())
+    record("put_wishlist_item", backend.put_wishlist_item("event9", {"id": "item1", "title": "Blanket",
+                                                                     "price": 40.0, "status": "available",
+                                                                     "contributors": []}))
+    record("get_wishlist", backend.get_wishlist("event1"))
+    record("get_missing_wishlist", backend.get_wishlist("nope"))
+    record("get_wishlist_item", backend.get_wishlist_item("event1", "item2"))
+    record("get_missing_wishlist_item", backend.get_wishlist_item("event1", "nope"))
+    record("update_wishlist_item", backend.update_wishlist_item("event1", "item1", {"status": "funded"}))
+    record("update_missing_wishlist_item", backend.update_wishlist_item("event1", "nope", {"status": "funded"}))
+    record("adjust_item", backend.adjust_item_number("event1", "item1", "pooled_amount", 12.5))
+    record("adjust_item_again", backend.adjust_item_number("event1", "item1", "pooled_amount", 0.25))
+    record("all_wishlists", backend.all_wishlists())
+    record("append_chat_message", backend.append_chat_message("event1", dict(chat_message)))
+    record("append_first_chat_message", backend.append_chat_message("event9", dict(chat_message)))
+    record("read_newest_messages", backend.read_chat_messages("event1", limit=2))
+    record("read_before_cursor", backend.read_chat_messages("event1", 2, 5))
+    record("read_past_end", backend.read_chat_messages("event1", 100, 1))
+    record("read_missing_chat", backend.read_chat_messages("nope"))
+    record("chat_message_count", backend.chat_message_count("event1"))
+    record("all_chats", {event_id: list(messages) for event_id, messages in backend.all_chats().items()})
+    record("add_contribution", backend.add_contribution({"event_id": "event1", "item_id": "item1",
+                                                         "user_id": "user2", "amount": 30.0,
+                                                         "date": "2026-10-01"}))
+    record("add_odd_contribution", backend.add_contribution({"event_id": "event9", "item_id": "item1",
+                                                             "user_id": "user2", "amount": 12.345,
+                                                             "date": "soon", "note": "x"}))
+    record("all_contributions", backend.get_contributions())
+    record("event_contributions", backend.get_contributions(event_id="event1"))
+    record("item_contributions", backend.get_contributions("event2", "item5"))
+    record("user_contributions", backend.get_contributions(user_id="user2"))
+    for by in (BY_EVENT, BY_ITEM, BY_USER, BY_DAY):
+        record(f"totals_by_{by}", backend.contribution_totals(by))
+    record("filtered_totals", backend.contribution_totals(BY_USER, event_id="event2", item_id="item5"))
+    record("contribution_frame", len(backend.contribution_frame()))
+    post = backend.add_post({"user_id": "user3", "type": "general_update", "content": "hello",
+                             "date": "2026-10-01"})
+    record("add_post", post)
+    record("get_post", backend.get_post(post["id"]))
+    record("get_missing_post", backend.get_post(999))
+    page, cursor = backend.read_posts(limit=2)
+    record("read_posts", (page, cursor))
+    record("read_posts_after_cursor", backend.read_posts(cursor, 2))
+    record("like_post", backend.like_post(post["id"]))
+    record("like_missing_post", backend.like_post(999))
+    record("add_post_comment", backend.add_post_comment(post["id"], {"user_id": "user1", "text": "yo"}))
+    record("comment_missing_post", backend.add_post_comment(999, {"user_id": "user1", "text": "yo"}))
+    record("all_posts", backend.all_posts())
+
+    record("credit_wallet", backend.adjust_wallet("user4", CREDIT, 50.0, "Added funds", "txn_1", ts=LATER))
+    record("debit_wallet", backend.adjust_wallet("user4", CONTRIBUTION, -30.25, "Contribution", "event1/item1",
+                                                 minimum=0, ts=LATER + 10))
+    record("overdraw_wallet", backend.adjust_wallet("user4", CONTRIBUTION, -1e6, "Contribution", minimum=0,
+                                                    ts=LATER + 20))
+    record("redeem_to_wallet", backend.adjust_wallet("user4", REWARD_REDEMPTION, 0.0, "Redeemed", "CODE",
+                                                     ts=LATER + 20))
+    record("backdated_entry", backend.adjust_wallet("user4", CREDIT, 1.0, "Refund", ts=LATER - 10))
+    record("adjust_missing_wallet", backend.adjust_wallet("nobody", CREDIT, 1.0, "Added funds"))
+    record("wallet_balance", backend.wallet_balance("user4"))
+    record("missing_wallet_balance", backend.wallet_balance("nobody"))
+    for offset in (-1, 0, 10, 15, 20):
+        record(f"wallet_balance_at_{offset}", backend.wallet_balance_at("user4", LATER + offset))
+    page, cursor = backend.wallet_history("user4", limit=3)
+    record("wallet_history", (page, cursor))
+    older, _ = backend.wallet_history("user4", cursor, 3)
+    # The opening entry is stamped with the time of seeding
+    record("wallet_history_after_cursor", [{**entry, "ts": None, "date": None} for entry in older])
+    record("missing_wallet_history", backend.wallet_history("nobody"))
+    record("reconcile_wallets", backend.reconcile_wallets())
+    return results
+
+@pytest.fixture
+def memory_results(connect_backend):
+    backend = connect_backend("memory")()
+    backend.seed(*collections())
+    return exercise(backend)
+
+@pytest.mark.parametrize("name", ["sqlite", "redis"])
+def test_backend_agrees_with_memory(name, connect_backend, memory_results):
+    backend = connect_backend(name)()
+    assert backend.seed(*collections())
+    assert not backend.seed(*collections()), "seeding a non-empty backend"
+    results = exercise(backend)
+    for operation, expected in memory_results.items():
+        assert results[operation] == expected, f"{name} differs from memory in {operation}"
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_concurrent_clients(name, connect_backend, threads=8, rounds=40):
+    """Debits, chat appends and contributions from several clients at once"""
+    connect = connect_backend(name)
+    backend = connect()
+    backend.seed(*collections())
+    backend.put_user({"id": "racer", "name": "Racer", "wallet_balance": 100.0, "reward_points": 0})
+    chat_before = backend.chat_message_count("event3")
+    totals_before = backend.contribution_totals(BY_EVENT).get("event3", 0.0)
+
+    def work(worker):
+        client = connect()
+        debits = sum(client.adjust_user_number("racer", "wallet_balance", -1.0, minimum=0) is not None
+                     for _ in range(rounds))
+        message_ids = [client.append_chat_message("event3", {"user": f"w{worker}", "message": str(i),
+                                                             "timestamp": "2026-10-01 10:00:00"})["id"]
+                       for i in range(rounds)]
+        positions = [client.add_contribution({"event_id": "event3", "item_id": "item6", "user_id": f"w{worker}",
+                                              "amount": 0.5, "date": "2026-10-01"}) for _ in range(rounds)]
+        return debits, message_ids, positions
+
+    with ThreadPoolExecutor(threads) as pool:
+        outcomes = list(pool.map(work, range(threads)))
+    message_ids = sorted(i for _, ids, _ in outcomes for i in ids)
+    positions = [p for _, _, ps in outcomes for p in ps]
+    assert sum(debits for debits, _, _ in outcomes) == 100, "debits past the balance"
+    assert backend.get_user("racer")["wallet_balance"] == 0
+    assert message_ids == list(range(chat_before, chat_before + threads * rounds)), "chat ids lost or repeated"
+    assert backend.chat_message_count("event3") == chat_before + threads * rounds
+    assert len(set(positions)) == threads * rounds, "contribution positions repeated"
+    total = backend.contribution_totals(BY_EVENT)["event3"]
+    assert abs(total - totals_before - threads * rounds * 0.5) < 1e-6, "contributions lost"
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_seeded_wallets_reconcile(name, connect_backend):
+    backend = connect_backend(name)()
+    users, *rest = collections()
+    backend.seed(users, *rest)
+    for user_id, user in users.items():
+        assert backend.wallet_balance(user_id) == user["wallet_balance"]
+        assert backend.get_user(user_id)["wallet_balance"] == user["wallet_balance"]
+        entries, _ = backend.wallet_history(user_id)
+        assert [entry["kind"] for entry in entries] == ["opening"]
+    assert backend.reconcile_wallets() == {}
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_reconcile_reports_balances_changed_outside_the_ledger(name, connect_backend):
+    backend = connect_backend(name)()
+    backend.seed(*collections())
+    backend.adjust_wallet("user1", CREDIT, 20.0, "Added funds")
+    backend.adjust_user_number("user2", "wallet_balance", 5.0)
+    backend.update_user("user3", {"wallet_balance": 0.0})
+    backend.put_user({"id": "newcomer", "name": "Newcomer", "wallet_balance": 12.0, "reward_points": 0})
+
+    differences = backend.reconcile_wallets()
+    assert set(differences) == {"user2", "user3", "newcomer"}
+    assert differences["user2"] == pytest.approx(5.0)
+    assert differences["user3"] == pytest.approx(-collections()[0]["user3"]["wallet_balance"])
+    assert differences["newcomer"] == pytest.approx(12.0)
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_concurrent_wallet_debits_keep_balance_and_ledger_together(name, connect_backend, threads=8, rounds=40):
+    connect = connect_backend(name)
+    backend = connect()
+    backend.seed(*collections())
+    backend.put_user({"id": "racer", "name": "Racer", "wallet_balance": 0.0, "reward_points": 0})
+    backend.adjust_wallet("racer", CREDIT, 100.0, "Added funds")
+
+    def work(worker):
+        client = connect()
+        return sum(client.adjust_wallet("racer", CONTRIBUTION, -1.0, f"Contribution {worker}", minimum=0) is not None
+                   for _ in range(rounds))
+
+    with ThreadPoolExecutor(threads) as pool:
+        assert sum(pool.map(work, range(threads))) == 100, "debits past the balance"
+    assert backend.get_user("racer")["wallet_balance"] == 0
+    assert backend.wallet_balance("racer") == 0
+    entries, _ = backend.wallet_history("racer", limit=1000)
+    assert [entry["seq"] for entry in entries] == list(range(100, -1, -1))
+    assert all(newer["ts"] >= older["ts"] for newer, older in zip(entries, entries[1:]))
+    assert backend.reconcile_wallets() == {}
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_concurrent_put_event_if_absent_inserts_once(name, connect_backend, threads=8):
+    connect = connect_backend(name)
+    connect().seed(*collections())
+
+    def work(worker):
+        event = {"id": "birthday-user1-2026", "title": f"Birthday {worker}", "date": "2026-12-01",
+                 "type": "birthday", "creator": "user1", "participants": [f"user{worker % 4 + 1}"]}
+        return connect().put_event_if_absent(event) is not None
+
+    with ThreadPoolExecutor(threads) as pool:
+        assert sum(pool.map(work, range(threads))) == 1
+    backend = connect()
+    assert sum(event["id"] == "birthday-user1-2026" for event in backend.get_user_events("user1")) == 1
+
+@pytest.mark.parametrize("name", ["sqlite", "redis"])
+def test_versions_count_writes(name, connect_backend):
+    backend = connect_backend(name)()
+    assert backend.versions() == {}
+    backend.put_user({"id": "ann", "name": "Ann", "email": "ann@example.com"})
+    backend.update_user("ann", {"birthday": "1990-01-01"})
+    backend.put_event({"id": "party", "title": "Party", "date": "2030-01-01", "type": "birthday",
+                       "creator": "ann", "privacy": "public", "participants": [], "rsvp": {}})
+    backend.set_rsvp("party", "ann", "yes")
+    backend.put_wishlist_item("party", {"id": "item1", "title": "Lamp", "price": 10.0})
+    backend.append_chat_message("party", {"user": "ann", "message": "hi", "timestamp": ""})
+    backend.add_contribution({"event_id": "party", "item_id": "item1", "user_id": "ann", "amount": 5.0,
+                              "date": "2030-01-01"})
+    post = backend.add_post({"user_id": "ann", "type": "general_update", "content": "hello"})
+    backend.add_post_comment(post["id"], {"user_id": "ann", "text": "first"})
+    # Numeric adjustments feed no view, so they aren't counted
+    backend.adjust_user_number("ann", "reward_points", 5)
+    backend.adjust_item_number("party", "item1", "pooled_amount", 5.0)
+    backend.like_post(post["id"])
+    assert backend.versions() == {USERS: 2, EVENTS: 2, WISHLISTS: 1, CHATS: 1, CONTRIBUTIONS: 1, POSTS: 2}
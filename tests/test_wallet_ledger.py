@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from utils.wallet_ledger import WalletLedger, OPENING, CREDIT, CONTRIBUTION
+
+def filled_ledger(users=5, entries=500, seed=7):
+    """A ledger with checkpoints, and the entries appended to it"""
+    rng = random.Random(seed)
+    ledger = WalletLedger(checkpoint_interval=16)
+    appended = []
+    for user in range(users):
+        appended.append((f"user{user}", 1_700_000_000.0, 100.0))
+        ledger.append(f"user{user}", OPENING, 100.0, "Opening balance", ts=1_700_000_000)
+    for i in range(entries):
+        user_id, amount = f"user{rng.randrange(users)}", round(rng.uniform(-20, 30), 2)
+        ts = 1_700_000_000.0 + i * 60
+        appended.append((user_id, ts, amount))
+        ledger.append(user_id, CREDIT if amount > 0 else CONTRIBUTION, amount, "Entry", f"ref{i}", ts=ts)
+    return ledger, appended
+
+def test_balance_at_matches_a_full_scan():
+    ledger, appended = filled_ledger()
+    for when in [1_699_999_999.0] + [1_700_000_000.0 + minutes * 60 for minutes in range(0, 520, 7)]:
+        for user in range(5):
+            expected = sum(amount for user_id, ts, amount in appended if user_id == f"user{user}" and ts <= when)
+            assert ledger.balance_at(f"user{user}", when) == pytest.approx(expected)
+    assert ledger.balance_at("nobody", 2_000_000_000) == 0.0
+
+def test_history_pages_cover_every_entry_once():
+    ledger, appended = filled_ledger()
+    seen, cursor = [], None
+    while True:
+        page, cursor = ledger.history("user3", cursor, limit=9)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert [entry["seq"] for entry in seen] == list(range(len(seen) - 1, -1, -1))
+    assert [entry["amount"] for entry in reversed(seen)] == [amount for user_id, _, amount in appended
+                                                             if user_id == "user3"]
+    assert ledger.history("nobody") == ([], None)
+
+def test_reconcile_reports_only_drifted_balances():
+    ledger, _ = filled_ledger()
+    assert ledger.reconcile() == {}
+
+    balances = {f"user{user}": ledger.balance(f"user{user}") for user in range(5)}
+    balances["user1"] += 0.004
+    balances["user2"] -= 10.0
+    differences = ledger.reconcile(balances)
+    assert list(differences) == ["user2"]
+    assert differences["user2"] == pytest.approx(-10.0)
+
+def test_columns_round_trip():
+    ledger, _ = filled_ledger()
+    restored = WalletLedger(checkpoint_interval=16)
+    restored.load_columns(ledger.columns())
+    for user in range(5):
+        assert restored.history(f"user{user}", limit=1000) == ledger.history(f"user{user}", limit=1000)
+        assert restored.balance_at(f"user{user}", 1_700_010_000) == ledger.balance_at(f"user{user}", 1_700_010_000)
+    assert restored.reconcile() == {}
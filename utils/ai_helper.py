@@ -4,6 +4,7 @@ import re
 from data.mock_data import AI_SUGGESTIONS
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_ollama.llms import OllamaLLM
+from utils.cassette import cassette
 
 # Initialize Ollama model with direct API access as fallback
 ollama_model = None
@@ -33,6 +34,23 @@ def call_ollama_api(prompt, model="qwen2.5:latest"):
         print(f"Error calling Ollama API: {e}")
         return None
 
+def generate_text(template, variables, model="qwen2.5:latest"):
+    """
+    Run a prompt template through Ollama.
+    Uses LangChain if available, otherwise the direct API. Generations go
+    through the cassette so they can be recorded and replayed offline.
+    """
+    def generate():
+        if ollama_model:
+            # Try using LangChain
+            prompt = ChatPromptTemplate.from_template(template)
+            chain = prompt | ollama_model
+            return chain.invoke(variables)
+        # Fallback to direct API
+        return call_ollama_api(template.format(**variables), model)
+    
+    return cassette.llm_generate(generate, model, {"template": template, "variables": variables})
+
 def get_gift_suggestions(event_type, budget=None, interests=None, participant_count=None):
     """
     Get gift suggestions based on event type, budget, and interests.
@@ -67,16 +85,7 @@ def get_gift_suggestions(event_type, budget=None, interests=None, participant_co
             Return only the JSON array with no other text.
             """
             
-            result = None
-            if ollama_model:
-                # Try using LangChain
-                prompt = ChatPromptTemplate.from_template(template)
-                chain = prompt | ollama_model
-                result = chain.invoke({"event_type": event_type, "budget_info": budget_info})
-            else:
-                # Fallback to direct API
-                prompt_text = template.format(event_type=event_type, budget_info=budget_info)
-                result = call_ollama_api(prompt_text)
+            result = generate_text(template, {"event_type": event_type, "budget_info": budget_info})
             
             if result:
                 # Try to parse the JSON response
@@ -129,16 +138,7 @@ def refine_wishlist_item(item_description):
             Return only the JSON object with no other text.
             """
             
-            result = None
-            if ollama_model:
-                # Try using LangChain
-                prompt = ChatPromptTemplate.from_template(template)
-                chain = prompt | ollama_model
-                result = chain.invoke({"item_description": item_description})
-            else:
-                # Fallback to direct API
-                prompt_text = template.format(item_description=item_description)
-                result = call_ollama_api(prompt_text)
+            result = generate_text(template, {"item_description": item_description})
             
             if result:
                 # Try to parse the JSON response
@@ -250,16 +250,7 @@ def chat_with_assistant(message, event_type=None, context=None):
         Keep your response under 100 words.
         """
         
-        result = None
-        if ollama_model:
-            # Try using LangChain
-            prompt = ChatPromptTemplate.from_template(template)
-            chain = prompt | ollama_model
-            result = chain.invoke({"message": message, "event_context": event_context})
-        else:
-            # Fallback to direct API
-            prompt_text = template.format(message=message, event_context=event_context)
-            result = call_ollama_api(prompt_text)
+        result = generate_text(template, {"message": message, "event_context": event_context})
         
         if result:
             return result
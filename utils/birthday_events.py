@@ -0,0 +1,147 @@
+import datetime
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+from utils.ai_helper import get_gift_suggestions
+from utils.data_manager import DataManager
+
+logger = logging.getLogger(__name__)
+
+def birthday_event_id(user_id: str, year: int) -> str:
+    """ID of the auto-created event for a user's birthday in a given year"""
+    return f"birthday-{user_id}-{year}"
+
+class BirthdayEventJob:
+    """
+    Daily job that creates birthday events, with a starter wishlist, for
+    birthdays coming up within `lead_days`.
+    Only the users whose birthday falls in the window are visited (see
+    utils.date_index.BirthdayIndex). Event IDs are derived from the user and
+    year and inserted only if absent, so re-running the job, or running it in
+    several processes sharing a backend, never creates duplicates.
+    """
+
+    def __init__(self, lead_days: int = 14, starter_items: int = 3):
+        """
+        Initialize the job
+
+        Args:
+            lead_days: How many days ahead of a birthday its event is created
+            starter_items: Number of suggested gifts added to each new wishlist
+        """
+        self.lead_days = lead_days
+        self.starter_items = starter_items
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def create_birthday_event(self, user_id: str, date: datetime.date, suggestions: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Create the event for one birthday, inviting the user's friends
+
+        Returns:
+            The new event ID, or None if the event already exists
+        """
+        event_id = birthday_event_id(user_id, date.year)
+        # Cheap check for the common case; the insert below decides races between job runs
+        if DataManager.get_event(event_id):
+            return None
+
+        user = DataManager.get_user(user_id)
+        if not user:
+            return None
+
+        friend_ids = [friend["id"] for friend in DataManager.get_user_friends(user_id)]
+        created = DataManager.add_event_if_absent({
+            "id": event_id,
+            "title": f"{user['name'].split()[0]}'s Birthday",
+            "type": "birthday",
+            "date": date.strftime("%Y-%m-%d"),
+            "description": "Created automatically for an upcoming birthday.",
+            "creator": user_id,
+            "participants": friend_ids,
+            "privacy": "private",
+            "rsvp": {friend_id: "not responded" for friend_id in friend_ids},
+            "auto_created": True,
+            "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+        if created is None:
+            return None
+
+        for suggestion in suggestions[:self.starter_items]:
+            DataManager.add_wishlist_item(event_id, {
+                "title": suggestion["title"],
+                "description": "Suggested gift",
+                "price": suggestion["price"],
+                "category": suggestion.get("category", "medium")
+            })
+
+        DataManager.add_chat_message(
+            event_id, "system",
+            f"{user['name']}'s birthday is on {date.strftime('%B %d')}! Use this space to coordinate gift ideas."
+        )
+        return event_id
+
+    def run_once(self, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """
+        Create the events for the birthdays in the next `lead_days` days
+
+        Args:
+            today: Reference date (defaults to the current date)
+
+        Returns:
+            Summary of the run
+        """
+        today = today or datetime.date.today()
+        birthdays = DataManager.get_upcoming_birthdays(today, self.lead_days)
+        summary = {"birthdays": len(birthdays), "created": 0, "existing": 0}
+
+        # Suggestions only depend on the event type, so they are fetched once per run
+        suggestions = get_gift_suggestions("birthday") if birthdays else []
+
+        for user_id, date in birthdays:
+            if self.create_birthday_event(user_id, date, suggestions):
+                summary["created"] += 1
+            else:
+                summary["existing"] += 1
+
+        summary["finished_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.last_run = summary
+        return summary
+
+    def _run_forever(self, interval_seconds: float):
+        """Background loop that runs the job every interval"""
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Birthday event run failed")
+            self._stop_event.wait(interval_seconds)
+
+    def start(self, interval_seconds: float = 86400):
+        """
+        Run the job in a background thread
+
+        Args:
+            interval_seconds: Seconds to wait between runs
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_forever,
+            args=(interval_seconds,),
+            name="birthday-events",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
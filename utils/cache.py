@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Hashable, Iterable, Tuple
+
+# A scope names a piece of data whose version is tracked, e.g. ("user", "user1"),
+# ("event", "event1") or ("item", "event1", "item2")
+Scope = Tuple[Hashable, ...]
+
+class VersionedCache:
+    """
+    Read-through cache shared by all sessions.
+    Every entry records the versions of the scopes it was computed from; writes
+    bump those versions, so an entry is never served once its data has changed.
+    Memory is bounded by evicting the least recently used entries.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached results kept
+        """
+        self.max_entries = max_entries
+
+        self._versions: Dict[Scope, int] = {}
+        self._entries: "OrderedDict[Hashable, Tuple[Dict[Scope, int], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def version(self, scope: Scope) -> int:
+        """Current version of a scope"""
+        return self._versions.get(scope, 0)
+
+    def bump(self, *scopes: Scope):
+        """Mark the data of the given scopes as changed"""
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def get_or_compute(self, key: Hashable, scopes: Iterable[Scope], compute_fn: Callable[[], Any]) -> Any:
+        """
+        Get a cached result, computing it if missing or out of date
+
+        Args:
+            key: Cache key identifying the result
+            scopes: Scopes the result depends on
+            compute_fn: Function computing the result
+
+        Returns:
+            The cached or freshly computed result
+        """
+        with self._lock:
+            versions = {scope: self._versions.get(scope, 0) for scope in scopes}
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["stale" if entry is not None else "misses"] += 1
+
+        # Computed outside the lock; the versions read before computing are stored,
+        # so a write racing with the computation makes the entry stale right away
+        value = compute_fn()
+
+        with self._lock:
+            self._entries[key] = (versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return value
+
+    def clear(self):
+        """Drop all cached results (versions are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Cache metrics
+
+        Returns:
+            Hit, miss, stale and eviction counts, current size and hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+def user_scope(user_id) -> Scope:
+    return ("user", user_id)
+
+def event_scope(event_id) -> Scope:
+    return ("event", event_id)
+
+def item_scope(event_id, item_id) -> Scope:
+    return ("item", event_id, item_id)
+
+def chat_scope(event_id) -> Scope:
+    return ("chat", event_id)
+
+def discovery_scope() -> Scope:
+    """Scope of the public event listings (new events, wishlist goals and funding)"""
+    return ("discovery",)
+
+def event_scopes(events: List[Dict[str, Any]]) -> List[Scope]:
+    """Scopes of a list of events, for views built from several events"""
+    return [event_scope(event["id"]) for event in events]
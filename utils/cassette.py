@@ -0,0 +1,221 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Callable
+
+# Cassette configuration, read from the environment so benchmarks and load
+# tests can switch modes without code changes:
+#   HUBSHUB_CASSETTE_MODE     off | record | replay
+#   HUBSHUB_CASSETTE_PATH     cassette file (gzip-compressed JSON lines)
+#   HUBSHUB_CASSETTE_LATENCY  latency emulation factor for replay (0 = instant, 1 = as recorded)
+MODES = ("off", "record", "replay")
+
+DEFAULT_CASSETTE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cassettes", "default.jsonl.gz"
+)
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when no recording matches a request"""
+
+class RecordedResponse:
+    """Replayed HTTP response exposing the parts of requests.Response the app uses"""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], text: str, url: str):
+        self.status_code = status_code
+        # Header lookups are case-insensitive, as with requests
+        self._headers = {name.lower(): value for name, value in headers.items()}
+        self.headers = _HeaderView(self._headers)
+        self.text = text
+        self.url = url
+
+    def json(self):
+        return json.loads(self.text)
+
+class _HeaderView:
+    """Read-only, case-insensitive header mapping"""
+
+    def __init__(self, headers: Dict[str, str]):
+        self._headers = headers
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._headers.get(name.lower(), default)
+
+    def __getitem__(self, name: str) -> str:
+        return self._headers[name.lower()]
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._headers
+
+class Cassette:
+    """Records HTTP responses and LLM generations, and serves them back offline"""
+
+    def __init__(self, mode: str = "off", path: str = DEFAULT_CASSETTE_PATH, latency_factor: float = 0.0,
+                 flush_every: int = 64):
+        """
+        Initialize the cassette
+
+        Args:
+            mode: 'off', 'record' or 'replay'
+            path: Cassette file (gzip-compressed JSON lines)
+            latency_factor: In replay mode, multiplier applied to recorded latencies
+                (0 serves responses instantly, 1 reproduces the recorded timing)
+            flush_every: In record mode, number of recordings written to the file at once
+                (call flush to write the rest)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.mode = mode
+        self.path = path
+        self.latency_factor = latency_factor
+        self.flush_every = flush_every
+
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._replay_positions: Dict[str, int] = {}
+        # Recorded lines not yet written to the file
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+        if mode == "replay":
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    @staticmethod
+    def _key(kind: str, request: Dict[str, Any]) -> str:
+        payload = json.dumps({"kind": kind, "request": request}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Each batch is its own gzip member; gzip readers concatenate them transparently
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write("".join(self._pending))
+        self._pending = []
+
+    def flush(self):
+        """Write the recordings not yet written to the cassette file"""
+        with self._lock:
+            self._write_pending()
+
+    def _replay(self, key: str, description: str) -> Dict[str, Any]:
+        with self._lock:
+            recordings = self._entries.get(key)
+            if not recordings:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"No recording for {description}")
+
+            # Identical requests replay their recordings in order, repeating the last one
+            position = self._replay_positions.get(key, 0)
+            self._replay_positions[key] = position + 1
+            entry = recordings[min(position, len(recordings) - 1)]
+            self.stats["replayed"] += 1
+
+        if self.latency_factor > 0:
+            time.sleep(entry["latency"] * self.latency_factor)
+        return entry
+
+    def _record(self, kind: str, key: str, request: Dict[str, Any], response: Dict[str, Any], latency: float):
+        entry = {"kind": kind, "key": key, "request": request, "response": response, "latency": latency}
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            self._pending.append(json.dumps(entry, separators=(",", ":")) + "\n")
+            if len(self._pending) >= self.flush_every:
+                self._write_pending()
+            self.stats["recorded"] += 1
+
+    def http_get(self, fetch_fn: Callable[[], Any], url: str, headers: Optional[Dict[str, str]] = None):
+        """
+        Perform (or replay) an HTTP GET
+
+        Args:
+            fetch_fn: Function performing the real request and returning a response
+            url: Requested URL
+            headers: Request headers that affect the response (conditional headers)
+
+        Returns:
+            The real response, or a RecordedResponse in replay mode
+        """
+        # Only headers that change the response take part in the key
+        relevant = {name: value for name, value in (headers or {}).items()
+                    if name.lower() in ("if-none-match", "if-modified-since", "accept")}
+        request = {"method": "GET", "url": url, "headers": relevant}
+        key = self._key("http", request)
+
+        if self.replaying:
+            response = self._replay(key, f"GET {url}")["response"]
+            return RecordedResponse(response["status"], response["headers"], response["text"], url)
+
+        started = time.perf_counter()
+        response = fetch_fn()
+        latency = time.perf_counter() - started
+
+        # Throttling responses belong to the live run, not to the page, so they are not recorded
+        if self.recording and response.status_code not in (429, 503):
+            self._record("http", key, request, {
+                "status": response.status_code,
+                "headers": dict(response.headers),
+                "text": response.text
+            }, latency)
+        return response
+
+    def llm_generate(self, generate_fn: Callable[[], Any], model: str, prompt: Any) -> Any:
+        """
+        Run (or replay) an LLM generation
+
+        Args:
+            generate_fn: Function performing the real generation
+            model: Model name, part of the recording key
+            prompt: Prompt text or template variables, part of the recording key
+
+        Returns:
+            The generated output (any JSON-serializable value)
+        """
+        request = {"model": model, "prompt": prompt}
+        key = self._key("llm", request)
+
+        if self.replaying:
+            return self._replay(key, f"{model} generation")["response"]
+
+        started = time.perf_counter()
+        output = generate_fn()
+        latency = time.perf_counter() - started
+
+        if self.recording and output is not None:
+            self._record("llm", key, request, output, latency)
+        return output
+
+def _cassette_from_environment() -> Cassette:
+    mode = os.environ.get("HUBSHUB_CASSETTE_MODE", "off").lower()
+    path = os.environ.get("HUBSHUB_CASSETTE_PATH", DEFAULT_CASSETTE_PATH)
+    try:
+        latency_factor = float(os.environ.get("HUBSHUB_CASSETTE_LATENCY", "0"))
+    except ValueError:
+        latency_factor = 0.0
+    return Cassette(mode, path, latency_factor)
+
+# Shared cassette used by the fetch scheduler, the scraper and the AI helper
+cassette = _cassette_from_environment()
+atexit.register(cassette.flush)
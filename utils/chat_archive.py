@@ -0,0 +1,81 @@
+import datetime
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from utils.data_manager import DataManager
+
+logger = logging.getLogger(__name__)
+
+class ChatArchiveJob:
+    """
+    Daily job that moves the chats of events more than `after_days` in the
+    past to disk, so the chats held in memory are those of active events.
+    Archived chats are loaded back when someone opens the event.
+    """
+
+    def __init__(self, after_days: int = 30):
+        """
+        Initialize the job
+
+        Args:
+            after_days: How many days after an event its chat is archived
+        """
+        self.after_days = after_days
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def run_once(self, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """
+        Archive the chats of the events dated before the cutoff
+
+        Args:
+            today: Reference date (defaults to the current date)
+
+        Returns:
+            Summary of the run
+        """
+        today = today or datetime.date.today()
+        archived, released = DataManager.archive_chats(today - datetime.timedelta(days=self.after_days))
+        summary = {"archived": archived, "released_bytes": released}
+        summary.update(DataManager.get_chat_memory_stats())
+        summary["finished_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.last_run = summary
+        return summary
+
+    def _run_forever(self, interval_seconds: float):
+        """Background loop that runs the job every interval"""
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Chat archive run failed")
+            self._stop_event.wait(interval_seconds)
+
+    def start(self, interval_seconds: float = 86400):
+        """
+        Run the job in a background thread
+
+        Args:
+            interval_seconds: Seconds to wait between runs
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_forever,
+            args=(interval_seconds,),
+            name="chat-archive",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
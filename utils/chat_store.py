@@ -0,0 +1,265 @@
+import hashlib
+import os
+import pickle
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable
+
+from data.records import ChatLog
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "chat_archive")
+
+class SegmentedChatLog:
+    """
+    One event's chat as fixed-size segments: a columnar tail that takes new
+    messages, and sealed segments kept zlib-compressed and decompressed on
+    read (the last few stay decoded). An archived log has written all its
+    segments to one file and keeps only the path and message count in memory;
+    it is loaded back on the next read or append.
+    Behaves as the list of messages it replaces (len, indexing, slicing, append).
+    """
+
+    def __init__(self, messages=(), segment_size: int = 256, decoded_segments: int = 2):
+        """
+        Initialize the log
+
+        Args:
+            messages: Existing messages, oldest first
+            segment_size: Messages per segment
+            decoded_segments: Number of decompressed segments kept for reads
+        """
+        self.segment_size = segment_size
+        self.decoded_segments = decoded_segments
+        self._sealed: List[bytes] = []
+        self._tail = ChatLog()
+        self._decoded: "OrderedDict[int, ChatLog]" = OrderedDict()
+        self._archive_path: Optional[str] = None
+        self._count = 0
+        self._lock = threading.RLock()
+        for message in messages:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def archived(self) -> bool:
+        """Whether the log's segments are on disk only"""
+        return self._archive_path is not None
+
+    def _seal(self):
+        self._sealed.append(zlib.compress(pickle.dumps(self._tail, protocol=pickle.HIGHEST_PROTOCOL)))
+        self._tail = ChatLog(base=self._count)
+
+    def _segment(self, index: int) -> ChatLog:
+        """Segment `index`, the tail included"""
+        if index == len(self._sealed):
+            return self._tail
+        segment = self._decoded.get(index)
+        if segment is None:
+            segment = pickle.loads(zlib.decompress(self._sealed[index]))
+            self._decoded[index] = segment
+            while len(self._decoded) > self.decoded_segments:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(index)
+        return segment
+
+    def append(self, message):
+        """Append a message; its id is its position"""
+        with self._lock:
+            self._load()
+            self._tail.append(message)
+            self._count += 1
+            if len(self._tail) >= self.segment_size:
+                self._seal()
+
+    def __getitem__(self, position):
+        with self._lock:
+            self._load()
+            if isinstance(position, slice):
+                start, stop, step = position.indices(self._count)
+                if step != 1:
+                    return [self[i] for i in range(start, stop, step)]
+                messages = []
+                while start < stop:
+                    index = start // self.segment_size
+                    offset = index * self.segment_size
+                    messages.extend(self._segment(index)[start - offset:stop - offset])
+                    start = offset + self.segment_size
+                return messages
+            if position < 0:
+                position += self._count
+            if not 0 <= position < self._count:
+                raise IndexError("chat message index out of range")
+            index = position // self.segment_size
+            return self._segment(index)[position - index * self.segment_size]
+
+    def __iter__(self):
+        with self._lock:
+            archived = self.archived
+            if archived:
+                # Read an archived log (e.g. to index it) without bringing it back into memory
+                sealed, tail = self._read_archive()
+        if not archived:
+            for start in range(0, len(self), self.segment_size):
+                yield from self[start:start + self.segment_size]
+            return
+        for blob in sealed:
+            yield from pickle.loads(zlib.decompress(blob))
+        yield from tail
+
+    def __setitem__(self, position: int, message):
+        """Replace a message (journal replay)"""
+        with self._lock:
+            self._load()
+            index = position // self.segment_size
+            segment = self._segment(index)
+            segment[position - index * self.segment_size] = message
+            if index < len(self._sealed):
+                self._sealed[index] = zlib.compress(pickle.dumps(segment, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def resident_bytes(self) -> int:
+        """Approximate memory held by the log's messages"""
+        with self._lock:
+            if self.archived:
+                return 0
+            tail_texts = sum(len(text) for text in self._tail._texts)
+            return sum(len(blob) for blob in self._sealed) + 12 * len(self._tail) + tail_texts
+
+    def archive(self, path: str) -> int:
+        """
+        Write the log to a file and drop its messages from memory
+
+        Returns:
+            The bytes of memory released (approximately)
+        """
+        with self._lock:
+            if self.archived:
+                return 0
+            released = self.resident_bytes()
+            data = pickle.dumps({"segment_size": self.segment_size, "count": self._count,
+                                 "sealed": self._sealed, "tail": self._tail}, protocol=pickle.HIGHEST_PROTOCOL)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            self._sealed, self._tail = [], ChatLog()
+            self._decoded.clear()
+            self._archive_path = path
+            return released
+
+    def _read_archive(self):
+        with open(self._archive_path, "rb") as f:
+            data = pickle.load(f)
+        return data["sealed"], data["tail"]
+
+    def _load(self):
+        """Read an archived log back into memory"""
+        if self._archive_path is None:
+            return
+        self._sealed, self._tail = self._read_archive()
+        self._archive_path = None
+
+    def __reduce__(self):
+        with self._lock:
+            return (_segmented_log_from_state, (self.segment_size, self._count, self._sealed, self._tail,
+                                                self._archive_path))
+
+def _segmented_log_from_state(segment_size, count, sealed, tail, archive_path) -> SegmentedChatLog:
+    log = SegmentedChatLog(segment_size=segment_size)
+    log._count, log._sealed, log._tail, log._archive_path = count, sealed, tail, archive_path
+    return log
+
+class ChatStore:
+    """Per-event append-only chat logs with cursor-based reads"""
+
+    def __init__(self, logs: Dict[str, List[Dict[str, Any]]], log_factory: Callable[[], List] = list):
+        """
+        Initialize the store
+
+        Args:
+            logs: Existing messages per event, oldest first. The lists are used
+                in place and only ever appended to.
+            log_factory: Creates the log of an event's first message (any list-like
+                type, e.g. SegmentedChatLog)
+        """
+        self._logs = logs
+        self._log_factory = log_factory
+        self._lock = threading.Lock()
+
+        # Message ids are positions in the event's log, so a cursor is an index
+        # (logs other than lists number their messages themselves)
+        for messages in self._logs.values():
+            if not isinstance(messages, list):
+                continue
+            for position, message in enumerate(messages):
+                if message.get("id") != position:
+                    message["id"] = position
+
+    def append(self, event_id: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Append a message to an event's log
+
+        Args:
+            event_id: Event the message belongs to
+            message: Message with 'user', 'message' and 'timestamp' keys
+
+        Returns:
+            The stored message, with its 'id' set
+        """
+        with self._lock:
+            log = self._logs.get(event_id)
+            if log is None:
+                log = self._logs[event_id] = self._log_factory()
+            message["id"] = len(log)
+            log.append(message)
+        return message
+
+    def read(self, event_id: str, cursor: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read a window of messages, oldest first
+
+        Args:
+            event_id: Event to read
+            cursor: Only return messages older than this message id (None for the newest)
+            limit: Maximum number of messages to return (None for no limit)
+
+        Returns:
+            Up to `limit` messages immediately before the cursor
+        """
+        log = self._logs.get(event_id, [])
+        end = len(log) if cursor is None else max(0, min(cursor, len(log)))
+        start = 0 if limit is None else max(0, end - limit)
+        return log[start:end]
+
+    def count(self, event_id: str) -> int:
+        """Number of messages in an event's log"""
+        return len(self._logs.get(event_id, []))
+
+    def archive(self, event_id: str, directory: str = DEFAULT_ARCHIVE_DIR) -> int:
+        """
+        Move an event's chat to disk; it is loaded back when next read
+
+        Returns:
+            The bytes of memory released (0 if the log can't be archived or already is)
+        """
+        log = self._logs.get(event_id)
+        if not isinstance(log, SegmentedChatLog):
+            return 0
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha1(event_id.encode("utf-8")).hexdigest()[:20]
+        return log.archive(os.path.join(directory, f"chat-{digest}.bin"))
+
+    def memory_stats(self) -> Dict[str, int]:
+        """Events with chats in memory and on disk, and the approximate bytes of messages in memory"""
+        stats = {"resident_events": 0, "archived_events": 0, "resident_bytes": 0}
+        for log in list(self._logs.values()):
+            if isinstance(log, SegmentedChatLog) and log.archived:
+                stats["archived_events"] += 1
+            else:
+                stats["resident_events"] += 1
+                if isinstance(log, SegmentedChatLog):
+                    stats["resident_bytes"] += log.resident_bytes()
+        return stats
@@ -0,0 +1,343 @@
+import datetime
+import sys
+import threading
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Mapping, Tuple
+
+import numpy as np
+
+from data.records import CONTRIBUTION_FIELDS, ContributionView, parse_date
+
+# Group-by keys of the aggregations
+BY_EVENT = "event"
+BY_ITEM = "item"
+BY_USER = "user"
+BY_DAY = "day"
+
+_COLUMNS = (("_events", np.int32), ("_items", np.int32), ("_users", np.int32),
+            ("_cents", np.int64), ("_days", np.int32))
+
+class ContributionLedger:
+    """
+    Append-only contribution history in growable NumPy columns: event, item
+    and user indexes, amounts in cents and day ordinals (28 bytes per
+    contribution). Capacity doubles when full, so appends are amortized O(1).
+    Group-by sums and counts are one bincount over the matching rows; reads
+    of single contributions return ContributionView objects that decode on
+    access, so the ledger can stand in for the list of dicts it replaces.
+    Items are indexed per event, since item ids repeat across wishlists.
+    """
+
+    def __init__(self, contributions: Iterable[Mapping] = (), capacity: int = 1024):
+        self._event_ids: List[str] = []
+        self._event_codes: Dict[str, int] = {}
+        # (event index, item id) per item index
+        self._item_keys: List[Tuple[int, str]] = []
+        self._item_codes: Dict[Tuple[int, str], int] = {}
+        self._user_ids: List[str] = []
+        self._user_codes: Dict[str, int] = {}
+
+        self._count = 0
+        for name, dtype in _COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        # Keys beyond CONTRIBUTION_FIELDS, and values the columns can't hold exactly, by position
+        self._extra: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.extend(contributions)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[ContributionView]:
+        return (ContributionView(self, position) for position in range(self._count))
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [ContributionView(self, i) for i in range(*position.indices(self._count))]
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("contribution index out of range")
+        return ContributionView(self, position)
+
+    def _code(self, codes: Dict, values: List, value) -> int:
+        code = codes.get(value)
+        if code is None:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _event_code(self, event_id: str) -> int:
+        return self._code(self._event_codes, self._event_ids, event_id)
+
+    def _item_code(self, event_code: int, item_id: str) -> int:
+        return self._code(self._item_codes, self._item_keys, (event_code, sys.intern(item_id)))
+
+    def _user_code(self, user_id: str) -> int:
+        return self._code(self._user_codes, self._user_ids, user_id)
+
+    def _row_of(self, contribution: Mapping) -> Tuple[Tuple[int, int, int, int, int], Optional[Dict[str, Any]]]:
+        extra = {key: value for key, value in contribution.items() if key not in CONTRIBUTION_FIELDS}
+        amount = contribution["amount"]
+        cents = int(round(amount * 100))
+        if cents / 100 != amount:
+            extra["amount"] = amount
+        date = parse_date(contribution.get("date"))
+        if date is None:
+            extra["date"] = contribution.get("date")
+        event = self._event_code(contribution["event_id"])
+        row = (event, self._item_code(event, contribution["item_id"]), self._user_code(contribution["user_id"]),
+               cents, date.toordinal() if date else 0)
+        return row, extra or None
+
+    def _write_row(self, position: int, row: Tuple[int, int, int, int, int], extra: Optional[Dict[str, Any]]):
+        for (name, _), value in zip(_COLUMNS, row):
+            getattr(self, name)[position] = value
+        self._extra.pop(position, None)
+        if extra:
+            self._extra[position] = extra
+
+    def _reserve(self, count: int):
+        capacity = len(self._cents)
+        if count <= capacity:
+            return
+        while capacity < count:
+            capacity *= 2
+        # Readers holding the old arrays keep a consistent view of the rows they saw
+        for name, dtype in _COLUMNS:
+            grown = np.zeros(capacity, dtype=dtype)
+            grown[:self._count] = getattr(self, name)[:self._count]
+            setattr(self, name, grown)
+
+    def append(self, contribution: Mapping) -> ContributionView:
+        """Append a contribution ('event_id', 'item_id', 'user_id', 'amount', 'date')"""
+        with self._lock:
+            row, extra = self._row_of(contribution)
+            position = self._count
+            self._reserve(position + 1)
+            self._write_row(position, row, extra)
+            self._count += 1
+        return ContributionView(self, position)
+
+    def extend(self, contributions: Iterable[Mapping]):
+        for contribution in contributions:
+            self.append(contribution)
+
+    def __setitem__(self, position: int, contribution: Mapping):
+        """Replace a contribution (journal replay)"""
+        with self._lock:
+            if not 0 <= position < self._count:
+                raise IndexError("contribution index out of range")
+            row, extra = self._row_of(contribution)
+            self._write_row(position, row, extra)
+
+    def clear(self):
+        with self._lock:
+            self._count = 0
+            self._extra.clear()
+
+    def extra(self, position: int) -> Optional[Dict[str, Any]]:
+        """Overflow keys of a contribution"""
+        return self._extra.get(position)
+
+    def value(self, position: int, key: str) -> Any:
+        """One field of a contribution"""
+        extra = self._extra.get(position)
+        if extra and key in extra:
+            return extra[key]
+        if key == "event_id":
+            return self._event_ids[self._events[position]]
+        if key == "item_id":
+            return self._item_keys[self._items[position]][1]
+        if key == "user_id":
+            return self._user_ids[self._users[position]]
+        if key == "amount":
+            return int(self._cents[position]) / 100
+        if key == "date":
+            return datetime.date.fromordinal(int(self._days[position])).isoformat()
+        raise KeyError(key)
+
+    def _mask(self, count: int, event_id: Optional[str], item_id: Optional[str],
+              user_id: Optional[str]) -> Optional[np.ndarray]:
+        """Rows matching the filters (None for all rows, False if no row can match)"""
+        mask = None
+        if item_id is not None:
+            if event_id is None:
+                raise ValueError("Filtering by item needs the item's event")
+            code = self._item_codes.get((self._event_codes.get(event_id, -1), item_id))
+            if code is None:
+                return False
+            mask = self._items[:count] == code
+        elif event_id is not None:
+            code = self._event_codes.get(event_id)
+            if code is None:
+                return False
+            mask = self._events[:count] == code
+        if user_id is not None:
+            code = self._user_codes.get(user_id)
+            if code is None:
+                return False
+            users = self._users[:count] == code
+            mask = users if mask is None else mask & users
+        return mask
+
+    def _group(self, by: str, event_id: Optional[str], item_id: Optional[str],
+               user_id: Optional[str]) -> Tuple[np.ndarray, np.ndarray, Optional[List[Any]], int]:
+        """Sums (in cents) and counts per group index, with the groups' keys and index offset"""
+        with self._lock:
+            count = self._count
+            column = {BY_EVENT: self._events, BY_ITEM: self._items, BY_USER: self._users,
+                      BY_DAY: self._days}.get(by)
+            if column is None:
+                raise ValueError(f"Unknown group-by key: {by}")
+            # Key tables only grow, so they can be read after the lock is released
+            keys = {BY_EVENT: self._event_ids, BY_ITEM: self._item_keys, BY_USER: self._user_ids}.get(by)
+            groups, cents = column[:count], self._cents[:count]
+
+        mask = self._mask(count, event_id, item_id, user_id)
+        if mask is False:
+            return np.zeros(0), np.zeros(0, dtype=np.int64), keys, 0
+        if mask is not None:
+            groups, cents = groups[mask], cents[mask]
+
+        offset = 0
+        if by == BY_DAY and len(groups):
+            # Day ordinals are large; count from the first day present
+            offset = int(groups.min())
+            groups = groups - offset
+        # Float weights sum cents exactly up to 2**53
+        sums = np.bincount(groups, weights=cents)
+        counts = np.bincount(groups)
+        return sums, counts, keys, offset
+
+    def _keys(self, by: str, keys: Optional[List[Any]], indexes: np.ndarray, offset: int) -> List[Any]:
+        if by == BY_DAY:
+            # Day 0 holds the contributions whose date isn't an ISO date
+            return [datetime.date.fromordinal(day).isoformat() if day else None for day in (indexes + offset).tolist()]
+        if by == BY_ITEM:
+            return [(self._event_ids[keys[index][0]], keys[index][1]) for index in indexes.tolist()]
+        return [keys[index] for index in indexes.tolist()]
+
+    def totals(self, by: str, event_id: Optional[str] = None, item_id: Optional[str] = None,
+               user_id: Optional[str] = None) -> Dict[Any, float]:
+        """
+        Total amount contributed per group
+
+        Args:
+            by: BY_EVENT, BY_ITEM, BY_USER or BY_DAY
+            event_id, item_id, user_id: Only count these contributions (filtering
+                by item needs the item's event)
+
+        Returns:
+            Totals keyed by event ID, (event ID, item ID), user ID or ISO date,
+            for the groups with at least one contribution (summed in whole cents)
+        """
+        sums, counts, keys, offset = self._group(by, event_id, item_id, user_id)
+        present = np.flatnonzero(counts)
+        return dict(zip(self._keys(by, keys, present, offset), (np.rint(sums[present]) / 100).tolist()))
+
+    def counts(self, by: str, event_id: Optional[str] = None, item_id: Optional[str] = None,
+               user_id: Optional[str] = None) -> Dict[Any, int]:
+        """Number of contributions per group (see totals)"""
+        _, counts, keys, offset = self._group(by, event_id, item_id, user_id)
+        present = np.flatnonzero(counts)
+        return dict(zip(self._keys(by, keys, present, offset), counts[present].tolist()))
+
+    def total(self, event_id: Optional[str] = None, item_id: Optional[str] = None,
+              user_id: Optional[str] = None) -> float:
+        """Total amount of the matching contributions"""
+        with self._lock:
+            count = self._count
+            cents = self._cents[:count]
+        mask = self._mask(count, event_id, item_id, user_id)
+        if mask is False:
+            return 0.0
+        return int((cents if mask is None else cents[mask]).sum()) / 100
+
+    def select(self, event_id: Optional[str] = None, item_id: Optional[str] = None,
+               user_id: Optional[str] = None) -> List[ContributionView]:
+        """The matching contributions, oldest first"""
+        with self._lock:
+            count = self._count
+        mask = self._mask(count, event_id, item_id, user_id)
+        if mask is False:
+            return []
+        positions = range(count) if mask is None else np.flatnonzero(mask).tolist()
+        return [ContributionView(self, position) for position in positions]
+
+    def frame(self):
+        """
+        pandas DataFrame over the ledger's columns, without copying them:
+        'event', 'item' and 'user' indexes (see labels), 'amount_cents' and
+        'day' (date ordinal). The columns are read-only views, so the frame
+        reflects the rows present when it was taken.
+        """
+        import pandas as pd
+
+        with self._lock:
+            count = self._count
+            columns = {}
+            for (name, _), label in zip(_COLUMNS, ("event", "item", "user", "amount_cents", "day")):
+                view = getattr(self, name)[:count]
+                view.flags.writeable = False
+                columns[label] = view
+        return pd.DataFrame(columns, copy=False)
+
+    def labels(self, by: str) -> List[Any]:
+        """Keys of the frame's index columns: event IDs, (event ID, item ID) pairs or user IDs"""
+        with self._lock:
+            if by == BY_EVENT:
+                return list(self._event_ids)
+            if by == BY_ITEM:
+                return [(self._event_ids[event], item_id) for event, item_id in self._item_keys]
+            if by == BY_USER:
+                return list(self._user_ids)
+        raise ValueError(f"Unknown group-by key: {by}")
+
+    def columns(self) -> Dict[str, Any]:
+        """
+        The ledger in the column format of utils.journal.encode_columns, e.g.
+        for a snapshot ("cents" and "days" columns hold cents and date ordinals)
+        """
+        with self._lock:
+            count = self._count
+            return {
+                "count": count,
+                "event_id": ("codes", self._events[:count].copy(), list(self._event_ids)),
+                "item_id": ("codes", self._items[:count].copy(), [item_id for _, item_id in self._item_keys]),
+                "item_events": np.array([event for event, _ in self._item_keys], dtype=np.int32),
+                "user_id": ("codes", self._users[:count].copy(), list(self._user_ids)),
+                "amount": ("cents", self._cents[:count].copy()),
+                "date": ("days", self._days[:count].copy()),
+                "extra": dict(self._extra),
+            }
+
+    def load_columns(self, columns: Dict[str, Any]):
+        """Replace the ledger's contents with columns from columns() or utils.journal.encode_columns"""
+        self.clear()
+        if "item_events" not in columns:
+            from utils.journal import decode_columns
+            self.extend(decode_columns(columns))
+            return
+
+        with self._lock:
+            count = columns["count"]
+            self._reserve(count)
+            _, event_codes, event_table = columns["event_id"]
+            event_remap = np.array([self._event_code(event_id) for event_id in event_table], dtype=np.int32)
+            _, item_codes, item_table = columns["item_id"]
+            item_remap = np.array([self._item_code(int(event_remap[event]), item_id)
+                                   for event, item_id in zip(columns["item_events"].tolist(), item_table)],
+                                  dtype=np.int32)
+            _, user_codes, user_table = columns["user_id"]
+            user_remap = np.array([self._user_code(user_id) for user_id in user_table], dtype=np.int32)
+
+            # Remap the snapshot's codes to this ledger's tables, one vectorized gather per column
+            self._events[:count] = event_remap[event_codes]
+            self._items[:count] = item_remap[item_codes]
+            self._users[:count] = user_remap[user_codes]
+            self._cents[:count] = columns["amount"][1]
+            self._days[:count] = columns["date"][1]
+            self._extra.update(columns.get("extra", {}))
+            self._count = count
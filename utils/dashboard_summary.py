@@ -0,0 +1,157 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Iterable, Optional
+
+RSVP_STATUSES = ("yes", "maybe", "no", "not responded")
+
+class DashboardSummary:
+    """
+    Everything the dashboard shows for one user: owned and invited events with
+    RSVP counts, and contribution totals by event and item.
+    Built in one pass over the user's events and contributions, then kept up to
+    date by applying each change instead of rebuilding.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.events: List[Dict[str, Any]] = []
+        self.owned_events: List[Dict[str, Any]] = []
+        self.invited_events: List[Dict[str, Any]] = []
+        self.total_contributed = 0.0
+        self.contribution_count = 0
+        self.contributions_by_event: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        self._rsvp_counts: Dict[str, Dict[str, int]] = {}
+        self._invitations: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def build(cls, user_id: str, events: Iterable[Dict[str, Any]], contributions: Iterable[Dict[str, Any]],
+              creator_names: Dict[str, str], get_event: Callable[[str], Optional[Dict[str, Any]]],
+              get_item_title: Callable[[str, str], Optional[str]]) -> "DashboardSummary":
+        """
+        Build a user's summary
+
+        Args:
+            user_id: User the summary is for
+            events: Events the user created or participates in
+            contributions: The user's contributions, oldest first
+            creator_names: Names of the creators of the events, keyed by user ID
+            get_event: Event lookup by ID
+            get_item_title: Wishlist item title lookup by event and item ID
+
+        Returns:
+            The summary
+        """
+        summary = cls(user_id)
+        for event in events:
+            summary.add_event(event, creator_names.get(event["creator"], "Unknown"))
+        for contribution in contributions:
+            event = get_event(contribution["event_id"])
+            if event:
+                summary.add_contribution(contribution, event, get_item_title(event["id"], contribution["item_id"]))
+        return summary
+
+    def add_event(self, event: Dict[str, Any], creator_name: str):
+        """Apply a new event the user created or was invited to"""
+        self.events.append(event)
+
+        if event["creator"] == self.user_id:
+            rsvp_counts = dict.fromkeys(RSVP_STATUSES, 0)
+            for status in event["rsvp"].values():
+                if status in rsvp_counts:
+                    rsvp_counts[status] += 1
+            self._rsvp_counts[event["id"]] = rsvp_counts
+            self.owned_events.append({"event": event, "rsvp_counts": rsvp_counts})
+
+        elif self.user_id in event["participants"]:
+            invitation = {
+                "event": event,
+                "creator_name": creator_name,
+                "user_status": event["rsvp"].get(self.user_id, "not responded")
+            }
+            self._invitations[event["id"]] = invitation
+            self.invited_events.append(invitation)
+
+    def update_rsvp(self, event_id: str, user_id: str, old_status: str, new_status: str):
+        """Apply an RSVP change on one of the user's events"""
+        rsvp_counts = self._rsvp_counts.get(event_id)
+        if rsvp_counts is not None:
+            if old_status in rsvp_counts:
+                rsvp_counts[old_status] -= 1
+            if new_status in rsvp_counts:
+                rsvp_counts[new_status] += 1
+
+        invitation = self._invitations.get(event_id)
+        if invitation is not None and user_id == self.user_id:
+            invitation["user_status"] = new_status
+
+    def add_contribution(self, contribution: Dict[str, Any], event: Dict[str, Any], item_title: Optional[str]):
+        """Apply a new contribution made by the user"""
+        amount = contribution["amount"]
+        self.total_contributed += amount
+        self.contribution_count += 1
+
+        by_event = self.contributions_by_event.get(event["id"])
+        if by_event is None:
+            by_event = self.contributions_by_event[event["id"]] = {
+                "event": event,
+                "total": 0.0,
+                "items": OrderedDict(),
+                "entries": []
+            }
+        by_event["total"] += amount
+
+        by_item = by_event["items"].setdefault(contribution["item_id"], {"title": item_title, "total": 0.0})
+        by_item["total"] += amount
+
+        by_event["entries"].append({
+            "amount": amount,
+            "item_title": item_title,
+            "date": contribution["date"]
+        })
+
+class DashboardSummaryStore:
+    """Per-user dashboard summaries, built on first use and updated incrementally"""
+
+    def __init__(self, build_fn: Callable[[str], DashboardSummary], max_users: int = 1024):
+        """
+        Initialize the store
+
+        Args:
+            build_fn: Builds a user's summary from scratch
+            max_users: Maximum number of summaries kept (least recently used are dropped)
+        """
+        self.build_fn = build_fn
+        self.max_users = max_users
+
+        self._summaries: "OrderedDict[str, DashboardSummary]" = OrderedDict()
+        # Reentrant, so updates can be applied while a summary is being built
+        self._lock = threading.RLock()
+
+    def get(self, user_id: str) -> DashboardSummary:
+        """Get a user's summary, building it if needed"""
+        with self._lock:
+            summary = self._summaries.get(user_id)
+            if summary is None:
+                summary = self._summaries[user_id] = self.build_fn(user_id)
+                while len(self._summaries) > self.max_users:
+                    self._summaries.popitem(last=False)
+            self._summaries.move_to_end(user_id)
+            return summary
+
+    def update(self, user_ids: Iterable[str], apply_fn: Callable[[DashboardSummary], None]):
+        """
+        Apply a change to the summaries of the given users.
+        Users without a built summary are skipped; theirs will include the
+        change when it is built.
+        """
+        with self._lock:
+            for user_id in user_ids:
+                summary = self._summaries.get(user_id)
+                if summary is not None:
+                    apply_fn(summary)
+
+    def invalidate(self, user_id: str):
+        """Drop a user's summary so it is rebuilt on next use"""
+        with self._lock:
+            self._summaries.pop(user_id, None)
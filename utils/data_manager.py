@@ -1,134 +1,874 @@
+import contextlib
 import datetime
-from data.mock_data import USERS, EVENTS, WISHLISTS, CHAT_MESSAGES, CONTRIBUTIONS
+import os
+import threading
+from data import mock_data
+from data.mock_data import USERS, EVENTS, WISHLISTS, CHAT_MESSAGES, COMMUNITY_POSTS
+from data.records import User, Event, WishlistItem
+from utils.cache import VersionedCache, user_scope, event_scope, item_scope, chat_scope, discovery_scope
+from utils.chat_store import SegmentedChatLog, DEFAULT_ARCHIVE_DIR
+from utils.contribution_ledger import ContributionLedger, BY_EVENT
+from utils.dashboard_summary import DashboardSummary, DashboardSummaryStore
+from utils.date_index import BirthdayIndex, EventDateIndex, next_occurrence
+from utils.event_discovery import EventDiscoveryIndex
+from utils.feed_store import FeedStore
+from utils.friend_graph import FriendGraph
+from utils.fund_allocator import FundAllocator
+from utils.journal import persistence_from_environment
+from utils.perf import record_backend_calls
+from utils.price_history import price_history
+from utils.rewards import RewardPoints
+from utils.search_index import SearchIndex, ITEM, CHAT, POST
+from utils.storage import (MemoryBackend, backend_from_environment, COLLECTIONS, USERS as USERS_COLLECTION,
+                           EVENTS as EVENTS_COLLECTION, WISHLISTS as WISHLISTS_COLLECTION, CHATS as CHATS_COLLECTION,
+                           CONTRIBUTIONS as CONTRIBUTIONS_COLLECTION, POSTS as POSTS_COLLECTION)
+from utils.user_directory import UserDirectory, TypeAhead
+from utils.wallet_ledger import WalletLedger, CREDIT, CONTRIBUTION, REWARD_REDEMPTION
+
+# Users, events and wishlist items are slotted records (see data.records), chat
+# messages compressed segmented logs (see utils.chat_store) and contributions a
+# columnar ledger with group-by aggregations (see utils.contribution_ledger);
+# all read like the dicts they replace
+CONTRIBUTIONS = ContributionLedger(mock_data.CONTRIBUTIONS)
+
+def _convert_records():
+    """Convert the collections' dicts to records, in place"""
+    for user_id, user in USERS.items():
+        USERS[user_id] = User.from_mapping(user)
+    for event_id, event in EVENTS.items():
+        EVENTS[event_id] = Event.from_mapping(event)
+    for wishlist in WISHLISTS.values():
+        wishlist[:] = [WishlistItem.from_mapping(item) for item in wishlist]
+    for event_id, messages in CHAT_MESSAGES.items():
+        if not isinstance(messages, SegmentedChatLog):
+            CHAT_MESSAGES[event_id] = SegmentedChatLog(messages)
+
+_convert_records()
+
+def _capture_state():
+    """Current collections, for a snapshot"""
+    return {
+        "users": USERS,
+        "events": EVENTS,
+        "wishlists": WISHLISTS,
+        "chat_messages": CHAT_MESSAGES,
+        "community_posts": COMMUNITY_POSTS,
+        "contributions": CONTRIBUTIONS.columns(),
+        "wallet_ledger": wallet_ledger.columns(),
+        "reward_points": reward_points.entries(),
+    }
+
+def _restore_state(state):
+    """Replace the collections, in place, with a snapshot's"""
+    for collection, key in ((USERS, "users"), (EVENTS, "events"), (WISHLISTS, "wishlists"),
+                            (CHAT_MESSAGES, "chat_messages")):
+        collection.clear()
+        collection.update(state[key])
+    COMMUNITY_POSTS[:] = state["community_posts"]
+    CONTRIBUTIONS.load_columns(state["contributions"])
+    wallet_ledger.load_columns(state["wallet_ledger"])
+    reward_points.load_entries(state["reward_points"])
+    _convert_records()
+
+def _put_at(records, position, record):
+    if position < len(records):
+        records[position] = record
+    else:
+        records.append(record)
+
+def _apply_record(op, args):
+    """Apply a journal record. Records are puts, so applying one twice is harmless."""
+    if op == "user":
+        user_id, fields = args
+        if user_id in USERS:
+            USERS[user_id].update(fields)
+        else:
+            USERS[user_id] = User.from_mapping(fields)
+    elif op == "event":
+        event, = args
+        EVENTS[event["id"]] = Event.from_mapping(event)
+        WISHLISTS.setdefault(event["id"], [])
+    elif op == "item":
+        event_id, item = args
+        item = WishlistItem.from_mapping(item)
+        wishlist = WISHLISTS.setdefault(event_id, [])
+        for i, existing in enumerate(wishlist):
+            if existing["id"] == item["id"]:
+                wishlist[i] = item
+                break
+        else:
+            wishlist.append(item)
+    elif op == "chat":
+        event_id, message = args
+        _put_at(CHAT_MESSAGES.setdefault(event_id, SegmentedChatLog()), message["id"], message)
+    elif op == "contribution":
+        position, contribution = args
+        _put_at(CONTRIBUTIONS, position, contribution)
+    elif op == "post":
+        post, = args
+        _put_at(COMMUNITY_POSTS, post["id"], post)
+    elif op == "wallet":
+        user_id, balance, position, kind, amount, description, reference, ts = args
+        if user_id in USERS:
+            USERS[user_id]["wallet_balance"] = balance
+        wallet_ledger.put(position, user_id, kind, amount, description, reference, ts)
+    elif op == "points":
+        reward_points.put(*args)
+
+def _record(op, *args):
+    """Journal a mutation after it is applied"""
+    if persistence:
+        persistence.record(op, *args)
+
+# Wallet ledger of the memory backend (shared backends store their own). The
+# backend appends an entry with every balance change, in the same atomic step
+wallet_ledger = WalletLedger()
+
+# Reward points ledger and leaderboards; user["reward_points"] holds the balance
+reward_points = RewardPoints(on_write=_record)
+
+# Storage backend (see utils.storage). HUBSHUB_BACKEND selects a SQLite file or a
+# Redis server that several app processes share, seeded with the collections above
+# when empty. By default the collections above are the store, kept in memory and
+# made durable by the write-ahead journal and snapshots (see utils.journal) when
+# HUBSHUB_DATA_DIR is set; they are restored before anything below indexes them.
+backend = backend_from_environment()
+persistence = None
+if backend:
+    backend.seed(USERS, EVENTS, WISHLISTS, CHAT_MESSAGES, CONTRIBUTIONS, COMMUNITY_POSTS)
+else:
+    persistence = persistence_from_environment()
+    if persistence:
+        persistence.recover(_restore_state, _apply_record, _capture_state)
+    backend = MemoryBackend(USERS, EVENTS, WISHLISTS, CHAT_MESSAGES, CONTRIBUTIONS, COMMUNITY_POSTS,
+                            SegmentedChatLog, on_write=_record, wallet_ledger=wallet_ledger)
+
+# Chats of past events are archived to disk (next to the journal when persistence is enabled)
+_chat_archive_dir = os.path.join(persistence.directory, "chat_archive") if persistence else DEFAULT_ARCHIVE_DIR
+
+# Read cache shared by all sessions; every write below bumps the versions
+# of the users, events and items it touches. Other processes' writes bump
+# nothing here, so with a shared backend results are not kept.
+data_cache = VersionedCache(max_entries=0 if backend.shared else 4096)
+
+def _wishlist_total(event_id, wishlist=None):
+    wishlist = backend.get_wishlist(event_id) if wishlist is None else wishlist
+    return sum(item.get("price") or 0 for item in wishlist)
+
+# Search index documents (SearchIndex.add arguments) of wishlist items, chat messages and posts
+def _item_document(event_id, item):
+    return (f"{ITEM}:{event_id}:{item['id']}", ITEM,
+            f"{item.get('title', '')} {item.get('description', '')}", event_id)
+
+def _chat_document(event_id, message):
+    return f"{CHAT}:{event_id}:{message['id']}", CHAT, message["message"], event_id
+
+def _post_document(post):
+    text = " ".join([post.get("content", ""), post.get("product_name", ""), post.get("store_name", "")]
+                    + [comment["text"] for comment in post.get("comments", [])])
+    return f"{POST}:{post['id']}", POST, text
+
+# The views below are built from the backend and kept up to date by this
+# process's writes. A shared backend counts the writes to each collection
+# (see StorageBackend.versions), including other processes'; there the views
+# are rebuilt from the collections that changed before they are read, and
+# this process's writes reach them the same way.
+friend_graph = feed_store = user_directory = birthday_index = None
+event_date_index = event_discovery = search_index = None
+_view_versions = {}
+_views_lock = threading.Lock()
+
+def _build_views(changed):
+    """(Re)build the views built from the `changed` collections"""
+    global friend_graph, feed_store, user_directory, birthday_index
+    global event_date_index, event_discovery, search_index
+
+    if USERS_COLLECTION in changed:
+        users = backend.all_users()
+        # Symmetric friendship graph; user["friends"] mirrors it for display
+        friend_graph = FriendGraph({user_id: user.get("friends", []) for user_id, user in users.items()})
+        # Prefix index over user names and emails for the user pickers
+        user_directory = UserDirectory(users.values(), friend_graph.friends)
+        # Birthdays by day of the year, for upcoming-date queries
+        birthday_index = BirthdayIndex(users.values())
+
+    if changed & {USERS_COLLECTION, POSTS_COLLECTION}:
+        # Community feed timelines; posts fan out to the author's friends
+        feed_store = FeedStore(backend.all_posts(), friend_graph.friends)
+
+    if not changed & {EVENTS_COLLECTION, WISHLISTS_COLLECTION, CONTRIBUTIONS_COLLECTION, CHATS_COLLECTION,
+                      POSTS_COLLECTION}:
+        return
+    events = backend.all_events()
+    wishlists = backend.all_wishlists()
+    if EVENTS_COLLECTION in changed:
+        # Events by date, for upcoming-date queries
+        event_date_index = EventDateIndex(events.values())
+
+    if changed & {EVENTS_COLLECTION, WISHLISTS_COLLECTION, CONTRIBUTIONS_COLLECTION}:
+        # Public events by type, date and funding ratio, for discovery
+        discovery = EventDiscoveryIndex()
+        funded_by_event = backend.contribution_totals(BY_EVENT)
+        for event in events.values():
+            discovery.add_event(event, _wishlist_total(event["id"], wishlists.get(event["id"], [])),
+                                funded_by_event.get(event["id"], 0))
+        event_discovery = discovery
+
+    if changed & {EVENTS_COLLECTION, WISHLISTS_COLLECTION, CHATS_COLLECTION, POSTS_COLLECTION}:
+        # Full-text index over wishlist items, chat messages and community posts
+        index = SearchIndex()
+        for event in events.values():
+            index.set_event_privacy(event["id"], event.get("privacy") == "public")
+        for event_id, wishlist in wishlists.items():
+            for item in wishlist:
+                index.add(*_item_document(event_id, item))
+        for event_id, messages in backend.all_chats().items():
+            for message in messages:
+                index.add(*_chat_document(event_id, message))
+        for post in backend.all_posts():
+            index.add(*_post_document(post))
+        search_index = index
+
+def _refresh_views():
+    """With a shared backend, rebuild the views of the collections written since they were built"""
+    if not backend.shared:
+        return
+    _backend_call()
+    with _views_lock:
+        versions = backend.versions()
+        changed = {collection for collection, version in versions.items()
+                   if _view_versions.get(collection) != version}
+        if changed:
+            _build_views(changed)
+            _view_versions.update(versions)
+
+with _views_lock:
+    _view_versions.update(backend.versions())
+    _build_views(set(COLLECTIONS))
+
+# Users start their points ledgers with their balances; restored ledgers already hold them
+for _user_id, _user in backend.all_users().items():
+    if _user.get("reward_points") and not reward_points.lifetime(_user_id):
+        reward_points.award(_user_id, _user["reward_points"], "Opening balance")
+
+# State of the script run (page render or fragment rerun) on this thread;
+# Streamlit runs each session's script on its own thread
+_request = threading.local()
+
+@contextlib.contextmanager
+def request_scope(name):
+    """
+    Scope user lookups to one script run.
+    Users fetched during the run are memoized, so repeated lookups of the
+    same user cost one backend call, and the number of backend calls made
+    is recorded under `name`. Nested scopes join the outer one. Can also
+    be used as a decorator.
+    """
+    if getattr(_request, "users", None) is not None:
+        yield
+        return
+    
+    _request.users = {}
+    _request.backend_calls = 0
+    try:
+        yield
+    finally:
+        record_backend_calls(name, _request.backend_calls)
+        _request.users = None
+
+def _backend_call():
+    """Count one call to the data backend (a query, against a real database)"""
+    if getattr(_request, "users", None) is not None:
+        _request.backend_calls += 1
+
+def _fetch_users(user_ids):
+    """Fetch several users in a single backend call"""
+    _backend_call()
+    return backend.get_users(user_ids)
+
+def _index_event(event):
+    """Add a stored event to the indexes and summaries, and invalidate its members' cached reads"""
+    members = [event["creator"]] + list(event.get("participants", []))
+    data_cache.bump(event_scope(event["id"]), discovery_scope(), *[user_scope(user_id) for user_id in members])
+    if backend.shared:
+        return
+
+    event_date_index.add(event)
+    event_discovery.add_event(event, _wishlist_total(event["id"]))
+    search_index.set_event_privacy(event["id"], event.get("privacy") == "public")
+
+    creator_name = DataManager.get_user_names([event["creator"]], default="Unknown")[event["creator"]]
+    dashboard_summaries.update(members, lambda summary: summary.add_event(event, creator_name))
 
 class DataManager:
     """Class to manage mock data operations"""
     
+    @staticmethod
+    def get_view(key, scopes, build_fn):
+        """
+        Get derived view data from the shared cache.
+        build_fn is only called when the data of one of the scopes
+        (see utils.cache) has changed since the view was last built.
+        """
+        return data_cache.get_or_compute(("view", key), scopes, build_fn)
+    
+    @staticmethod
+    def get_dashboard_summary(user_id):
+        """Get a user's dashboard summary (see utils.dashboard_summary)"""
+        # Other processes' writes don't update kept summaries, so with a shared backend they are built per call
+        if backend.shared:
+            return _build_dashboard_summary(user_id)
+        return dashboard_summaries.get(user_id)
+    
+    @staticmethod
+    def get_cache_metrics():
+        """Get hit-rate metrics of the shared read cache"""
+        return data_cache.metrics()
+    
     @staticmethod
     def get_user(user_id):
         """Get user by ID"""
-        return USERS.get(user_id)
+        return DataManager.get_users([user_id]).get(user_id)
+    
+    @staticmethod
+    def get_users(user_ids):
+        """
+        Get several users by ID in one backend call.
+        Returns a dict of the found users keyed by ID. Inside a request
+        scope, users already fetched during the run are not fetched again.
+        """
+        memo = getattr(_request, "users", None)
+        if memo is None:
+            return _fetch_users(set(user_ids))
+        
+        missing = {user_id for user_id in user_ids if user_id not in memo}
+        if missing:
+            fetched = _fetch_users(missing)
+            for user_id in missing:
+                memo[user_id] = fetched.get(user_id)
+        
+        return {user_id: memo[user_id] for user_id in user_ids if memo.get(user_id) is not None}
+    
+    @staticmethod
+    def get_user_names(user_ids, default="Unknown User"):
+        """Get display names for several users in one backend call, keyed by ID"""
+        users = DataManager.get_users(user_ids)
+        return {user_id: users[user_id]["name"] if user_id in users else default for user_id in user_ids}
+    
+    @staticmethod
+    def search_users(query, limit=10, user_id=None, exclude=(), typeahead=None):
+        """
+        Type-ahead search of users by name or email prefix.
+        Returns at most `limit` directory entries (id, name, email); friends of
+        `user_id` rank first and `user_id` itself is left out. Pass the same
+        `typeahead` (see new_user_typeahead) on every keystroke of a picker to
+        continue the previous search instead of starting over.
+        """
+        if typeahead is not None:
+            return typeahead.search(query, limit, user_id, exclude)
+        _refresh_views()
+        return user_directory.search(query, limit, user_id, exclude)
+    
+    @staticmethod
+    def new_user_typeahead():
+        """Start an incremental user search for one picker"""
+        _refresh_views()
+        return TypeAhead(user_directory)
     
     @staticmethod
     def get_all_users():
         """Get all users"""
-        return USERS
+        return backend.all_users()
         
     @staticmethod
     def get_user_friends(user_id):
         """Get a user's friends"""
-        user = USERS.get(user_id)
-        if not user:
-            return []
-        
-        friend_ids = user.get("friends", [])
-        return [USERS.get(friend_id) for friend_id in friend_ids]
+        _refresh_views()
+        friend_ids = friend_graph.friends(user_id)
+        users = DataManager.get_users(friend_ids)
+        return [users[friend_id] for friend_id in friend_ids if friend_id in users]
+    
+    @staticmethod
+    def get_mutual_friends(user_id, other_id):
+        """Get the IDs of the friends two users have in common"""
+        _refresh_views()
+        return friend_graph.mutual_friends(user_id, other_id)
+    
+    @staticmethod
+    def suggest_invitees(user_id, exclude=(), limit=5):
+        """
+        Suggest friends of friends to invite, most mutual friends first.
+        Returns (user_id, mutual friend count) pairs, leaving out `exclude`
+        (e.g. the participants already invited).
+        """
+        _refresh_views()
+        return friend_graph.suggestions(user_id, limit, exclude)
+    
+    @staticmethod
+    def add_friendship(user_id, friend_id):
+        """Make two users friends"""
+        if not backend.shared:
+            friend_graph.add_friendship(user_id, friend_id)
+            feed_store.add_friendship(user_id, friend_id)
+        users = backend.get_users([user_id, friend_id])
+        for a, b in ((user_id, friend_id), (friend_id, user_id)):
+            friends = list(users[a].get("friends", [])) if a in users else None
+            if friends is not None and b not in friends:
+                backend.update_user(a, {"friends": friends + [b]})
+        data_cache.bump(user_scope(user_id), user_scope(friend_id))
     
     @staticmethod
     def get_event(event_id):
         """Get event by ID"""
-        return EVENTS.get(event_id)
+        _backend_call()
+        return backend.get_event(event_id)
     
     @staticmethod
     def get_user_events(user_id):
         """Get events where the user is creator or participant"""
-        user_events = []
-        for event_id, event in EVENTS.items():
-            if event["creator"] == user_id or user_id in event["participants"]:
-                user_events.append(event)
-        return user_events
+        def lookup():
+            _backend_call()
+            return backend.get_user_events(user_id)
+        
+        return data_cache.get_or_compute(("user_events", user_id), [user_scope(user_id)], lookup)
+    
+    @staticmethod
+    def add_event(event):
+        """Add a new event"""
+        event = backend.put_event(event)
+        _index_event(event)
+        return event["id"]
+    
+    @staticmethod
+    def add_event_if_absent(event):
+        """Add an event unless one with its ID exists; returns its ID, or None if it exists"""
+        event = backend.put_event_if_absent(event)
+        if event is None:
+            return None
+        _index_event(event)
+        return event["id"]
+    
+    @staticmethod
+    def discover_events(event_type=None, days=None, max_funding=1.0, sort="date", cursor=None, limit=10, today=None):
+        """
+        Find public events, e.g. housewarmings in the next 30 days under 50% funded.
+        Only upcoming events are returned; `days` limits how far ahead, and
+        `max_funding` the share of the wishlist already contributed (0-1).
+        Sorts by "date" (soonest first) or "funding" (least funded first).
+        Returns dicts with 'event' and 'funding_ratio', and the next page's cursor.
+        """
+        today = today or datetime.date.today()
+        end = (today + datetime.timedelta(days=days)).isoformat() if days is not None else None
+        _refresh_views()
+        return event_discovery.query(event_type, today.isoformat(), end, max_funding=max_funding,
+                                     sort=sort, cursor=cursor, limit=limit)
+    
+    @staticmethod
+    def get_upcoming_events(user_id, days=30, today=None):
+        """
+        Get events in the next `days` days for a user and their friends,
+        soonest first: events the user is part of, and public events of
+        their friends. Returns dicts with 'event' and 'days_until'.
+        """
+        today = today or datetime.date.today()
+        _refresh_views()
+        circle = set(friend_graph.friends(user_id))
+        circle.add(user_id)
+        
+        event_ids = event_date_index.between(today, today + datetime.timedelta(days=days))
+        events = backend.get_events(event_ids)
+        upcoming = []
+        for event_id in event_ids:
+            event = events.get(event_id)
+            if not event:
+                continue
+            member = event["creator"] == user_id or user_id in event.get("participants", [])
+            if member or (event["creator"] in circle and event.get("privacy") == "public"):
+                event_date = datetime.date.fromisoformat(event["date"])
+                upcoming.append({"event": event, "days_until": (event_date - today).days})
+        return upcoming
+    
+    @staticmethod
+    def get_upcoming_birthdays(start, days):
+        """Get the birthdays celebrated in the `days` days from `start`, as (user_id, date) pairs in date order"""
+        _refresh_views()
+        return birthday_index.upcoming(start, days)
+    
+    @staticmethod
+    def get_friend_birthdays(user_id, days=30, today=None):
+        """Get a user's friends' birthdays in the next `days` days, as (friend_id, date) pairs in date order"""
+        today = today or datetime.date.today()
+        _refresh_views()
+        birthdays = []
+        for friend_id in friend_graph.friends(user_id):
+            date = next_occurrence(birthday_index.birthday(friend_id), today)
+            if date is not None and (date - today).days < days:
+                birthdays.append((friend_id, date))
+        return sorted(birthdays, key=lambda entry: entry[1])
+    
+    @staticmethod
+    def set_birthday(user_id, birthday):
+        """Update a user's birthday (ISO date string)"""
+        if not backend.update_user(user_id, {"birthday": birthday}):
+            return
+        if not backend.shared:
+            birthday_index.set(user_id, birthday)
+        data_cache.bump(user_scope(user_id))
+    
+    @staticmethod
+    def update_rsvp(event_id, user_id, status):
+        """Update a participant's RSVP status for an event"""
+        event, old_status = backend.set_rsvp(event_id, user_id, status)
+        if not event:
+            return False
+        
+        data_cache.bump(event_scope(event_id), user_scope(user_id))
+        if backend.shared:
+            return True
+        dashboard_summaries.update(
+            {event["creator"], user_id},
+            lambda summary: summary.update_rsvp(event_id, user_id, old_status, status)
+        )
+        return True
     
     @staticmethod
     def get_wishlist(event_id):
         """Get wishlist for an event"""
-        return WISHLISTS.get(event_id, [])
+        _backend_call()
+        return backend.get_wishlist(event_id)
+    
+    @staticmethod
+    def get_all_wishlists():
+        """Get all wishlists keyed by event ID"""
+        return backend.all_wishlists()
     
     @staticmethod
     def get_wishlist_item(event_id, item_id):
         """Get a specific wishlist item"""
-        wishlist = WISHLISTS.get(event_id, [])
-        for item in wishlist:
-            if item["id"] == item_id:
-                return item
-        return None
+        def lookup():
+            _backend_call()
+            return backend.get_wishlist_item(event_id, item_id)
+        
+        return data_cache.get_or_compute(("wishlist_item", event_id, item_id), [event_scope(event_id)], lookup)
     
     @staticmethod
     def update_wishlist_item(event_id, item_id, updates):
         """Update a wishlist item"""
-        wishlist = WISHLISTS.get(event_id, [])
-        for i, item in enumerate(wishlist):
-            if item["id"] == item_id:
-                wishlist[i].update(updates)
-                return True
-        return False
+        item = backend.update_wishlist_item(event_id, item_id, updates)
+        if item is None:
+            return False
+        data_cache.bump(event_scope(event_id), item_scope(event_id, item_id), discovery_scope())
+        if backend.shared:
+            return True
+        if "price" in updates:
+            event_discovery.set_goal(event_id, _wishlist_total(event_id))
+        if "title" in updates or "description" in updates:
+            search_index.add(*_item_document(event_id, item))
+        return True
     
     @staticmethod
     def add_wishlist_item(event_id, item_data):
         """Add a new item to a wishlist"""
-        if event_id not in WISHLISTS:
-            WISHLISTS[event_id] = []
-            
         # Generate a new item ID
-        item_id = f"item{len(WISHLISTS[event_id]) + 1}"
+        item_id = f"item{len(backend.get_wishlist(event_id)) + 1}"
         
         # Set defaults
-        new_item = {
-            "id": item_id,
-            "title": "",
-            "description": "",
-            "price": 0.0,
-            "category": "medium",
-            "url": "",
-            "status": "available",
-            "priority": "medium",
-            "contributors": []
-        }
+        new_item = WishlistItem(
+            id=item_id,
+            title="",
+            description="",
+            price=0.0,
+            category="medium",
+            url="",
+            status="available",
+            priority="medium",
+            contributors=[]
+        )
         
         # Update with provided data
         new_item.update(item_data)
         
-        WISHLISTS[event_id].append(new_item)
-        return item_id
+        # Check the listed price against the product's observed price history
+        history_stats = price_history.window_stats(new_item["url"])
+        new_item["fraud_check"] = FundAllocator().handle_fraud_prevention_with_history(new_item["price"], history_stats)
+        
+        new_item = backend.put_wishlist_item(event_id, new_item)
+        data_cache.bump(event_scope(event_id), item_scope(event_id, new_item["id"]), discovery_scope())
+        if not backend.shared:
+            event_discovery.set_goal(event_id, _wishlist_total(event_id))
+            search_index.add(*_item_document(event_id, new_item))
+        return new_item["id"]
+    
+    @staticmethod
+    def get_chat_messages(event_id, cursor=None, limit=None):
+        """
+        Get chat messages for an event, oldest first.
+        Returns at most `limit` messages older than the `cursor` message id
+        (or the newest ones if no cursor is given). Use the first returned
+        message's id as the cursor for the next, older page.
+        """
+        _backend_call()
+        return backend.read_chat_messages(event_id, cursor, limit)
     
     @staticmethod
-    def get_chat_messages(event_id):
-        """Get chat messages for an event"""
-        return CHAT_MESSAGES.get(event_id, [])
+    def get_chat_message_count(event_id):
+        """Get the number of chat messages in an event"""
+        return backend.chat_message_count(event_id)
     
     @staticmethod
     def add_chat_message(event_id, user_id, message):
         """Add a chat message to an event"""
-        if event_id not in CHAT_MESSAGES:
-            CHAT_MESSAGES[event_id] = []
-            
         new_message = {
             "user": user_id,
             "message": message,
             "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
-        CHAT_MESSAGES[event_id].append(new_message)
+        new_message = backend.append_chat_message(event_id, new_message)
+        if not backend.shared:
+            search_index.add(*_chat_document(event_id, new_message))
+        data_cache.bump(chat_scope(event_id))
+        return True
+    
+    @staticmethod
+    def archive_chats(before):
+        """
+        Move the chats of events dated before `before` (a date) to disk; they
+        are loaded back when someone opens the event.
+        Returns the number of chats archived and the bytes of memory released.
+        """
+        archived, released = 0, 0
+        _refresh_views()
+        for event_id in event_date_index.between("", before - datetime.timedelta(days=1)):
+            freed = backend.archive_chat(event_id, _chat_archive_dir)
+            if freed:
+                archived += 1
+                released += freed
+        return archived, released
+    
+    @staticmethod
+    def get_chat_memory_stats():
+        """Get the number of chats in memory and on disk, and the bytes of messages in memory"""
+        return backend.chat_memory_stats()
+    
+    @staticmethod
+    def credit_wallet(user_id, amount, description, transaction_id):
+        """Credit a user's wallet and record the transaction"""
+        if backend.adjust_wallet(user_id, CREDIT, amount, description, reference=transaction_id) is None:
+            return False
+        
+        data_cache.bump(user_scope(user_id))
+        return True
+    
+    @staticmethod
+    def get_wallet_balance(user_id):
+        """Get a user's current wallet balance, from their ledger"""
+        return backend.wallet_balance(user_id)
+    
+    @staticmethod
+    def get_wallet_history(user_id, cursor=None, limit=10):
+        """
+        Get a page of a user's wallet entries, newest first.
+        Returns the entries and the cursor for the next, older page
+        (None when there are no older entries).
+        """
+        _backend_call()
+        return backend.wallet_history(user_id, cursor, limit)
+    
+    @staticmethod
+    def get_wallet_balance_at(user_id, when):
+        """Get a user's wallet balance at a past time (datetime or unix timestamp)"""
+        if isinstance(when, datetime.datetime):
+            when = when.timestamp()
+        return backend.wallet_balance_at(user_id, when)
+    
+    @staticmethod
+    def reconcile_wallets():
+        """
+        Check every user's wallet balance against the ledger.
+        Returns the difference for each user whose balance doesn't match.
+        """
+        return backend.reconcile_wallets()
+    
+    @staticmethod
+    def award_points(user_id, points, reason):
+        """Award reward points to a user; returns the new points balance"""
+        balance = reward_points.award(user_id, points, reason)
+        stored = backend.adjust_user_number(user_id, "reward_points", points)
+        data_cache.bump(user_scope(user_id))
+        return balance if stored is None else stored
+    
+    @staticmethod
+    def get_reward_points(user_id):
+        """Get a user's spendable reward points"""
+        user = backend.get_user(user_id)
+        return user.get("reward_points", 0) if user else reward_points.balance(user_id)
+    
+    @staticmethod
+    def get_reward_level(user_id):
+        """Get a user's reward level (see utils.rewards.LEVELS)"""
+        return reward_points.level(user_id)
+    
+    @staticmethod
+    def get_leaderboard(k=10, user_id=None):
+        """
+        Get the top users by lifetime reward points, highest first.
+        With a user, only ranks that user and their friends.
+        Returns (user_id, points) pairs.
+        """
+        if user_id is None:
+            return reward_points.leaderboard(k)
+        _refresh_views()
+        return reward_points.friends_leaderboard(user_id, friend_graph.friends(user_id), k)
+    
+    @staticmethod
+    def redeem_reward(user_id, reward):
+        """Redeem reward points for a reward and record it in the wallet history"""
+        # The balance check and the debit are one atomic step in the backend
+        if backend.adjust_user_number(user_id, "reward_points", -reward["cost"], minimum=0) is None:
+            return False
+        reward_points.redeem(user_id, reward["cost"], f"Redeemed {reward['name']}")
+        
+        user = backend.get_user(user_id)
+        backend.update_user(user_id, {"redemptions": list(user.get("redemptions", [])) + [{
+            "date": datetime.datetime.now().strftime("%Y-%m-%d"),
+            "reward": reward["name"],
+            "code": reward["code"],
+            "cost": reward["cost"]
+        }]})
+        
+        # Rewards are paid in points, so the entry doesn't change the balance
+        backend.adjust_wallet(user_id, REWARD_REDEMPTION, 0.0,
+                              f"Redeemed {reward['name']} ({reward['cost']} points)", reference=reward["code"])
+        data_cache.bump(user_scope(user_id))
         return True
     
+    @staticmethod
+    def get_feed(user_id=None, cursor=None, limit=10):
+        """
+        Get a page of community posts, newest first.
+        With a user, reads their timeline (their own and their friends' posts),
+        otherwise all posts. Returns the posts and the cursor for the next,
+        older page (None when there are no older posts).
+        """
+        _backend_call()
+        if user_id is None:
+            return backend.read_posts(cursor, limit)
+        _refresh_views()
+        posts, next_cursor = feed_store.read_timeline(user_id, cursor, limit)
+        # Likes and comments are read from the backend
+        stored = backend.get_posts([post["id"] for post in posts])
+        return [stored.get(post["id"], post) for post in posts], next_cursor
+    
+    @staticmethod
+    def add_post(post):
+        """Publish a community post"""
+        post = backend.add_post(post)
+        if not backend.shared:
+            feed_store.publish(post)
+            search_index.add(*_post_document(post))
+        return post["id"]
+    
+    @staticmethod
+    def like_post(post_id):
+        """Like a community post; returns the new like count"""
+        return backend.like_post(post_id)
+    
+    @staticmethod
+    def add_post_comment(post_id, user_id, text):
+        """Comment on a community post; returns the new comment count"""
+        count = backend.add_post_comment(post_id, {"user_id": user_id, "text": text})
+        if count is not None and not backend.shared:
+            search_index.add(*_post_document(backend.get_post(post_id)))
+        return count
+    
+    @staticmethod
+    def search(user_id, query, kinds=None, limit=20):
+        """
+        Full-text search of wishlist items, chat messages and community posts.
+        Only returns documents of public events and of events the user
+        created or was invited to. Returns dicts with 'kind', 'score',
+        'event_id', 'title' and 'text', plus 'item_id' or 'post_id'.
+        """
+        member_events = [event["id"] for event in DataManager.get_user_events(user_id)]
+        _refresh_views()
+        hits = search_index.search(query, member_events, kinds, limit)
+        events = backend.get_events({key.split(":")[1] for key, _ in hits if not key.startswith(f"{POST}:")})
+        results = []
+        for key, score in hits:
+            kind, _, ref = key.partition(":")
+            if kind == POST:
+                post = backend.get_post(int(ref))
+                if post:
+                    results.append({"kind": kind, "score": score, "event_id": None, "post_id": post["id"],
+                                    "title": post.get("product_name") or post.get("store_name") or "Community post",
+                                    "text": post["content"]})
+                continue
+            
+            event_id, _, ref = ref.rpartition(":")
+            event = events.get(event_id)
+            if not event:
+                continue
+            if kind == ITEM:
+                item = DataManager.get_wishlist_item(event_id, ref)
+                if item:
+                    results.append({"kind": kind, "score": score, "event_id": event_id, "item_id": item["id"],
+                                    "title": f"{item['title']} ({event['title']})", "text": item.get("description", "")})
+            else:
+                messages = backend.read_chat_messages(event_id, int(ref) + 1, 1)
+                if messages:
+                    results.append({"kind": kind, "score": score, "event_id": event_id,
+                                    "title": f"Chat in {event['title']}", "text": messages[0]["message"]})
+        return results
+    
+    @staticmethod
+    def save_search_snapshot(path):
+        """Write a snapshot of the search index to disk"""
+        _refresh_views()
+        search_index.save(path)
+    
     @staticmethod
     def get_user_contributions(user_id):
         """Get contributions made by a user"""
-        return [c for c in CONTRIBUTIONS if c["user_id"] == user_id]
+        def lookup():
+            _backend_call()
+            return backend.get_contributions(user_id=user_id)
+        
+        return data_cache.get_or_compute(("user_contributions", user_id), [user_scope(user_id)], lookup)
     
     @staticmethod
     def get_item_contributions(event_id, item_id):
         """Get all contributions for a specific item"""
-        return [c for c in CONTRIBUTIONS if c["event_id"] == event_id and c["item_id"] == item_id]
+        def scan():
+            _backend_call()
+            return backend.get_contributions(event_id, item_id)
+        
+        return data_cache.get_or_compute(("item_contributions", event_id, item_id), [item_scope(event_id, item_id)], scan)
+    
+    @staticmethod
+    def get_contribution_totals(by, event_id=None, item_id=None, user_id=None):
+        """
+        Get the total contributed per event, item, user or day ("event", "item",
+        "user", "day"), optionally only counting one event's, item's or user's
+        contributions. Items are keyed by (event_id, item_id) and days by ISO date.
+        """
+        return backend.contribution_totals(by, event_id, item_id, user_id)
+    
+    @staticmethod
+    def get_contribution_frame():
+        """Get a pandas DataFrame over the contribution columns, for analytics (no copy is made)"""
+        return backend.contribution_frame()
     
     @staticmethod
     def add_contribution(event_id, item_id, user_id, amount):
         """Add a new contribution"""
-        # Update user wallet balance
-        user = USERS.get(user_id)
-        if not user or user["wallet_balance"] < amount:
+        item = DataManager.get_wishlist_item(event_id, item_id)
+        description = f"Contribution to {item['title']}" if item else "Contribution"
+        
+        # Debit the wallet; the balance check, the debit and its ledger entry are one atomic step in the backend
+        if backend.adjust_wallet(user_id, CONTRIBUTION, -amount, description,
+                                 reference=f"{event_id}/{item_id}", minimum=0) is None:
             return False
-            
-        user["wallet_balance"] -= amount
         
         # Add to contributions list
         new_contribution = {
@@ -139,22 +879,52 @@ class DataManager:
             "date": datetime.datetime.now().strftime("%Y-%m-%d")
         }
         
-        CONTRIBUTIONS.append(new_contribution)
+        backend.add_contribution(new_contribution)
+        if not backend.shared:
+            event_discovery.add_funds(event_id, amount)
+        
+        data_cache.bump(user_scope(user_id), event_scope(event_id), item_scope(event_id, item_id), discovery_scope())
         
         # Update item contributors
-        item = DataManager.get_wishlist_item(event_id, item_id)
         if item:
+            updates = {}
             if user_id not in item["contributors"]:
-                item["contributors"].append(user_id)
+                updates["contributors"] = list(item["contributors"]) + [user_id]
                 
-            # Add/update pooled amount
-            pooled_amount = item.get("pooled_amount", 0)
-            item["pooled_amount"] = pooled_amount + amount
+            # Add to the pooled amount
+            pooled_amount = backend.adjust_item_number(event_id, item_id, "pooled_amount", amount)
             
             # Check if fully funded
-            if item["pooled_amount"] >= item["price"]:
-                item["status"] = "purchased"
+            if pooled_amount is not None and pooled_amount >= item["price"]:
+                updates["status"] = "purchased"
                 
-            DataManager.update_wishlist_item(event_id, item_id, item)
+            DataManager.update_wishlist_item(event_id, item_id, updates)
+        
+        if backend.shared:
+            return True
+        event = backend.get_event(event_id)
+        if event:
+            item_title = item["title"] if item else None
+            dashboard_summaries.update(
+                [user_id],
+                lambda summary: summary.add_contribution(new_contribution, event, item_title)
+            )
             
-        return True 
\ No newline at end of file
+        return True
+
+def _build_dashboard_summary(user_id):
+    """Build a user's dashboard summary from their indexed events and contributions"""
+    events = DataManager.get_user_events(user_id)
+    creator_names = DataManager.get_user_names({event["creator"] for event in events}, default="Unknown")
+    
+    def get_item_title(event_id, item_id):
+        item = DataManager.get_wishlist_item(event_id, item_id)
+        return item["title"] if item else None
+    
+    return DashboardSummary.build(
+        user_id, events, DataManager.get_user_contributions(user_id),
+        creator_names, DataManager.get_event, get_item_title
+    )
+
+# Dashboard summaries, kept up to date by the writes above
+dashboard_summaries = DashboardSummaryStore(_build_dashboard_summary)
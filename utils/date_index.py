@@ -0,0 +1,137 @@
+import bisect
+import datetime
+import threading
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+# Birthdays are bucketed by their day in a leap year, so Feb 29 has a bucket of its own
+_LEAP_YEAR = 2000
+DAYS_IN_YEAR = 366
+
+def day_key(month: int, day: int) -> int:
+    """Bucket index (0-365) of a month and day"""
+    return datetime.date(_LEAP_YEAR, month, day).timetuple().tm_yday - 1
+
+def _parse_date(value) -> Optional[datetime.date]:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def next_occurrence(birthday, today: datetime.date) -> Optional[datetime.date]:
+    """Next date on or after `today` on which a birthday is celebrated (Feb 29 falls on Feb 28 in other years)"""
+    birthday = _parse_date(birthday)
+    if birthday is None:
+        return None
+    for year in (today.year, today.year + 1):
+        try:
+            occurrence = datetime.date(year, birthday.month, birthday.day)
+        except ValueError:
+            occurrence = datetime.date(year, 2, 28)
+        if occurrence >= today:
+            return occurrence
+    return None
+
+class BirthdayIndex:
+    """
+    Users bucketed by the day of the year of their birthday.
+    A window of upcoming birthdays only visits the buckets of the days in the
+    window, never the whole user table.
+    """
+
+    def __init__(self, users: Iterable[Dict[str, Any]] = ()):
+        self._buckets: List[List[str]] = [[] for _ in range(DAYS_IN_YEAR)]
+        self._birthdays: Dict[str, datetime.date] = {}
+        self._lock = threading.Lock()
+
+        for user in users:
+            self.set(user["id"], user.get("birthday"))
+
+    def set(self, user_id: str, birthday):
+        """Index a user's birthday (None removes it)"""
+        birthday = _parse_date(birthday)
+        with self._lock:
+            previous = self._birthdays.pop(user_id, None)
+            if previous is not None:
+                self._buckets[day_key(previous.month, previous.day)].remove(user_id)
+            if birthday is not None:
+                self._birthdays[user_id] = birthday
+                self._buckets[day_key(birthday.month, birthday.day)].append(user_id)
+
+    def birthday(self, user_id: str) -> Optional[datetime.date]:
+        """Indexed birthday of a user"""
+        return self._birthdays.get(user_id)
+
+    def upcoming(self, start: datetime.date, days: int) -> List[Tuple[str, datetime.date]]:
+        """
+        Birthdays celebrated in a window of days
+
+        Args:
+            start: First day of the window
+            days: Length of the window in days
+
+        Returns:
+            (user_id, celebration date) pairs in date order
+        """
+        results = []
+        with self._lock:
+            for offset in range(min(days, DAYS_IN_YEAR)):
+                date = start + datetime.timedelta(days=offset)
+                keys = [day_key(date.month, date.day)]
+                if date.month == 2 and date.day == 28 and not _is_leap(date.year):
+                    keys.append(day_key(2, 29))
+                for key in keys:
+                    results.extend((user_id, date) for user_id in self._buckets[key])
+        return results
+
+class EventDateIndex:
+    """
+    Events sorted by date.
+    ISO dates sort as strings, so the index is a sorted list of
+    (date, event_id) pairs and a date range is two binary searches.
+    """
+
+    def __init__(self, events: Iterable[Dict[str, Any]] = ()):
+        self._dates: Dict[str, str] = {event["id"]: event["date"] for event in events if event.get("date")}
+        self._entries: List[Tuple[str, str]] = sorted((date, event_id) for event_id, date in self._dates.items())
+        self._lock = threading.Lock()
+
+    def add(self, event: Dict[str, Any]):
+        """Index a new event, or move an event whose date changed"""
+        with self._lock:
+            previous = self._dates.get(event["id"])
+            if previous == event.get("date"):
+                return
+            if previous is not None:
+                self._entries.pop(bisect.bisect_left(self._entries, (previous, event["id"])))
+                del self._dates[event["id"]]
+            if event.get("date"):
+                bisect.insort(self._entries, (event["date"], event["id"]))
+                self._dates[event["id"]] = event["date"]
+
+    def remove(self, event_id: str):
+        """Remove an event from the index"""
+        with self._lock:
+            date = self._dates.pop(event_id, None)
+            if date is not None:
+                self._entries.pop(bisect.bisect_left(self._entries, (date, event_id)))
+
+    def between(self, start, end) -> List[str]:
+        """
+        IDs of the events dated within a range, soonest first
+
+        Args:
+            start, end: First and last day of the range (dates or ISO strings), inclusive
+        """
+        start = start.isoformat() if isinstance(start, datetime.date) else start
+        end = end.isoformat() if isinstance(end, datetime.date) else end
+        with self._lock:
+            low = bisect.bisect_left(self._entries, (start, ""))
+            high = bisect.bisect_right(self._entries, (end, "\uffff"))
+            return [event_id for _, event_id in self._entries[low:high]]
@@ -0,0 +1,159 @@
+import bisect
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+# Sort orders of discovery queries
+SORT_BY_DATE = "date"
+SORT_BY_FUNDING = "funding"
+
+class EventDiscoveryIndex:
+    """
+    Indexes over public events for discovery queries.
+    Two sorted indexes are kept: (type, date) pairs per event type plus one
+    over all types, and (funding ratio, date) pairs. A query reads a range of
+    one of them, picking the range with fewer candidates. When the range is
+    already in the requested order, the scan stops once a page is full. Funding
+    ratios (contributed / wishlist total) are updated as contributions land.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._goals: Dict[str, float] = {}
+        self._funded: Dict[str, float] = {}
+
+        # Sorted (date, event_id) per type, and under None for all types
+        self._by_type: Dict[Optional[str], List[Tuple[str, str]]] = {None: []}
+        # Sorted (funding ratio, date, event_id)
+        self._by_funding: List[Tuple[float, str, str]] = []
+
+        self._lock = threading.Lock()
+
+    def _ratio(self, event_id: str) -> float:
+        goal = self._goals.get(event_id, 0.0)
+        if goal <= 0:
+            return 0.0
+        return min(1.0, self._funded.get(event_id, 0.0) / goal)
+
+    def _funding_key(self, event_id: str) -> Tuple[float, str, str]:
+        return (self._ratio(event_id), self._events[event_id]["date"], event_id)
+
+    def add_event(self, event: Dict[str, Any], goal: float = 0.0, funded: float = 0.0):
+        """
+        Index a public event (other events are ignored)
+
+        Args:
+            event: Event with 'id', 'type', 'date' and 'privacy'
+            goal: Total price of the event's wishlist
+            funded: Amount contributed so far
+        """
+        if event.get("privacy") != "public" or not event.get("date"):
+            return
+
+        with self._lock:
+            if event["id"] in self._events:
+                return
+            self._events[event["id"]] = event
+            self._goals[event["id"]] = goal
+            self._funded[event["id"]] = funded
+
+            entry = (event["date"], event["id"])
+            bisect.insort(self._by_type.setdefault(event["type"], []), entry)
+            bisect.insort(self._by_type[None], entry)
+            bisect.insort(self._by_funding, self._funding_key(event["id"]))
+
+    def _update_funding(self, event_id: str, goal: Optional[float] = None, funded_delta: float = 0.0):
+        with self._lock:
+            if event_id not in self._events:
+                return
+            old_key = self._funding_key(event_id)
+            if goal is not None:
+                self._goals[event_id] = goal
+            self._funded[event_id] += funded_delta
+            new_key = self._funding_key(event_id)
+            if new_key != old_key:
+                self._by_funding.pop(bisect.bisect_left(self._by_funding, old_key))
+                bisect.insort(self._by_funding, new_key)
+
+    def add_funds(self, event_id: str, amount: float):
+        """Record a contribution to an event"""
+        self._update_funding(event_id, funded_delta=amount)
+
+    def set_goal(self, event_id: str, goal: float):
+        """Update the wishlist total of an event"""
+        self._update_funding(event_id, goal=goal)
+
+    def funding_ratio(self, event_id: str) -> float:
+        """Share of an event's wishlist total contributed so far (0-1)"""
+        return self._ratio(event_id)
+
+    def query(self, event_type: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+              min_funding: float = 0.0, max_funding: float = 1.0, sort: str = SORT_BY_DATE,
+              cursor: Optional[tuple] = None, limit: int = 10) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+        """
+        Find public events
+
+        Args:
+            event_type: Only events of this type (None for any)
+            start, end: Only events dated within this range (ISO dates, inclusive; None for open)
+            min_funding, max_funding: Only events whose funding ratio is within this range (inclusive)
+            sort: SORT_BY_DATE (soonest first) or SORT_BY_FUNDING (least funded first)
+            cursor: Cursor returned with the previous page (None for the first page)
+            limit: Maximum number of events to return
+
+        Returns:
+            Dicts with 'event' and 'funding_ratio', and the cursor of the next page or None
+        """
+        if sort not in (SORT_BY_DATE, SORT_BY_FUNDING):
+            raise ValueError(f"Unknown sort order: {sort}")
+
+        start = start or ""
+        end = end or "\uffff"
+
+        with self._lock:
+            dates = self._by_type.get(event_type, [])
+            date_low = bisect.bisect_left(dates, (start, ""))
+            date_high = bisect.bisect_right(dates, (end, "\uffff"))
+
+            funding_low = bisect.bisect_left(self._by_funding, (min_funding, "", ""))
+            funding_high = bisect.bisect_right(self._by_funding, (max_funding, "\uffff", "\uffff"))
+
+            def matches(event_id):
+                event = self._events[event_id]
+                return ((event_type is None or event["type"] == event_type)
+                        and start <= event["date"] <= end
+                        and min_funding <= self._ratio(event_id) <= max_funding)
+
+            # Sort key of an event in the requested order; cursors are the key of the last event returned
+            if sort == SORT_BY_DATE:
+                sort_key = lambda event_id: (self._events[event_id]["date"], event_id)
+            else:
+                sort_key = self._funding_key
+
+            if date_high - date_low <= funding_high - funding_low:
+                index, low, high = dates, date_low, date_high
+                in_order = sort == SORT_BY_DATE
+            else:
+                index, low, high = self._by_funding, funding_low, funding_high
+                in_order = sort == SORT_BY_FUNDING
+            if in_order and cursor is not None:
+                low = max(low, bisect.bisect_right(index, cursor))
+            # Read the range in place rather than copying a slice of it
+            candidates = (index[position][-1] for position in range(low, high))
+
+            page = []
+            if in_order:
+                # Stop as soon as one event past the page is found
+                for event_id in candidates:
+                    if matches(event_id):
+                        page.append(event_id)
+                        if len(page) > limit:
+                            break
+            else:
+                page = sorted((event_id for event_id in candidates
+                               if matches(event_id) and (cursor is None or sort_key(event_id) > cursor)),
+                              key=sort_key)[:limit + 1]
+
+            has_more = len(page) > limit
+            page = page[:limit]
+            results = [{"event": self._events[event_id], "funding_ratio": self._ratio(event_id)} for event_id in page]
+            return results, (sort_key(page[-1]) if has_more else None)
@@ -0,0 +1,109 @@
+import bisect
+import datetime
+import heapq
+import itertools
+import threading
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
+
+def _insert(post_ids: List[int], post_id: int):
+    """Add an id to a sorted list. Ids mostly arrive in order, but posts stored by a
+    backend are published after its lock is released, so two can arrive swapped."""
+    if not post_ids or post_ids[-1] < post_id:
+        post_ids.append(post_id)
+    else:
+        position = bisect.bisect_left(post_ids, post_id)
+        if position == len(post_ids) or post_ids[position] != post_id:
+            post_ids.insert(position, post_id)
+
+class FeedStore:
+    """
+    Shared community feed.
+    Post ids increase with posting time, so every user's timeline is an
+    append-only, sorted list of ids. Timelines are fanned out on
+    write to the author and the author's friends, and reads binary search the
+    cursor, so a page costs O(log n + page size) however many posts exist.
+    New friends' earlier posts are merged in by add_friendship.
+    """
+
+    def __init__(self, posts: Iterable[Dict[str, Any]], get_friends: Callable[[str], Iterable[str]]):
+        """
+        Initialize the store
+
+        Args:
+            posts: Existing posts, oldest first. The dicts are used in place.
+            get_friends: Returns the friends of a user, whose timelines receive the user's posts
+        """
+        self.get_friends = get_friends
+
+        self._posts: Dict[int, Dict[str, Any]] = {}
+        self._timelines: Dict[str, List[int]] = {}
+        self._authored: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+        for post in posts:
+            self._add(post)
+
+    def _add(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        # Posts stored by a backend (see utils.storage) come with their id, which only increases
+        post_id = post["id"] if "id" in post else len(self._posts)
+        post["id"] = post_id
+        post.setdefault("likes", 0)
+        post.setdefault("comments", [])
+        post.setdefault("date", datetime.datetime.now().strftime("%Y-%m-%d"))
+
+        self._posts[post_id] = post
+        _insert(self._authored.setdefault(post["user_id"], []), post_id)
+        for user_id in [post["user_id"]] + list(self.get_friends(post["user_id"])):
+            _insert(self._timelines.setdefault(user_id, []), post_id)
+        return post
+
+    def publish(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Publish a new post
+
+        Args:
+            post: Post with at least 'user_id', 'type' and 'content', and its 'id' if
+                it is already stored elsewhere
+
+        Returns:
+            The stored post, with its 'id' set
+        """
+        with self._lock:
+            return self._add(post)
+
+    def add_friendship(self, user_id: str, friend_id: str):
+        """Backfill two new friends' timelines with each other's earlier posts"""
+        with self._lock:
+            for reader, author in ((user_id, friend_id), (friend_id, user_id)):
+                authored = self._authored.get(author)
+                if authored:
+                    timeline = self._timelines.get(reader, [])
+                    merged = heapq.merge(timeline, authored)
+                    self._timelines[reader] = [post_id for post_id, _ in itertools.groupby(merged)]
+
+    def get_post(self, post_id: int) -> Optional[Dict[str, Any]]:
+        """Get a post by ID"""
+        return self._posts.get(post_id)
+
+    @staticmethod
+    def _page(post_ids: List[int], cursor: Optional[int], limit: int) -> Tuple[List[int], Optional[int]]:
+        end = len(post_ids) if cursor is None else bisect.bisect_left(post_ids, cursor)
+        start = max(0, end - limit)
+        page = post_ids[start:end][::-1]
+        return page, (page[-1] if start > 0 else None)
+
+    def read_timeline(self, user_id: str, cursor: Optional[int] = None, limit: int = 10) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Read a page of a user's timeline (their own and their friends' posts), newest first
+
+        Args:
+            user_id: User whose timeline to read
+            cursor: Only return posts older than this post id (None for the newest)
+            limit: Maximum number of posts to return
+
+        Returns:
+            The posts, and the cursor for the next (older) page or None if there is none
+        """
+        with self._lock:
+            page, next_cursor = self._page(self._timelines.get(user_id, []), cursor, limit)
+            return [self._posts[post_id] for post_id in page], next_cursor
@@ -0,0 +1,422 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from utils.cassette import cassette
+
+# Request classes, in the order they are considered for dispatch
+PRIORITIES = ("interactive", "background")
+
+# Statuses that mean the retailer wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+# Seconds a user-facing fetch may take in total, queueing and retries included
+INTERACTIVE_DEADLINE = 20.0
+
+class TokenBucket:
+    """Token bucket limiting the request rate to a single domain"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+class _FetchJob:
+    """A queued outbound request"""
+    __slots__ = ("url", "domain", "headers", "timeout", "priority", "future", "attempts", "enqueued_at", "deadline")
+
+    def __init__(self, url: str, headers: Dict[str, str], timeout: float, priority: str,
+                 deadline: Optional[float] = None):
+        self.url = url
+        self.domain = urlparse(url).netloc.lower()
+        self.headers = headers
+        self.timeout = timeout
+        self.priority = priority
+        self.future: Future = Future()
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+        # Monotonic time by which the job must be answered (None for no limit)
+        self.deadline = None if deadline is None else self.enqueued_at + deadline
+
+class FetchScheduler:
+    """Shared politeness scheduler for outbound product page fetches"""
+
+    def __init__(self,
+                 max_concurrency: int = 4,
+                 domain_rate: float = 0.5,
+                 domain_burst: float = 2,
+                 interactive_weight: int = 4,
+                 max_retries: int = 4,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 60.0,
+                 session: Optional[requests.Session] = None):
+        """
+        Initialize the scheduler
+
+        Args:
+            max_concurrency: Maximum number of requests in flight across all domains
+            domain_rate: Sustained requests per second allowed per domain
+            domain_burst: Number of requests a domain may receive back to back
+            interactive_weight: Interactive jobs dispatched for every background job
+                when both are waiting
+            max_retries: Retries after a 429/503 or connection error before giving up
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Upper bound for a single backoff delay
+            session: HTTP session to use (a new one by default)
+        """
+        self.max_concurrency = max_concurrency
+        self.domain_rate = domain_rate
+        self.domain_burst = domain_burst
+        self.interactive_weight = interactive_weight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = session or requests.Session()
+
+        # Per priority: domain -> deque of jobs, rotated so domains are served round-robin
+        self._queues: Dict[str, "OrderedDict[str, deque]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._backoff_until: Dict[str, float] = {}
+        self._backoff_streak: Dict[str, int] = {}
+        self._interactive_streak = 0
+
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "throttled": 0,
+            "wait_seconds": {p: 0.0 for p in PRIORITIES},
+            "dispatched": {p: 0 for p in PRIORITIES}
+        }
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"fetch-worker-{i}", daemon=True)
+            for i in range(max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self,
+               url: str,
+               headers: Optional[Dict[str, str]] = None,
+               priority: str = "interactive",
+               timeout: float = 10.0,
+               deadline: Optional[float] = None) -> Future:
+        """
+        Queue a GET request
+
+        Args:
+            url: URL to fetch
+            headers: Request headers
+            priority: 'interactive' for user-facing fetches, 'background' for crawlers
+            timeout: Timeout of each attempt in seconds
+            deadline: Seconds the whole request may take, queueing and backoff
+                included (None for no limit). A job still queued at its deadline
+                fails with requests.Timeout; a throttled response is returned as
+                is when the next retry couldn't start before the deadline.
+
+        Returns:
+            Future resolving to the requests.Response
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown fetch priority: {priority}")
+
+        if cassette.replaying:
+            # Replayed responses never reach a retailer, so skip the politeness queue
+            future = Future()
+            try:
+                future.set_result(cassette.http_get(None, url, headers))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        job = _FetchJob(url, dict(headers or {}), timeout, priority, deadline)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Fetch scheduler has been shut down")
+            self._enqueue(job)
+            self._stats["submitted"] += 1
+            self._condition.notify()
+        return job.future
+
+    def fetch(self,
+              url: str,
+              headers: Optional[Dict[str, str]] = None,
+              priority: str = "interactive",
+              timeout: float = 10.0,
+              deadline: Optional[float] = None) -> requests.Response:
+        """
+        Queue a GET request and wait for its response (see submit)
+
+        Interactive fetches are given INTERACTIVE_DEADLINE unless a deadline is
+        passed, so a throttling retailer can't hold a page render for minutes.
+        """
+        if deadline is None and priority == "interactive":
+            deadline = INTERACTIVE_DEADLINE
+        return self.submit(url, headers, priority, timeout, deadline).result()
+
+    def _enqueue(self, job: _FetchJob, front: bool = False):
+        domains = self._queues[job.priority]
+        if job.domain not in domains:
+            domains[job.domain] = deque()
+        if front:
+            domains[job.domain].appendleft(job)
+        else:
+            domains[job.domain].append(job)
+
+    def _domain_wait(self, domain: str, now: float) -> float:
+        """Seconds until the domain may be contacted again"""
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = self._buckets[domain] = TokenBucket(self.domain_rate, self.domain_burst)
+        return max(bucket.wait_time(now), self._backoff_until.get(domain, 0.0) - now)
+
+    def _priority_order(self):
+        """Weighted round-robin between interactive and background work"""
+        background_waiting = bool(self._queues["background"])
+        if background_waiting and self._interactive_streak >= self.interactive_weight:
+            return ("background", "interactive")
+        return PRIORITIES
+
+    def _expire_jobs(self, now: float) -> Optional[float]:
+        """
+        Fail queued jobs that reached their deadline
+
+        Returns:
+            Seconds until the next queued job's deadline (None if no job has one)
+        """
+        next_deadline = None
+        for domains in self._queues.values():
+            for domain in list(domains):
+                jobs = domains[domain]
+                for job in list(jobs):
+                    if job.deadline is None:
+                        continue
+                    if job.deadline <= now:
+                        jobs.remove(job)
+                        self._stats["failed"] += 1
+                        job.future.set_exception(requests.Timeout(f"Fetch of {job.url} passed its deadline"))
+                    elif next_deadline is None or job.deadline < next_deadline:
+                        next_deadline = job.deadline
+                if not jobs:
+                    del domains[domain]
+        return None if next_deadline is None else next_deadline - now
+
+    def _next_job(self):
+        """
+        Pick the next job that can be sent now
+
+        Returns:
+            (job, None) if a job is ready, otherwise (None, seconds to wait)
+        """
+        now = time.monotonic()
+        min_wait = self._expire_jobs(now)
+
+        for priority in self._priority_order():
+            domains = self._queues[priority]
+            for domain in list(domains):
+                wait = self._domain_wait(domain, now)
+                if wait > 0:
+                    min_wait = wait if min_wait is None else min(min_wait, wait)
+                    continue
+
+                jobs = domains.pop(domain)
+                job = jobs.popleft()
+                if jobs:
+                    # Re-insert at the end so other domains get their turn
+                    domains[domain] = jobs
+
+                self._buckets[domain].consume(now)
+                if priority == "interactive":
+                    self._interactive_streak += 1
+                else:
+                    self._interactive_streak = 0
+
+                self._stats["dispatched"][priority] += 1
+                self._stats["wait_seconds"][priority] += now - job.enqueued_at
+                return job, None
+
+        return None, min_wait
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job, wait = self._next_job()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait(wait)
+                    job, wait = self._next_job()
+                self._in_flight += 1
+
+            try:
+                self._execute(job)
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _execute(self, job: _FetchJob):
+        job.attempts += 1
+        timeout = job.timeout
+        if job.deadline is not None:
+            timeout = max(0.1, min(timeout, job.deadline - time.monotonic()))
+        try:
+            response = cassette.http_get(
+                lambda: self.session.get(job.url, headers=job.headers, timeout=timeout),
+                job.url,
+                job.headers
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not self._retry(job, None):
+                with self._condition:
+                    self._stats["failed"] += 1
+                job.future.set_exception(e)
+            return
+        except Exception as e:
+            with self._condition:
+                self._stats["failed"] += 1
+            job.future.set_exception(e)
+            return
+
+        if response.status_code in THROTTLE_STATUSES:
+            with self._condition:
+                self._stats["throttled"] += 1
+            if self._retry(job, response):
+                return
+        else:
+            with self._condition:
+                self._backoff_streak.pop(job.domain, None)
+
+        with self._condition:
+            self._stats["completed"] += 1
+        job.future.set_result(response)
+
+    def _retry(self, job: _FetchJob, response: Optional[requests.Response]) -> bool:
+        """
+        Back off the job's domain and requeue the job, if it has retries left
+
+        Returns:
+            True if the job was requeued
+        """
+        if job.attempts > self.max_retries:
+            return False
+
+        with self._condition:
+            streak = self._backoff_streak.get(job.domain, 0) + 1
+            self._backoff_streak[job.domain] = streak
+
+            # Exponential backoff with full jitter, never sooner than Retry-After
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (streak - 1))))
+            retry_after = _parse_retry_after(response)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.backoff_max))
+            if job.deadline is not None and time.monotonic() + delay >= job.deadline:
+                return False
+
+            self._backoff_until[job.domain] = max(self._backoff_until.get(job.domain, 0.0),
+                                                  time.monotonic() + delay)
+            self._stats["retries"] += 1
+            self._enqueue(job, front=True)
+            self._condition.notify_all()
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of queue and throughput metrics
+
+        Returns:
+            Dictionary with queue depths, in-flight count, counters and average queue wait
+        """
+        with self._condition:
+            queued = {p: sum(len(jobs) for jobs in self._queues[p].values()) for p in PRIORITIES}
+            queued_by_domain: Dict[str, int] = {}
+            for p in PRIORITIES:
+                for domain, jobs in self._queues[p].items():
+                    queued_by_domain[domain] = queued_by_domain.get(domain, 0) + len(jobs)
+
+            now = time.monotonic()
+            return {
+                "queued": queued,
+                "queued_by_domain": queued_by_domain,
+                "in_flight": self._in_flight,
+                "backed_off_domains": [d for d, until in self._backoff_until.items() if until > now],
+                "submitted": self._stats["submitted"],
+                "completed": self._stats["completed"],
+                "failed": self._stats["failed"],
+                "retries": self._stats["retries"],
+                "throttled": self._stats["throttled"],
+                "avg_wait_seconds": {
+                    p: self._stats["wait_seconds"][p] / self._stats["dispatched"][p]
+                    if self._stats["dispatched"][p] else 0.0
+                    for p in PRIORITIES
+                }
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers, cancelling jobs that have not been dispatched yet"""
+        with self._condition:
+            self._shutdown = True
+            for domains in self._queues.values():
+                for jobs in domains.values():
+                    for job in jobs:
+                        job.future.cancel()
+                domains.clear()
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+def _parse_retry_after(response: Optional[requests.Response]) -> Optional[float]:
+    """Read a Retry-After header given in seconds"""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+_scheduler: Optional[FetchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_fetch_scheduler() -> FetchScheduler:
+    """Get the process-wide fetch scheduler, creating it on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler()
+        return _scheduler
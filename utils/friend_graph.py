@@ -0,0 +1,311 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Iterable, Mapping, Set, Tuple
+
+import numpy as np
+
+class FriendGraph:
+    """
+    Undirected friendship graph.
+    Friendships live in compact CSR arrays (each user's friends are a sorted
+    slice of one int32 array), which bulk analytics and BFS read directly.
+    Users whose friendships changed since the last compaction are kept as
+    Python sets in an overlay, so point queries and writes stay O(1) while
+    the arrays are rebuilt only every `compact_threshold` changed users.
+    Invitation suggestions (friends of friends ranked by mutual friends) are
+    precomputed per user and dropped when an edge within two hops changes.
+    """
+
+    def __init__(self, adjacency: Optional[Mapping[str, Iterable[str]]] = None,
+                 compact_threshold: int = 4096, suggestion_pool: int = 50, max_cached_suggestions: int = 100000):
+        """
+        Initialize the graph
+
+        Args:
+            adjacency: Friend IDs per user ID; edges are made symmetric and deduplicated
+            compact_threshold: Number of changed users after which the CSR arrays are rebuilt
+            suggestion_pool: Number of suggestions precomputed per user
+            max_cached_suggestions: Number of users whose suggestions are kept
+        """
+        self.compact_threshold = compact_threshold
+        self.suggestion_pool = suggestion_pool
+        self.max_cached_suggestions = max_cached_suggestions
+
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._overlay: Dict[int, Set[int]] = {}
+        self._suggestions: "OrderedDict[int, List[Tuple[int, int]]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        if adjacency:
+            sources, targets = [], []
+            for user_id, friend_ids in adjacency.items():
+                source = self._node(user_id)
+                for friend_id in friend_ids:
+                    sources.append(source)
+                    targets.append(self._node(friend_id))
+            self._build(np.asarray(sources, dtype=np.int32), np.asarray(targets, dtype=np.int32))
+
+    @classmethod
+    def from_edges(cls, user_ids: List[str], sources: np.ndarray, targets: np.ndarray, **kwargs) -> "FriendGraph":
+        """
+        Build a graph from edge arrays
+
+        Args:
+            user_ids: User ID of each node index
+            sources, targets: Node indexes of the edges, in either direction
+        """
+        graph = cls(**kwargs)
+        graph._ids = list(user_ids)
+        graph._index = {user_id: i for i, user_id in enumerate(graph._ids)}
+        graph._build(np.asarray(sources, dtype=np.int32), np.asarray(targets, dtype=np.int32))
+        return graph
+
+    def _node(self, user_id: str) -> int:
+        index = self._index.get(user_id)
+        if index is None:
+            index = self._index[user_id] = len(self._ids)
+            self._ids.append(user_id)
+        return index
+
+    def _build(self, sources: np.ndarray, targets: np.ndarray):
+        # Symmetric, deduplicated, without self-loops; sorting the combined
+        # key leaves each row's friends sorted
+        node_count = len(self._ids)
+        keep = sources != targets
+        rows = np.concatenate([sources[keep], targets[keep]]).astype(np.int64)
+        cols = np.concatenate([targets[keep], sources[keep]]).astype(np.int64)
+        keys = np.sort(rows * max(node_count, 1) + cols)
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if len(keys) else keys
+        rows, cols = np.divmod(keys, max(node_count, 1))
+
+        self._indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=node_count), out=self._indptr[1:])
+        self._indices = cols.astype(np.int32)
+        self._overlay = {}
+
+    def _row(self, node: int) -> np.ndarray:
+        if node + 1 >= len(self._indptr):
+            return self._indices[:0]
+        return self._indices[self._indptr[node]:self._indptr[node + 1]]
+
+    def _neighbor_array(self, node: int) -> np.ndarray:
+        overlay = self._overlay.get(node)
+        if overlay is not None:
+            return np.fromiter(sorted(overlay), dtype=np.int32, count=len(overlay))
+        return self._row(node)
+
+    def compact(self):
+        """Fold the overlay of changed users back into the CSR arrays"""
+        with self._lock:
+            if not self._overlay:
+                return
+            node_count = len(self._ids)
+            sources = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int32), np.diff(self._indptr))
+            targets = self._indices
+
+            # Drop the changed rows from the arrays and add their overlay sets
+            changed = np.zeros(node_count, dtype=bool)
+            changed[list(self._overlay)] = True
+            keep = ~changed[sources]
+            extra_sources = [node for node, friends in self._overlay.items() for _ in friends]
+            extra_targets = [friend for friends in self._overlay.values() for friend in friends]
+            sources = np.concatenate([sources[keep], np.asarray(extra_sources, dtype=np.int32)])
+            targets = np.concatenate([targets[keep], np.asarray(extra_targets, dtype=np.int32)])
+
+            # Both directions of a changed edge are in the overlay, so building
+            # from one direction per row is enough; _build symmetrizes again
+            self._build(sources, targets)
+
+    def _change(self, user_id: str, friend_id: str, add: bool):
+        with self._lock:
+            a, b = self._node(user_id), self._node(friend_id)
+            if a == b:
+                return
+            for node, other in ((a, b), (b, a)):
+                friends = self._overlay.get(node)
+                if friends is None:
+                    friends = self._overlay[node] = set(self._row(node).tolist())
+                if add:
+                    friends.add(other)
+                else:
+                    friends.discard(other)
+
+            # Suggestions of anyone within two hops of the edge may change
+            for node in {a, b} | self._overlay[a] | self._overlay[b]:
+                self._suggestions.pop(node, None)
+
+            if len(self._overlay) >= self.compact_threshold:
+                self.compact()
+
+    def add_friendship(self, user_id: str, friend_id: str):
+        """Make two users friends (both directions)"""
+        self._change(user_id, friend_id, add=True)
+
+    def remove_friendship(self, user_id: str, friend_id: str):
+        """Remove the friendship between two users"""
+        self._change(user_id, friend_id, add=False)
+
+    def friends(self, user_id: str) -> List[str]:
+        """Friend IDs of a user"""
+        node = self._index.get(user_id)
+        if node is None:
+            return []
+        with self._lock:
+            return [self._ids[friend] for friend in self._neighbor_array(node).tolist()]
+
+    def degree(self, user_id: str) -> int:
+        """Number of friends of a user"""
+        node = self._index.get(user_id)
+        if node is None:
+            return 0
+        with self._lock:
+            overlay = self._overlay.get(node)
+            return len(overlay) if overlay is not None else len(self._row(node))
+
+    def are_friends(self, user_id: str, other_id: str) -> bool:
+        """Whether two users are friends"""
+        a, b = self._index.get(user_id), self._index.get(other_id)
+        if a is None or b is None:
+            return False
+        with self._lock:
+            overlay = self._overlay.get(a)
+            if overlay is not None:
+                return b in overlay
+            row = self._row(a)
+            position = np.searchsorted(row, b)
+            return bool(position < len(row) and row[position] == b)
+
+    def mutual_friends(self, user_id: str, other_id: str) -> List[str]:
+        """Friends two users have in common"""
+        a, b = self._index.get(user_id), self._index.get(other_id)
+        if a is None or b is None:
+            return []
+        with self._lock:
+            common = np.intersect1d(self._neighbor_array(a), self._neighbor_array(b), assume_unique=True)
+            return [self._ids[node] for node in common.tolist()]
+
+    def mutual_friend_count(self, user_id: str, other_id: str) -> int:
+        """Number of friends two users have in common"""
+        return len(self.mutual_friends(user_id, other_id))
+
+    def within(self, user_id: str, depth: int = 2) -> Dict[str, int]:
+        """
+        Users reachable from a user in at most `depth` friendships
+
+        Returns:
+            Hop distance per reachable user ID (the user itself is left out)
+        """
+        source = self._index.get(user_id)
+        if source is None:
+            return {}
+
+        with self._lock:
+            distances = {source: 0}
+            frontier = np.asarray([source], dtype=np.int32)
+            for hop in range(1, depth + 1):
+                if not len(frontier):
+                    break
+                # Gather the frontier's rows in one vectorized step; overlay rows separately
+                in_overlay = np.fromiter((node in self._overlay for node in frontier.tolist()), dtype=bool,
+                                         count=len(frontier))
+                plain = frontier[~in_overlay]
+                plain = plain[plain + 1 < len(self._indptr)]  # users added since the last build have no row
+                starts, ends = self._indptr[plain], self._indptr[plain + 1]
+                lengths = ends - starts
+                offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                reached = self._indices[offsets + np.arange(lengths.sum())]
+                extra = [friend for node in frontier[in_overlay].tolist() for friend in self._overlay[node]]
+                if extra:
+                    reached = np.concatenate([reached, np.asarray(extra, dtype=np.int32)])
+
+                next_frontier = []
+                for node in np.unique(reached).tolist():
+                    if node not in distances:
+                        distances[node] = hop
+                        next_frontier.append(node)
+                frontier = np.asarray(next_frontier, dtype=np.int32)
+
+            del distances[source]
+            return {self._ids[node]: hop for node, hop in distances.items()}
+
+    def _compute_suggestions(self, node: int) -> List[Tuple[int, int]]:
+        friends = self._neighbor_array(node)
+        if not len(friends):
+            return []
+        candidates = np.concatenate([self._neighbor_array(friend) for friend in friends.tolist()])
+        candidates, mutual = np.unique(candidates, return_counts=True)
+
+        # Not the user, and not already friends
+        keep = (candidates != node) & ~np.isin(candidates, friends, assume_unique=True)
+        candidates, mutual = candidates[keep], mutual[keep]
+
+        # Most mutual friends first; ties by node index for a stable order
+        order = np.lexsort((candidates, -mutual))[:self.suggestion_pool]
+        return list(zip(candidates[order].tolist(), mutual[order].tolist()))
+
+    def suggestions(self, user_id: str, limit: int = 10, exclude: Iterable[str] = ()) -> List[Tuple[str, int]]:
+        """
+        Friends of friends to invite, ranked by mutual friends
+
+        Args:
+            user_id: User to suggest people for
+            limit: Maximum number of suggestions
+            exclude: User IDs to leave out (e.g. already invited)
+
+        Returns:
+            (user ID, mutual friend count) pairs, most mutual friends first
+        """
+        node = self._index.get(user_id)
+        if node is None:
+            return []
+
+        with self._lock:
+            pool = self._suggestions.get(node)
+            if pool is None:
+                pool = self._suggestions[node] = self._compute_suggestions(node)
+                if len(self._suggestions) > self.max_cached_suggestions:
+                    self._suggestions.popitem(last=False)
+            else:
+                self._suggestions.move_to_end(node)
+
+        skip = set(exclude)
+        return [(self._ids[candidate], mutual) for candidate, mutual in pool
+                if self._ids[candidate] not in skip][:limit]
+
+    def precompute_suggestions(self, user_ids: Iterable[str]):
+        """Compute suggestions ahead of time (e.g. for active users)"""
+        for user_id in user_ids:
+            self.suggestions(user_id, 0)
+
+    def csr(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        The graph as CSR arrays for bulk analytics (compacts first)
+
+        Returns:
+            User ID per node, row pointers (len nodes + 1) and friend node indexes
+        """
+        with self._lock:
+            self.compact()
+            if len(self._indptr) < len(self._ids) + 1:
+                # Users added without friendships
+                padding = np.full(len(self._ids) + 1 - len(self._indptr), self._indptr[-1])
+                self._indptr = np.concatenate([self._indptr, padding])
+            return list(self._ids), self._indptr, self._indices
+
+    def degree_stats(self) -> Dict[str, Any]:
+        """Friend count distribution over all users"""
+        _, indptr, _ = self.csr()
+        degrees = np.diff(indptr)
+        if not len(degrees):
+            return {"users": 0, "friendships": 0, "mean": 0.0, "median": 0.0, "max": 0, "isolated": 0}
+        return {
+            "users": int(len(degrees)),
+            "friendships": int(degrees.sum() // 2),
+            "mean": float(degrees.mean()),
+            "median": float(np.median(degrees)),
+            "max": int(degrees.max()),
+            "isolated": int((degrees == 0).sum())
+        }
@@ -254,6 +254,36 @@ class FundAllocator:
             
         return result
     
+    def handle_price_changes_batch(self, price_changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Handle a batch of price changes detected by the price refresh crawler
+        
+        Args:
+            price_changes: List of dictionaries with 'original_price', 'current_price',
+                'total_collected' and 'contributors' keys. Any other keys (such as
+                'event_id' and 'item_id') are copied onto the matching result.
+            
+        Returns:
+            List of price change strategies, in the same order as the input
+        """
+        results = []
+        for change in price_changes:
+            result = self.handle_price_changes(
+                change['original_price'],
+                change['current_price'],
+                change.get('total_collected', 0.0),
+                change.get('contributors', [])
+            )
+            
+            # Carry identifying fields through so callers can route each result
+            for key, value in change.items():
+                if key not in result:
+                    result[key] = value
+            
+            results.append(result)
+            
+        return results
+    
     def prioritize_multi_item_purchase(self,
                                       gift_list: List[Dict[str, Any]],
                                       total_raised: float,
@@ -344,4 +374,55 @@ class FundAllocator:
             result['assessment'] = 'reasonable_price'
             result['reason'] = 'Price is within normal market range'
             
-        return result 
\ No newline at end of file
+        return result
+    
+    def handle_fraud_prevention_with_history(self,
+                                             gift_price: float,
+                                             history_stats: Optional[Dict[str, float]]) -> Dict[str, Any]:
+        """
+        Check a gift's price against its observed price history
+        
+        Uses the median and median absolute deviation (MAD) of past observations,
+        so a few outlier prices (flash sales, scraping errors) don't skew the check.
+        
+        Args:
+            gift_price: The listed price of the gift
+            history_stats: Window statistics from PriceHistoryStore.window_stats
+            
+        Returns:
+            Fraud assessment
+        """
+        if not history_stats or not history_stats.get('count'):
+            return {
+                'assessment': 'unknown',
+                'reason': 'No price history available for comparison'
+            }
+            
+        median_price = history_stats['median']
+        price_difference_pct = abs(gift_price - median_price) / median_price
+        
+        # Robust z-score; 1.4826 scales the MAD to a standard deviation for normal data
+        robust_spread = 1.4826 * history_stats['mad']
+        robust_z = abs(gift_price - median_price) / robust_spread if robust_spread > 0 else math.inf
+        
+        result = {
+            'gift_price': gift_price,
+            'average_market_price': history_stats['mean'],
+            'median_market_price': median_price,
+            'price_range': {'min': history_stats['min'], 'max': history_stats['max']},
+            'difference_percentage': price_difference_pct * 100,
+            'robust_z_score': robust_z,
+            'observations': history_stats['count']
+        }
+        
+        if price_difference_pct > 0.15 and robust_z > 3.5:
+            result['assessment'] = 'potential_fraud'
+            if gift_price > median_price:
+                result['reason'] = 'Price is significantly higher than its recent price history'
+            else:
+                result['reason'] = 'Price is significantly lower than its recent price history (potential scam or counterfeit)'
+        else:
+            result['assessment'] = 'reasonable_price'
+            result['reason'] = 'Price is within its normal historical range'
+            
+        return result
@@ -0,0 +1,297 @@
+import json
+import re
+import time
+from html import escape as html_escape
+from html.parser import HTMLParser
+from typing import Dict, List, Any, Optional
+
+# Elements that never carry product information
+DROP_TAGS = {
+    "script", "style", "noscript", "svg", "canvas", "iframe", "template", "object", "embed",
+    "nav", "header", "footer", "aside", "form", "button", "input", "select", "textarea",
+    "link", "meta", "picture", "video", "audio", "map"
+}
+
+# Elements without a closing tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Class/id tokens that mark page chrome, reviews and cross-selling blocks
+BOILERPLATE_TOKENS = {
+    "nav", "navbar", "navigation", "menu", "breadcrumb", "breadcrumbs", "footer", "masthead",
+    "cookie", "cookies", "consent", "banner", "promo", "newsletter", "subscribe", "social", "share",
+    "sidebar", "review", "reviews", "comment", "comments", "qa", "questions", "related",
+    "recommendations", "recommended", "carousel", "sponsored", "ad", "ads", "advert", "modal", "popup"
+}
+
+# Attributes worth keeping for the LLM; everything else (classes, styles, tracking data) is dropped
+KEEP_ATTRIBUTES = {"itemprop", "itemtype", "content", "alt"}
+
+# Elements that can hold a whole product block (a "product-title" span or a
+# "single-product" body class doesn't make an element the block)
+CONTAINER_TAGS = {"div", "section", "article", "main"}
+
+# Elements a following sibling of the same kind closes implicitly (<li>One<li>Two)
+IMPLICITLY_CLOSED_TAGS = {"li", "p", "option", "dt", "dd", "tr", "td", "th"}
+
+# Open Graph / product meta properties that state price, availability and identity
+PRODUCT_META_PREFIXES = ("og:title", "og:description", "og:price:", "product:price:", "product:availability",
+                         "product:brand", "product:condition", "product:retailer_item_id")
+
+# JSON-LD types worth passing on; breadcrumbs, organizations and the like are dropped
+JSON_LD_PRODUCT_TYPES = {"Product", "ProductGroup", "Offer", "AggregateOffer"}
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+CLASS_TOKEN_SPLIT = re.compile(r"[\s_\-]+")
+
+class _Node:
+    """Minimal element node built by the reducer's parser"""
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["_Node"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Any] = []  # _Node or str
+        self.parent = parent
+
+class _TreeBuilder(HTMLParser):
+    """
+    Builds a lightweight element tree, skipping dropped subtrees as it parses.
+    Product meta tags and JSON-LD product data are collected wherever they
+    appear (usually in <head>, outside the main block).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("#root", {}, None)
+        self.current = self.root
+        # Open elements of the dropped subtree being skipped, its root first
+        self.skip_stack: List[str] = []
+        self.product_meta: List[Dict[str, str]] = []
+        self.json_ld: List[str] = []
+        self._json_ld_parts: Optional[List[str]] = None
+
+    def _collect(self, tag: str, attrs: Dict[str, str]):
+        if tag == "meta":
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            if attrs.get("content") and name.startswith(PRODUCT_META_PREFIXES):
+                self.product_meta.append({"property": name, "content": attrs["content"]})
+        elif tag == "script" and attrs.get("type", "").lower() == "application/ld+json":
+            self._json_ld_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        self._collect(tag, attrs)
+
+        if self.skip_stack and tag in IMPLICITLY_CLOSED_TAGS and self.skip_stack[-1] == tag:
+            # A sibling closes the open one, which may be the skipped root itself
+            self.skip_stack.pop()
+        if self.skip_stack:
+            if tag not in VOID_TAGS:
+                self.skip_stack.append(tag)
+            return
+
+        if _is_boilerplate(tag, attrs):
+            if tag not in VOID_TAGS:
+                self.skip_stack.append(tag)
+            return
+
+        node = _Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        self._collect(tag, attrs)
+        if not self.skip_stack and not _is_boilerplate(tag, attrs):
+            self.current.children.append(_Node(tag, attrs, self.current))
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._json_ld_parts is not None:
+            self.json_ld.append("".join(self._json_ld_parts))
+            self._json_ld_parts = None
+
+        # Walk up to the matching open element, tolerating unclosed tags
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+
+        if self.skip_stack:
+            if tag in self.skip_stack:
+                # Close the matching open element, and any left unclosed inside it
+                del self.skip_stack[len(self.skip_stack) - 1 - self.skip_stack[::-1].index(tag):]
+                return
+            if node is self.root:
+                # Stray end tag
+                return
+            # Closes an element around the dropped subtree, which ends there too
+            self.skip_stack.clear()
+
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        if self._json_ld_parts is not None:
+            self._json_ld_parts.append(data)
+        elif not self.skip_stack and data.strip():
+            self.current.children.append(data)
+
+def _is_boilerplate(tag: str, attrs: Dict[str, str]) -> bool:
+    """Check whether an element should be dropped along with its subtree"""
+    if tag == "meta" and "itemprop" in attrs:
+        # Microdata meta tags carry facts such as the price currency
+        return False
+    if tag in DROP_TAGS:
+        return True
+    if attrs.get("aria-hidden") == "true" or "hidden" in attrs:
+        return True
+    if attrs.get("role") in ("navigation", "banner", "contentinfo", "complementary", "dialog"):
+        return True
+
+    tokens = set(CLASS_TOKEN_SPLIT.split(f"{attrs.get('class', '')} {attrs.get('id', '')}".lower()))
+    return bool(tokens & BOILERPLATE_TOKENS)
+
+def _json_ld_types(value: Any) -> set:
+    """All @type values in a JSON-LD document, including nested ones (offers, @graph)"""
+    types = set()
+    if isinstance(value, dict):
+        declared = value.get("@type")
+        types.update(declared if isinstance(declared, list) else [declared])
+        for child in value.values():
+            types |= _json_ld_types(child)
+    elif isinstance(value, list):
+        for child in value:
+            types |= _json_ld_types(child)
+    return types
+
+def _product_json_ld(blocks: List[str]) -> List[str]:
+    """Compact JSON of the JSON-LD blocks that describe a product or offer"""
+    kept = []
+    for block in blocks:
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        if _json_ld_types(data) & JSON_LD_PRODUCT_TYPES:
+            kept.append(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return kept
+
+def _text_length(node: _Node) -> int:
+    total = 0
+    for child in node.children:
+        total += len(child) if isinstance(child, str) else _text_length(child)
+    return total
+
+def _find_main_block(root: _Node) -> _Node:
+    """Locate the element that most likely holds the product details"""
+    schema_product = None
+    product_blocks = []
+    main = body = None
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if "schema.org/product" in node.attrs.get("itemtype", "").lower():
+            schema_product = schema_product or node
+        tokens = set(CLASS_TOKEN_SPLIT.split(f"{node.attrs.get('class', '')} {node.attrs.get('id', '')}".lower()))
+        if ("product" in tokens or "pdp" in tokens) and node.tag in CONTAINER_TAGS:
+            product_blocks.append(node)
+        if (node.tag == "main" or node.attrs.get("role") == "main") and main is None:
+            main = node
+        if node.tag == "body" and body is None:
+            body = node
+        stack.extend(child for child in node.children if isinstance(child, _Node))
+
+    if schema_product is not None:
+        return schema_product
+    if product_blocks:
+        return max(product_blocks, key=_text_length)
+    return main or body or root
+
+def _serialize(node: _Node, parts: List[str]):
+    """Write compact HTML for a node, dropping empty elements and noisy attributes"""
+    # The parser unescapes text and attribute values (convert_charrefs), so they are escaped again
+    if node.tag == "#root":
+        for child in node.children:
+            if isinstance(child, str):
+                parts.append(html_escape(WHITESPACE_PATTERN.sub(" ", child), quote=False))
+            else:
+                _serialize(child, parts)
+        return
+
+    attrs = "".join(
+        f' {name}="{html_escape(value)}"' for name, value in node.attrs.items() if name in KEEP_ATTRIBUTES and value
+    )
+
+    if node.tag in VOID_TAGS:
+        # Only images with alt text or microdata tags carry information
+        if attrs:
+            parts.append(f"<{node.tag}{attrs}>")
+        return
+
+    start = len(parts)
+    parts.append(f"<{node.tag}{attrs}>")
+    for child in node.children:
+        if isinstance(child, str):
+            parts.append(html_escape(WHITESPACE_PATTERN.sub(" ", child), quote=False))
+        else:
+            _serialize(child, parts)
+
+    if len(parts) == start + 1 and not attrs:
+        # Empty element: drop it entirely
+        parts.pop()
+        return
+    parts.append(f"</{node.tag}>")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in a text
+
+    Counts words and punctuation marks, which tracks BPE tokenizers closely
+    enough to compare page sizes before and after reduction.
+
+    Args:
+        text: Text or HTML to measure
+
+    Returns:
+        Estimated token count
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+def reduce_product_html(html: str) -> Dict[str, Any]:
+    """
+    Shrink a product page to the markup the LLM actually needs
+
+    Drops scripts, styles, navigation, reviews and other boilerplate, extracts
+    the main product block, strips presentational attributes and compacts
+    whitespace. Product meta tags (og:price, product:price, ...) and JSON-LD
+    Product/Offer data are kept ahead of the block.
+
+    Args:
+        html: Raw HTML of the product page
+
+    Returns:
+        Dictionary with the reduced 'html', 'tokens_before', 'tokens_after' and
+        'reduction_ms' (time spent reducing)
+    """
+    started = time.perf_counter()
+
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+
+    # Structured product data first: it states the price more reliably than the page text
+    parts: List[str] = [f'<meta property="{meta["property"]}" content="{html_escape(meta["content"])}">'
+                        for meta in builder.product_meta]
+    parts.extend(f'<script type="application/ld+json">{block}</script>'
+                 for block in _product_json_ld(builder.json_ld))
+    _serialize(_find_main_block(builder.root), parts)
+    reduced = WHITESPACE_PATTERN.sub(" ", "".join(parts)).replace("> <", "><").strip()
+
+    return {
+        "html": reduced,
+        "tokens_before": estimate_tokens(html),
+        "tokens_after": estimate_tokens(reduced),
+        "reduction_ms": (time.perf_counter() - started) * 1000
+    }
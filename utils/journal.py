@@ -0,0 +1,476 @@
+import datetime
+import glob
+import logging
+import mmap
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Persistence configuration, read from the environment:
+#   HUBSHUB_DATA_DIR         directory for the journal and snapshots (unset = in-memory only)
+#   HUBSHUB_FSYNC            always | interval | never
+#   HUBSHUB_SNAPSHOT_EVERY   journal records between snapshots
+FSYNC_ALWAYS = "always"      # fsync every group commit before acknowledging it
+FSYNC_INTERVAL = "interval"  # fsync at most every fsync_interval seconds
+FSYNC_NEVER = "never"        # leave flushing to the OS
+
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+# Journal record: payload length, CRC32 of the payload, sequence number
+_RECORD_HEADER = struct.Struct("<IIQ")
+
+# Snapshot file: magic, metadata length, buffer count; then (offset, length) per buffer,
+# the pickled metadata and the raw buffers, each aligned to 64 bytes
+_SNAPSHOT_MAGIC = b"HUBSNAP1"
+_SNAPSHOT_HEADER = struct.Struct("<8sQI")
+_BUFFER_ENTRY = struct.Struct("<QQ")
+_ALIGNMENT = 64
+
+class Journal:
+    """
+    Write-ahead journal with group commit.
+    append() only pickles the record and queues it, so the write path doesn't
+    wait for the disk; a writer thread drains the queue and writes every record
+    queued meanwhile with one write (and at most one fsync). Callers that need
+    durability wait for their sequence number with wait_durable().
+    """
+
+    def __init__(self, directory: str, fsync: str = FSYNC_INTERVAL, fsync_interval: float = 1.0,
+                 next_seq: int = 1):
+        """
+        Open a journal for appending
+
+        Args:
+            directory: Directory of the journal segments
+            fsync: One of FSYNC_POLICIES
+            fsync_interval: Seconds between fsyncs with FSYNC_INTERVAL
+            next_seq: Sequence number of the next record (one past the last recovered record)
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue: "queue.Queue[Optional[Tuple[int, Any]]]" = queue.Queue()
+        self._seq_lock = threading.Lock()
+        self._next_seq = next_seq
+        self._durable_seq = next_seq - 1
+        self._durable = threading.Condition()
+        self._last_fsync = time.monotonic()
+        self.metrics = {"records": 0, "batches": 0, "fsyncs": 0, "bytes": 0}
+
+        self._file = open(segment_path(directory, next_seq), "ab")
+        self._thread = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the last record appended"""
+        return self._next_seq - 1
+
+    def append(self, op: str, *args) -> int:
+        """
+        Queue a record
+
+        Returns:
+            The record's sequence number
+        """
+        payload = pickle.dumps((op, args), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._seq_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._queue.put((seq, payload))
+        return seq
+
+    def rotate(self) -> int:
+        """
+        Start a new segment after the last record appended so far, waiting
+        until the old segments are written and fsynced
+
+        Returns:
+            The sequence number the old segments end at
+        """
+        rotated = threading.Event()
+        with self._seq_lock:
+            seq = self._next_seq - 1
+            self._queue.put((-seq, rotated))
+        rotated.wait()
+        return seq
+
+    def wait_durable(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """Wait until a record is written (and fsynced, as the policy requires)"""
+        with self._durable:
+            return self._durable.wait_for(lambda: self._durable_seq >= seq, timeout)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Group commit: take everything queued while the previous batch was written
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = False
+            chunks = []
+            last_seq = None
+            for record in batch:
+                if record is None:
+                    closing = True
+                    continue
+                seq, payload = record
+                if seq < 0:
+                    # Rotation marker: finish the current segment first
+                    self._write(chunks, force_sync=True)
+                    chunks = []
+                    self._file.close()
+                    self._file = open(segment_path(self.directory, -seq + 1), "ab")
+                    payload.set()
+                    continue
+                chunks.append(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload), seq))
+                chunks.append(payload)
+                last_seq = seq
+                self.metrics["records"] += 1
+
+            self._write(chunks, force_sync=closing)
+            if last_seq is not None:
+                with self._durable:
+                    self._durable_seq = max(self._durable_seq, last_seq)
+                    self._durable.notify_all()
+            if closing:
+                self._file.close()
+                return
+
+    def _write(self, chunks: List[bytes], force_sync: bool = False):
+        if chunks:
+            data = b"".join(chunks)
+            self._file.write(data)
+            self._file.flush()
+            self.metrics["batches"] += 1
+            self.metrics["bytes"] += len(data)
+
+        now = time.monotonic()
+        if force_sync or (chunks and (self.fsync == FSYNC_ALWAYS or (
+                self.fsync == FSYNC_INTERVAL and now - self._last_fsync >= self.fsync_interval))):
+            if self.fsync != FSYNC_NEVER:
+                os.fsync(self._file.fileno())
+                self.metrics["fsyncs"] += 1
+            self._last_fsync = now
+
+    def close(self):
+        """Write everything queued and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+def segment_path(directory: str, first_seq: int) -> str:
+    return os.path.join(directory, f"journal-{first_seq:020d}.log")
+
+def snapshot_path(directory: str, seq: int) -> str:
+    return os.path.join(directory, f"snapshot-{seq:020d}.bin")
+
+def _seq_of(path: str) -> int:
+    return int(os.path.basename(path).split("-")[1].split(".")[0])
+
+def read_journal(directory: str, after_seq: int = 0) -> Iterator[Tuple[int, str, tuple]]:
+    """
+    Read journal records in order
+
+    Args:
+        directory: Journal directory
+        after_seq: Skip records up to this sequence number
+
+    Yields:
+        (seq, op, args) per record. Reading a segment stops at a torn or corrupt
+        record, which can only be the tail of the last write before a crash, and
+        goes on with the next segment (written after recovering from the crash).
+    """
+    segments = sorted(glob.glob(os.path.join(directory, "journal-*.log")), key=_seq_of)
+    # Only the segments that can hold records after after_seq
+    starts = [_seq_of(path) for path in segments]
+    first = max([i for i, start in enumerate(starts) if start <= after_seq + 1] or [0])
+
+    for path in segments[first:]:
+        with open(path, "rb") as f:
+            data = f.read()
+        for _, seq, payload in _segment_records(data):
+            if seq > after_seq:
+                op, args = pickle.loads(payload)
+                yield seq, op, args
+                after_seq = seq
+
+def _segment_records(data: bytes) -> Iterator[Tuple[int, int, bytes]]:
+    """(end offset, seq, payload) of a segment's records, up to the first torn or corrupt one"""
+    position = 0
+    while position + _RECORD_HEADER.size <= len(data):
+        length, checksum, seq = _RECORD_HEADER.unpack_from(data, position)
+        payload = data[position + _RECORD_HEADER.size:position + _RECORD_HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        position += _RECORD_HEADER.size + length
+        yield position, seq, payload
+
+def truncate_torn_tails(directory: str) -> int:
+    """
+    Cut the torn or corrupt tail off every journal segment, so records
+    appended to a segment later are readable
+
+    Returns:
+        The number of bytes removed
+    """
+    removed = 0
+    for path in glob.glob(os.path.join(directory, "journal-*.log")):
+        with open(path, "rb") as f:
+            data = f.read()
+        valid = 0
+        for valid, _, _ in _segment_records(data):
+            pass
+        if valid < len(data):
+            os.truncate(path, valid)
+            removed += len(data) - valid
+    return removed
+
+def write_snapshot(path: str, state: Any):
+    """
+    Write a snapshot: the state pickled with its large buffers (numpy arrays)
+    stored out of band, so they can be mapped back without copying
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    meta = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+
+    table_size = _SNAPSHOT_HEADER.size + _BUFFER_ENTRY.size * len(raws)
+    offset = _align(table_size + len(meta))
+    entries = []
+    for raw in raws:
+        entries.append((offset, raw.nbytes))
+        offset = _align(offset + raw.nbytes)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, len(meta), len(raws)))
+        for entry in entries:
+            f.write(_BUFFER_ENTRY.pack(*entry))
+        f.write(meta)
+        for (start, _), raw in zip(entries, raws):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def read_snapshot(path: str) -> Any:
+    """Load a snapshot through mmap; its numpy arrays are read-only views of the mapping"""
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    magic, meta_length, buffer_count = _SNAPSHOT_HEADER.unpack_from(view, 0)
+    if magic != _SNAPSHOT_MAGIC:
+        raise ValueError(f"Not a snapshot: {path}")
+
+    table = _SNAPSHOT_HEADER.size
+    buffers = [view[start:start + length] for start, length in
+               (_BUFFER_ENTRY.unpack_from(view, table + i * _BUFFER_ENTRY.size) for i in range(buffer_count))]
+    meta_start = table + buffer_count * _BUFFER_ENTRY.size
+    return pickle.loads(view[meta_start:meta_start + meta_length], buffers=buffers)
+
+def encode_columns(records: List[Dict[str, Any]], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Encode flat records column by column: numbers as numpy arrays, strings as
+    int32 codes into a table of distinct values. Stores may also provide
+    "cents" and "days" columns of amounts in cents and date ordinals (see
+    utils.contribution_ledger.ContributionLedger).
+    """
+    columns: Dict[str, Any] = {"count": len(records)}
+    for field in fields:
+        values = [record.get(field) for record in records]
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            columns[field] = ("number", np.asarray(values, dtype=np.float64))
+        else:
+            table: Dict[Any, int] = {}
+            codes = np.fromiter((table.setdefault(value, len(table)) for value in values), dtype=np.int32,
+                                count=len(values))
+            columns[field] = ("codes", codes, list(table))
+    return columns
+
+def decode_columns(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rebuild the records encoded by encode_columns"""
+    decoded = []
+    for field, column in columns.items():
+        if not isinstance(column, tuple):
+            # Counts and store-specific metadata
+            continue
+        if column[0] == "number":
+            decoded.append((field, column[1].tolist()))
+        elif column[0] == "cents":
+            decoded.append((field, [cents / 100 for cents in column[1].tolist()]))
+        elif column[0] == "days":
+            decoded.append((field, [datetime.date.fromordinal(day).isoformat() for day in column[1].tolist()]))
+        else:
+            table = column[2]
+            decoded.append((field, [table[code] for code in column[1].tolist()]))
+    names = [field for field, _ in decoded]
+    return [dict(zip(names, values)) for values in zip(*(values for _, values in decoded))]
+
+class Persistence:
+    """
+    Journal plus periodic snapshots for an in-memory store.
+    The store journals every mutation after applying it, as an idempotent
+    'put' record, so a snapshot taken while writes continue is still correct
+    once the journal records after it are replayed.
+    """
+
+    def __init__(self, directory: str, fsync: str = FSYNC_INTERVAL, snapshot_every: int = 10000,
+                 keep_snapshots: int = 2, retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        """
+        Initialize persistence (call recover() before recording)
+
+        Args:
+            directory: Directory for the journal segments and snapshots
+            fsync: One of FSYNC_POLICIES
+            snapshot_every: Journal records between snapshots
+            keep_snapshots: Number of snapshots kept on disk
+            retry_delay: Seconds before retrying a failed background snapshot, doubling
+                up to max_retry_delay while it keeps failing
+        """
+        self.directory = directory
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = keep_snapshots
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.journal: Optional[Journal] = None
+        self._capture_fn: Optional[Callable[[], Any]] = None
+        self._since_snapshot = 0
+        self._snapshotting = threading.Lock()
+        # Held by the background thread writing a snapshot, retries included
+        self._scheduled = threading.Lock()
+        self._closed = threading.Event()
+        self.last_recovery: Optional[Dict[str, Any]] = None
+
+    def recover(self, restore_fn: Callable[[Any], None], apply_fn: Callable[[str, tuple], None],
+                capture_fn: Callable[[], Any]):
+        """
+        Load the latest snapshot and replay the journal after it, then open the journal
+
+        Args:
+            restore_fn: Replaces the store's state with a snapshot's state
+            apply_fn: Applies one journal record (op, args)
+            capture_fn: Returns the store's current state for a snapshot
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._capture_fn = capture_fn
+        summary = {"snapshot_seq": 0, "replayed": 0}
+
+        started = time.perf_counter()
+        snapshots = sorted(glob.glob(os.path.join(self.directory, "snapshot-*.bin")), key=_seq_of)
+        last_seq = 0
+        if snapshots:
+            last_seq = summary["snapshot_seq"] = _seq_of(snapshots[-1])
+            restore_fn(read_snapshot(snapshots[-1]))
+        summary["snapshot_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for seq, op, args in read_journal(self.directory, last_seq):
+            apply_fn(op, args)
+            last_seq = seq
+            summary["replayed"] += 1
+        summary["replay_seconds"] = time.perf_counter() - started
+
+        # New records go to a fresh segment, or after the valid records of the one
+        # starting at the same seq; either way the torn tail must not precede them
+        summary["truncated_bytes"] = truncate_torn_tails(self.directory)
+        self.journal = Journal(self.directory, self.fsync, next_seq=last_seq + 1)
+        self._since_snapshot = summary["replayed"]
+        self.last_recovery = summary
+
+    def record(self, op: str, *args) -> int:
+        """Journal a mutation that was just applied; returns its sequence number"""
+        seq = self.journal.append(op, *args)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every and self._scheduled.acquire(blocking=False):
+            self._since_snapshot = 0
+            threading.Thread(target=self._snapshot_in_background, name="snapshot-writer", daemon=True).start()
+        return seq
+
+    def _snapshot_in_background(self):
+        """Snapshot, retrying with backoff until it succeeds, so the journal can't grow without bound"""
+        delay = self.retry_delay
+        try:
+            while not self._closed.is_set():
+                try:
+                    self.snapshot()
+                    return
+                except Exception:
+                    logger.exception("Snapshot failed; retrying in %.1f s", delay)
+                self._closed.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        finally:
+            self._scheduled.release()
+
+    def snapshot(self) -> Optional[int]:
+        """
+        Write a snapshot of the current state and drop the journal segments and
+        snapshots it makes obsolete
+
+        Returns:
+            The sequence number the snapshot covers, or None if one is already being written
+        """
+        if not self._snapshotting.acquire(blocking=False):
+            return None
+        try:
+            # Every record up to seq is applied before it is journaled, so the
+            # state captured now includes them; later records replay on top
+            seq = self.journal.rotate()
+            for attempt in range(3):
+                try:
+                    state = self._capture_fn()
+                    write_snapshot(snapshot_path(self.directory, seq), state)
+                    break
+                except RuntimeError:
+                    # A collection changed size while it was being copied
+                    if attempt == 2:
+                        raise
+
+            for path in sorted(glob.glob(os.path.join(self.directory, "snapshot-*.bin")), key=_seq_of)[:-self.keep_snapshots]:
+                os.remove(path)
+            for path in glob.glob(os.path.join(self.directory, "journal-*.log")):
+                if _seq_of(path) <= seq:
+                    os.remove(path)
+            return seq
+        finally:
+            self._snapshotting.release()
+
+    def close(self):
+        """Flush the journal"""
+        self._closed.set()
+        if self.journal:
+            self.journal.close()
+
+def persistence_from_environment() -> Optional[Persistence]:
+    """Persistence configured by HUBSHUB_DATA_DIR, or None to keep state in memory only"""
+    directory = os.environ.get("HUBSHUB_DATA_DIR")
+    if not directory:
+        return None
+    fsync = os.environ.get("HUBSHUB_FSYNC", FSYNC_INTERVAL).lower()
+    try:
+        snapshot_every = int(os.environ.get("HUBSHUB_SNAPSHOT_EVERY", "10000"))
+    except ValueError:
+        snapshot_every = 10000
+    return Persistence(directory, fsync if fsync in FSYNC_POLICIES else FSYNC_INTERVAL, snapshot_every)
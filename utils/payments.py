@@ -0,0 +1,303 @@
+import asyncio
+import datetime
+import random
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+from utils.data_manager import DataManager
+
+# Payment intent states
+PENDING = "pending"
+PROCESSING = "processing"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+TERMINAL_STATUSES = (SUCCEEDED, FAILED)
+
+# How long intents, idempotency keys and delivered event ids are remembered
+# (gateways such as Stripe keep idempotency keys for 24 hours too)
+RETENTION = datetime.timedelta(hours=24)
+
+class PaymentIntent:
+    """A wallet top-up, from creation until the gateway reports its outcome"""
+    __slots__ = ("id", "idempotency_key", "user_id", "amount", "payment_method",
+                 "status", "transaction_id", "failure_reason", "credit_failures", "created_at", "updated_at")
+
+    def __init__(self, idempotency_key: str, user_id: str, amount: float, payment_method: str):
+        self.id = f"pi_{uuid.uuid4().hex[:16]}"
+        self.idempotency_key = idempotency_key
+        self.user_id = user_id
+        self.amount = amount
+        self.payment_method = payment_method
+        self.status = PENDING
+        self.transaction_id: Optional[str] = None
+        self.failure_reason: Optional[str] = None
+        self.credit_failures = 0
+        self.created_at = datetime.datetime.now()
+        self.updated_at = self.created_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+class PaymentGateway:
+    """Interface of a payment gateway; outcomes are reported through the webhook"""
+
+    def __init__(self, webhook: Callable[[Dict[str, Any]], None]):
+        """
+        Initialize the gateway
+
+        Args:
+            webhook: Called with each gateway event (see PaymentProcessor.handle_webhook)
+        """
+        self.webhook = webhook
+
+    def charge(self, intent_id: str, amount: float, payment_method: str, idempotency_key: str):
+        """Start a charge without waiting for its outcome"""
+        raise NotImplementedError
+
+class LocalPaymentGateway(PaymentGateway):
+    """
+    Stand-in gateway simulating card processing locally.
+    All charges run as coroutines on one event loop thread, so any number of
+    concurrent top-ups are in flight without a blocked thread each.
+    """
+
+    def __init__(self, webhook: Callable[[Dict[str, Any]], None],
+                 latency: tuple = (0.5, 1.5), success_rate: float = 0.95,
+                 delivery_attempts: int = 5, redelivery_delay: float = 1.0):
+        """
+        Initialize the gateway
+
+        Args:
+            webhook: Called with each gateway event
+            latency: Range of simulated processing times in seconds
+            success_rate: Share of charges that succeed
+            delivery_attempts: Times an event is delivered while the webhook raises
+            redelivery_delay: Delay before the first redelivery, doubled after each
+        """
+        super().__init__(webhook)
+        self.latency = latency
+        self.success_rate = success_rate
+        self.delivery_attempts = delivery_attempts
+        self.redelivery_delay = redelivery_delay
+
+        # Idempotency key -> (intent ID, charge time), oldest first
+        self._charges: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="payment-gateway", daemon=True)
+        self._thread.start()
+
+    def charge(self, intent_id: str, amount: float, payment_method: str, idempotency_key: str):
+        # Like real gateways, a repeated idempotency key does not charge twice
+        now = datetime.datetime.now()
+        with self._lock:
+            while self._charges and next(iter(self._charges.values()))[1] < now - RETENTION:
+                self._charges.popitem(last=False)
+            if idempotency_key in self._charges:
+                return
+            self._charges[idempotency_key] = (intent_id, now)
+        asyncio.run_coroutine_threadsafe(self._process(intent_id, amount), self._loop)
+
+    async def _deliver(self, event: Dict[str, Any]):
+        """Call the webhook, redelivering with backoff while it raises (as real gateways do)"""
+        delay = self.redelivery_delay
+        for attempt in range(self.delivery_attempts):
+            try:
+                self.webhook(event)
+                return
+            except Exception:
+                pass
+            if attempt + 1 < self.delivery_attempts:
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def _process(self, intent_id: str, amount: float):
+        await self._deliver({"id": f"evt_{uuid.uuid4().hex[:16]}", "type": "payment_intent.processing",
+                             "intent_id": intent_id})
+
+        await asyncio.sleep(random.uniform(*self.latency))
+
+        if random.random() < self.success_rate:
+            event = {"type": "payment_intent.succeeded", "transaction_id": f"txn_{uuid.uuid4().hex[:16]}"}
+        else:
+            event = {"type": "payment_intent.payment_failed", "failure_reason": "Card declined"}
+        event.update({"id": f"evt_{uuid.uuid4().hex[:16]}", "intent_id": intent_id})
+        await self._deliver(event)
+
+    def shutdown(self):
+        """Stop the event loop (charges in flight are abandoned)"""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+class PaymentProcessor:
+    """Creates top-up intents and applies gateway outcomes to them"""
+
+    def __init__(self, credit_fn: Callable[[PaymentIntent], None], gateway_factory=LocalPaymentGateway,
+                 max_credit_attempts: int = 3, max_seen_events: int = 100000):
+        """
+        Initialize the processor
+
+        Args:
+            credit_fn: Credits the wallet for a succeeded intent; called until it
+                succeeds once per intent
+            gateway_factory: Builds the gateway from the webhook handler
+            max_credit_attempts: Deliveries of a success event whose crediting may
+                fail before the intent is marked failed
+            max_seen_events: Most delivered event ids remembered (besides the
+                RETENTION limit)
+        """
+        self.credit_fn = credit_fn
+        self.max_credit_attempts = max_credit_attempts
+        self.max_seen_events = max_seen_events
+        self.gateway = gateway_factory(self.handle_webhook)
+
+        # Both oldest first, so expired entries are pruned from the front
+        self._intents: "OrderedDict[str, PaymentIntent]" = OrderedDict()
+        self._seen_events: "OrderedDict[str, datetime.datetime]" = OrderedDict()
+        self._by_key: Dict[str, str] = {}
+        # Intents whose wallet credit is running
+        self._crediting = set()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: datetime.datetime):
+        """Forget intents and delivered event ids older than RETENTION (call with the lock held)"""
+        cutoff = now - RETENTION
+        while self._seen_events and next(iter(self._seen_events.values())) < cutoff:
+            self._seen_events.popitem(last=False)
+        while self._intents and next(iter(self._intents.values())).created_at < cutoff:
+            _, intent = self._intents.popitem(last=False)
+            self._by_key.pop(intent.idempotency_key, None)
+
+    def _handled(self, event_id: str, now: datetime.datetime):
+        """Record a delivered event as handled (call with the lock held)"""
+        self._seen_events[event_id] = now
+        if len(self._seen_events) > self.max_seen_events:
+            self._seen_events.popitem(last=False)
+
+    def create_top_up(self, user_id: str, amount: float, payment_method: str, idempotency_key: str) -> PaymentIntent:
+        """
+        Create a wallet top-up and send it to the gateway
+
+        Args:
+            user_id: User whose wallet is credited
+            amount: Amount to add
+            payment_method: Payment method shown on the transaction
+            idempotency_key: Identifies the top-up attempt; repeating it returns the
+                existing intent instead of charging again
+
+        Returns:
+            The (new or existing) payment intent
+        """
+        with self._lock:
+            self._prune(datetime.datetime.now())
+            existing = self._by_key.get(idempotency_key)
+            if existing is not None:
+                return self._intents[existing]
+
+            intent = PaymentIntent(idempotency_key, user_id, amount, payment_method)
+            self._intents[intent.id] = intent
+            self._by_key[idempotency_key] = intent.id
+
+        self.gateway.charge(intent.id, amount, payment_method, idempotency_key)
+        return intent
+
+    def get_intent(self, intent_id: str) -> Optional[PaymentIntent]:
+        """Get a payment intent by ID (None once it is older than RETENTION)"""
+        return self._intents.get(intent_id)
+
+    def handle_webhook(self, event: Dict[str, Any]) -> bool:
+        """
+        Apply a gateway event to its intent
+
+        Events may be delivered more than once; each is applied at most once, and
+        finished intents don't change state again. An event is only recorded as
+        delivered once it has been handled: if crediting the wallet fails, the
+        error is raised so the gateway redelivers the event, and after
+        max_credit_attempts failures the intent fails with the error as reason.
+
+        Returns:
+            Whether the event changed the intent
+        """
+        now = datetime.datetime.now()
+        with self._lock:
+            self._prune(now)
+            if event["id"] in self._seen_events:
+                return False
+
+            intent = self._intents.get(event["intent_id"])
+            if intent is None or intent.finished:
+                self._handled(event["id"], now)
+                return False
+
+            if event["type"] == "payment_intent.succeeded":
+                if intent.id in self._crediting:
+                    # Another delivery of the outcome is still crediting the wallet
+                    return False
+                self._crediting.add(intent.id)
+                intent.transaction_id = event["transaction_id"]
+            else:
+                self._handled(event["id"], now)
+                if event["type"] == "payment_intent.processing":
+                    intent.status = PROCESSING
+                elif event["type"] == "payment_intent.payment_failed":
+                    intent.status = FAILED
+                    intent.failure_reason = event.get("failure_reason")
+                else:
+                    return False
+                intent.updated_at = now
+                return True
+
+        # Credit outside the lock, so a slow wallet write doesn't hold up other intents.
+        # The intent is marked succeeded afterwards, so a poller that sees the new
+        # status also sees the new balance.
+        try:
+            self.credit_fn(intent)
+        except Exception as e:
+            with self._lock:
+                self._crediting.discard(intent.id)
+                intent.credit_failures += 1
+                intent.updated_at = datetime.datetime.now()
+                if intent.credit_failures < self.max_credit_attempts:
+                    raise
+                intent.status = FAILED
+                intent.failure_reason = f"Wallet credit failed: {e}"
+                self._handled(event["id"], intent.updated_at)
+            return True
+
+        with self._lock:
+            self._crediting.discard(intent.id)
+            intent.status = SUCCEEDED
+            intent.updated_at = datetime.datetime.now()
+            self._handled(event["id"], intent.updated_at)
+        return True
+
+    def metrics(self) -> Dict[str, int]:
+        """Number of intents per status"""
+        with self._lock:
+            counts = dict.fromkeys((PENDING, PROCESSING, SUCCEEDED, FAILED), 0)
+            for intent in self._intents.values():
+                counts[intent.status] += 1
+            return counts
+
+_processor: Optional[PaymentProcessor] = None
+_processor_lock = threading.Lock()
+
+def _credit_wallet(intent: PaymentIntent):
+    if not DataManager.credit_wallet(
+        intent.user_id,
+        intent.amount,
+        f"Added funds via {intent.payment_method}",
+        intent.transaction_id
+    ):
+        raise LookupError(f"user {intent.user_id} not found")
+
+def get_payment_processor() -> PaymentProcessor:
+    """Get the process-wide payment processor, creating it on first use"""
+    global _processor
+    with _processor_lock:
+        if _processor is None:
+            _processor = PaymentProcessor(_credit_wallet)
+        return _processor
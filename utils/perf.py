@@ -0,0 +1,89 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any
+
+# Show the timing table under the page footer (HUBSHUB_SHOW_TIMINGS=1)
+SHOW_TIMINGS = os.environ.get("HUBSHUB_SHOW_TIMINGS", "0") == "1"
+
+# Most recent durations kept per timed section
+MAX_SAMPLES = 500
+
+_samples: Dict[str, deque] = {}
+_backend_calls: Dict[str, deque] = {}
+_lock = threading.Lock()
+
+def record_timing(name: str, seconds: float):
+    """Record one duration for a named section"""
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=MAX_SAMPLES)
+        samples.append(seconds)
+
+def timed(name: str):
+    """
+    Decorator recording the wall-clock time of each call under a section name.
+    Used to compare per-interaction script time, e.g. full page runs vs fragment reruns.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def timing_summary() -> Dict[str, Dict[str, Any]]:
+    """
+    Summarize recorded timings
+
+    Returns:
+        Per section: number of samples, mean, p95 and max in milliseconds
+    """
+    with _lock:
+        snapshot = {name: sorted(samples) for name, samples in _samples.items()}
+
+    summary = {}
+    for name, values in snapshot.items():
+        if not values:
+            continue
+        summary[name] = {
+            "calls": len(values),
+            "mean_ms": 1000 * sum(values) / len(values),
+            "p95_ms": 1000 * values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max_ms": 1000 * values[-1]
+        }
+    return summary
+
+def record_backend_calls(name: str, count: int):
+    """Record the number of data backend calls made by one render of a section"""
+    with _lock:
+        samples = _backend_calls.get(name)
+        if samples is None:
+            samples = _backend_calls[name] = deque(maxlen=MAX_SAMPLES)
+        samples.append(count)
+
+def backend_call_summary() -> Dict[str, Dict[str, Any]]:
+    """
+    Summarize recorded backend calls
+
+    Returns:
+        Per section: number of renders, mean and max backend calls per render
+    """
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _backend_calls.items()}
+
+    return {
+        name: {
+            "renders": len(values),
+            "mean_calls": sum(values) / len(values),
+            "max_calls": max(values)
+        }
+        for name, values in snapshot.items() if values
+    }
@@ -0,0 +1,235 @@
+import datetime
+import logging
+import threading
+from concurrent.futures import as_completed
+from typing import Dict, List, Any, Optional
+
+from utils.data_manager import DataManager
+from utils.fetch_scheduler import FetchScheduler, get_fetch_scheduler
+from utils.fund_allocator import FundAllocator
+from utils.price_history import price_history
+from utils.scraper import conditional_headers, page_from_response, extract_structured_data
+
+logger = logging.getLogger(__name__)
+
+# Wishlist item statuses that can still change price before purchase
+OPEN_ITEM_STATUSES = ("available", "reserved")
+
+class PriceRefreshCrawler:
+    """Periodically revisits wishlist item URLs and feeds price changes to the fund allocator"""
+
+    def __init__(self,
+                 fund_allocator: Optional[FundAllocator] = None,
+                 scheduler: Optional[FetchScheduler] = None,
+                 max_items_per_run: int = 200):
+        """
+        Initialize the crawler
+
+        Args:
+            fund_allocator: Allocator used to compute price change recommendations
+            scheduler: Fetch scheduler enforcing per-domain rate limits (the shared one by default)
+            max_items_per_run: Maximum number of item URLs visited per refresh run
+        """
+        self.fund_allocator = fund_allocator or FundAllocator()
+        self.scheduler = scheduler or get_fetch_scheduler()
+        self.max_items_per_run = max_items_per_run
+
+        # Conditional request validators per URL: {"etag": ..., "last_modified": ...}
+        self._validators: Dict[str, Dict[str, Optional[str]]] = {}
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def build_queue(self, today: Optional[datetime.date] = None) -> List[Dict[str, Any]]:
+        """
+        Build the prioritized list of open wishlist items to refresh
+
+        Items for sooner events come first; within the same event date, items
+        closest to being fully funded come first since they will be purchased soonest.
+
+        Args:
+            today: Reference date (defaults to the current date)
+
+        Returns:
+            List of queue entries with 'event_id', 'item', 'days_until' and 'progress' keys
+        """
+        today = today or datetime.date.today()
+        queue = []
+
+        for event_id, wishlist in DataManager.get_all_wishlists().items():
+            event = DataManager.get_event(event_id)
+            if not event:
+                continue
+
+            try:
+                event_date = datetime.datetime.strptime(event["date"], "%Y-%m-%d").date()
+            except (KeyError, ValueError):
+                continue
+
+            days_until = (event_date - today).days
+            if days_until < 0:
+                # Gifts for past events are no longer being funded
+                continue
+
+            for item in wishlist:
+                if item.get("status") not in OPEN_ITEM_STATUSES or not item.get("url"):
+                    continue
+
+                price = item.get("price") or 0
+                progress = item.get("pooled_amount", 0) / price if price > 0 else 0
+                queue.append({
+                    "event_id": event_id,
+                    "item": item,
+                    "days_until": days_until,
+                    "progress": progress
+                })
+
+        queue.sort(key=lambda entry: (entry["days_until"], -entry["progress"]))
+        return queue[:self.max_items_per_run]
+
+    def _parse_price_response(self, url: str, response) -> Optional[float]:
+        """
+        Read the current price from a conditional product page response
+
+        Args:
+            url: Product page URL
+            response: Response from the fetch scheduler
+
+        Returns:
+            The current price, or None if the page is unchanged or has no structured price
+        """
+        validators = self._validators.get(url, {})
+        page = page_from_response(response, validators.get("etag"), validators.get("last_modified"))
+
+        self._validators[url] = {"etag": page["etag"], "last_modified": page["last_modified"]}
+
+        if page["not_modified"] or page["status"] != 200:
+            return None
+
+        details = extract_structured_data(page["html"])
+        if not details:
+            return None
+
+        price_history.record(url, details["price"])
+        return details["price"]
+
+    def refresh_once(self, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """
+        Run one refresh pass over all open wishlist items
+
+        Every fetch is queued at background priority in the shared scheduler in
+        priority order; the scheduler spaces out requests per domain and lets
+        interactive fetches jump ahead.
+
+        Args:
+            today: Reference date used for prioritization
+
+        Returns:
+            Summary of the run
+        """
+        queue = self.build_queue(today)
+        summary = {"queued": len(queue), "fetched": 0, "unchanged": 0, "errors": 0, "price_changes": 0}
+        price_changes = []
+
+        # URLs shared by several items are only fetched once per run
+        futures = {}
+        submitted_urls = set()
+        for entry in queue:
+            url = entry["item"]["url"]
+            if url in submitted_urls:
+                continue
+            submitted_urls.add(url)
+            validators = self._validators.get(url, {})
+            future = self.scheduler.submit(
+                url,
+                headers=conditional_headers(validators.get("etag"), validators.get("last_modified")),
+                priority="background"
+            )
+            futures[future] = url
+
+        prices = {}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                prices[url] = self._parse_price_response(url, future.result())
+                summary["fetched"] += 1
+            except Exception as e:
+                logger.warning("Error refreshing price for %s: %s", url, e)
+                summary["errors"] += 1
+
+        checked_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for entry in queue:
+            item = entry["item"]
+            if item["url"] not in prices:
+                continue
+
+            current_price = prices[item["url"]]
+            last_known_price = item.get("current_price", item["price"])
+            if current_price is None or abs(current_price - last_known_price) < 0.005:
+                summary["unchanged"] += 1
+                DataManager.update_wishlist_item(entry["event_id"], item["id"], {"price_checked_at": checked_at})
+                continue
+
+            # Aggregate contributions per user, as the allocator expects
+            totals = {}
+            for contribution in DataManager.get_item_contributions(entry["event_id"], item["id"]):
+                totals[contribution["user_id"]] = totals.get(contribution["user_id"], 0) + contribution["amount"]
+
+            price_changes.append({
+                "event_id": entry["event_id"],
+                "item_id": item["id"],
+                "checked_at": checked_at,
+                "original_price": item["price"],
+                "current_price": current_price,
+                "total_collected": item.get("pooled_amount", 0),
+                "contributors": [{"user_id": user_id, "amount": amount} for user_id, amount in totals.items()]
+            })
+
+        # Precompute recommendations in one batch so the event page only has to read them
+        for result in self.fund_allocator.handle_price_changes_batch(price_changes):
+            DataManager.update_wishlist_item(result["event_id"], result["item_id"], {
+                "current_price": result["current_price"],
+                "price_checked_at": result["checked_at"],
+                "price_recommendation": result
+            })
+
+        summary["price_changes"] = len(price_changes)
+        summary["finished_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.last_run = summary
+        return summary
+
+    def _run_forever(self, interval_seconds: float):
+        """Background loop that refreshes prices every interval"""
+        while not self._stop_event.is_set():
+            try:
+                self.refresh_once()
+            except Exception:
+                logger.exception("Price refresh run failed")
+            self._stop_event.wait(interval_seconds)
+
+    def start(self, interval_seconds: float = 3600):
+        """
+        Start refreshing prices in a background thread
+
+        Args:
+            interval_seconds: Seconds to wait between refresh runs
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_forever,
+            args=(interval_seconds,),
+            name="price-refresh-crawler",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,260 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+import numpy as np
+
+# On-disk record layout: observation time (unix seconds) and observed price
+OBSERVATION_DTYPE = np.dtype([("ts", "<i8"), ("price", "<f8")])
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "price_history")
+
+# Query parameters that track the visit rather than select a product
+TRACKING_PARAMETERS = {
+    "gclid", "gclsrc", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid", "twclid", "ttclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "srsltid", "ref", "ref_", "referrer", "tag", "affiliate",
+    "aff_id", "affid", "clickid", "irclickid", "cjevent", "spm", "scid", "trk", "sessionid"
+}
+TRACKING_PARAMETER_PREFIXES = ("utm_", "pf_rd_", "pd_rd_", "_hs", "hsa_", "mkt_")
+
+def canonical_product_key(url: str) -> str:
+    """
+    Build a canonical product key from a product URL
+
+    The scheme, tracking parameters, fragments, "www." and trailing slashes are
+    dropped and the host is lowercased, so the same product page always maps to
+    the same history. The path keeps its case (many stores' paths are
+    case-sensitive), and other query parameters (product IDs, variants) are
+    kept, sorted.
+
+    Args:
+        url: Product page URL
+
+    Returns:
+        Canonical key such as "example.com/dyson" or "example.com/item?id=123"
+    """
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parsed.path.rstrip("/")
+    parameters = sorted(
+        (name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMETERS and not name.lower().startswith(TRACKING_PARAMETER_PREFIXES)
+    )
+    if parameters:
+        return f"{host}{path}?{urlencode(parameters)}"
+    return f"{host}{path}"
+
+class _ProductSeries:
+    """Append-only price series for one product: sealed segments on disk plus an in-memory tail"""
+
+    def __init__(self, directory: str, segment_size: int):
+        self.directory = directory
+        self.segment_size = segment_size
+
+        # Sealed segments: (first_ts, last_ts, path); data is memory-mapped lazily
+        self.segments: List[Tuple[int, int, str]] = []
+        self._mapped: Dict[str, np.ndarray] = {}
+
+        # Active tail, grown geometrically so appends are amortized O(1)
+        self.tail = np.empty(64, dtype=OBSERVATION_DTYPE)
+        self.tail_length = 0
+        self.last_ts = None
+
+        self._load_existing()
+
+    def _load_existing(self):
+        """Pick up segments and the unsealed tail written by an earlier process"""
+        if not os.path.isdir(self.directory):
+            return
+
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if name.startswith("seg-") and name.endswith(".npy"):
+                data = np.load(path, mmap_mode="r")
+                if len(data):
+                    self.segments.append((int(data["ts"][0]), int(data["ts"][-1]), path))
+                    self._mapped[path] = data
+                    self.last_ts = int(data["ts"][-1])
+
+        tail_path = os.path.join(self.directory, "tail.npy")
+        if os.path.exists(tail_path):
+            tail = np.load(tail_path)
+            self._ensure_capacity(len(tail))
+            self.tail[:len(tail)] = tail
+            self.tail_length = len(tail)
+            if self.tail_length:
+                self.last_ts = int(tail["ts"][-1])
+
+    def _ensure_capacity(self, needed: int):
+        if needed > len(self.tail):
+            grown = np.empty(max(needed, len(self.tail) * 2), dtype=OBSERVATION_DTYPE)
+            grown[:self.tail_length] = self.tail[:self.tail_length]
+            self.tail = grown
+
+    def append(self, ts: int, price: float):
+        # Keep the series time-ordered so window lookups can binary search
+        if self.last_ts is not None and ts < self.last_ts:
+            ts = self.last_ts
+
+        self._ensure_capacity(self.tail_length + 1)
+        self.tail[self.tail_length] = (ts, price)
+        self.tail_length += 1
+        self.last_ts = ts
+
+        if self.tail_length >= self.segment_size:
+            self.seal()
+
+    def seal(self):
+        """Write the active tail out as an immutable segment"""
+        if not self.tail_length:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"seg-{len(self.segments):06d}.npy")
+        data = self.tail[:self.tail_length]
+        np.save(path, data)
+
+        self.segments.append((int(data["ts"][0]), int(data["ts"][-1]), path))
+        self._mapped[path] = np.load(path, mmap_mode="r")
+        self.tail_length = 0
+
+        tail_path = os.path.join(self.directory, "tail.npy")
+        if os.path.exists(tail_path):
+            os.remove(tail_path)
+
+    def flush_tail(self):
+        """Persist the unsealed tail so it survives a restart"""
+        if not self.tail_length:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(os.path.join(self.directory, "tail.npy"), self.tail[:self.tail_length])
+
+    def window_prices(self, start_ts: int, end_ts: int) -> np.ndarray:
+        """Return all observed prices with start_ts <= ts <= end_ts"""
+        chunks = []
+        for first_ts, last_ts, path in self.segments:
+            if last_ts < start_ts or first_ts > end_ts:
+                continue
+            chunks.append(self._slice(self._mapped[path], start_ts, end_ts))
+
+        if self.tail_length:
+            chunks.append(self._slice(self.tail[:self.tail_length], start_ts, end_ts))
+
+        if not chunks:
+            return np.empty(0, dtype=np.float64)
+        if len(chunks) == 1:
+            return np.asarray(chunks[0])
+        return np.concatenate(chunks)
+
+    @staticmethod
+    def _slice(data: np.ndarray, start_ts: int, end_ts: int) -> np.ndarray:
+        timestamps = data["ts"]
+        lo = np.searchsorted(timestamps, start_ts, side="left")
+        hi = np.searchsorted(timestamps, end_ts, side="right")
+        return data["price"][lo:hi]
+
+class PriceHistoryStore:
+    """Compact time-series store of observed prices per canonical product"""
+
+    def __init__(self, root_dir: str = DEFAULT_HISTORY_DIR, segment_size: int = 4096):
+        """
+        Initialize the store
+
+        Args:
+            root_dir: Directory holding one sub-directory of segments per product
+            segment_size: Number of observations per sealed on-disk segment
+        """
+        self.root_dir = root_dir
+        self.segment_size = segment_size
+        self._series: Dict[str, _ProductSeries] = {}
+        self._lock = threading.Lock()
+
+    def _directory_for(self, key: str) -> str:
+        # Hash the key so arbitrary URLs map to safe, fixed-length directory names
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.root_dir, digest)
+
+    def _get_series(self, key: str, create: bool) -> Optional[_ProductSeries]:
+        series = self._series.get(key)
+        if series is None:
+            directory = self._directory_for(key)
+            if not create and not os.path.isdir(directory):
+                return None
+            series = _ProductSeries(directory, self.segment_size)
+            self._series[key] = series
+            if create and not os.path.exists(os.path.join(directory, "key.json")):
+                os.makedirs(directory, exist_ok=True)
+                with open(os.path.join(directory, "key.json"), "w") as f:
+                    json.dump({"key": key}, f)
+        return series
+
+    def record(self, url: str, price: float, observed_at: Optional[float] = None):
+        """
+        Append a price observation for the product at a URL
+
+        Args:
+            url: Product page URL
+            price: Observed price
+            observed_at: Unix timestamp of the observation (defaults to now)
+        """
+        if not url or price is None or price <= 0:
+            return
+
+        ts = int(observed_at if observed_at is not None else time.time())
+        with self._lock:
+            self._get_series(canonical_product_key(url), create=True).append(ts, float(price))
+
+    def window_stats(self, url: str, days: float = 90, now: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """
+        Summarize observed prices for a product over a trailing time window
+
+        Args:
+            url: Product page URL
+            days: Window length in days
+            now: Unix timestamp for the end of the window (defaults to now)
+
+        Returns:
+            Dictionary with count, mean, min, max, median and mad (median absolute
+            deviation), or None if there are no observations in the window
+        """
+        if not url:
+            return None
+
+        end_ts = int(now if now is not None else time.time())
+        start_ts = end_ts - int(days * 86400)
+
+        with self._lock:
+            series = self._get_series(canonical_product_key(url), create=False)
+            if series is None:
+                return None
+            prices = series.window_prices(start_ts, end_ts)
+
+        if not len(prices):
+            return None
+
+        median = float(np.median(prices))
+        return {
+            "count": int(len(prices)),
+            "mean": float(prices.mean()),
+            "min": float(prices.min()),
+            "max": float(prices.max()),
+            "median": median,
+            "mad": float(np.median(np.abs(prices - median)))
+        }
+
+    def flush(self):
+        """Persist the unsealed tails of every product series"""
+        with self._lock:
+            for series in self._series.values():
+                series.flush_tail()
+
+# Shared store used by the scraper, the price refresh crawler and fraud checks
+price_history = PriceHistoryStore()
+atexit.register(price_history.flush)
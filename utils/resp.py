@@ -0,0 +1,587 @@
+import socket
+import socketserver
+import threading
+from typing import Dict, List, Any, Optional, Iterable, Sequence, Tuple
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+def _encode_command(args: Sequence[Any]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode("utf-8")
+        elif isinstance(arg, float):
+            data = repr(arg).encode("ascii")
+        else:
+            data = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+def _read_reply(stream) -> Any:
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return RespError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) < length + 2:
+            raise ConnectionError("Connection closed by the server")
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [_read_reply(stream) for _ in range(count)]
+    raise ConnectionError(f"Unexpected reply: {line!r}")
+
+class RespClient:
+    """
+    Minimal client for the Redis protocol (RESP2), with pipelining.
+    Every thread gets its own connection, so a thread's WATCH ... MULTI/EXEC
+    sequence is never interleaved with another thread's commands. Replies
+    are decoded as UTF-8 strings.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0, timeout: float = 10.0):
+        """
+        Initialize the client (connections are opened on first use)
+
+        Args:
+            host, port: Server address
+            db: Database number selected on every connection
+            timeout: Socket timeout in seconds
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._sockets: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> Tuple[socket.socket, Any]:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = self._local.connection = (sock, sock.makefile("rb"))
+            with self._lock:
+                self._sockets.append(sock)
+            if self.db:
+                self.execute("SELECT", self.db)
+        return connection
+
+    def _disconnect(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            with self._lock:
+                if connection[0] in self._sockets:
+                    self._sockets.remove(connection[0])
+            connection[0].close()
+
+    def pipeline(self, commands: Iterable[Sequence[Any]]) -> List[Any]:
+        """
+        Send several commands in one write and read all their replies
+
+        Args:
+            commands: Commands as sequences of arguments, e.g. ("HGET", key, field)
+
+        Returns:
+            The replies in command order; error replies are returned as RespError
+            instances rather than raised, so one failed command doesn't hide the rest
+        """
+        commands = list(commands)
+        sock, stream = self._connection()
+        try:
+            sock.sendall(b"".join(_encode_command(command) for command in commands))
+            return [_read_reply(stream) for _ in commands]
+        except (OSError, ConnectionError):
+            # The connection's state (pending replies, WATCHed keys) is unknown
+            self._disconnect()
+            raise
+
+    def execute(self, *args: Any) -> Any:
+        """Run one command and return its reply, raising RespError on an error reply"""
+        reply, = self.pipeline([args])
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def transaction(self, commands: Iterable[Sequence[Any]]) -> Optional[List[Any]]:
+        """
+        Run commands atomically with MULTI/EXEC, in one round trip
+
+        Returns:
+            The commands' replies, or None if a key WATCHed by this thread changed
+            and the transaction was discarded
+        """
+        commands = list(commands)
+        replies = self.pipeline([("MULTI",)] + commands + [("EXEC",)])
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies[-1]
+
+    def close(self):
+        """Close the connections of all threads"""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            sock.close()
+        self._local = threading.local()
+
+# Reply markers of the stand-in server
+class _Status(str):
+    pass
+
+_OK = _Status("OK")
+_QUEUED = _Status("QUEUED")
+_NULL_ARRAY = object()
+
+class _WrongType(RespError):
+    def __init__(self):
+        super().__init__("WRONGTYPE Operation against a key holding the wrong kind of value")
+
+def _encode_reply(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if value is _NULL_ARRAY:
+        return b"*-1\r\n"
+    if isinstance(value, _Status):
+        return b"+%s\r\n" % value.encode("utf-8")
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode("utf-8")
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+    return b"*%d\r\n" % len(value) + b"".join(_encode_reply(item) for item in value)
+
+def _parse_command(buffer: bytearray, start: int) -> Tuple[Optional[List[str]], int]:
+    """Parse one command (an array of bulk strings); returns (None, start) if it isn't complete yet"""
+    line_end = buffer.find(b"\r\n", start)
+    if line_end < 0:
+        return None, start
+    if buffer[start:start + 1] != b"*":
+        raise RespError("ERR Protocol error: expected '*'")
+    position = line_end + 2
+    args = []
+    for _ in range(int(buffer[start + 1:line_end])):
+        line_end = buffer.find(b"\r\n", position)
+        if line_end < 0:
+            return None, start
+        data_start = line_end + 2
+        data_end = data_start + int(buffer[position + 1:line_end])
+        if data_end + 2 > len(buffer):
+            return None, start
+        args.append(buffer[data_start:data_end].decode("utf-8"))
+        position = data_end + 2
+    return args, position
+
+def _format_float(value: float) -> str:
+    text = repr(value)
+    return text[:-2] if text.endswith(".0") else text
+
+def _parse_int(value: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RespError("ERR value is not an integer or out of range") from None
+
+def _parse_float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RespError("ERR value is not a valid float") from None
+
+class _Session:
+    """State of one client connection"""
+
+    def __init__(self):
+        self.db = 0
+        self.queued: Optional[List[List[str]]] = None
+        self.watched: Dict[Tuple[int, str], int] = {}
+        self.watch_failed = False
+
+class LocalRespServer:
+    """
+    In-process stand-in for a Redis server, for running the Redis backend
+    without one. Implements the string, hash, list, set and sorted-set
+    commands the storage backend uses, plus MULTI/EXEC/WATCH; like Redis, it
+    executes one command at a time, so every command is atomic.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Start serving on a background thread
+
+        Args:
+            host, port: Address to listen on (port 0 picks a free port; see `address`)
+        """
+        self._databases: Dict[int, Dict[str, Any]] = {}
+        # Per (db, key): number of writes, for WATCH
+        self._versions: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._serve(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.address: Tuple[str, int] = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="resp-server", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stop serving"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _serve(self, sock: socket.socket):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = _Session()
+        buffer = bytearray()
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data
+
+            # Run every complete command received, and answer them with one write
+            replies = []
+            position = 0
+            while position < len(buffer):
+                try:
+                    args, position = _parse_command(buffer, position)
+                except (RespError, ValueError) as e:
+                    sock.sendall(_encode_reply(RespError(str(e))))
+                    return
+                if args is None:
+                    break
+                replies.append(_encode_reply(self._dispatch(session, args)))
+            del buffer[:position]
+            if replies:
+                try:
+                    sock.sendall(b"".join(replies))
+                except OSError:
+                    return
+
+    def _dispatch(self, session: _Session, args: List[str]) -> Any:
+        name = args[0].upper() if args else ""
+        with self._lock:
+            try:
+                if name == "MULTI":
+                    if session.queued is not None:
+                        return RespError("ERR MULTI calls can not be nested")
+                    session.queued = []
+                    return _OK
+                if name == "EXEC":
+                    return self._exec(session)
+                if name == "DISCARD":
+                    if session.queued is None:
+                        return RespError("ERR DISCARD without MULTI")
+                    session.queued = None
+                    session.watched.clear()
+                    return _OK
+                if name == "WATCH":
+                    if session.queued is not None:
+                        return RespError("ERR WATCH inside MULTI is not allowed")
+                    for key in args[1:]:
+                        session.watched[(session.db, key)] = self._versions.get((session.db, key), 0)
+                    return _OK
+                if name == "UNWATCH":
+                    session.watched.clear()
+                    return _OK
+                handler = _COMMANDS.get(name)
+                if handler is None:
+                    return RespError(f"ERR unknown command '{args[0] if args else ''}'")
+                if session.queued is not None:
+                    session.queued.append(args)
+                    return _QUEUED
+                return self._run(session, handler, args)
+            except RespError as e:
+                return e
+
+    def _exec(self, session: _Session) -> Any:
+        if session.queued is None:
+            return RespError("ERR EXEC without MULTI")
+        queued, session.queued = session.queued, None
+        watched, session.watched = session.watched, {}
+        if any(self._versions.get(key, 0) != version for key, version in watched.items()):
+            return _NULL_ARRAY
+        replies = []
+        for args in queued:
+            try:
+                replies.append(self._run(session, _COMMANDS[args[0].upper()], args))
+            except RespError as e:
+                replies.append(e)
+        return replies
+
+    def _run(self, session: _Session, handler, args: List[str]) -> Any:
+        try:
+            return handler(self, session, args[1:])
+        except IndexError:
+            raise RespError(f"ERR wrong number of arguments for '{args[0].lower()}' command") from None
+
+    def _db(self, session: _Session) -> Dict[str, Any]:
+        return self._databases.setdefault(session.db, {})
+
+    def _touch(self, session: _Session, key: str):
+        versions_key = (session.db, key)
+        self._versions[versions_key] = self._versions.get(versions_key, 0) + 1
+
+    def _get(self, session: _Session, key: str, kind: type, create: bool = False) -> Any:
+        db = self._db(session)
+        value = db.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = db[key] = kind()
+        elif not isinstance(value, kind):
+            raise _WrongType()
+        return value
+
+    def _drop_if_empty(self, session: _Session, key: str):
+        db = self._db(session)
+        if key in db and not isinstance(db[key], str) and not db[key]:
+            del db[key]
+
+    # Commands; each takes the arguments after the command name
+
+    def _ping(self, session, args):
+        return args[0] if args else _Status("PONG")
+
+    def _select(self, session, args):
+        session.db = _parse_int(args[0])
+        return _OK
+
+    def _flushdb(self, session, args):
+        for key in list(self._db(session)):
+            self._touch(session, key)
+        self._db(session).clear()
+        return _OK
+
+    def _dbsize(self, session, args):
+        return len(self._db(session))
+
+    def _del(self, session, args):
+        db = self._db(session)
+        deleted = 0
+        for key in args:
+            if db.pop(key, None) is not None:
+                self._touch(session, key)
+                deleted += 1
+        return deleted
+
+    def _exists(self, session, args):
+        db = self._db(session)
+        return sum(1 for key in args if key in db)
+
+    def _get_string(self, session, args):
+        return self._get(session, args[0], str)
+
+    def _set(self, session, args):
+        self._db(session)[args[0]] = args[1]
+        self._touch(session, args[0])
+        return _OK
+
+    def _incrby_string(self, session, key, delta):
+        value = _parse_int(self._get(session, key, str) or "0") + delta
+        self._db(session)[key] = str(value)
+        self._touch(session, key)
+        return value
+
+    def _incr(self, session, args):
+        return self._incrby_string(session, args[0], 1)
+
+    def _incrby(self, session, args):
+        return self._incrby_string(session, args[0], _parse_int(args[1]))
+
+    def _incrbyfloat(self, session, args):
+        value = _format_float(_parse_float(self._get(session, args[0], str) or "0") + _parse_float(args[1]))
+        self._db(session)[args[0]] = value
+        self._touch(session, args[0])
+        return value
+
+    def _hset(self, session, args):
+        if len(args) < 3 or len(args) % 2 == 0:
+            raise RespError("ERR wrong number of arguments for 'hset' command")
+        fields = self._get(session, args[0], dict, create=True)
+        added = 0
+        for field, value in zip(args[1::2], args[2::2]):
+            added += field not in fields
+            fields[field] = value
+        self._touch(session, args[0])
+        return added
+
+    def _hsetnx(self, session, args):
+        fields = self._get(session, args[0], dict, create=True)
+        if args[1] in fields:
+            return 0
+        fields[args[1]] = args[2]
+        self._touch(session, args[0])
+        return 1
+
+    def _hget(self, session, args):
+        return (self._get(session, args[0], dict) or {}).get(args[1])
+
+    def _hmget(self, session, args):
+        fields = self._get(session, args[0], dict) or {}
+        return [fields.get(field) for field in args[1:]]
+
+    def _hgetall(self, session, args):
+        fields = self._get(session, args[0], dict) or {}
+        return [part for item in fields.items() for part in item]
+
+    def _hdel(self, session, args):
+        fields = self._get(session, args[0], dict) or {}
+        deleted = sum(1 for field in args[1:] if fields.pop(field, None) is not None)
+        if deleted:
+            self._drop_if_empty(session, args[0])
+            self._touch(session, args[0])
+        return deleted
+
+    def _hexists(self, session, args):
+        return int(args[1] in (self._get(session, args[0], dict) or {}))
+
+    def _hlen(self, session, args):
+        return len(self._get(session, args[0], dict) or {})
+
+    def _hincrby(self, session, args):
+        fields = self._get(session, args[0], dict, create=True)
+        try:
+            value = _parse_int(fields.get(args[1], "0"))
+        except RespError:
+            raise RespError("ERR hash value is not an integer") from None
+        value += _parse_int(args[2])
+        fields[args[1]] = str(value)
+        self._touch(session, args[0])
+        return value
+
+    def _hincrbyfloat(self, session, args):
+        fields = self._get(session, args[0], dict, create=True)
+        try:
+            current = _parse_float(fields.get(args[1], "0"))
+        except RespError:
+            raise RespError("ERR hash value is not a float") from None
+        value = fields[args[1]] = _format_float(current + _parse_float(args[2]))
+        self._touch(session, args[0])
+        return value
+
+    def _rpush(self, session, args):
+        items = self._get(session, args[0], list, create=True)
+        items.extend(args[1:])
+        self._touch(session, args[0])
+        return len(items)
+
+    @staticmethod
+    def _range(length: int, start: int, stop: int) -> Tuple[int, int]:
+        if start < 0:
+            start = max(0, length + start)
+        if stop < 0:
+            stop = length + stop
+        return start, min(stop, length - 1) + 1
+
+    def _lrange(self, session, args):
+        items = self._get(session, args[0], list) or []
+        start, end = self._range(len(items), _parse_int(args[1]), _parse_int(args[2]))
+        return items[start:end]
+
+    def _llen(self, session, args):
+        return len(self._get(session, args[0], list) or [])
+
+    def _lindex(self, session, args):
+        items = self._get(session, args[0], list) or []
+        index = _parse_int(args[1])
+        return items[index] if -len(items) <= index < len(items) else None
+
+    def _sadd(self, session, args):
+        members = self._get(session, args[0], set, create=True)
+        added = 0
+        for member in args[1:]:
+            if member not in members:
+                members.add(member)
+                added += 1
+        if added:
+            self._touch(session, args[0])
+        return added
+
+    def _smembers(self, session, args):
+        return list(self._get(session, args[0], set) or ())
+
+    def _sismember(self, session, args):
+        return int(args[1] in (self._get(session, args[0], set) or ()))
+
+    def _scard(self, session, args):
+        return len(self._get(session, args[0], set) or ())
+
+    def _zadd(self, session, args):
+        key, args = args[0], args[1:]
+        options = set()
+        while args and args[0].upper() in ("NX", "XX", "CH"):
+            options.add(args[0].upper())
+            args = args[1:]
+        if not args or len(args) % 2:
+            raise RespError("ERR syntax error")
+        scores = self._get(session, key, dict, create=True)
+        added = changed = 0
+        for score, member in zip(args[::2], args[1::2]):
+            score = _parse_float(score)
+            if member in scores:
+                if "NX" not in options and scores[member] != score:
+                    scores[member] = score
+                    changed += 1
+            elif "XX" not in options:
+                scores[member] = score
+                added += 1
+        self._drop_if_empty(session, key)
+        self._touch(session, key)
+        return added + changed if "CH" in options else added
+
+    def _zrange(self, session, args):
+        scores = self._get(session, args[0], dict) or {}
+        members = sorted(scores, key=lambda member: (scores[member], member))
+        start, end = self._range(len(members), _parse_int(args[1]), _parse_int(args[2]))
+        return members[start:end]
+
+    def _zcard(self, session, args):
+        return len(self._get(session, args[0], dict) or {})
+
+_COMMANDS = {
+    "PING": LocalRespServer._ping, "SELECT": LocalRespServer._select,
+    "FLUSHDB": LocalRespServer._flushdb, "DBSIZE": LocalRespServer._dbsize,
+    "DEL": LocalRespServer._del, "EXISTS": LocalRespServer._exists,
+    "GET": LocalRespServer._get_string, "SET": LocalRespServer._set,
+    "INCR": LocalRespServer._incr, "INCRBY": LocalRespServer._incrby, "INCRBYFLOAT": LocalRespServer._incrbyfloat,
+    "HSET": LocalRespServer._hset, "HSETNX": LocalRespServer._hsetnx, "HGET": LocalRespServer._hget,
+    "HMGET": LocalRespServer._hmget, "HGETALL": LocalRespServer._hgetall, "HDEL": LocalRespServer._hdel,
+    "HEXISTS": LocalRespServer._hexists, "HLEN": LocalRespServer._hlen,
+    "HINCRBY": LocalRespServer._hincrby, "HINCRBYFLOAT": LocalRespServer._hincrbyfloat,
+    "RPUSH": LocalRespServer._rpush, "LRANGE": LocalRespServer._lrange,
+    "LLEN": LocalRespServer._llen, "LINDEX": LocalRespServer._lindex,
+    "SADD": LocalRespServer._sadd, "SMEMBERS": LocalRespServer._smembers,
+    "SISMEMBER": LocalRespServer._sismember, "SCARD": LocalRespServer._scard,
+    "ZADD": LocalRespServer._zadd, "ZRANGE": LocalRespServer._zrange, "ZCARD": LocalRespServer._zcard,
+}
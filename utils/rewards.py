@@ -0,0 +1,195 @@
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
+
+# Levels by lifetime points earned, lowest first
+LEVELS = [
+    {"name": "Gift Novice", "min_points": 0, "color": "gray"},
+    {"name": "Gift Giver", "min_points": 100, "color": "blue"},
+    {"name": "Gift Expert", "min_points": 300, "color": "green"},
+    {"name": "Gift Master", "min_points": 700, "color": "purple"},
+    {"name": "Gift Legend", "min_points": 1500, "color": "gold"}
+]
+
+_LEVEL_THRESHOLDS = [level["min_points"] for level in LEVELS]
+
+# Points awarded for community and contribution activity
+POINTS_FOR_POST = 10
+POINTS_FOR_COMMENT = 5
+POINTS_FOR_LIKE = 2
+
+def level_for(points: int) -> Dict[str, Any]:
+    """Level reached with the given lifetime points"""
+    return LEVELS[max(0, bisect.bisect_right(_LEVEL_THRESHOLDS, points) - 1)]
+
+def points_for_contribution(amount: float) -> int:
+    """Points awarded for a contribution: 10 points per $10, at least 10"""
+    return max(10, int((amount / 10) * 10))
+
+class RewardPoints:
+    """
+    Reward points for all users.
+    Every award and redemption is appended to a points ledger; spendable
+    balances and lifetime points are updated in the same atomic step.
+    Leaderboards rank lifetime points, which only grow, so the top K are
+    kept in a bounded min-heap updated in O(log K) per award. Every ledger
+    entry is reported to `on_write` as a utils.journal record, so
+    Persistence can make it durable.
+    """
+
+    def __init__(self, leaderboard_size: int = 100, on_write: Optional[Callable[..., None]] = None):
+        """
+        Initialize the points subsystem
+
+        Args:
+            leaderboard_size: Number of users kept on the global leaderboard
+            on_write: Called with ("points", position, ts, user_id, delta, reason)
+                after each award and redemption
+        """
+        self.leaderboard_size = leaderboard_size
+        self._on_write = on_write or (lambda op, *args: None)
+
+        self._ledger: List[Tuple[float, str, int, str]] = []  # (ts, user_id, delta, reason)
+        self._balances: Dict[str, int] = {}
+        self._lifetime: Dict[str, int] = {}
+
+        # Min-heap of (lifetime points, user_id); entries superseded by a later
+        # award of the same user are skipped lazily
+        self._heap: List[Tuple[int, str]] = []
+        self._on_board: Dict[str, int] = {}
+
+        self._lock = threading.Lock()
+
+    def award(self, user_id: str, points: int, reason: str) -> int:
+        """
+        Award points to a user
+
+        Returns:
+            The user's new spendable balance
+        """
+        if points <= 0:
+            raise ValueError("Awarded points must be positive")
+
+        with self._lock:
+            ts = time.time()
+            position = self._add(ts, user_id, points, reason)
+            self._on_write("points", position, ts, user_id, points, reason)
+            return self._balances[user_id]
+
+    def redeem(self, user_id: str, points: int, reason: str) -> bool:
+        """
+        Spend a user's points
+
+        Returns:
+            Whether the user had enough points (nothing is spent otherwise)
+        """
+        with self._lock:
+            if self._balances.get(user_id, 0) < points:
+                return False
+            ts = time.time()
+            position = self._add(ts, user_id, -points, reason)
+            self._on_write("points", position, ts, user_id, -points, reason)
+            return True
+
+    def _add(self, ts: float, user_id: str, delta: int, reason: str) -> int:
+        position = len(self._ledger)
+        self._ledger.append((ts, user_id, delta, reason))
+        self._balances[user_id] = self._balances.get(user_id, 0) + delta
+        if delta > 0:
+            lifetime = self._lifetime[user_id] = self._lifetime.get(user_id, 0) + delta
+            self._update_leaderboard(user_id, lifetime)
+        return position
+
+    def put(self, position: int, ts: float, user_id: str, delta: int, reason: str):
+        """Apply a journaled entry (see award and redeem); entries already held are skipped"""
+        with self._lock:
+            if position >= len(self._ledger):
+                self._add(ts, user_id, delta, reason)
+
+    def entries(self) -> List[Tuple[float, str, int, str]]:
+        """The points ledger, for a snapshot (see load_entries)"""
+        with self._lock:
+            return list(self._ledger)
+
+    def load_entries(self, entries: Iterable[Tuple[float, str, int, str]]):
+        """Replace the points ledger with a snapshot's, rebuilding balances and leaderboards"""
+        with self._lock:
+            self._ledger = []
+            self._balances = {}
+            self._lifetime = {}
+            self._heap = []
+            self._on_board = {}
+            for ts, user_id, delta, reason in entries:
+                self._add(ts, user_id, delta, reason)
+
+    def _update_leaderboard(self, user_id: str, lifetime: int):
+        if user_id in self._on_board:
+            self._on_board[user_id] = lifetime
+            heapq.heappush(self._heap, (lifetime, user_id))
+        elif len(self._on_board) < self.leaderboard_size:
+            self._on_board[user_id] = lifetime
+            heapq.heappush(self._heap, (lifetime, user_id))
+        else:
+            self._drop_stale()
+            lowest, lowest_user = self._heap[0]
+            if lifetime <= lowest:
+                return
+            # Replace the lowest user on the board
+            heapq.heapreplace(self._heap, (lifetime, user_id))
+            del self._on_board[lowest_user]
+            self._on_board[user_id] = lifetime
+
+        # Keep the stale entries bounded
+        if len(self._heap) > 2 * self.leaderboard_size:
+            self._heap = [(score, user) for user, score in self._on_board.items()]
+            heapq.heapify(self._heap)
+
+    def _drop_stale(self):
+        while self._heap and self._on_board.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def balance(self, user_id: str) -> int:
+        """Spendable points of a user"""
+        return self._balances.get(user_id, 0)
+
+    def lifetime(self, user_id: str) -> int:
+        """Points a user has earned in total"""
+        return self._lifetime.get(user_id, 0)
+
+    def level(self, user_id: str) -> Dict[str, Any]:
+        """Level of a user, from their lifetime points"""
+        return level_for(self.lifetime(user_id))
+
+    def leaderboard(self, k: int = 10) -> List[Tuple[str, int]]:
+        """
+        Top users by lifetime points
+
+        Args:
+            k: Number of users (at most leaderboard_size)
+
+        Returns:
+            (user_id, lifetime points) pairs, highest first
+        """
+        with self._lock:
+            board = list(self._on_board.items())
+        return heapq.nlargest(k, board, key=lambda entry: entry[1])
+
+    def friends_leaderboard(self, user_id: str, friend_ids: Iterable[str], k: int = 10) -> List[Tuple[str, int]]:
+        """Top users by lifetime points among a user and their friends, highest first"""
+        members = set(friend_ids)
+        members.add(user_id)
+        return heapq.nlargest(k, ((member, self._lifetime.get(member, 0)) for member in members),
+                              key=lambda entry: entry[1])
+
+    def history(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """A user's most recent points ledger entries, newest first"""
+        entries = []
+        with self._lock:
+            for ts, entry_user, delta, reason in reversed(self._ledger):
+                if entry_user == user_id:
+                    entries.append({"ts": ts, "points": delta, "reason": reason})
+                    if len(entries) >= limit:
+                        break
+        return entries
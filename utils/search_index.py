@@ -0,0 +1,298 @@
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from typing import Dict, List, Optional, Iterable, Tuple
+
+import numpy as np
+
+# Document kinds
+ITEM = "item"
+CHAT = "chat"
+POST = "post"
+
+DOC_KINDS = (ITEM, CHAT, POST)
+
+# Event number of documents that don't belong to an event (community posts);
+# they are visible to everyone
+NO_EVENT = 0
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its me my no not of on or our so "
+    "that the their them then there these they this to was we were what when which who will with you your".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def stem(token: str) -> str:
+    """Strip common English suffixes, so 'headphones' and 'headphone' match"""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, replacement in (("ies", "y"), ("sses", "ss"), ("ing", ""), ("ed", ""), ("ly", ""), ("es", "e"), ("s", "")):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == "s" and token.endswith("ss"):
+                return token
+            return token[:-len(suffix)] + replacement
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and stem"""
+    return [stem(token) for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+class SearchIndex:
+    """
+    In-process full-text index with BM25 ranking.
+    Each term maps to two append-only arrays (document numbers and term
+    frequencies), so postings stay compact at millions of documents and
+    scoring is vectorized. Updating a document tombstones its old number and
+    appends it again; tombstones are purged once they make up a quarter of
+    the index. Every document records the event it belongs to, and queries
+    only return documents of events the caller may see.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize the index
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._keys: List[Optional[str]] = []  # None once deleted
+        self._doc_numbers: Dict[str, int] = {}
+        self._lengths = array("I")
+        self._kinds = array("B")
+        self._doc_events = array("I")
+        self._total_length = 0
+        self._deleted = 0
+
+        # Event numbers (0 is NO_EVENT) and whether each event is public
+        self._event_numbers: Dict[str, int] = {}
+        self._event_ids: List[Optional[str]] = [None]
+        self._event_public = array("B", [1])
+
+        self._lock = threading.RLock()
+
+    def _event_number(self, event_id: Optional[str]) -> int:
+        if event_id is None:
+            return NO_EVENT
+        number = self._event_numbers.get(event_id)
+        if number is None:
+            number = self._event_numbers[event_id] = len(self._event_ids)
+            self._event_ids.append(event_id)
+            self._event_public.append(0)
+        return number
+
+    def set_event_privacy(self, event_id: str, public: bool):
+        """Record whether an event's documents are visible to non-members"""
+        with self._lock:
+            self._event_public[self._event_number(event_id)] = 1 if public else 0
+
+    def add(self, key: str, kind: str, text: str, event_id: Optional[str] = None):
+        """
+        Index a document, replacing any previous version with the same key
+
+        Args:
+            key: Unique document key
+            kind: One of DOC_KINDS
+            text: Text to index
+            event_id: Event the document belongs to (None for documents visible to everyone)
+        """
+        terms = tokenize(text)
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+
+        with self._lock:
+            self._remove(key)
+            number = len(self._keys)
+            self._keys.append(key)
+            self._doc_numbers[key] = number
+            self._lengths.append(len(terms))
+            self._kinds.append(DOC_KINDS.index(kind))
+            self._doc_events.append(self._event_number(event_id))
+            self._total_length += len(terms)
+
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("H"))
+                postings[0].append(number)
+                postings[1].append(min(count, 65535))
+
+            if self._deleted * 4 > len(self._keys):
+                self.compact()
+
+    def _remove(self, key: str):
+        number = self._doc_numbers.pop(key, None)
+        if number is None:
+            return
+        self._keys[number] = None
+        self._total_length -= self._lengths[number]
+        self._deleted += 1
+
+    def remove(self, key: str):
+        """Remove a document"""
+        with self._lock:
+            self._remove(key)
+            if self._deleted * 4 > len(self._keys):
+                self.compact()
+
+    def compact(self):
+        """Renumber the live documents and drop the tombstones from every posting list"""
+        with self._lock:
+            live = np.frombuffer(bytes(key is not None for key in self._keys), dtype=np.uint8).astype(bool)
+            renumber = np.cumsum(live) - 1
+
+            postings = {}
+            for term, (docs, tfs) in self._postings.items():
+                docs_array = np.frombuffer(docs, dtype=np.uint32)
+                keep = live[docs_array]
+                if keep.any():
+                    postings[term] = (array("I", renumber[docs_array[keep]].astype(np.uint32).tobytes()),
+                                      array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()))
+            self._postings = postings
+
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)[live]
+            self._lengths = array("I", lengths.tobytes())
+            self._kinds = array("B", np.frombuffer(self._kinds, dtype=np.uint8)[live].tobytes())
+            self._doc_events = array("I", np.frombuffer(self._doc_events, dtype=np.uint32)[live].tobytes())
+            self._keys = [key for key in self._keys if key is not None]
+            self._doc_numbers = {key: number for number, key in enumerate(self._keys)}
+            self._deleted = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_numbers)
+
+    def search(self, query: str, member_events: Iterable[str] = (), kinds: Optional[Iterable[str]] = None,
+               limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank documents against a query with BM25
+
+        Args:
+            query: Free text query
+            member_events: Events the caller belongs to; documents of other
+                events are only returned if the event is public
+            kinds: Only documents of these kinds (None for all)
+            limit: Maximum number of results
+
+        Returns:
+            (document key, score) pairs, best first
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_numbers)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+
+            doc_parts, score_parts = [], []
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                docs = np.frombuffer(postings[0], dtype=np.uint32)
+                tfs = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float64)
+                # Document frequency counts tombstones until the next compaction
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[docs] / average_length)
+                doc_parts.append(docs)
+                score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+            if not doc_parts:
+                return []
+
+            docs = np.concatenate(doc_parts)
+            scores = np.concatenate(score_parts)
+            if len(doc_parts) > 1:
+                # Sum the scores of documents matching several terms
+                order = np.argsort(docs, kind="stable")
+                docs, scores = docs[order], scores[order]
+                starts = np.flatnonzero(np.concatenate([[True], docs[1:] != docs[:-1]]))
+                docs, scores = docs[starts], np.add.reduceat(scores, starts)
+
+            # Live documents of visible events and requested kinds only
+            event_public = np.frombuffer(self._event_public, dtype=np.uint8).astype(bool)
+            for event_id in member_events:
+                number = self._event_numbers.get(event_id)
+                if number is not None:
+                    event_public[number] = True
+            keys = self._keys
+            visible = event_public[np.frombuffer(self._doc_events, dtype=np.uint32)[docs]]
+            if kinds is not None:
+                kind_mask = np.zeros(len(DOC_KINDS), dtype=bool)
+                kind_mask[[DOC_KINDS.index(kind) for kind in kinds]] = True
+                visible &= kind_mask[np.frombuffer(self._kinds, dtype=np.uint8)[docs]]
+            docs, scores = docs[visible], scores[visible]
+
+            # Tombstones are rare, so take a few extra candidates and skip them
+            results = []
+            take = min(len(docs), limit + self._deleted)
+            while take:
+                top = np.argpartition(-scores, take - 1)[:take] if take < len(docs) else np.arange(len(docs))
+                top = top[np.argsort(-scores[top], kind="stable")]
+                results = [(keys[doc], float(score)) for doc, score in zip(docs[top].tolist(), scores[top].tolist())
+                           if keys[doc] is not None]
+                if len(results) >= limit or take == len(docs):
+                    break
+                take = min(len(docs), take * 2)
+            return results[:limit]
+
+    def save(self, path: str):
+        """Write a snapshot of the index to disk (atomically replacing any previous one)"""
+        with self._lock:
+            state = {
+                "k1": self.k1,
+                "b": self.b,
+                "postings": self._postings,
+                "keys": self._keys,
+                "lengths": self._lengths,
+                "kinds": self._kinds,
+                "doc_events": self._doc_events,
+                "total_length": self._total_length,
+                "deleted": self._deleted,
+                "event_ids": self._event_ids,
+                "event_public": self._event_public
+            }
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        """Load an index from a snapshot written by save"""
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+
+        index = cls(state["k1"], state["b"])
+        index._postings = state["postings"]
+        index._keys = state["keys"]
+        index._doc_numbers = {key: number for number, key in enumerate(index._keys) if key is not None}
+        index._lengths = state["lengths"]
+        index._kinds = state["kinds"]
+        index._doc_events = state["doc_events"]
+        index._total_length = state["total_length"]
+        index._deleted = state["deleted"]
+        index._event_ids = state["event_ids"]
+        index._event_numbers = {event_id: number for number, event_id in enumerate(index._event_ids) if event_id is not None}
+        index._event_public = state["event_public"]
+        return index
+
+    def size_bytes(self) -> int:
+        """Approximate memory used by the postings and per-document arrays"""
+        postings = sum(docs.itemsize * len(docs) + tfs.itemsize * len(tfs) for docs, tfs in self._postings.values())
+        per_doc = len(self._keys) * (4 + 1 + 4)
+        return postings + per_doc
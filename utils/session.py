@@ -33,4 +33,17 @@ def navigate_to(page, **kwargs):
     # Update other session variables if provided
     for key, value in kwargs.items():
         if key in st.session_state:
-            st.session_state[key] = value 
\ No newline at end of file
+            st.session_state[key] = value
+
+def section_navigation(key, sections):
+    """
+    Show a tab-like section switcher and return the active section.
+    Unlike st.tabs, only the active section's body needs to run.
+    """
+    return st.radio(
+        "Section",
+        sections,
+        key=key,
+        horizontal=True,
+        label_visibility="collapsed"
+    )
@@ -0,0 +1,1539 @@
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional, Callable, Iterable, Mapping, Tuple
+from urllib.parse import urlsplit
+
+from data.records import User, Event, WishlistItem, CONTRIBUTION_FIELDS, parse_date
+from utils.chat_store import ChatStore, DEFAULT_ARCHIVE_DIR
+from utils.contribution_ledger import ContributionLedger, BY_EVENT, BY_ITEM, BY_USER, BY_DAY
+from utils.resp import RespClient
+from utils.wallet_ledger import WalletLedger, ENTRY_KINDS, OPENING, ledger_entry
+
+# Backend configuration, read from the environment:
+#   HUBSHUB_BACKEND   memory (default) | sqlite:PATH | redis://HOST:PORT/DB
+
+def _json_default(value):
+    # NumPy scalars, e.g. in price statistics
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _dumps(value: Any) -> str:
+    return json.dumps(dict(value) if isinstance(value, Mapping) else value,
+                      separators=(",", ":"), default=_json_default)
+
+def _split_contribution(contribution: Mapping) -> Tuple[int, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Whole cents, ISO day and remaining keys of a contribution, split like
+    ContributionLedger stores them: amounts that aren't whole cents and dates
+    that aren't ISO dates are kept as given with the remaining keys
+    """
+    extra = {key: value for key, value in contribution.items() if key not in CONTRIBUTION_FIELDS}
+    amount = contribution["amount"]
+    cents = int(round(amount * 100))
+    if cents / 100 != amount:
+        extra["amount"] = amount
+    date = parse_date(contribution.get("date"))
+    if date is None:
+        extra["date"] = contribution.get("date")
+    return cents, date.isoformat() if date else None, extra or None
+
+def _join_contribution(event_id: str, item_id: str, user_id: str, cents: int, day: Optional[str],
+                       extra: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    contribution = {"event_id": event_id, "item_id": item_id, "user_id": user_id,
+                    "amount": cents / 100, "date": day}
+    if extra:
+        contribution.update(extra)
+    return contribution
+
+def _check_filters(by: Optional[str], event_id: Optional[str], item_id: Optional[str]):
+    if by is not None and by not in (BY_EVENT, BY_ITEM, BY_USER, BY_DAY):
+        raise ValueError(f"Unknown group-by key: {by}")
+    if item_id is not None and event_id is None:
+        raise ValueError("Filtering by item needs the item's event")
+
+# Collections whose writes are counted by StorageBackend.versions()
+USERS = "users"
+EVENTS = "events"
+WISHLISTS = "wishlists"
+CHATS = "chats"
+CONTRIBUTIONS = "contributions"
+POSTS = "posts"
+COLLECTIONS = (USERS, EVENTS, WISHLISTS, CHATS, CONTRIBUTIONS, POSTS)
+
+def _sum_by(by: str, rows: Iterable[Tuple[str, str, str, int, Optional[str]]]) -> Dict[Any, float]:
+    """Totals per group of (event_id, item_id, user_id, cents, day) rows, as ContributionLedger.totals"""
+    index = {BY_EVENT: 0, BY_USER: 2, BY_DAY: 4}.get(by)
+    sums: Dict[Any, int] = {}
+    for row in rows:
+        key = (row[0], row[1]) if by == BY_ITEM else row[index]
+        sums[key] = sums.get(key, 0) + row[3]
+    return {key: cents / 100 for key, cents in sums.items()}
+
+def _check_kind(kind: str):
+    if kind not in ENTRY_KINDS:
+        raise ValueError(f"Unknown ledger entry kind: {kind}")
+
+def _page_bounds(count: int, cursor: Optional[int], limit: int) -> Tuple[int, int]:
+    """Positions [start, end) of a newest-first page of `count` entries before `cursor`"""
+    end = count if cursor is None else max(0, min(cursor, count))
+    return max(0, end - limit), end
+
+def _wallet_differences(balances: Mapping[str, float], sums: Mapping[str, float],
+                        tolerance: float) -> Dict[str, float]:
+    """Difference (balance - ledger sum) for every user whose balance doesn't reconcile"""
+    differences = {}
+    for user_id, balance in balances.items():
+        difference = balance - sums.get(user_id, 0.0)
+        if abs(difference) > tolerance:
+            differences[user_id] = difference
+    return differences
+
+def _post_defaults(post: Dict[str, Any]) -> Dict[str, Any]:
+    post.setdefault("likes", 0)
+    post.setdefault("comments", [])
+    post.setdefault("date", datetime.datetime.now().strftime("%Y-%m-%d"))
+    return post
+
+def _page_posts(fetch: Callable[[List[int]], Dict[int, Any]], count: int, cursor: Optional[int],
+                limit: int) -> Tuple[List[Any], Optional[int]]:
+    """Newest-first page of posts whose ids are their positions (see FeedStore.read_timeline)"""
+    start, end = _page_bounds(count, cursor, limit)
+    post_ids = list(range(end - 1, start - 1, -1))
+    posts = fetch(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts], (start if start > 0 else None)
+
+class StorageBackend:
+    """
+    Interface of the store behind DataManager: users, events and their
+    members, wishlists, chat logs, contributions, community posts and
+    wallet ledgers.
+    Users, events and wishlist items are returned as data.records types,
+    messages, contributions and posts as mappings. Only the memory backend
+    returns the stored objects themselves, so callers write changes back
+    through these methods rather than by mutating what they read.
+    """
+
+    # Whether other processes see this backend's writes
+    shared = False
+
+    def versions(self) -> Dict[str, int]:
+        """
+        Write counters of the COLLECTIONS, bumped in the same atomic step as
+        each write, so a process can tell when the views it builds from a
+        collection are stale. Numeric adjustments (balances, points, pooled
+        amounts, likes) aren't counted: no view is built from them. Backends
+        that aren't shared return no counters.
+        """
+        return {}
+
+    # Users
+
+    def is_empty(self) -> bool:
+        """Whether the backend holds no users"""
+        raise NotImplementedError
+
+    def get_users(self, user_ids: Iterable[str]) -> Dict[str, User]:
+        """The users found, keyed by ID, in one backend call"""
+        raise NotImplementedError
+
+    def get_user(self, user_id: str) -> Optional[User]:
+        return self.get_users([user_id]).get(user_id)
+
+    def all_users(self) -> Mapping[str, User]:
+        raise NotImplementedError
+
+    def put_user(self, user: Mapping) -> User:
+        """Insert or replace a user"""
+        raise NotImplementedError
+
+    def update_user(self, user_id: str, fields: Mapping) -> bool:
+        """Set some of a user's fields; False if there is no such user"""
+        raise NotImplementedError
+
+    def adjust_user_number(self, user_id: str, field: str, delta: float,
+                           minimum: Optional[float] = None) -> Optional[float]:
+        """
+        Atomically add `delta` to a numeric field of a user (e.g. the wallet balance)
+
+        Returns:
+            The new value, or None (and nothing changes) if there is no such user
+            or the new value would be below `minimum`
+        """
+        raise NotImplementedError
+
+    # Wallets
+
+    def adjust_wallet(self, user_id: str, kind: str, amount: float, description: str,
+                      reference: Optional[str] = None, minimum: Optional[float] = None,
+                      ts: Optional[float] = None) -> Optional[float]:
+        """
+        Add `amount` to a user's wallet balance and append the matching entry
+        to their wallet ledger (see utils.wallet_ledger), as one atomic step
+
+        Args:
+            kind: One of utils.wallet_ledger.ENTRY_KINDS
+            ts: Entry time (unix seconds); defaults to now. A user's entries are kept time-ordered.
+
+        Returns:
+            The new balance, or None (and nothing changes) if there is no such user
+            or the new balance would be below `minimum`
+        """
+        raise NotImplementedError
+
+    def wallet_balance(self, user_id: str) -> float:
+        """A user's balance after their latest ledger entry (0.0 without entries)"""
+        raise NotImplementedError
+
+    def wallet_balance_at(self, user_id: str, when: float) -> float:
+        """A user's balance after their ledger entries up to a unix time"""
+        raise NotImplementedError
+
+    def wallet_history(self, user_id: str, cursor: Optional[int] = None,
+                       limit: int = 20) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        A page of a user's ledger entries, newest first, with the cursor of the
+        next (older) page or None (see WalletLedger.history)
+        """
+        raise NotImplementedError
+
+    def reconcile_wallets(self, tolerance: float = 0.005) -> Dict[str, float]:
+        """Difference between the wallet balance and the ledger sum of every user whose don't match"""
+        raise NotImplementedError
+
+    # Events
+
+    def get_events(self, event_ids: Iterable[str]) -> Dict[str, Event]:
+        """The events found, keyed by ID, in one backend call"""
+        raise NotImplementedError
+
+    def get_event(self, event_id: str) -> Optional[Event]:
+        return self.get_events([event_id]).get(event_id)
+
+    def all_events(self) -> Mapping[str, Event]:
+        raise NotImplementedError
+
+    def put_event(self, event: Mapping) -> Event:
+        """Insert or replace an event, adding its creator and participants to its members"""
+        raise NotImplementedError
+
+    def put_event_if_absent(self, event: Mapping) -> Optional[Event]:
+        """Atomically insert an event unless one with its ID exists (see put_event); None if it does"""
+        raise NotImplementedError
+
+    def get_user_events(self, user_id: str) -> List[Event]:
+        """Events the user created or was invited to, in the order they were added"""
+        raise NotImplementedError
+
+    def set_rsvp(self, event_id: str, user_id: str, status: str) -> Tuple[Optional[Event], Optional[str]]:
+        """
+        Atomically set a participant's RSVP status
+
+        Returns:
+            The updated event and the previous status, or (None, None) if there is no such event
+        """
+        raise NotImplementedError
+
+    # Wishlists
+
+    def get_wishlist(self, event_id: str) -> List[WishlistItem]:
+        raise NotImplementedError
+
+    def all_wishlists(self) -> Mapping[str, List[WishlistItem]]:
+        """Wishlists keyed by event ID (empty for events without items)"""
+        raise NotImplementedError
+
+    def get_wishlist_item(self, event_id: str, item_id: str) -> Optional[WishlistItem]:
+        raise NotImplementedError
+
+    def put_wishlist_item(self, event_id: str, item: Mapping) -> WishlistItem:
+        """Insert an item at the end of an event's wishlist, or replace it in place"""
+        raise NotImplementedError
+
+    def update_wishlist_item(self, event_id: str, item_id: str, updates: Mapping) -> Optional[WishlistItem]:
+        """Set some of an item's fields; returns the updated item, or None if there is no such item"""
+        raise NotImplementedError
+
+    def adjust_item_number(self, event_id: str, item_id: str, field: str, delta: float) -> Optional[float]:
+        """Atomically add `delta` to a numeric field of an item; returns the new value (None if there is no such item)"""
+        raise NotImplementedError
+
+    # Chats
+
+    def append_chat_message(self, event_id: str, message: Mapping) -> Mapping:
+        """Append a message to an event's chat; returns the stored message, with its 'id' (position) set"""
+        raise NotImplementedError
+
+    def read_chat_messages(self, event_id: str, cursor: Optional[int] = None,
+                           limit: Optional[int] = None) -> List[Mapping]:
+        """Up to `limit` messages older than the `cursor` message id (the newest without one), oldest first"""
+        raise NotImplementedError
+
+    def chat_message_count(self, event_id: str) -> int:
+        raise NotImplementedError
+
+    def all_chats(self) -> Mapping[str, Iterable[Mapping]]:
+        """Every event's messages, oldest first, keyed by event ID"""
+        raise NotImplementedError
+
+    def archive_chat(self, event_id: str, directory: str = DEFAULT_ARCHIVE_DIR) -> int:
+        """Move an event's chat out of process memory; returns the bytes released"""
+        return 0
+
+    def chat_memory_stats(self) -> Dict[str, int]:
+        """Events with chats in memory and on disk, and the approximate bytes of messages in memory"""
+        return {"resident_events": 0, "archived_events": 0, "resident_bytes": 0}
+
+    # Contributions
+
+    def add_contribution(self, contribution: Mapping) -> int:
+        """Append a contribution ('event_id', 'item_id', 'user_id', 'amount', 'date'); returns its position"""
+        raise NotImplementedError
+
+    def get_contributions(self, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                          user_id: Optional[str] = None) -> List[Mapping]:
+        """The matching contributions, oldest first (filtering by item needs the item's event)"""
+        raise NotImplementedError
+
+    def contribution_totals(self, by: str, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                            user_id: Optional[str] = None) -> Dict[Any, float]:
+        """Total contributed per group, as ContributionLedger.totals"""
+        raise NotImplementedError
+
+    def contribution_frame(self):
+        """pandas DataFrame of the contributions (see ContributionLedger.frame)"""
+        return ContributionLedger(self.get_contributions()).frame()
+
+    # Community posts
+
+    def add_post(self, post: Mapping) -> Mapping:
+        """Publish a post; returns the stored post, with its 'id' (position) set"""
+        raise NotImplementedError
+
+    def get_posts(self, post_ids: Iterable[int]) -> Dict[int, Mapping]:
+        """The posts found, keyed by ID, in one backend call"""
+        raise NotImplementedError
+
+    def get_post(self, post_id: int) -> Optional[Mapping]:
+        return self.get_posts([post_id]).get(post_id)
+
+    def read_posts(self, cursor: Optional[int] = None, limit: int = 10) -> Tuple[List[Mapping], Optional[int]]:
+        """A page of all posts, newest first, and the cursor for the next (older) page"""
+        raise NotImplementedError
+
+    def all_posts(self) -> List[Mapping]:
+        """All posts, oldest first"""
+        raise NotImplementedError
+
+    def like_post(self, post_id: int) -> Optional[int]:
+        """Atomically add a like; returns the new like count (None if there is no such post)"""
+        raise NotImplementedError
+
+    def add_post_comment(self, post_id: int, comment: Mapping) -> Optional[int]:
+        """Atomically append a comment; returns the new comment count (None if there is no such post)"""
+        raise NotImplementedError
+
+    def seed(self, users: Mapping[str, Mapping], events: Mapping[str, Mapping],
+             wishlists: Mapping[str, Iterable[Mapping]], chats: Mapping[str, Iterable[Mapping]],
+             contributions: Iterable[Mapping], posts: Iterable[Mapping]) -> bool:
+        """
+        Load collections (e.g. data.mock_data's) into an empty backend
+
+        Returns:
+            False, loading nothing, if the backend already holds users
+        """
+        if not self.is_empty():
+            return False
+        for user in users.values():
+            # Wallets are opened through the ledger, so balance and ledger start out agreeing
+            self.put_user(dict(user, wallet_balance=0.0))
+            self.adjust_wallet(user["id"], OPENING, user.get("wallet_balance", 0.0), "Opening balance")
+        for event in events.values():
+            self.put_event(event)
+        for event_id, items in wishlists.items():
+            for item in items:
+                self.put_wishlist_item(event_id, item)
+        for event_id, messages in chats.items():
+            for message in messages:
+                self.append_chat_message(event_id, {key: value for key, value in message.items() if key != "id"})
+        for contribution in contributions:
+            self.add_contribution(contribution)
+        for post in posts:
+            self.add_post({key: value for key, value in post.items() if key != "id"})
+        return True
+
+    def close(self):
+        """Release connections"""
+
+class MemoryBackend(StorageBackend):
+    """
+    Collections in process memory: the dicts and lists DataManager loads from
+    data.mock_data (or a snapshot), with chats in a ChatStore,
+    contributions in a ContributionLedger and wallet entries in a
+    WalletLedger. Every write is reported to `on_write` as a utils.journal
+    record, so Persistence can make it durable.
+    """
+
+    def __init__(self, users: Dict[str, User], events: Dict[str, Event], wishlists: Dict[str, List[WishlistItem]],
+                 chats: Dict[str, Any], contributions: ContributionLedger, posts: List[Dict[str, Any]],
+                 chat_log_factory: Callable[[], Any] = list,
+                 on_write: Optional[Callable[..., None]] = None,
+                 wallet_ledger: Optional[WalletLedger] = None):
+        """
+        Initialize the backend over existing collections, used in place
+
+        Args:
+            users, events, wishlists: Records keyed by ID (wishlists by event ID)
+            chats: Chat logs keyed by event ID
+            contributions: Contribution ledger
+            posts: Community posts, oldest first (a post's id is its position)
+            chat_log_factory: Creates the log of an event's first message
+            on_write: Called with (op, *args) after each write
+            wallet_ledger: Wallet ledger (a new one by default); users it has no
+                entries for get an opening entry of their balance
+        """
+        self._users = users
+        self._events = events
+        self._wishlists = wishlists
+        self._chats = chats
+        self._chat_store = ChatStore(chats, chat_log_factory)
+        self._contributions = contributions
+        self._posts = posts
+        self._wallet_ledger = wallet_ledger if wallet_ledger is not None else WalletLedger()
+        self._on_write = on_write or (lambda op, *args: None)
+        # Serializes read-modify-writes, and the appends to the positional logs with
+        # their journal records, so the journal replays them in position order
+        self._lock = threading.RLock()
+
+        for user_id, user in users.items():
+            if user_id not in self._wallet_ledger:
+                self._append_wallet_entry(user_id, user.get("wallet_balance", 0.0), OPENING,
+                                          user.get("wallet_balance", 0.0), "Opening balance", None, None)
+
+        self._events_by_user: Dict[str, List[str]] = {}
+        for event in events.values():
+            self._index_event(event)
+        for position, post in enumerate(posts):
+            post["id"] = position
+            _post_defaults(post)
+
+    def _index_event(self, event: Mapping):
+        for user_id in [event["creator"]] + list(event.get("participants", [])):
+            event_ids = self._events_by_user.setdefault(user_id, [])
+            if event["id"] not in event_ids:
+                event_ids.append(event["id"])
+
+    def is_empty(self) -> bool:
+        return not self._users
+
+    def get_users(self, user_ids: Iterable[str]) -> Dict[str, User]:
+        return {user_id: self._users[user_id] for user_id in user_ids if user_id in self._users}
+
+    def all_users(self) -> Mapping[str, User]:
+        return self._users
+
+    def put_user(self, user: Mapping) -> User:
+        user = User.from_mapping(user)
+        with self._lock:
+            self._users[user["id"]] = user
+            self._on_write("user", user["id"], dict(user))
+        return user
+
+    def update_user(self, user_id: str, fields: Mapping) -> bool:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return False
+            user.update(fields)
+            self._on_write("user", user_id, dict(fields))
+        return True
+
+    def adjust_user_number(self, user_id: str, field: str, delta: float,
+                           minimum: Optional[float] = None) -> Optional[float]:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            value = user.get(field, 0) + delta
+            if minimum is not None and value < minimum:
+                return None
+            user[field] = value
+            self._on_write("user", user_id, {field: value})
+        return value
+
+    def _append_wallet_entry(self, user_id: str, balance: float, kind: str, amount: float, description: str,
+                             reference: Optional[str], ts: Optional[float]):
+        # The balance and the entry are one journal record, so replay restores both or neither
+        position = len(self._wallet_ledger)
+        entry = self._wallet_ledger.append(user_id, kind, amount, description, reference, ts)
+        self._on_write("wallet", user_id, balance, position, kind, amount, description, reference, entry["ts"])
+
+    def adjust_wallet(self, user_id: str, kind: str, amount: float, description: str,
+                      reference: Optional[str] = None, minimum: Optional[float] = None,
+                      ts: Optional[float] = None) -> Optional[float]:
+        _check_kind(kind)
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            balance = user.get("wallet_balance", 0.0) + amount
+            if minimum is not None and balance < minimum:
+                return None
+            user["wallet_balance"] = balance
+            self._append_wallet_entry(user_id, balance, kind, amount, description, reference, ts)
+        return balance
+
+    def wallet_balance(self, user_id: str) -> float:
+        return self._wallet_ledger.balance(user_id)
+
+    def wallet_balance_at(self, user_id: str, when: float) -> float:
+        return self._wallet_ledger.balance_at(user_id, when)
+
+    def wallet_history(self, user_id: str, cursor: Optional[int] = None,
+                       limit: int = 20) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        return self._wallet_ledger.history(user_id, cursor, limit)
+
+    def reconcile_wallets(self, tolerance: float = 0.005) -> Dict[str, float]:
+        balances = {user_id: user.get("wallet_balance", 0.0) for user_id, user in list(self._users.items())}
+        differences = self._wallet_ledger.reconcile(balances, tolerance)
+        # Users without entries have a ledger sum of zero
+        differences.update(_wallet_differences(
+            {user_id: balance for user_id, balance in balances.items() if user_id not in self._wallet_ledger},
+            {}, tolerance))
+        return differences
+
+    def get_events(self, event_ids: Iterable[str]) -> Dict[str, Event]:
+        return {event_id: self._events[event_id] for event_id in event_ids if event_id in self._events}
+
+    def all_events(self) -> Mapping[str, Event]:
+        return self._events
+
+    def put_event(self, event: Mapping) -> Event:
+        with self._lock:
+            return self._put_event(Event.from_mapping(event))
+
+    def put_event_if_absent(self, event: Mapping) -> Optional[Event]:
+        with self._lock:
+            if event["id"] in self._events:
+                return None
+            return self._put_event(Event.from_mapping(event))
+
+    def _put_event(self, event: Event) -> Event:
+        self._events[event["id"]] = event
+        self._wishlists.setdefault(event["id"], [])
+        self._index_event(event)
+        self._on_write("event", event)
+        return event
+
+    def get_user_events(self, user_id: str) -> List[Event]:
+        return [self._events[event_id] for event_id in self._events_by_user.get(user_id, [])]
+
+    def set_rsvp(self, event_id: str, user_id: str, status: str) -> Tuple[Optional[Event], Optional[str]]:
+        with self._lock:
+            event = self._events.get(event_id)
+            if event is None:
+                return None, None
+            rsvp = event.setdefault("rsvp", {})
+            old_status = rsvp.get(user_id)
+            rsvp[user_id] = status
+            self._on_write("event", event)
+        return event, old_status
+
+    def get_wishlist(self, event_id: str) -> List[WishlistItem]:
+        return self._wishlists.get(event_id, [])
+
+    def all_wishlists(self) -> Mapping[str, List[WishlistItem]]:
+        return self._wishlists
+
+    def get_wishlist_item(self, event_id: str, item_id: str) -> Optional[WishlistItem]:
+        for item in self._wishlists.get(event_id, []):
+            if item["id"] == item_id:
+                return item
+        return None
+
+    def put_wishlist_item(self, event_id: str, item: Mapping) -> WishlistItem:
+        item = WishlistItem.from_mapping(item)
+        with self._lock:
+            wishlist = self._wishlists.setdefault(event_id, [])
+            for i, existing in enumerate(wishlist):
+                if existing["id"] == item["id"]:
+                    wishlist[i] = item
+                    break
+            else:
+                wishlist.append(item)
+            self._on_write("item", event_id, item)
+        return item
+
+    def update_wishlist_item(self, event_id: str, item_id: str, updates: Mapping) -> Optional[WishlistItem]:
+        with self._lock:
+            item = self.get_wishlist_item(event_id, item_id)
+            if item is None:
+                return None
+            item.update(updates)
+            self._on_write("item", event_id, item)
+        return item
+
+    def adjust_item_number(self, event_id: str, item_id: str, field: str, delta: float) -> Optional[float]:
+        with self._lock:
+            item = self.get_wishlist_item(event_id, item_id)
+            if item is None:
+                return None
+            value = item[field] = item.get(field, 0) + delta
+            self._on_write("item", event_id, item)
+        return value
+
+    def append_chat_message(self, event_id: str, message: Mapping) -> Mapping:
+        message = dict(message)
+        with self._lock:
+            self._chat_store.append(event_id, message)
+            self._on_write("chat", event_id, message)
+        return message
+
+    def read_chat_messages(self, event_id: str, cursor: Optional[int] = None,
+                           limit: Optional[int] = None) -> List[Mapping]:
+        return self._chat_store.read(event_id, cursor, limit)
+
+    def chat_message_count(self, event_id: str) -> int:
+        return self._chat_store.count(event_id)
+
+    def all_chats(self) -> Mapping[str, Iterable[Mapping]]:
+        return self._chats
+
+    def archive_chat(self, event_id: str, directory: str = DEFAULT_ARCHIVE_DIR) -> int:
+        return self._chat_store.archive(event_id, directory)
+
+    def chat_memory_stats(self) -> Dict[str, int]:
+        return self._chat_store.memory_stats()
+
+    def add_contribution(self, contribution: Mapping) -> int:
+        with self._lock:
+            position = len(self._contributions)
+            self._contributions.append(contribution)
+            self._on_write("contribution", position, contribution)
+        return position
+
+    def get_contributions(self, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                          user_id: Optional[str] = None) -> List[Mapping]:
+        return self._contributions.select(event_id, item_id, user_id)
+
+    def contribution_totals(self, by: str, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                            user_id: Optional[str] = None) -> Dict[Any, float]:
+        return self._contributions.totals(by, event_id, item_id, user_id)
+
+    def contribution_frame(self):
+        return self._contributions.frame()
+
+    def add_post(self, post: Mapping) -> Mapping:
+        post = _post_defaults(post if isinstance(post, dict) else dict(post))
+        with self._lock:
+            post["id"] = len(self._posts)
+            self._posts.append(post)
+            self._on_write("post", post)
+        return post
+
+    def get_posts(self, post_ids: Iterable[int]) -> Dict[int, Mapping]:
+        count = len(self._posts)
+        return {post_id: self._posts[post_id] for post_id in post_ids if 0 <= post_id < count}
+
+    def read_posts(self, cursor: Optional[int] = None, limit: int = 10) -> Tuple[List[Mapping], Optional[int]]:
+        return _page_posts(self.get_posts, len(self._posts), cursor, limit)
+
+    def all_posts(self) -> List[Mapping]:
+        return self._posts
+
+    def like_post(self, post_id: int) -> Optional[int]:
+        with self._lock:
+            post = self.get_post(post_id)
+            if post is None:
+                return None
+            post["likes"] += 1
+            self._on_write("post", post)
+        return post["likes"]
+
+    def add_post_comment(self, post_id: int, comment: Mapping) -> Optional[int]:
+        with self._lock:
+            post = self.get_post(post_id)
+            if post is None:
+                return None
+            post["comments"].append(dict(comment))
+            self._on_write("post", post)
+        return len(post["comments"])
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS event_members (
+    user_id TEXT NOT NULL, event_id TEXT NOT NULL, UNIQUE (user_id, event_id));
+CREATE TABLE IF NOT EXISTS wishlists (event_id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS wishlist_items (
+    event_id TEXT NOT NULL, item_id TEXT NOT NULL, data TEXT NOT NULL, UNIQUE (event_id, item_id));
+CREATE TABLE IF NOT EXISTS chat_messages (
+    event_id TEXT NOT NULL, id INTEGER NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (event_id, id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS contributions (
+    position INTEGER PRIMARY KEY, event_id TEXT NOT NULL, item_id TEXT NOT NULL, user_id TEXT NOT NULL,
+    cents INTEGER NOT NULL, day TEXT, extra TEXT);
+CREATE INDEX IF NOT EXISTS contributions_by_item ON contributions (event_id, item_id);
+CREATE INDEX IF NOT EXISTS contributions_by_user ON contributions (user_id);
+CREATE TABLE IF NOT EXISTS posts (id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS wallet_entries (
+    user_id TEXT NOT NULL, seq INTEGER NOT NULL, ts REAL NOT NULL, kind TEXT NOT NULL, amount REAL NOT NULL,
+    balance REAL NOT NULL, description TEXT NOT NULL, reference TEXT,
+    PRIMARY KEY (user_id, seq)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS wallet_entries_by_time ON wallet_entries (user_id, ts);
+CREATE TABLE IF NOT EXISTS versions (collection TEXT PRIMARY KEY, version INTEGER NOT NULL);
+"""
+
+# Host parameters per IN (...) query, under SQLite's default limit
+_SQLITE_BATCH = 500
+
+class SQLiteBackend(StorageBackend):
+    """
+    Collections in a SQLite database file, shared by every process that opens
+    it. Records are stored as JSON next to the keys they are looked up by;
+    contributions are stored as columns, so totals are GROUP BY queries.
+    Wallet entries are rows holding the balance after them, so current and
+    past balances are single indexed lookups. Each thread has its own connection; the database runs in WAL mode, so
+    readers don't wait for the writer, and every read-modify-write runs in a
+    BEGIN IMMEDIATE transaction.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        """
+        Open (and create if needed) a database
+
+        Args:
+            path: Database file
+            timeout: Seconds to wait for another process's write transaction
+        """
+        self.path = path
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SQLITE_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit; writes open their own transactions (see _write)
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    @contextlib.contextmanager
+    def _write(self):
+        """Transaction holding the database's write lock from the start, so its reads can't go stale"""
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _bump(db: sqlite3.Connection, collection: str):
+        """Count a write to a collection, inside its transaction (see versions)"""
+        db.execute("INSERT INTO versions (collection, version) VALUES (?, 1) "
+                   "ON CONFLICT (collection) DO UPDATE SET version = version + 1", (collection,))
+
+    def _modify(self, table: str, where: str, params: Tuple, modify: Callable[[Dict[str, Any]], Any],
+                collection: Optional[str] = None) -> Any:
+        """
+        Change one JSON record in a transaction. modify(data) changes the
+        decoded record in place and returns the result, or None to leave it
+        unchanged. Returns None if there is no such record. A change is
+        counted as a write to `collection`, if given.
+        """
+        with self._write() as db:
+            row = db.execute(f"SELECT data FROM {table} WHERE {where}", params).fetchone()
+            if row is None:
+                return None
+            data = json.loads(row[0])
+            result = modify(data)
+            if result is not None:
+                db.execute(f"UPDATE {table} SET data = ? WHERE {where}", (_dumps(data),) + params)
+                if collection:
+                    self._bump(db, collection)
+            return result
+
+    def versions(self) -> Dict[str, int]:
+        return dict(self._connection().execute("SELECT collection, version FROM versions"))
+
+    def _select_in(self, sql: str, keys: List[Any]) -> List[Tuple]:
+        """Rows of a query with one `IN ({})` list of keys, in batches"""
+        rows = []
+        db = self._connection()
+        for start in range(0, len(keys), _SQLITE_BATCH):
+            batch = keys[start:start + _SQLITE_BATCH]
+            rows.extend(db.execute(sql.format(",".join("?" * len(batch))), batch))
+        return rows
+
+    def is_empty(self) -> bool:
+        return self._connection().execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    def get_users(self, user_ids: Iterable[str]) -> Dict[str, User]:
+        user_ids = list(user_ids)
+        found = dict(self._select_in("SELECT id, data FROM users WHERE id IN ({})", user_ids))
+        return {user_id: User(json.loads(found[user_id])) for user_id in user_ids if user_id in found}
+
+    def all_users(self) -> Mapping[str, User]:
+        rows = self._connection().execute("SELECT id, data FROM users ORDER BY rowid")
+        return {user_id: User(json.loads(data)) for user_id, data in rows}
+
+    def put_user(self, user: Mapping) -> User:
+        user = User.from_mapping(user)
+        with self._write() as db:
+            db.execute("INSERT INTO users (id, data) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET data = excluded.data",
+                       (user["id"], _dumps(user)))
+            self._bump(db, USERS)
+        return user
+
+    def update_user(self, user_id: str, fields: Mapping) -> bool:
+        return bool(self._modify("users", "id = ?", (user_id,), lambda user: user.update(fields) or True, USERS))
+
+    def adjust_user_number(self, user_id: str, field: str, delta: float,
+                           minimum: Optional[float] = None) -> Optional[float]:
+        def adjust(user):
+            value = user.get(field, 0) + delta
+            if minimum is not None and value < minimum:
+                return None
+            user[field] = value
+            return value
+
+        return self._modify("users", "id = ?", (user_id,), adjust)
+
+    def adjust_wallet(self, user_id: str, kind: str, amount: float, description: str,
+                      reference: Optional[str] = None, minimum: Optional[float] = None,
+                      ts: Optional[float] = None) -> Optional[float]:
+        _check_kind(kind)
+        with self._write() as db:
+            row = db.execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+            if row is None:
+                return None
+            user = json.loads(row[0])
+            balance = user.get("wallet_balance", 0.0) + amount
+            if minimum is not None and balance < minimum:
+                return None
+            user["wallet_balance"] = balance
+
+            seq, last_ts = db.execute("SELECT COALESCE(MAX(seq) + 1, 0), MAX(ts) FROM wallet_entries WHERE user_id = ?",
+                                      (user_id,)).fetchone()
+            ts = time.time() if ts is None else ts
+            if last_ts is not None:
+                ts = max(ts, last_ts)
+            db.execute("UPDATE users SET data = ? WHERE id = ?", (_dumps(user), user_id))
+            db.execute("INSERT INTO wallet_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       (user_id, seq, ts, kind, amount, balance, description, reference))
+        return balance
+
+    def wallet_balance(self, user_id: str) -> float:
+        row = self._connection().execute(
+            "SELECT balance FROM wallet_entries WHERE user_id = ? ORDER BY seq DESC LIMIT 1", (user_id,)).fetchone()
+        return row[0] if row else 0.0
+
+    def wallet_balance_at(self, user_id: str, when: float) -> float:
+        row = self._connection().execute(
+            "SELECT balance FROM wallet_entries WHERE user_id = ? AND ts <= ? ORDER BY ts DESC, seq DESC LIMIT 1",
+            (user_id, when)).fetchone()
+        return row[0] if row else 0.0
+
+    def wallet_history(self, user_id: str, cursor: Optional[int] = None,
+                       limit: int = 20) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        db = self._connection()
+        count, = db.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM wallet_entries WHERE user_id = ?",
+                            (user_id,)).fetchone()
+        start, end = _page_bounds(count, cursor, limit)
+        rows = db.execute("SELECT seq, ts, kind, amount, description, reference FROM wallet_entries "
+                          "WHERE user_id = ? AND seq >= ? AND seq < ? ORDER BY seq DESC", (user_id, start, end))
+        return [ledger_entry(*row) for row in rows], (start if start > 0 else None)
+
+    def reconcile_wallets(self, tolerance: float = 0.005) -> Dict[str, float]:
+        # One read transaction, so no write lands between the balances and the sums
+        db = self._connection()
+        db.execute("BEGIN")
+        try:
+            balances = {user_id: json.loads(data).get("wallet_balance", 0.0)
+                        for user_id, data in db.execute("SELECT id, data FROM users ORDER BY rowid")}
+            sums = dict(db.execute("SELECT user_id, SUM(amount) FROM wallet_entries GROUP BY user_id"))
+        finally:
+            db.execute("COMMIT")
+        return _wallet_differences(balances, sums, tolerance)
+
+    def get_events(self, event_ids: Iterable[str]) -> Dict[str, Event]:
+        event_ids = list(event_ids)
+        found = dict(self._select_in("SELECT id, data FROM events WHERE id IN ({})", event_ids))
+        return {event_id: Event(json.loads(found[event_id])) for event_id in event_ids if event_id in found}
+
+    def all_events(self) -> Mapping[str, Event]:
+        rows = self._connection().execute("SELECT id, data FROM events ORDER BY rowid")
+        return {event_id: Event(json.loads(data)) for event_id, data in rows}
+
+    def put_event(self, event: Mapping) -> Event:
+        return self._put_event(event, "DO UPDATE SET data = excluded.data")
+
+    def put_event_if_absent(self, event: Mapping) -> Optional[Event]:
+        return self._put_event(event, "DO NOTHING")
+
+    def _put_event(self, event: Mapping, on_conflict: str) -> Optional[Event]:
+        event = Event.from_mapping(event)
+        members = [event["creator"]] + list(event.get("participants", []))
+        with self._write() as db:
+            inserted = db.execute(f"INSERT INTO events (id, data) VALUES (?, ?) ON CONFLICT (id) {on_conflict}",
+                                  (event["id"], _dumps(event)))
+            if not inserted.rowcount:
+                return None
+            db.execute("INSERT OR IGNORE INTO wishlists (event_id) VALUES (?)", (event["id"],))
+            db.executemany("INSERT OR IGNORE INTO event_members (user_id, event_id) VALUES (?, ?)",
+                           [(user_id, event["id"]) for user_id in members])
+            self._bump(db, EVENTS)
+        return event
+
+    def get_user_events(self, user_id: str) -> List[Event]:
+        rows = self._connection().execute(
+            "SELECT events.data FROM event_members JOIN events ON events.id = event_members.event_id "
+            "WHERE event_members.user_id = ? ORDER BY event_members.rowid", (user_id,))
+        return [Event(json.loads(data)) for data, in rows]
+
+    def set_rsvp(self, event_id: str, user_id: str, status: str) -> Tuple[Optional[Event], Optional[str]]:
+        def set_status(event):
+            rsvp = event.setdefault("rsvp", {})
+            old_status = rsvp.get(user_id)
+            rsvp[user_id] = status
+            return Event(event), old_status
+
+        return self._modify("events", "id = ?", (event_id,), set_status, EVENTS) or (None, None)
+
+    def get_wishlist(self, event_id: str) -> List[WishlistItem]:
+        rows = self._connection().execute(
+            "SELECT data FROM wishlist_items WHERE event_id = ? ORDER BY rowid", (event_id,))
+        return [WishlistItem(json.loads(data)) for data, in rows]
+
+    def all_wishlists(self) -> Mapping[str, List[WishlistItem]]:
+        db = self._connection()
+        wishlists = {event_id: [] for event_id, in db.execute("SELECT event_id FROM wishlists ORDER BY rowid")}
+        for event_id, data in db.execute("SELECT event_id, data FROM wishlist_items ORDER BY rowid"):
+            wishlists.setdefault(event_id, []).append(WishlistItem(json.loads(data)))
+        return wishlists
+
+    def get_wishlist_item(self, event_id: str, item_id: str) -> Optional[WishlistItem]:
+        row = self._connection().execute(
+            "SELECT data FROM wishlist_items WHERE event_id = ? AND item_id = ?", (event_id, item_id)).fetchone()
+        return WishlistItem(json.loads(row[0])) if row else None
+
+    def put_wishlist_item(self, event_id: str, item: Mapping) -> WishlistItem:
+        item = WishlistItem.from_mapping(item)
+        with self._write() as db:
+            db.execute("INSERT OR IGNORE INTO wishlists (event_id) VALUES (?)", (event_id,))
+            db.execute("INSERT INTO wishlist_items (event_id, item_id, data) VALUES (?, ?, ?) "
+                       "ON CONFLICT (event_id, item_id) DO UPDATE SET data = excluded.data",
+                       (event_id, item["id"], _dumps(item)))
+            self._bump(db, WISHLISTS)
+        return item
+
+    def update_wishlist_item(self, event_id: str, item_id: str, updates: Mapping) -> Optional[WishlistItem]:
+        def update(item):
+            item.update(updates)
+            return WishlistItem(item)
+
+        return self._modify("wishlist_items", "event_id = ? AND item_id = ?", (event_id, item_id), update, WISHLISTS)
+
+    def adjust_item_number(self, event_id: str, item_id: str, field: str, delta: float) -> Optional[float]:
+        def adjust(item):
+            value = item[field] = item.get(field, 0) + delta
+            return value
+
+        return self._modify("wishlist_items", "event_id = ? AND item_id = ?", (event_id, item_id), adjust)
+
+    def append_chat_message(self, event_id: str, message: Mapping) -> Mapping:
+        message = {key: value for key, value in message.items() if key != "id"}
+        with self._write() as db:
+            message_id, = db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chat_messages WHERE event_id = ?",
+                                     (event_id,)).fetchone()
+            db.execute("INSERT INTO chat_messages (event_id, id, data) VALUES (?, ?, ?)",
+                       (event_id, message_id, _dumps(message)))
+            self._bump(db, CHATS)
+        message["id"] = message_id
+        return message
+
+    @staticmethod
+    def _message(message_id: int, data: str) -> Dict[str, Any]:
+        message = json.loads(data)
+        message["id"] = message_id
+        return message
+
+    def read_chat_messages(self, event_id: str, cursor: Optional[int] = None,
+                           limit: Optional[int] = None) -> List[Mapping]:
+        if limit is not None and limit <= 0:
+            return []
+        rows = self._connection().execute(
+            "SELECT id, data FROM chat_messages WHERE event_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (event_id, 2 ** 62 if cursor is None else cursor, -1 if limit is None else limit)).fetchall()
+        return [self._message(message_id, data) for message_id, data in reversed(rows)]
+
+    def chat_message_count(self, event_id: str) -> int:
+        count, = self._connection().execute(
+            "SELECT COALESCE(MAX(id) + 1, 0) FROM chat_messages WHERE event_id = ?", (event_id,)).fetchone()
+        return count
+
+    def all_chats(self) -> Mapping[str, Iterable[Mapping]]:
+        chats = {}
+        for event_id, message_id, data in self._connection().execute(
+                "SELECT event_id, id, data FROM chat_messages ORDER BY event_id, id"):
+            chats.setdefault(event_id, []).append(self._message(message_id, data))
+        return chats
+
+    def add_contribution(self, contribution: Mapping) -> int:
+        cents, day, extra = _split_contribution(contribution)
+        with self._write() as db:
+            position, = db.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM contributions").fetchone()
+            db.execute("INSERT INTO contributions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (position, contribution["event_id"], contribution["item_id"], contribution["user_id"],
+                        cents, day, _dumps(extra) if extra else None))
+            self._bump(db, CONTRIBUTIONS)
+        return position
+
+    @staticmethod
+    def _where(event_id: Optional[str], item_id: Optional[str], user_id: Optional[str]) -> Tuple[str, Tuple]:
+        conditions, params = [], []
+        for column, value in (("event_id", event_id), ("item_id", item_id), ("user_id", user_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), tuple(params)
+
+    def get_contributions(self, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                          user_id: Optional[str] = None) -> List[Mapping]:
+        _check_filters(None, event_id, item_id)
+        where, params = self._where(event_id, item_id, user_id)
+        rows = self._connection().execute(
+            f"SELECT event_id, item_id, user_id, cents, day, extra FROM contributions{where} ORDER BY position", params)
+        return [_join_contribution(*row[:5], json.loads(row[5]) if row[5] else None) for row in rows]
+
+    def contribution_totals(self, by: str, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                            user_id: Optional[str] = None) -> Dict[Any, float]:
+        _check_filters(by, event_id, item_id)
+        columns = {BY_EVENT: "event_id", BY_ITEM: "event_id, item_id", BY_USER: "user_id", BY_DAY: "day"}[by]
+        where, params = self._where(event_id, item_id, user_id)
+        rows = self._connection().execute(
+            f"SELECT {columns}, SUM(cents) FROM contributions{where} GROUP BY {columns}", params)
+        if by == BY_ITEM:
+            return {(row[0], row[1]): row[2] / 100 for row in rows}
+        return {key: cents / 100 for key, cents in rows}
+
+    def add_post(self, post: Mapping) -> Mapping:
+        post = _post_defaults({key: value for key, value in post.items() if key != "id"})
+        with self._write() as db:
+            post["id"], = db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM posts").fetchone()
+            db.execute("INSERT INTO posts (id, data) VALUES (?, ?)", (post["id"], _dumps(post)))
+            self._bump(db, POSTS)
+        return post
+
+    def get_posts(self, post_ids: Iterable[int]) -> Dict[int, Mapping]:
+        return {post_id: json.loads(data)
+                for post_id, data in self._select_in("SELECT id, data FROM posts WHERE id IN ({})", list(post_ids))}
+
+    def read_posts(self, cursor: Optional[int] = None, limit: int = 10) -> Tuple[List[Mapping], Optional[int]]:
+        count, = self._connection().execute("SELECT COALESCE(MAX(id) + 1, 0) FROM posts").fetchone()
+        return _page_posts(self.get_posts, count, cursor, limit)
+
+    def all_posts(self) -> List[Mapping]:
+        return [json.loads(data) for data, in self._connection().execute("SELECT data FROM posts ORDER BY id")]
+
+    def like_post(self, post_id: int) -> Optional[int]:
+        def like(post):
+            post["likes"] += 1
+            return post["likes"]
+
+        return self._modify("posts", "id = ?", (post_id,), like)
+
+    def add_post_comment(self, post_id: int, comment: Mapping) -> Optional[int]:
+        def add_comment(post):
+            post["comments"].append(dict(comment))
+            return len(post["comments"])
+
+        return self._modify("posts", "id = ?", (post_id,), add_comment, POSTS)
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+class RedisBackend(StorageBackend):
+    """
+    Collections in a Redis-protocol server, shared by every process using it.
+    Records are hashes of JSON-encoded fields, so a single field can be
+    changed in place; chats are lists, whose RPUSH reply is the new message's
+    position. Multi-key writes are sent as one pipelined MULTI/EXEC, counters
+    use INCRBY/HINCRBYFLOAT, and conditional updates (a debit that must not
+    overdraw) WATCH the key and retry if it changed, so no server-side
+    scripts are needed. Contribution totals are kept per group with HINCRBY
+    as contributions are added. A user's wallet entries are a list holding
+    the balance after each entry, written in the same MULTI/EXEC as the
+    balance.
+    """
+
+    shared = True
+
+    def __init__(self, client: RespClient, prefix: str = "hubshub"):
+        """
+        Initialize the backend
+
+        Args:
+            client: Connection to the server
+            prefix: Prefix of every key, so several apps can share a database
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, *parts: Any) -> str:
+        return ":".join((self.prefix,) + tuple(str(part) for part in parts))
+
+    @staticmethod
+    def _decode_hash(reply: List[str]) -> Dict[str, Any]:
+        return {field: json.loads(value) for field, value in zip(reply[::2], reply[1::2])}
+
+    @staticmethod
+    def _encode_hash(record: Mapping) -> List[str]:
+        return [part for field, value in record.items() for part in (field, _dumps(value))]
+
+    def _put_hash(self, key: str, record: Mapping) -> List[Tuple]:
+        """Commands replacing a hash with a record's fields"""
+        commands = [("DEL", key)]
+        if record:
+            commands.append(("HSET", key) + tuple(self._encode_hash(record)))
+        return commands
+
+    def _get_hashes(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Decoded hashes (empty for missing keys), in one round trip"""
+        return [self._decode_hash(reply) for reply in self.client.pipeline([("HGETALL", key) for key in keys])]
+
+    def _bump(self, collection: str) -> Tuple:
+        """Command counting a write to a collection, sent in the write's transaction (see versions)"""
+        return ("HINCRBY", self._key("versions"), collection, 1)
+
+    def versions(self) -> Dict[str, int]:
+        reply = self.client.execute("HGETALL", self._key("versions"))
+        return {collection: int(version) for collection, version in zip(reply[::2], reply[1::2])}
+
+    def _update_hash(self, key: str, fields: Mapping, collection: str) -> Optional[Dict[str, Any]]:
+        """
+        Set some fields of an existing hash and read it back, atomically,
+        counting a write to `collection`; None if there is no such hash
+        """
+        if not fields:
+            return self._get_hashes([key])[0] or None
+        if not self.client.execute("EXISTS", key):
+            return None
+        replies = self.client.transaction([("HSET", key) + tuple(self._encode_hash(fields)), ("HGETALL", key),
+                                           self._bump(collection)])
+        return self._decode_hash(replies[1])
+
+    def _adjust(self, key: str, field: str, delta: float, minimum: Optional[float] = None) -> Optional[float]:
+        """
+        Add to a numeric field of an existing hash: WATCH the hash, check the
+        new value, then HINCRBY(FLOAT) in MULTI/EXEC; retried if the hash
+        changed in between
+        """
+        while True:
+            _, exists, value = self.client.pipeline([("WATCH", key), ("EXISTS", key), ("HGET", key, field)])
+            current = json.loads(value) if value is not None else 0
+            if not exists or (minimum is not None and current + delta < minimum):
+                self.client.execute("UNWATCH")
+                return None
+            integral = isinstance(current, int) and isinstance(delta, int)
+            replies = self.client.transaction([("HINCRBY" if integral else "HINCRBYFLOAT", key, field, delta)])
+            if replies is not None:
+                return int(replies[0]) if integral else float(replies[0])
+
+    def is_empty(self) -> bool:
+        return not self.client.execute("SCARD", self._key("users"))
+
+    def get_users(self, user_ids: Iterable[str]) -> Dict[str, User]:
+        user_ids = list(user_ids)
+        hashes = self._get_hashes([self._key("user", user_id) for user_id in user_ids])
+        return {user_id: User(fields) for user_id, fields in zip(user_ids, hashes) if fields}
+
+    def all_users(self) -> Mapping[str, User]:
+        return self.get_users(sorted(self.client.execute("SMEMBERS", self._key("users"))))
+
+    def put_user(self, user: Mapping) -> User:
+        user = User.from_mapping(user)
+        self.client.transaction(self._put_hash(self._key("user", user["id"]), user)
+                                + [("SADD", self._key("users"), user["id"]), self._bump(USERS)])
+        return user
+
+    def update_user(self, user_id: str, fields: Mapping) -> bool:
+        return self._update_hash(self._key("user", user_id), fields, USERS) is not None
+
+    def adjust_user_number(self, user_id: str, field: str, delta: float,
+                           minimum: Optional[float] = None) -> Optional[float]:
+        return self._adjust(self._key("user", user_id), field, delta, minimum)
+
+    def adjust_wallet(self, user_id: str, kind: str, amount: float, description: str,
+                      reference: Optional[str] = None, minimum: Optional[float] = None,
+                      ts: Optional[float] = None) -> Optional[float]:
+        _check_kind(kind)
+        key, wallet_key = self._key("user", user_id), self._key("wallet", user_id)
+        while True:
+            # WATCH both, so the balance and the entry's time are checked against the latest entry
+            _, exists, value, last = self.client.pipeline([
+                ("WATCH", key, wallet_key), ("EXISTS", key), ("HGET", key, "wallet_balance"),
+                ("LINDEX", wallet_key, -1)
+            ])
+            balance = (json.loads(value) if value is not None else 0.0) + amount
+            if not exists or (minimum is not None and balance < minimum):
+                self.client.execute("UNWATCH")
+                return None
+            entry_ts = time.time() if ts is None else ts
+            if last is not None:
+                entry_ts = max(entry_ts, json.loads(last)[0])
+            replies = self.client.transaction([
+                ("HSET", key, "wallet_balance", _dumps(balance)),
+                ("RPUSH", wallet_key, _dumps([entry_ts, kind, amount, balance, description, reference]))
+            ])
+            if replies is not None:
+                return balance
+
+    def _wallet_entry(self, user_id: str, seq: int) -> Optional[List[Any]]:
+        value = self.client.execute("LINDEX", self._key("wallet", user_id), seq)
+        return json.loads(value) if value is not None else None
+
+    def wallet_balance(self, user_id: str) -> float:
+        entry = self._wallet_entry(user_id, -1)
+        return entry[3] if entry else 0.0
+
+    def wallet_balance_at(self, user_id: str, when: float) -> float:
+        # Entries are time-ordered: binary search for the last one at or before `when`
+        low, high = 0, self.client.execute("LLEN", self._key("wallet", user_id))
+        balance = 0.0
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._wallet_entry(user_id, middle)
+            if entry[0] <= when:
+                balance = entry[3]
+                low = middle + 1
+            else:
+                high = middle
+        return balance
+
+    def wallet_history(self, user_id: str, cursor: Optional[int] = None,
+                       limit: int = 20) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        key = self._key("wallet", user_id)
+        start, end = _page_bounds(self.client.execute("LLEN", key), cursor, limit)
+        values = self.client.execute("LRANGE", key, start, end - 1) if end > start else []
+        entries = []
+        for seq, value in reversed(list(enumerate(values, start))):
+            ts, kind, amount, _, description, reference = json.loads(value)
+            entries.append(ledger_entry(seq, ts, kind, amount, description, reference))
+        return entries, (start if start > 0 else None)
+
+    def reconcile_wallets(self, tolerance: float = 0.005) -> Dict[str, float]:
+        user_ids = sorted(self.client.execute("SMEMBERS", self._key("users")))
+        # The balances and the ledgers, read atomically
+        replies = self.client.transaction(
+            [("HGET", self._key("user", user_id), "wallet_balance") for user_id in user_ids]
+            + [("LRANGE", self._key("wallet", user_id), 0, -1) for user_id in user_ids])
+        balances = {user_id: json.loads(value) if value is not None else 0.0
+                    for user_id, value in zip(user_ids, replies[:len(user_ids)])}
+        sums = {user_id: sum(json.loads(value)[2] for value in values)
+                for user_id, values in zip(user_ids, replies[len(user_ids):])}
+        return _wallet_differences(balances, sums, tolerance)
+
+    def get_events(self, event_ids: Iterable[str]) -> Dict[str, Event]:
+        event_ids = list(event_ids)
+        hashes = self._get_hashes([self._key("event", event_id) for event_id in event_ids])
+        return {event_id: Event(fields) for event_id, fields in zip(event_ids, hashes) if fields}
+
+    def all_events(self) -> Mapping[str, Event]:
+        return self.get_events(sorted(self.client.execute("SMEMBERS", self._key("events"))))
+
+    def put_event(self, event: Mapping) -> Event:
+        event = Event.from_mapping(event)
+        self.client.transaction(self._put_event_commands(event))
+        return event
+
+    def put_event_if_absent(self, event: Mapping) -> Optional[Event]:
+        event = Event.from_mapping(event)
+        key = self._key("event", event["id"])
+        while True:
+            _, exists = self.client.pipeline([("WATCH", key), ("EXISTS", key)])
+            if exists:
+                self.client.execute("UNWATCH")
+                return None
+            if self.client.transaction(self._put_event_commands(event)) is not None:
+                return event
+
+    def _put_event_commands(self, event: Event) -> List[Tuple]:
+        # Members are sorted sets scored by the time they joined, so events list in the order they were added
+        joined = time.time()
+        commands = self._put_hash(self._key("event", event["id"]), event)
+        commands.append(("SADD", self._key("events"), event["id"]))
+        commands.append(("SADD", self._key("wishlists"), event["id"]))
+        for user_id in [event["creator"]] + list(event.get("participants", [])):
+            commands.append(("ZADD", self._key("user_events", user_id), "NX", joined, event["id"]))
+        commands.append(self._bump(EVENTS))
+        return commands
+
+    def get_user_events(self, user_id: str) -> List[Event]:
+        event_ids = self.client.execute("ZRANGE", self._key("user_events", user_id), 0, -1)
+        events = self.get_events(event_ids)
+        return [events[event_id] for event_id in event_ids if event_id in events]
+
+    def set_rsvp(self, event_id: str, user_id: str, status: str) -> Tuple[Optional[Event], Optional[str]]:
+        def set_status(rsvp):
+            old_status = rsvp.get(user_id)
+            rsvp[user_id] = status
+            return old_status
+
+        # The RSVPs field always exists once the event does (an event without one gets it here)
+        key = self._key("event", event_id)
+        while True:
+            _, exists, value = self.client.pipeline([("WATCH", key), ("EXISTS", key), ("HGET", key, "rsvp")])
+            if not exists:
+                self.client.execute("UNWATCH")
+                return None, None
+            rsvp = json.loads(value) if value is not None else {}
+            old_status = set_status(rsvp)
+            replies = self.client.transaction([("HSET", key, "rsvp", _dumps(rsvp)), ("HGETALL", key),
+                                               self._bump(EVENTS)])
+            if replies is not None:
+                return Event(self._decode_hash(replies[1])), old_status
+
+    def _item_key(self, event_id: str, item_id: str) -> str:
+        return self._key("item", event_id, item_id)
+
+    def get_wishlist(self, event_id: str) -> List[WishlistItem]:
+        item_ids = self.client.execute("ZRANGE", self._key("wishlist", event_id), 0, -1)
+        hashes = self._get_hashes([self._item_key(event_id, item_id) for item_id in item_ids])
+        return [WishlistItem(fields) for fields in hashes if fields]
+
+    def all_wishlists(self) -> Mapping[str, List[WishlistItem]]:
+        event_ids = sorted(self.client.execute("SMEMBERS", self._key("wishlists")))
+        orders = self.client.pipeline([("ZRANGE", self._key("wishlist", event_id), 0, -1) for event_id in event_ids])
+        keys = [(event_id, item_id) for event_id, item_ids in zip(event_ids, orders) for item_id in item_ids]
+        hashes = self._get_hashes([self._item_key(event_id, item_id) for event_id, item_id in keys])
+        wishlists = {event_id: [] for event_id in event_ids}
+        for (event_id, _), fields in zip(keys, hashes):
+            if fields:
+                wishlists[event_id].append(WishlistItem(fields))
+        return wishlists
+
+    def get_wishlist_item(self, event_id: str, item_id: str) -> Optional[WishlistItem]:
+        fields = self._get_hashes([self._item_key(event_id, item_id)])[0]
+        return WishlistItem(fields) if fields else None
+
+    def put_wishlist_item(self, event_id: str, item: Mapping) -> WishlistItem:
+        item = WishlistItem.from_mapping(item)
+        commands = self._put_hash(self._item_key(event_id, item["id"]), item)
+        commands.append(("ZADD", self._key("wishlist", event_id), "NX", time.time(), item["id"]))
+        commands.append(("SADD", self._key("wishlists"), event_id))
+        commands.append(self._bump(WISHLISTS))
+        self.client.transaction(commands)
+        return item
+
+    def update_wishlist_item(self, event_id: str, item_id: str, updates: Mapping) -> Optional[WishlistItem]:
+        fields = self._update_hash(self._item_key(event_id, item_id), updates, WISHLISTS)
+        return WishlistItem(fields) if fields is not None else None
+
+    def adjust_item_number(self, event_id: str, item_id: str, field: str, delta: float) -> Optional[float]:
+        return self._adjust(self._item_key(event_id, item_id), field, delta)
+
+    def append_chat_message(self, event_id: str, message: Mapping) -> Mapping:
+        message = {key: value for key, value in message.items() if key != "id"}
+        length, _, _ = self.client.transaction([("RPUSH", self._key("chat", event_id), _dumps(message)),
+                                                ("SADD", self._key("chats"), event_id), self._bump(CHATS)])
+        message["id"] = length - 1
+        return message
+
+    @staticmethod
+    def _messages(first_id: int, values: List[str]) -> List[Dict[str, Any]]:
+        messages = []
+        for message_id, value in enumerate(values, first_id):
+            message = json.loads(value)
+            message["id"] = message_id
+            messages.append(message)
+        return messages
+
+    def read_chat_messages(self, event_id: str, cursor: Optional[int] = None,
+                           limit: Optional[int] = None) -> List[Mapping]:
+        key = self._key("chat", event_id)
+        if cursor is None:
+            if limit is None:
+                return self._messages(0, self.client.execute("LRANGE", key, 0, -1))
+            if limit <= 0:
+                return []
+            # The length and the newest messages, read atomically
+            length, values = self.client.transaction([("LLEN", key), ("LRANGE", key, -limit, -1)])
+            return self._messages(length - len(values), values)
+        if cursor <= 0 or (limit is not None and limit <= 0):
+            return []
+        start = 0 if limit is None else max(0, cursor - limit)
+        length, values = self.client.transaction([("LLEN", key), ("LRANGE", key, start, cursor - 1)])
+        if cursor > length and limit is not None:
+            # A cursor past the end reads the newest messages
+            start = max(0, length - limit)
+            values = self.client.execute("LRANGE", key, start, length - 1)
+        return self._messages(start, values)
+
+    def chat_message_count(self, event_id: str) -> int:
+        return self.client.execute("LLEN", self._key("chat", event_id))
+
+    def all_chats(self) -> Mapping[str, Iterable[Mapping]]:
+        event_ids = sorted(self.client.execute("SMEMBERS", self._key("chats")))
+        logs = self.client.pipeline([("LRANGE", self._key("chat", event_id), 0, -1) for event_id in event_ids])
+        return {event_id: self._messages(0, values) for event_id, values in zip(event_ids, logs)}
+
+    def add_contribution(self, contribution: Mapping) -> int:
+        event_id, item_id, user_id = contribution["event_id"], contribution["item_id"], contribution["user_id"]
+        cents, day, extra = _split_contribution(contribution)
+        # INCR hands out positions atomically; the row, its index entries and the
+        # running totals are then written in one transaction
+        position = self.client.execute("INCR", self._key("contributions", "next")) - 1
+        self.client.transaction([
+            ("HSET", self._key("contributions"), position, _dumps([event_id, item_id, user_id, cents, day, extra])),
+            ("RPUSH", self._key("contributions", "event", event_id), position),
+            ("RPUSH", self._key("contributions", "item", event_id, item_id), position),
+            ("RPUSH", self._key("contributions", "user", user_id), position),
+            ("HINCRBY", self._key("totals", BY_EVENT), event_id, cents),
+            ("HINCRBY", self._key("totals", BY_ITEM), _dumps([event_id, item_id]), cents),
+            ("HINCRBY", self._key("totals", BY_USER), user_id, cents),
+            ("HINCRBY", self._key("totals", BY_DAY), day or "", cents),
+            self._bump(CONTRIBUTIONS),
+        ])
+        return position
+
+    def _contribution_rows(self, event_id: Optional[str], item_id: Optional[str],
+                           user_id: Optional[str]) -> List[List[Any]]:
+        """Matching rows (event_id, item_id, user_id, cents, day, extra), oldest first"""
+        _check_filters(None, event_id, item_id)
+        indexes = []
+        if item_id is not None:
+            indexes.append(self._key("contributions", "item", event_id, item_id))
+        elif event_id is not None:
+            indexes.append(self._key("contributions", "event", event_id))
+        if user_id is not None:
+            indexes.append(self._key("contributions", "user", user_id))
+
+        if indexes:
+            # Positions are handed out before they are indexed, so concurrent adds can index out of order
+            lists = self.client.pipeline([("LRANGE", key, 0, -1) for key in indexes])
+            positions = set(lists[0]).intersection(*lists[1:])
+            positions = sorted(positions, key=int)
+        else:
+            positions = list(range(int(self.client.execute("GET", self._key("contributions", "next")) or 0)))
+
+        rows = []
+        for start in range(0, len(positions), 10000):
+            values = self.client.execute("HMGET", self._key("contributions"), *positions[start:start + 10000])
+            # A writer that failed between INCR and EXEC leaves a gap
+            rows.extend(json.loads(value) for value in values if value is not None)
+        return rows
+
+    def get_contributions(self, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                          user_id: Optional[str] = None) -> List[Mapping]:
+        return [_join_contribution(*row) for row in self._contribution_rows(event_id, item_id, user_id)]
+
+    def contribution_totals(self, by: str, event_id: Optional[str] = None, item_id: Optional[str] = None,
+                            user_id: Optional[str] = None) -> Dict[Any, float]:
+        _check_filters(by, event_id, item_id)
+        if event_id is not None or user_id is not None:
+            return _sum_by(by, self._contribution_rows(event_id, item_id, user_id))
+
+        totals = self.client.execute("HGETALL", self._key("totals", by))
+        keys, cents = totals[::2], totals[1::2]
+        if by == BY_ITEM:
+            keys = [tuple(json.loads(key)) for key in keys]
+        elif by == BY_DAY:
+            keys = [key or None for key in keys]
+        return {key: int(value) / 100 for key, value in zip(keys, cents)}
+
+    def add_post(self, post: Mapping) -> Mapping:
+        post = _post_defaults({key: value for key, value in post.items() if key != "id"})
+        post["id"] = self.client.execute("INCR", self._key("posts", "next")) - 1
+        # Comments are a list of their own, so commenting is a single RPUSH
+        key = self._key("post", post["id"])
+        commands = self._put_hash(key, {field: value for field, value in post.items() if field != "comments"})
+        if post["comments"]:
+            commands.append(("RPUSH", key + ":comments") + tuple(_dumps(comment) for comment in post["comments"]))
+        commands.append(self._bump(POSTS))
+        self.client.transaction(commands)
+        return post
+
+    def get_posts(self, post_ids: Iterable[int]) -> Dict[int, Mapping]:
+        post_ids = list(post_ids)
+        commands = []
+        for post_id in post_ids:
+            key = self._key("post", post_id)
+            commands += [("HGETALL", key), ("LRANGE", key + ":comments", 0, -1)]
+        replies = self.client.pipeline(commands)
+        posts = {}
+        for post_id, fields, comments in zip(post_ids, replies[::2], replies[1::2]):
+            if fields:
+                post = self._decode_hash(fields)
+                post["comments"] = [json.loads(comment) for comment in comments]
+                posts[post_id] = post
+        return posts
+
+    def _post_count(self) -> int:
+        return int(self.client.execute("GET", self._key("posts", "next")) or 0)
+
+    def read_posts(self, cursor: Optional[int] = None, limit: int = 10) -> Tuple[List[Mapping], Optional[int]]:
+        return _page_posts(self.get_posts, self._post_count(), cursor, limit)
+
+    def all_posts(self) -> List[Mapping]:
+        posts = self.get_posts(range(self._post_count()))
+        return [posts[post_id] for post_id in sorted(posts)]
+
+    def like_post(self, post_id: int) -> Optional[int]:
+        key = self._key("post", post_id)
+        # Posts are never deleted, so one that exists stays there for the HINCRBY
+        if not self.client.execute("EXISTS", key):
+            return None
+        return self.client.execute("HINCRBY", key, "likes", 1)
+
+    def add_post_comment(self, post_id: int, comment: Mapping) -> Optional[int]:
+        key = self._key("post", post_id)
+        if not self.client.execute("EXISTS", key):
+            return None
+        count, _ = self.client.transaction([("RPUSH", key + ":comments", _dumps(comment)), self._bump(POSTS)])
+        return count
+
+    def close(self):
+        self.client.close()
+
+def backend_from_environment() -> Optional[StorageBackend]:
+    """
+    Backend configured by HUBSHUB_BACKEND: "sqlite:PATH" or
+    "redis://HOST:PORT/DB"; None to keep the collections in process memory
+    """
+    url = os.environ.get("HUBSHUB_BACKEND", "").strip()
+    if not url or url.lower() == "memory":
+        return None
+    if url.startswith("sqlite:"):
+        return SQLiteBackend(url[len("sqlite:"):])
+    if url.startswith("redis://"):
+        parts = urlsplit(url)
+        db = parts.path.strip("/")
+        return RedisBackend(RespClient(parts.hostname or "127.0.0.1", parts.port or 6379, int(db) if db else 0))
+    raise ValueError(f"Unknown storage backend: {url}")
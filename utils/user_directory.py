@@ -0,0 +1,174 @@
+import threading
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Optional[List[str]] = None  # users with a search key ending here
+
+def search_keys(user: Dict[str, Any]) -> List[str]:
+    """
+    Lowercase keys a user can be found by: the full name, each word of the
+    name, the email address and its local part
+    """
+    name = user.get("name", "").lower().strip()
+    email = user.get("email", "").lower().strip()
+    keys = {name, email, email.split("@")[0]}
+    keys.update(name.split())
+    keys.discard("")
+    return sorted(keys)
+
+class UserDirectory:
+    """
+    Type-ahead user search over a prefix trie of names and emails.
+    Only the matches for a query are ever materialized, so pickers don't need
+    the full user table. Friends of the searching user rank first, followed by
+    the closest completions in alphabetical order.
+    """
+
+    def __init__(self, users: Iterable[Dict[str, Any]], get_friends: Callable[[str], Iterable[str]],
+                 max_scan: int = 5000):
+        """
+        Initialize the directory
+
+        Args:
+            users: Users with 'id', 'name' and 'email'
+            get_friends: Returns the friend IDs of a user
+            max_scan: Most trie entries visited per search before giving up on more matches
+        """
+        self.get_friends = get_friends
+        self.max_scan = max_scan
+
+        self._root = _TrieNode()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._keys: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+        for user in users:
+            self.add_user(user)
+
+    def add_user(self, user: Dict[str, Any]):
+        """Index a new or changed user"""
+        with self._lock:
+            if user["id"] in self._keys:
+                self._remove(user["id"])
+
+            keys = search_keys(user)
+            self._entries[user["id"]] = {"id": user["id"], "name": user.get("name", ""), "email": user.get("email", "")}
+            self._keys[user["id"]] = keys
+
+            for key in keys:
+                node = self._root
+                for char in key:
+                    node = node.children.setdefault(char, _TrieNode())
+                if node.ids is None:
+                    node.ids = []
+                node.ids.append(user["id"])
+
+    def _remove(self, user_id: str):
+        for key in self._keys.pop(user_id, []):
+            node = self._find(key)
+            if node is not None and node.ids:
+                node.ids.remove(user_id)
+        self._entries.pop(user_id, None)
+
+    def _find(self, prefix: str, start: Optional[_TrieNode] = None) -> Optional[_TrieNode]:
+        node = start or self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Directory entry (id, name, email) of a user"""
+        return self._entries.get(user_id)
+
+    def matches(self, user_id: str, query: str) -> bool:
+        """Whether a user matches a query"""
+        query = query.lower().strip()
+        return any(key.startswith(query) for key in self._keys.get(user_id, []))
+
+    def search(self, query: str, limit: int = 10, user_id: Optional[str] = None,
+               exclude: Iterable[str] = (), node: Optional[_TrieNode] = None) -> List[Dict[str, Any]]:
+        """
+        Find users whose name or email starts with the query
+
+        Args:
+            query: Typed text (case-insensitive)
+            limit: Maximum number of matches
+            user_id: Searching user; their friends rank first and they are left out
+            exclude: User IDs to leave out (e.g. already selected)
+            node: Trie node of the query, if already known (see TypeAhead)
+
+        Returns:
+            Directory entries (id, name, email), best first
+        """
+        query = query.lower().strip()
+        skip = set(exclude)
+        if user_id is not None:
+            skip.add(user_id)
+
+        results = []
+
+        # Friends first: the friend list is small, so check each friend directly
+        if user_id is not None:
+            friends = [self._entries[friend] for friend in self.get_friends(user_id)
+                       if friend in self._entries and friend not in skip and self.matches(friend, query)]
+            friends.sort(key=lambda entry: entry["name"])
+            results.extend(friends[:limit])
+            skip.update(entry["id"] for entry in results)
+
+        if len(results) >= limit:
+            return results
+
+        with self._lock:
+            if node is None:
+                node = self._find(query)
+            if node is None:
+                return results
+
+            # Depth-first in character order: shortest, alphabetically first completions first
+            stack = [node]
+            scanned = 0
+            while stack and len(results) < limit and scanned < self.max_scan:
+                current = stack.pop()
+                scanned += 1
+                if current.ids:
+                    for match in current.ids:
+                        if match not in skip:
+                            skip.add(match)
+                            results.append(self._entries[match])
+                            if len(results) >= limit:
+                                break
+                stack.extend(current.children[char] for char in sorted(current.children, reverse=True))
+        return results
+
+class TypeAhead:
+    """
+    Incremental search for one picker.
+    When the query grows by a few characters, the trie walk continues from the
+    previous query's node instead of starting over.
+    """
+
+    def __init__(self, directory: UserDirectory):
+        self.directory = directory
+        self._query = ""
+        self._node: Optional[_TrieNode] = directory._root
+
+    def search(self, query: str, limit: int = 10, user_id: Optional[str] = None,
+               exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Search as in UserDirectory.search, reusing the walk of the previous query"""
+        query = query.lower().strip()
+        if self._node is not None and query.startswith(self._query):
+            node = self.directory._find(query[len(self._query):], self._node)
+        else:
+            node = self.directory._find(query)
+        self._query, self._node = query, node
+
+        if node is None:
+            # No completions; friends can't match either
+            return []
+        return self.directory.search(query, limit, user_id, exclude, node=node)
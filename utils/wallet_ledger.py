@@ -0,0 +1,271 @@
+import bisect
+import datetime
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# Ledger entry kinds; amounts are signed (credits positive, debits negative)
+OPENING = "opening"
+CREDIT = "credit"
+DEBIT = "debit"
+CONTRIBUTION = "contribution"
+REFUND = "refund"
+REWARD_REDEMPTION = "reward_redemption"
+
+ENTRY_KINDS = (OPENING, CREDIT, DEBIT, CONTRIBUTION, REFUND, REWARD_REDEMPTION)
+
+# Entry columns shared by all users, so reconciliation is a single vectorized pass
+ENTRY_DTYPE = np.dtype([("user", "<i4"), ("ts", "<f8"), ("amount", "<f8"), ("kind", "u1")])
+
+def ledger_entry(seq: int, ts: float, kind: str, amount: float, description: str,
+                 reference: Optional[str]) -> Dict[str, Any]:
+    """A ledger entry as returned by history()"""
+    return {
+        "seq": seq,
+        "ts": ts,
+        "date": datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d"),
+        "kind": kind,
+        "amount": amount,
+        "description": description,
+        "reference": reference
+    }
+
+class WalletLedger:
+    """
+    Append-only wallet ledger for all users.
+    Current balances are kept up to date on append (O(1) reads); each user's
+    balance is also checkpointed every `checkpoint_interval` entries, so the
+    balance at any past time is a checkpoint plus a short replay. Entries
+    are numbered by position across all users, so a journal can replay
+    them with put().
+    """
+
+    def __init__(self, checkpoint_interval: int = 64):
+        """
+        Initialize the ledger
+
+        Args:
+            checkpoint_interval: Number of a user's entries between balance checkpoints
+        """
+        self.checkpoint_interval = checkpoint_interval
+
+        # Entry columns, grown geometrically so appends are amortized O(1)
+        self._entries = np.empty(1024, dtype=ENTRY_DTYPE)
+        self._length = 0
+        self._details: List[Tuple[str, Optional[str]]] = []  # (description, reference) per entry
+
+        self._user_index: Dict[str, int] = {}
+        self._user_ids: List[str] = []
+        self._balances: List[float] = []
+        # Per user: positions of their entries, and checkpoints as parallel lists of
+        # (timestamp, number of entries covered, balance after those entries)
+        self._positions: List[List[int]] = []
+        self._checkpoint_ts: List[List[float]] = []
+        self._checkpoints: List[List[Tuple[int, float]]] = []
+
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._user_index
+
+    def _user(self, user_id: str) -> int:
+        index = self._user_index.get(user_id)
+        if index is None:
+            index = self._user_index[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._balances.append(0.0)
+            self._positions.append([])
+            self._checkpoint_ts.append([])
+            self._checkpoints.append([])
+        return index
+
+    def _ensure_capacity(self, needed: int):
+        if needed > len(self._entries):
+            grown = np.empty(max(needed, len(self._entries) * 2), dtype=ENTRY_DTYPE)
+            grown[:self._length] = self._entries[:self._length]
+            self._entries = grown
+
+    def append(self, user_id: str, kind: str, amount: float, description: str,
+               reference: Optional[str] = None, ts: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Append an entry to a user's ledger
+
+        Args:
+            user_id: User whose wallet changes
+            kind: One of ENTRY_KINDS
+            amount: Signed amount (negative for debits and contributions)
+            description: Shown in the wallet history
+            reference: Optional id of what the entry is for (transaction, contribution...)
+            ts: Entry time (unix seconds); defaults to now. Entries are kept time-ordered.
+
+        Returns:
+            The appended entry
+        """
+        if kind not in ENTRY_KINDS:
+            raise ValueError(f"Unknown ledger entry kind: {kind}")
+
+        with self._lock:
+            index = self._user(user_id)
+            positions = self._positions[index]
+
+            ts = time.time() if ts is None else ts
+            if positions:
+                ts = max(ts, float(self._entries["ts"][positions[-1]]))
+
+            position = self._add(index, kind, amount, description, reference, ts)
+            return self._entry(position, len(positions) - 1)
+
+    def put(self, position: int, user_id: str, kind: str, amount: float, description: str,
+            reference: Optional[str], ts: float):
+        """Apply a journaled entry at a position; entries the ledger already holds are skipped"""
+        with self._lock:
+            if position >= self._length:
+                self._add(self._user(user_id), kind, amount, description, reference, ts)
+
+    def _add(self, index: int, kind: str, amount: float, description: str, reference: Optional[str],
+             ts: float) -> int:
+        self._ensure_capacity(self._length + 1)
+        position = self._length
+        self._entries[position] = (index, ts, amount, ENTRY_KINDS.index(kind))
+        self._details.append((description, reference))
+        self._length += 1
+        self._index_entry(index, position, ts, amount)
+        return position
+
+    def _index_entry(self, index: int, position: int, ts: float, amount: float):
+        positions = self._positions[index]
+        positions.append(position)
+        self._balances[index] += amount
+
+        if len(positions) % self.checkpoint_interval == 0:
+            self._checkpoint_ts[index].append(ts)
+            self._checkpoints[index].append((len(positions), self._balances[index]))
+
+    def columns(self) -> Dict[str, Any]:
+        """The entries as columns, for a snapshot (see load_columns)"""
+        with self._lock:
+            return {
+                "entries": self._entries[:self._length].copy(),
+                "details": list(self._details),
+                "user_ids": list(self._user_ids)
+            }
+
+    def load_columns(self, columns: Dict[str, Any]):
+        """Replace the ledger's entries with a snapshot's, rebuilding balances and checkpoints"""
+        with self._lock:
+            entries = columns["entries"]
+            self._entries = np.empty(max(1024, len(entries)), dtype=ENTRY_DTYPE)
+            self._entries[:len(entries)] = entries
+            self._length = len(entries)
+            self._details = list(columns["details"])
+
+            self._user_index = {}
+            self._user_ids = []
+            self._balances = []
+            self._positions = []
+            self._checkpoint_ts = []
+            self._checkpoints = []
+            for user_id in columns["user_ids"]:
+                self._user(user_id)
+            for position, (index, ts, amount) in enumerate(zip(entries["user"].tolist(), entries["ts"].tolist(),
+                                                               entries["amount"].tolist())):
+                self._index_entry(index, position, ts, amount)
+
+    def _entry(self, position: int, seq: int) -> Dict[str, Any]:
+        row = self._entries[position]
+        description, reference = self._details[position]
+        return ledger_entry(seq, float(row["ts"]), ENTRY_KINDS[row["kind"]], float(row["amount"]),
+                            description, reference)
+
+    def balance(self, user_id: str) -> float:
+        """Current balance of a user"""
+        index = self._user_index.get(user_id)
+        return self._balances[index] if index is not None else 0.0
+
+    def balance_at(self, user_id: str, when) -> float:
+        """
+        Balance of a user at a past time
+
+        Args:
+            user_id: User to look up
+            when: datetime or unix timestamp; entries at exactly this time are included
+
+        Returns:
+            The balance after all entries up to `when`
+        """
+        if isinstance(when, datetime.datetime):
+            when = when.timestamp()
+
+        with self._lock:
+            index = self._user_index.get(user_id)
+            if index is None:
+                return 0.0
+
+            # Latest checkpoint at or before `when`, then replay the entries after it
+            covered, balance = 0, 0.0
+            checkpoint = bisect.bisect_right(self._checkpoint_ts[index], when)
+            if checkpoint:
+                covered, balance = self._checkpoints[index][checkpoint - 1]
+
+            positions = self._positions[index]
+            replay = positions[covered:covered + self.checkpoint_interval]
+            if replay:
+                rows = self._entries[replay]
+                balance += float(rows["amount"][rows["ts"] <= when].sum())
+            return balance
+
+    def history(self, user_id: str, cursor: Optional[int] = None, limit: int = 20) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Read a page of a user's entries, newest first
+
+        Args:
+            user_id: User to read
+            cursor: Only return entries older than this entry's seq (None for the newest)
+            limit: Maximum number of entries to return
+
+        Returns:
+            The entries, and the cursor for the next (older) page or None if there is none
+        """
+        with self._lock:
+            index = self._user_index.get(user_id)
+            if index is None:
+                return [], None
+
+            positions = self._positions[index]
+            end = len(positions) if cursor is None else max(0, min(cursor, len(positions)))
+            start = max(0, end - limit)
+            entries = [self._entry(positions[seq], seq) for seq in range(end - 1, start - 1, -1)]
+            return entries, (start if start > 0 else None)
+
+    def reconcile(self, expected_balances: Optional[Dict[str, float]] = None, tolerance: float = 0.005) -> Dict[str, float]:
+        """
+        Check balances against the ledger for all users at once
+
+        Args:
+            expected_balances: Balances to check, keyed by user ID (defaults to the
+                ledger's own running balances)
+            tolerance: Largest difference treated as rounding
+
+        Returns:
+            Difference (expected - ledger sum) for every user that doesn't reconcile
+        """
+        with self._lock:
+            user_count = len(self._user_ids)
+            entries = self._entries[:self._length]
+            sums = np.bincount(entries["user"], weights=entries["amount"], minlength=user_count)
+
+            if expected_balances is None:
+                expected = np.asarray(self._balances, dtype=np.float64)
+            else:
+                expected = np.array([expected_balances.get(user_id, 0.0) for user_id in self._user_ids],
+                                    dtype=np.float64)
+            user_ids = list(self._user_ids)
+
+        differences = expected - sums
+        mismatched = np.nonzero(np.abs(differences) > tolerance)[0]
+        return {user_ids[i]: float(differences[i]) for i in mismatched}